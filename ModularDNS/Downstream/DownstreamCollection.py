@@ -145,6 +145,19 @@ class DownstreamCollection(object):
 	def GetNumOfEndpoints(self) -> int:
 		return len(self.__endpointStore)
 
+	def IsSenderDependent(self) -> bool:
+		'''
+		# IsSenderDependent
+
+		## Returns
+		- bool: Whether any handler in this collection may answer the same
+		  question differently depending on the sender of the query.
+		'''
+		return any(
+			handler.IsSenderDependent()
+			for handler in self.__handlerStore.values()
+		)
+
 	def AddHandler(
 		self,
 		handlerName: str,
@@ -54,6 +54,17 @@ class DownstreamHandler(object):
 	def GetTrueClassName(self) -> str:
 		return self._clsName
 
+	def IsSenderDependent(self) -> bool:
+		'''
+		# IsSenderDependent
+
+		## Returns
+		- bool: Whether this handler may answer the same question differently
+		  depending on the sender of the query, e.g., by routing on the
+		  sender's address.
+		'''
+		return False
+
 	def CheckRecursionDepth(
 		self,
 		givenStack: List[ Tuple[ int, str ] ],
@@ -8,20 +8,28 @@
 ###
 
 
-import copy
+import concurrent.futures
+import os
+import threading
+import time
 
-from typing import List, Tuple, Union
-
-from CacheLib.TTL import Interfaces as _CLTTLInterfaces
-from CacheLib.TTL import MultiKeyMultiTTLValueCache
+from typing import Any, Dict, Hashable, List, Tuple, Union
 
+from ...Exceptions import (
+	CopyException,
+	DNSNameNotFoundError,
+	DNSZeroAnswerError,
+)
 from ...MsgEntry import AnsEntry, MsgEntry, QuestionEntry
 from ..DownstreamCollection import DownstreamCollection
 from ..HandlerByQuestion import HandlerByQuestion
 from ..QuickLookup import QuickLookup
+from ..Utils import GetNegativeTTL, TokenBucket
+from . import CacheSnapshot
+from .CacheStore import CacheStore, ShardedCacheStore, StoreItem
 
 
-class CacheItem(_CLTTLInterfaces.KeyValueItem):
+class CacheItem(StoreItem):
 	'''
 	# CacheItem
 
@@ -32,50 +40,265 @@ class CacheItem(_CLTTLInterfaces.KeyValueItem):
 	- A list of `MsgEntry` objects, which should be the response to the DNS query.
 	- A TTL value, which should be derived from the (shortest) TTL value of the
 	  `MsgEntry` objects.
-	  - If none of the `MsgEntry` objects have a TTL value, the default TTL
-	    value will be used.
+	  - If there is no answer (i.e., a NODATA response), the negative TTL
+	    given by the SOA record in the authority section will be used
+	    (RFC 2308), or `negTTL` if there isn't one.
+	- Or, instead of the list of `MsgEntry` objects, the negative result
+	  (i.e., a `DNSNameNotFoundError` or a `DNSZeroAnswerError`) given for the
+	  DNS query, which will be re-raised when the item is retrieved.
+	  Its TTL is the negative TTL carried by the exception, or `negTTL` if the
+	  exception doesn't have one.
+	- If `ttl` and `size` are given, they override the values derived from
+	  above (e.g., for an item restored from a snapshot).
+	- An estimated size (in bytes) of the item, which is used to bound the
+	  memory usage of the cache.
 	'''
 
 	DEFAULT_TTL = 3600.0
+	DEFAULT_NEG_TTL = 300.0
+
+	ITEM_OVERHEAD_SIZE = 256
+	ENTRY_OVERHEAD_SIZE = 128
 
 	def __init__(
 		self,
 		question: QuestionEntry.QuestionEntry,
 		resps: List[MsgEntry.MsgEntry],
 		defaultTTL: float = DEFAULT_TTL,
+		negTTL: float = DEFAULT_NEG_TTL,
+		negExcept: Union[DNSNameNotFoundError, DNSZeroAnswerError, None] = None,
+		ttl: Union[float, None] = None,
+		size: Union[int, None] = None,
 	) -> None:
 		super(CacheItem, self).__init__()
 
 		self._question = question
 		self._resps = resps
 		self._defaultTTL = defaultTTL
+		self._negExcept = negExcept
+
+		self._createdAt = time.monotonic()
+		# number of hits since this item is cached; it's only a hint for
+		# the prefetching, so it's fine to be updated without locking
+		self.numHits = 0
+		self.hasPrefetched = False
 
 		# calculate the TTL value
-		self._ttl = None
-		for resp in resps:
-			if resp.entryType == 'ANS':
-				resp: AnsEntry.AnsEntry = resp
-				self._ttl = resp.ttl if (self._ttl is None) else min(self._ttl, resp.ttl)
+		self._ttl = ttl
+		if (self._ttl is None) and (negExcept is not None):
+			self._ttl = negExcept.negTTL
+			if self._ttl is None:
+				self._ttl = negTTL
+		elif self._ttl is None:
+			for resp in resps:
+				if resp.entryType == 'ANS':
+					resp: AnsEntry.AnsEntry = resp
+					self._ttl = resp.ttl if (self._ttl is None) else min(self._ttl, resp.ttl)
+			if self._ttl is None:
+				# a NODATA response
+				self._ttl = GetNegativeTTL(
+					[ x.ToRRSet() for x in resps if x.entryType == 'AUTH' ]
+				)
+				if self._ttl is None:
+					self._ttl = negTTL
 		if self._ttl is None:
 			self._ttl = self._defaultTTL
 
-	def GetKeys(self) -> List[_CLTTLInterfaces.KeyValueKey]:
+		self._size = size
+		if self._size is None:
+			self._size = self.ITEM_OVERHEAD_SIZE + sum(
+				[ self._EstimateEntrySize(x) for x in resps ]
+			)
+			if negExcept is not None:
+				self._size += len(str(negExcept.name))
+
+	@classmethod
+	def _EstimateEntrySize(cls, entry: MsgEntry.MsgEntry) -> int:
+		if entry.entryType == 'ANS':
+			entry: AnsEntry.AnsEntry = entry
+			name, dataList = entry.name, entry.dataList
+		else:
+			rrset = entry.ToRRSet()
+			name, dataList = rrset.name, rrset
+
+		return cls.ENTRY_OVERHEAD_SIZE + len(name.to_wire()) + sum(
+			[ len(x.to_wire()) for x in dataList ]
+		)
+
+	def GetKeys(self) -> List[Hashable]:
 		return [self._question]
 
 	def GetTTL(self) -> float:
 		return self._ttl
 
+	def GetSize(self) -> int:
+		return self._size
+
+	def GetRemainingTTL(self) -> float:
+		return self._createdAt + self._ttl - time.monotonic()
+
 	def Terminate(self) -> None:
 		# nothing to do in this case
 		pass
 
+	def Dump(self, expireAt: float) -> bytes:
+		'''
+		# Dump
+		Serialize this item into a snapshot record.
+
+		## Parameters
+		- `expireAt`: The absolute expiry time of this item, in seconds since
+		  the epoch.
+
+		## Returns
+		- bytes: The snapshot record.
+		'''
+		return CacheSnapshot.DumpEntry(
+			question=self._question,
+			resps=self._resps,
+			negExcept=self._negExcept,
+			expireAt=expireAt,
+			size=self._size,
+		)
+
+	@classmethod
+	def IsNegativeResp(cls, resps: List[MsgEntry.MsgEntry]) -> bool:
+		'''
+		# IsNegativeResp
+
+		## Parameters
+		- `resps`: The response to a DNS query.
+
+		## Returns
+		- bool: Whether the response has no answer (i.e., a NODATA response).
+		'''
+		return all([ x.entryType != 'ANS' for x in resps ])
+
+	def _RaiseNegExcept(self) -> None:
+		# raise a new exception object every time, since the same object
+		# can't be raised by multiple threads at the same time
+		e = self._negExcept
+		if isinstance(e, DNSNameNotFoundError):
+			raise DNSNameNotFoundError(
+				name=e.name,
+				respServer=e.respServer,
+				negTTL=e.negTTL,
+			)
+		else:
+			raise DNSZeroAnswerError(name=e.name, negTTL=e.negTTL)
+
 	def GetResp(self) -> List[MsgEntry.MsgEntry]:
-		return [ copy.copy(x) for x in self._resps ]
+		if self._negExcept is not None:
+			self._RaiseNegExcept()
+		# `MsgEntry` objects are immutable, so they can be shared without
+		# being copied
+		return list(self._resps)
+
+	def GetStaleResp(self, staleAnsTTL: int) -> List[MsgEntry.MsgEntry]:
+		if self._negExcept is not None:
+			self._RaiseNegExcept()
+		return [
+			x.WithTTL(min(x.ttl, staleAnsTTL)) if x.entryType == 'ANS' else x
+			for x in self._resps
+		]
+
+
+class InFlightReq(object):
+	'''
+	# InFlightReq
+
+	A lookup that has missed the cache and is currently being resolved by the
+	fallback handler.
+
+	The thread resolving the lookup (i.e., the *leader*) queries the
+	fallback handler and publishes the outcome via `SetResp()` or
+	`SetExcept()`.
+	Other threads missing the cache on the same question (i.e., the
+	*followers*) wait for that outcome via `GetResp()`, instead of querying
+	the fallback handler by themselves.
+	'''
+
+	def __init__(self) -> None:
+		super(InFlightReq, self).__init__()
+
+		self.leaderThreadId = threading.get_ident()
+
+		self._doneEvent = threading.Event()
+		self._resps: Union[List[MsgEntry.MsgEntry], None] = None
+		self._except: Union[BaseException, None] = None
+
+	def SetResp(self, resps: List[MsgEntry.MsgEntry]) -> None:
+		self._resps = resps
+		self._doneEvent.set()
+
+	def SetExcept(self, e: BaseException) -> None:
+		self._except = e
+		self._doneEvent.set()
+
+	def GetResp(self) -> List[MsgEntry.MsgEntry]:
+		self._doneEvent.wait()
+
+		if self._except is not None:
+			# each follower raises its own copy, chained to the one raised by
+			# the leader
+			raise CopyException(self._except) from self._except
+
+		return list(self._resps)
 
 
 class Cache(QuickLookup):
+	'''
+	# Cache
+
+	Caches the responses given by the `fallback` handler.
+
+	When `staleTTL` is greater than zero, expired entries are kept for another
+	`staleTTL` seconds (RFC 8767).
+	A lookup hitting such a stale entry is answered immediately, with the TTL
+	capped to `staleAnsTTL`, while the entry is refreshed by querying the
+	`fallback` handler in the background.
+	If the refresh fails, the stale entry continues to be served until the
+	end of the stale window.
+
+	Negative results (i.e., `DNSNameNotFoundError` and `DNSZeroAnswerError`
+	raised by the `fallback` handler) are cached as well (RFC 2308), and
+	re-raised on cache hits.
+	So are NODATA responses returned as normal results (i.e., with no
+	answer).
+	They are cached for the negative TTL given by the SOA record of the
+	response, or for `negTTL` seconds if there isn't one.
+	Setting `negTTL` to zero disables the caching of negative results.
+
+	When `numShards` is greater than one, the cached entries are split into
+	that many shards, each with its own lock, to reduce the lock contention
+	between concurrent lookups.
+
+	When `snapshotPath` is given, the cached entries are saved to that file
+	every `snapshotInterval` seconds (if it's greater than zero) and on
+	`Terminate()`, along with their absolute expiry times.
+	On start, the entries that are still valid are loaded back from that
+	file in the background, so the cache is warm after a restart without
+	delaying the start of the servers.
+
+	When `prefetchMinHits` is greater than zero, an entry that has been hit
+	at least `prefetchMinHits` times is refreshed in the background once less
+	than `prefetchRemainFrac` of its TTL is left, so popular entries are
+	renewed before they expire.
+	At most `prefetchRate` prefetches are started per second, so prefetching
+	can't amplify the load on the `fallback` handler.
+	'''
 
 	DEFAULT_TTL = CacheItem.DEFAULT_TTL
+	DEFAULT_NEG_TTL = CacheItem.DEFAULT_NEG_TTL
+	DEFAULT_EVICT_POLICY = CacheStore.EVICT_POLICY_LRU
+	DEFAULT_STALE_TTL = 0.0
+	DEFAULT_STALE_ANS_TTL = 30
+	DEFAULT_NUM_BG_WORKERS = 4
+	DEFAULT_PREFETCH_MIN_HITS = 0
+	DEFAULT_PREFETCH_REMAIN_FRAC = 0.1
+	DEFAULT_PREFETCH_RATE = 10.0
+	DEFAULT_SNAPSHOT_INTERVAL = 300.0
+	DEFAULT_NUM_SHARDS = 1
 
 	@classmethod
 	def FromConfig(
@@ -83,61 +306,503 @@ class Cache(QuickLookup):
 		dCollection: DownstreamCollection,
 		fallback: str,
 		defaultTTL: float = DEFAULT_TTL,
+		maxEntries: Union[int, None] = None,
+		maxBytes: Union[int, None] = None,
+		evictPolicy: str = DEFAULT_EVICT_POLICY,
+		staleTTL: float = DEFAULT_STALE_TTL,
+		staleAnsTTL: int = DEFAULT_STALE_ANS_TTL,
+		numBgWorkers: int = DEFAULT_NUM_BG_WORKERS,
+		prefetchMinHits: int = DEFAULT_PREFETCH_MIN_HITS,
+		prefetchRemainFrac: float = DEFAULT_PREFETCH_REMAIN_FRAC,
+		prefetchRate: float = DEFAULT_PREFETCH_RATE,
+		negTTL: float = DEFAULT_NEG_TTL,
+		snapshotPath: Union[str, None] = None,
+		snapshotInterval: float = DEFAULT_SNAPSHOT_INTERVAL,
+		numShards: int = DEFAULT_NUM_SHARDS,
 	) -> 'Cache':
 		return cls(
 			fallback=dCollection.GetHandlerByQuestion(fallback),
 			defaultTTL=defaultTTL,
+			maxEntries=maxEntries,
+			maxBytes=maxBytes,
+			evictPolicy=evictPolicy,
+			staleTTL=staleTTL,
+			staleAnsTTL=staleAnsTTL,
+			numBgWorkers=numBgWorkers,
+			prefetchMinHits=prefetchMinHits,
+			prefetchRemainFrac=prefetchRemainFrac,
+			prefetchRate=prefetchRate,
+			negTTL=negTTL,
+			snapshotPath=snapshotPath,
+			snapshotInterval=snapshotInterval,
+			numShards=numShards,
 		)
 
 	def __init__(
 		self,
 		fallback: HandlerByQuestion,
 		defaultTTL: float = DEFAULT_TTL,
+		maxEntries: Union[int, None] = None,
+		maxBytes: Union[int, None] = None,
+		evictPolicy: str = DEFAULT_EVICT_POLICY,
+		staleTTL: float = DEFAULT_STALE_TTL,
+		staleAnsTTL: int = DEFAULT_STALE_ANS_TTL,
+		numBgWorkers: int = DEFAULT_NUM_BG_WORKERS,
+		prefetchMinHits: int = DEFAULT_PREFETCH_MIN_HITS,
+		prefetchRemainFrac: float = DEFAULT_PREFETCH_REMAIN_FRAC,
+		prefetchRate: float = DEFAULT_PREFETCH_RATE,
+		negTTL: float = DEFAULT_NEG_TTL,
+		snapshotPath: Union[str, None] = None,
+		snapshotInterval: float = DEFAULT_SNAPSHOT_INTERVAL,
+		numShards: int = DEFAULT_NUM_SHARDS,
 	) -> None:
 		super(QuickLookup, self).__init__()
 
 		self._fallback = fallback
 		self._defaultTTL = defaultTTL
+		self._negTTL = negTTL
+		self._staleTTL = staleTTL
+		self._staleAnsTTL = staleAnsTTL
+		self._prefetchMinHits = prefetchMinHits
+		self._prefetchRemainFrac = prefetchRemainFrac
+		self._prefetchLimiter = TokenBucket(
+			rate=prefetchRate,
+			burst=max(1.0, prefetchRate),
+		)
 
-		self._cache = MultiKeyMultiTTLValueCache.MultiKeyMultiTTLValueCache()
+		if numShards > 1:
+			self._cache = ShardedCacheStore(
+				numShards=numShards,
+				maxEntries=maxEntries,
+				maxBytes=maxBytes,
+				evictPolicy=evictPolicy,
+				staleTTL=staleTTL,
+			)
+		else:
+			self._cache = CacheStore(
+				maxEntries=maxEntries,
+				maxBytes=maxBytes,
+				evictPolicy=evictPolicy,
+				staleTTL=staleTTL,
+			)
 
-	def HandleQuestion(
+		# questions that are being resolved by the fallback handler
+		self._inFlightLock = threading.Lock()
+		self._inFlight: Dict[QuestionEntry.QuestionEntry, InFlightReq] = {}
+		self._numStaleHits = 0
+		self._numBgRefreshes = 0
+		self._numPrefetches = 0
+		self._numPrefetchesLimited = 0
+
+		# workers that resolve questions in the background
+		self._bgExecutor = concurrent.futures.ThreadPoolExecutor(
+			max_workers=numBgWorkers,
+			thread_name_prefix=f'{self._clsName}.Background',
+		)
+
+		# snapshot of the cache
+		self._snapshotPath = snapshotPath
+		self._snapshotInterval = snapshotInterval
+		self._snapshotLock = threading.Lock()
+		self._snapshotStopEvent = threading.Event()
+		self._snapshotLoadedEvent = threading.Event()
+		# whether the previous snapshot has been completely loaded, so that
+		# it's safe to be overwritten
+		self._isSnapshotLoaded = False
+		self._numSnapshotLoaded = 0
+		self._snapshotThreads: List[threading.Thread] = []
+		if self._snapshotPath is None:
+			self._snapshotLoadedEvent.set()
+		else:
+			self._snapshotThreads.append(threading.Thread(
+				target=self._LoadSnapshot,
+				name=f'{self._clsName}.LoadSnapshot',
+				daemon=True,
+			))
+			if self._snapshotInterval > 0:
+				self._snapshotThreads.append(threading.Thread(
+					target=self._PeriodicSaveSnapshot,
+					name=f'{self._clsName}.SaveSnapshot',
+					daemon=True,
+				))
+			for t in self._snapshotThreads:
+				t.start()
+
+	def _LeadLookup(
 		self,
+		inFlightReq: InFlightReq,
 		msgEntry: QuestionEntry.QuestionEntry,
 		senderAddr: Tuple[str, int],
 		recDepthStack: List[ Tuple[ int, str ] ],
-	) -> List[ MsgEntry.MsgEntry ]:
-
-		cachedItem: Union[CacheItem, None] = self._cache.Get(msgEntry)
-		if cachedItem is not None:
-			return cachedItem.GetResp()
-		else:
-			# cache miss
+	) -> CacheItem:
+		try:
 			newRecStack = self.CheckRecursionDepth(
 				recDepthStack,
 				self.HandleQuestion
 			)
-			respEntries = self._fallback.HandleQuestion(
-				msgEntry=msgEntry,
-				senderAddr=senderAddr,
-				recDepthStack=newRecStack,
-			)
+			try:
+				respEntries = self._fallback.HandleQuestion(
+					msgEntry=msgEntry,
+					senderAddr=senderAddr,
+					recDepthStack=newRecStack,
+				)
+			except (DNSNameNotFoundError, DNSZeroAnswerError) as e:
+				# cache the negative result
+				if self._negTTL > 0:
+					self._cache.Put(
+						CacheItem(
+							question=msgEntry,
+							resps=[],
+							defaultTTL=self._defaultTTL,
+							negTTL=self._negTTL,
+							negExcept=e,
+						),
+						raiseIfKeyExist=False,
+					)
+				raise
 
 			# cache the response
 			cachedItem = CacheItem(
 				question=msgEntry,
 				resps=respEntries,
 				defaultTTL=self._defaultTTL,
+				negTTL=self._negTTL,
 			)
-			self._cache.Put(
-				cachedItem,
-				# it's fine that another thread already cached the item
-				raiseIfKeyExist=False,
+			if (self._negTTL > 0) or (not CacheItem.IsNegativeResp(respEntries)):
+				self._cache.Put(
+					cachedItem,
+					# it's fine that another thread already cached the item
+					raiseIfKeyExist=False,
+				)
+		except BaseException as e:
+			inFlightReq.SetExcept(e)
+			raise
+		else:
+			inFlightReq.SetResp(respEntries)
+		finally:
+			# the outcome is published, so any later miss should start a new
+			# lookup rather than waiting on this one
+			with self._inFlightLock:
+				self._inFlight.pop(msgEntry, None)
+
+		return cachedItem
+
+	def _BgLookup(
+		self,
+		inFlightReq: InFlightReq,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> None:
+		inFlightReq.leaderThreadId = threading.get_ident()
+		try:
+			self._LeadLookup(
+				inFlightReq=inFlightReq,
+				msgEntry=msgEntry,
+				senderAddr=senderAddr,
+				recDepthStack=recDepthStack,
+			)
+		except Exception as e:
+			# nobody is waiting for the background lookup, so the failure
+			# is only logged
+			self.logger.debug(
+				f'Background lookup of {msgEntry} failed with error {e}'
 			)
 
-			return cachedItem.GetResp()
+	def _StartBgLookup(
+		self,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> bool:
+		'''
+		Start a background lookup for the given question, unless there is
+		already a lookup in-flight for it.
+
+		## Returns
+		- bool: Whether a new background lookup has been started.
+		'''
+		with self._inFlightLock:
+			if msgEntry in self._inFlight:
+				return False
+			inFlightReq = InFlightReq()
+			self._inFlight[msgEntry] = inFlightReq
+
+		try:
+			self._bgExecutor.submit(
+				self._BgLookup,
+				inFlightReq,
+				msgEntry,
+				senderAddr,
+				list(recDepthStack),
+			)
+		except RuntimeError as e:
+			# the executor has been shutdown
+			inFlightReq.SetExcept(e)
+			with self._inFlightLock:
+				self._inFlight.pop(msgEntry, None)
+			return False
+
+		return True
+
+	def _HandleMiss(
+		self,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> List[ MsgEntry.MsgEntry ]:
+		with self._inFlightLock:
+			inFlightReq = self._inFlight.get(msgEntry, None)
+			isLeader = inFlightReq is None
+			if isLeader:
+				inFlightReq = InFlightReq()
+				self._inFlight[msgEntry] = inFlightReq
+
+		if not isLeader:
+			if inFlightReq.leaderThreadId == threading.get_ident():
+				# the same question is being looked up recursively by the
+				# leader thread itself; waiting here would dead lock, so
+				# we just forward it to the fallback handler
+				newRecStack = self.CheckRecursionDepth(
+					recDepthStack,
+					self.HandleQuestion
+				)
+				return self._fallback.HandleQuestion(
+					msgEntry=msgEntry,
+					senderAddr=senderAddr,
+					recDepthStack=newRecStack,
+				)
+
+			# another thread is already querying the fallback handler for the
+			# same question, so we only need to wait for its outcome
+			return inFlightReq.GetResp()
+
+		cachedItem = self._LeadLookup(
+			inFlightReq=inFlightReq,
+			msgEntry=msgEntry,
+			senderAddr=senderAddr,
+			recDepthStack=recDepthStack,
+		)
+		return cachedItem.GetResp()
+
+	def _HandleStaleHit(
+		self,
+		cachedItem: CacheItem,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> List[ MsgEntry.MsgEntry ]:
+		hasStarted = self._StartBgLookup(
+			msgEntry=msgEntry,
+			senderAddr=senderAddr,
+			recDepthStack=recDepthStack,
+		)
+		with self._inFlightLock:
+			self._numStaleHits += 1
+			if hasStarted:
+				self._numBgRefreshes += 1
+
+		return cachedItem.GetStaleResp(self._staleAnsTTL)
+
+	def _HandleFreshHit(
+		self,
+		cachedItem: CacheItem,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> List[ MsgEntry.MsgEntry ]:
+		if self._prefetchMinHits > 0:
+			cachedItem.numHits += 1
+			if (
+				(not cachedItem.hasPrefetched) and
+				(cachedItem.numHits >= self._prefetchMinHits) and
+				(
+					cachedItem.GetRemainingTTL() <
+					(cachedItem.GetTTL() * self._prefetchRemainFrac)
+				)
+			):
+				self._Prefetch(
+					cachedItem=cachedItem,
+					msgEntry=msgEntry,
+					senderAddr=senderAddr,
+					recDepthStack=recDepthStack,
+				)
+
+		return cachedItem.GetResp()
+
+	def _Prefetch(
+		self,
+		cachedItem: CacheItem,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> None:
+		if not self._prefetchLimiter.TryAcquire():
+			# too many prefetches recently; we may try again on the next hit
+			with self._inFlightLock:
+				self._numPrefetchesLimited += 1
+			return
+
+		cachedItem.hasPrefetched = True
+		hasStarted = self._StartBgLookup(
+			msgEntry=msgEntry,
+			senderAddr=senderAddr,
+			recDepthStack=recDepthStack,
+		)
+		if hasStarted:
+			with self._inFlightLock:
+				self._numPrefetches += 1
+
+	def HandleQuestion(
+		self,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> List[ MsgEntry.MsgEntry ]:
+
+		cachedItem, isStale = self._cache.GetAllowStale(msgEntry)
+		cachedItem: Union[CacheItem, None]
+		if cachedItem is None:
+			# cache miss
+			return self._HandleMiss(
+				msgEntry=msgEntry,
+				senderAddr=senderAddr,
+				recDepthStack=recDepthStack,
+			)
+		elif isStale:
+			return self._HandleStaleHit(
+				cachedItem=cachedItem,
+				msgEntry=msgEntry,
+				senderAddr=senderAddr,
+				recDepthStack=recDepthStack,
+			)
+		else:
+			return self._HandleFreshHit(
+				cachedItem=cachedItem,
+				msgEntry=msgEntry,
+				senderAddr=senderAddr,
+				recDepthStack=recDepthStack,
+			)
+
+	def _LoadSnapshot(self) -> None:
+		try:
+			if not os.path.exists(self._snapshotPath):
+				self.logger.debug(
+					f'Cache snapshot {self._snapshotPath} does not exist'
+				)
+			else:
+				for question, resps, negExcept, expireAt, size in CacheSnapshot.Load(
+					path=self._snapshotPath,
+					now=time.time(),
+					stopEvent=self._snapshotStopEvent,
+				):
+					ttl = expireAt - time.time()
+					isNegative = (negExcept is not None) or \
+						CacheItem.IsNegativeResp(resps)
+					if (ttl <= 0) or (isNegative and (self._negTTL <= 0)):
+						continue
+					try:
+						self._cache.Put(
+							CacheItem(
+								question=question,
+								resps=resps,
+								defaultTTL=self._defaultTTL,
+								negTTL=self._negTTL,
+								negExcept=negExcept,
+								ttl=ttl,
+								size=size,
+							),
+							# the entry cached since the start is fresher
+							raiseIfKeyExist=True,
+						)
+					except KeyError:
+						continue
+					self._numSnapshotLoaded += 1
+
+			self._isSnapshotLoaded = not self._snapshotStopEvent.is_set()
+		except Exception as e:
+			self.logger.warning(
+				f'Failed to load cache snapshot {self._snapshotPath}: {e}'
+			)
+			# the snapshot is broken anyway
+			self._isSnapshotLoaded = True
+		finally:
+			self._snapshotLoadedEvent.set()
+
+	def _PeriodicSaveSnapshot(self) -> None:
+		while not self._snapshotStopEvent.wait(self._snapshotInterval):
+			if not self._isSnapshotLoaded:
+				continue
+			try:
+				self.SaveSnapshot()
+			except Exception as e:
+				self.logger.warning(
+					f'Failed to save cache snapshot {self._snapshotPath}: {e}'
+				)
+
+	def WaitSnapshotLoaded(self, timeout: Union[float, None] = None) -> bool:
+		'''
+		# WaitSnapshotLoaded
+		Wait for the snapshot to be loaded.
+
+		## Parameters
+		- `timeout`: The maximum time to wait, in seconds.
+
+		## Returns
+		- bool: Whether the snapshot has been loaded (or there is no snapshot
+		  to load).
+		'''
+		return self._snapshotLoadedEvent.wait(timeout)
+
+	def SaveSnapshot(self) -> int:
+		'''
+		# SaveSnapshot
+		Save all fresh entries to the snapshot file.
+
+		## Returns
+		- int: The number of entries saved.
+		'''
+		if self._snapshotPath is None:
+			raise ValueError('snapshotPath is not configured')
+
+		now = time.time()
+		items = self._cache.GetFreshItems()
+		with self._snapshotLock:
+			return CacheSnapshot.Save(
+				path=self._snapshotPath,
+				records=(
+					item.Dump(expireAt=now + remainingTTL)
+					for item, remainingTTL in items
+				),
+			)
+
+	def GetNumEvictions(self) -> int:
+		return self._cache.GetNumEvictions()
+
+	def GetStats(self) -> Dict[str, Any]:
+		stats = self._cache.GetStats()
+		with self._inFlightLock:
+			stats['staleHits'] = self._numStaleHits
+			stats['bgRefreshes'] = self._numBgRefreshes
+			stats['prefetches'] = self._numPrefetches
+			stats['prefetchesLimited'] = self._numPrefetchesLimited
+		stats['snapshotLoaded'] = self._numSnapshotLoaded
+		return stats
 
 	def Terminate(self) -> None:
+		self._snapshotStopEvent.set()
+		for t in self._snapshotThreads:
+			t.join()
+
+		self._bgExecutor.shutdown(wait=True)
+
+		if (self._snapshotPath is not None) and self._isSnapshotLoaded:
+			try:
+				self.SaveSnapshot()
+			except Exception as e:
+				self.logger.warning(
+					f'Failed to save cache snapshot {self._snapshotPath}: {e}'
+				)
+
 		self._fallback.Terminate()
 		self._cache.Terminate()
-
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import functools
+import os
+import struct
+import threading
+
+from typing import BinaryIO, Iterable, Iterator, List, Tuple, Union
+
+import dns.name
+import dns.rdata
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+
+from ...Exceptions import DNSNameNotFoundError, DNSZeroAnswerError
+from ...MsgEntry import AddEntry, AnsEntry, AuthEntry, MsgEntry, QuestionEntry
+
+
+# A snapshot file starts with the magic bytes, followed by a sequence of
+# records. Each record consists of a fixed-size header, i.e., the kind of
+# the record, the absolute expiry time in seconds since the epoch, the
+# estimated size of the cache item, and the length of the body; and the body,
+# which consists of:
+# - the extra data: the `name` and the `respServer` of the negative result,
+#   separated by a null byte (only for negative results)
+# - the question: name, class, and type
+# - the entries: for each `MsgEntry` object, its section, name, class, type,
+#   TTL, and the list of Rdata objects in wire format
+# Names are stored in the uncompressed wire format, or as a single
+# `_NAME_SAME_AS_QUESTION` byte if they are the same as the question name.
+#
+# This format is used (instead of the DNS message wire format) since it can
+# be written and read with very little parsing.
+SNAPSHOT_MAGIC = b'MDNSCS02'
+
+_RECORD_HEADER = struct.Struct('>BdII')
+_LEN_FMT = struct.Struct('>H')
+_QUESTION_FMT = struct.Struct('>HH')
+_ENTRY_FMT = struct.Struct('>BHHIH')
+
+_NAME_SAME_AS_QUESTION = b'\xc0'
+
+KIND_RESP = 0
+KIND_NAME_NOT_FOUND = 1
+KIND_ZERO_ANSWER = 2
+
+SECTION_ANS = 0
+SECTION_AUTH = 1
+SECTION_ADD = 2
+
+_SECTION_LUT = {
+	'ANS': SECTION_ANS,
+	'AUTH': SECTION_AUTH,
+	'ADD': SECTION_ADD,
+}
+
+
+# there are only a few distinct classes and types, so converting them back to
+# enums is memoized
+_MakeRdCls = functools.lru_cache(maxsize=None)(dns.rdataclass.RdataClass.make)
+_MakeRdType = functools.lru_cache(maxsize=None)(dns.rdatatype.RdataType.make)
+
+
+NegExceptType = Union[DNSNameNotFoundError, DNSZeroAnswerError, None]
+
+SnapshotEntry = Tuple[
+	QuestionEntry.QuestionEntry,
+	List[MsgEntry.MsgEntry],
+	NegExceptType,
+	float,
+	int,
+]
+
+
+def _DumpName(name: dns.name.Name) -> bytes:
+	return b''.join([ bytes((len(x), )) + x for x in name.labels ])
+
+
+def _LoadName(
+	body: bytes,
+	offset: int,
+	questionName: Union[dns.name.Name, None],
+) -> Tuple[dns.name.Name, int]:
+	if body[offset] == _NAME_SAME_AS_QUESTION[0]:
+		return questionName, offset + 1
+
+	labels = []
+	while True:
+		labelLen = body[offset]
+		labels.append(body[offset + 1:offset + 1 + labelLen])
+		offset += 1 + labelLen
+		if labelLen == 0:
+			return dns.name.Name(labels), offset
+
+
+def DumpEntry(
+	question: QuestionEntry.QuestionEntry,
+	resps: List[MsgEntry.MsgEntry],
+	negExcept: NegExceptType,
+	expireAt: float,
+	size: int,
+) -> bytes:
+	'''
+	# DumpEntry
+	Serialize a cache entry into a snapshot record.
+
+	## Parameters
+	- `question`: The question of the entry.
+	- `resps`: The list of `MsgEntry` objects cached for the question.
+	- `negExcept`: The negative result cached for the question, if any.
+	- `expireAt`: The absolute expiry time of the entry, in seconds since the
+	  epoch.
+	- `size`: The estimated size of the entry.
+
+	## Returns
+	- bytes: The snapshot record.
+	'''
+	kind = KIND_RESP
+	extra = b''
+	if isinstance(negExcept, DNSNameNotFoundError):
+		kind = KIND_NAME_NOT_FOUND
+		extra = f'{negExcept.name}\0{negExcept.respServer}'.encode('utf-8')
+	elif isinstance(negExcept, DNSZeroAnswerError):
+		kind = KIND_ZERO_ANSWER
+		extra = f'{negExcept.name}'.encode('utf-8')
+
+	parts = [
+		_LEN_FMT.pack(len(extra)),
+		extra,
+		_DumpName(question.name),
+		_QUESTION_FMT.pack(question.rdCls, question.rdType),
+		_LEN_FMT.pack(len(resps)),
+	]
+	for resp in resps:
+		if resp.entryType == 'ANS':
+			resp: AnsEntry.AnsEntry = resp
+			name, rdCls, rdType = resp.name, resp.rdCls, resp.rdType
+			ttl, dataList = resp.ttl, resp.dataList
+		else:
+			rrset = resp.ToRRSet()
+			name, rdCls, rdType = rrset.name, rrset.rdclass, rrset.rdtype
+			ttl, dataList = rrset.ttl, rrset
+
+		parts.append(
+			_NAME_SAME_AS_QUESTION if name == question.name else _DumpName(name)
+		)
+		parts.append(_ENTRY_FMT.pack(
+			_SECTION_LUT[resp.entryType],
+			rdCls,
+			rdType,
+			ttl,
+			len(dataList),
+		))
+		for data in dataList:
+			rawData = data.to_wire()
+			parts.append(_LEN_FMT.pack(len(rawData)))
+			parts.append(rawData)
+
+	body = b''.join(parts)
+
+	return _RECORD_HEADER.pack(kind, expireAt, size, len(body)) + body
+
+
+def LoadEntry(
+	kind: int,
+	expireAt: float,
+	size: int,
+	body: bytes,
+) -> SnapshotEntry:
+	extraLen, = _LEN_FMT.unpack_from(body, 0)
+	extra = body[2:2 + extraLen]
+	offset = 2 + extraLen
+
+	qName, offset = _LoadName(body, offset, None)
+	qCls, qType = _QUESTION_FMT.unpack_from(body, offset)
+	offset += _QUESTION_FMT.size
+	question = QuestionEntry.QuestionEntry(
+		name=qName,
+		rdCls=_MakeRdCls(qCls),
+		rdType=_MakeRdType(qType),
+	)
+
+	numEntries, = _LEN_FMT.unpack_from(body, offset)
+	offset += _LEN_FMT.size
+	resps: List[MsgEntry.MsgEntry] = []
+	for _ in range(numEntries):
+		name, offset = _LoadName(body, offset, qName)
+		section, rdCls, rdType, ttl, numData = _ENTRY_FMT.unpack_from(
+			body,
+			offset
+		)
+		offset += _ENTRY_FMT.size
+		rdCls = _MakeRdCls(rdCls)
+		rdType = _MakeRdType(rdType)
+
+		dataList = []
+		for _ in range(numData):
+			dataLen, = _LEN_FMT.unpack_from(body, offset)
+			offset += _LEN_FMT.size
+			dataList.append(
+				dns.rdata.from_wire(rdCls, rdType, body, offset, dataLen)
+			)
+			offset += dataLen
+
+		if section == SECTION_ANS:
+			resps.append(AnsEntry.AnsEntry(
+				name=name,
+				rdCls=rdCls,
+				rdType=rdType,
+				dataList=dataList,
+				ttl=ttl,
+			))
+		else:
+			rrset = dns.rrset.RRset(name, rdCls, rdType)
+			rrset.update_ttl(ttl)
+			for data in dataList:
+				rrset.add(data)
+			if section == SECTION_AUTH:
+				resps.append(AuthEntry.AuthEntry(rawSet=rrset))
+			elif section == SECTION_ADD:
+				resps.append(AddEntry.AddEntry(rawSet=rrset))
+			else:
+				raise ValueError(f'Unknown snapshot entry section {section}')
+
+	negExcept = None
+	if kind == KIND_NAME_NOT_FOUND:
+		name, respServer = extra.decode('utf-8').split('\0', 1)
+		negExcept = DNSNameNotFoundError(name=name, respServer=respServer)
+	elif kind == KIND_ZERO_ANSWER:
+		negExcept = DNSZeroAnswerError(name=extra.decode('utf-8'))
+	elif kind != KIND_RESP:
+		raise ValueError(f'Unknown snapshot record kind {kind}')
+
+	return question, resps, negExcept, expireAt, size
+
+
+def Save(path: str, records: Iterable[bytes]) -> int:
+	'''
+	# Save
+	Write the given snapshot records into the snapshot file.
+	The records are first written into a temporary file, which then replaces
+	the snapshot file, so a crash while saving never leaves a partial
+	snapshot behind.
+
+	## Parameters
+	- `path`: The path of the snapshot file.
+	- `records`: The snapshot records given by `DumpEntry()`.
+
+	## Returns
+	- int: The number of records written.
+	'''
+	tmpPath = f'{path}.tmp'
+	numRecords = 0
+	with open(tmpPath, 'wb') as f:
+		f.write(SNAPSHOT_MAGIC)
+		for record in records:
+			f.write(record)
+			numRecords += 1
+	os.replace(tmpPath, path)
+
+	return numRecords
+
+
+def _ReadExact(f: BinaryIO, numBytes: int) -> bytes:
+	data = f.read(numBytes)
+	if len(data) != numBytes:
+		raise EOFError('Truncated snapshot record')
+	return data
+
+
+def Load(
+	path: str,
+	now: float,
+	stopEvent: Union[threading.Event, None] = None,
+) -> Iterator[SnapshotEntry]:
+	'''
+	# Load
+	Stream the entries stored in the snapshot file, skipping the ones that
+	have expired.
+
+	## Parameters
+	- `path`: The path of the snapshot file.
+	- `now`: The current time in seconds since the epoch.
+	- `stopEvent`: The optional event to stop loading early.
+
+	## Returns
+	- Iterator: The `(question, resps, negExcept, expireAt, size)` tuples of
+	  the valid entries, in the order they were saved.
+	'''
+	with open(path, 'rb') as f:
+		if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+			raise ValueError(f'{path} is not a cache snapshot file')
+
+		while (stopEvent is None) or (not stopEvent.is_set()):
+			header = f.read(_RECORD_HEADER.size)
+			if len(header) == 0:
+				# end of the file
+				return
+			if len(header) != _RECORD_HEADER.size:
+				raise EOFError('Truncated snapshot record')
+
+			kind, expireAt, size, bodyLen = _RECORD_HEADER.unpack(header)
+			if expireAt <= now:
+				# skip the expired entry without parsing it
+				f.seek(bodyLen, os.SEEK_CUR)
+				continue
+
+			yield LoadEntry(kind, expireAt, size, _ReadExact(f, bodyLen))
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import collections
+import heapq
+import threading
+import time
+
+from typing import Any, Dict, Hashable, List, Tuple, Union
+
+
+class StoreItem(object):
+	'''
+	# StoreItem
+
+	The interface of items that can be stored in a `CacheStore`.
+	'''
+
+	def GetKeys(self) -> List[Hashable]:
+		raise NotImplementedError(
+			f'{self.__class__.__name__}.GetKeys() is not implemented'
+		)
+
+	def GetTTL(self) -> float:
+		raise NotImplementedError(
+			f'{self.__class__.__name__}.GetTTL() is not implemented'
+		)
+
+	def GetSize(self) -> int:
+		raise NotImplementedError(
+			f'{self.__class__.__name__}.GetSize() is not implemented'
+		)
+
+	def Terminate(self) -> None:
+		raise NotImplementedError(
+			f'{self.__class__.__name__}.Terminate() is not implemented'
+		)
+
+
+class _StoreRecord(object):
+
+	__slots__ = ('key', 'item', 'expireAt', 'staleUntil', 'size')
+
+	def __init__(
+		self,
+		key: Hashable,
+		item: StoreItem,
+		expireAt: float,
+		staleUntil: float,
+		size: int,
+	) -> None:
+		self.key = key
+		self.item = item
+		self.expireAt = expireAt
+		self.staleUntil = staleUntil
+		self.size = size
+
+
+class CacheStore(object):
+	'''
+	# CacheStore
+
+	A thread-safe key-value store where each item expires after its TTL, and
+	where the total number of items and/or the total (estimated) size of the
+	items can be bounded.
+
+	When a bound is exceeded, items are evicted according to the eviction
+	policy:
+	- `lru`: the least recently used item is evicted first.
+	- `fifo`: the earliest inserted item is evicted first.
+
+	If `staleTTL` is greater than zero, expired items are kept for another
+	`staleTTL` seconds, during which they can still be retrieved via
+	`GetAllowStale()`.
+
+	Expired items are removed lazily, either when they are looked up or when
+	new items are inserted.
+	'''
+
+	EVICT_POLICY_LRU  = 'lru'
+	EVICT_POLICY_FIFO = 'fifo'
+
+	EVICT_POLICIES = [
+		EVICT_POLICY_LRU,
+		EVICT_POLICY_FIFO,
+	]
+
+	def __init__(
+		self,
+		maxEntries: Union[int, None] = None,
+		maxBytes: Union[int, None] = None,
+		evictPolicy: str = EVICT_POLICY_LRU,
+		staleTTL: float = 0.0,
+	) -> None:
+		super(CacheStore, self).__init__()
+
+		if (maxEntries is not None) and (maxEntries <= 0):
+			raise ValueError('maxEntries must be a positive integer')
+		if (maxBytes is not None) and (maxBytes <= 0):
+			raise ValueError('maxBytes must be a positive integer')
+		if evictPolicy not in self.EVICT_POLICIES:
+			raise ValueError(f'Unsupported eviction policy: {evictPolicy}')
+		if staleTTL < 0:
+			raise ValueError('staleTTL must not be negative')
+
+		self.maxEntries = maxEntries
+		self.maxBytes = maxBytes
+		self.evictPolicy = evictPolicy
+		self.staleTTL = staleTTL
+
+		self._lock = threading.Lock()
+		# ordered from the next to be evicted to the last to be evicted
+		self._records: Dict[Hashable, _StoreRecord] = collections.OrderedDict()
+		# min-heap of (staleUntil, seqNum, record) used to find expired records
+		self._expireHeap: List[Tuple[float, int, _StoreRecord]] = []
+		self._seqNum = 0
+		self._numBytes = 0
+
+		self._numEvictions = 0
+		self._numExpirations = 0
+
+	def _RemoveRecordLocked(self, record: _StoreRecord) -> None:
+		del self._records[record.key]
+		self._numBytes -= record.size
+		record.item.Terminate()
+
+	def _PurgeExpiredLocked(self, now: float) -> None:
+		while (len(self._expireHeap) > 0) and (self._expireHeap[0][0] <= now):
+			_, _, record = heapq.heappop(self._expireHeap)
+			if self._records.get(record.key, None) is record:
+				self._RemoveRecordLocked(record)
+				self._numExpirations += 1
+			# otherwise, the record has already been removed or replaced
+
+		# heap entries of removed or replaced records are only dropped once
+		# they expire, so rebuild the heap if it has grown too large
+		if len(self._expireHeap) > (2 * len(self._records) + 64):
+			self._expireHeap = [
+				x for x in self._expireHeap
+				if self._records.get(x[2].key, None) is x[2]
+			]
+			heapq.heapify(self._expireHeap)
+
+	def _EvictLocked(self) -> None:
+		while (
+			(len(self._records) > 0) and
+			(
+				(
+					(self.maxEntries is not None) and
+					(len(self._records) > self.maxEntries)
+				) or
+				(
+					(self.maxBytes is not None) and
+					(self._numBytes > self.maxBytes)
+				)
+			)
+		):
+			record = next(iter(self._records.values()))
+			self._RemoveRecordLocked(record)
+			self._numEvictions += 1
+
+	def GetAllowStale(self, key: Hashable) -> Tuple[Union[StoreItem, None], bool]:
+		'''
+		# GetAllowStale
+		Get the item with the given key, including the one that has expired
+		but is still within the stale window.
+
+		## Parameters
+		- `key`: The key of the item.
+
+		## Returns
+		- StoreItem: The item found, or `None` if there is no such item.
+		- bool: Whether the item found has expired (i.e., is stale).
+		'''
+		now = time.monotonic()
+		with self._lock:
+			record = self._records.get(key, None)
+			if record is None:
+				return (None, False)
+
+			if record.staleUntil <= now:
+				self._RemoveRecordLocked(record)
+				self._numExpirations += 1
+				return (None, False)
+
+			if self.evictPolicy == self.EVICT_POLICY_LRU:
+				self._records.move_to_end(key)
+
+			return (record.item, record.expireAt <= now)
+
+	def Get(self, key: Hashable) -> Union[StoreItem, None]:
+		item, isStale = self.GetAllowStale(key)
+		return None if isStale else item
+
+	def Put(self, item: StoreItem, raiseIfKeyExist: bool = True) -> None:
+		keys = item.GetKeys()
+		if len(keys) != 1:
+			raise ValueError('CacheStore only supports items with a single key')
+		key = keys[0]
+
+		now = time.monotonic()
+		expireAt = now + item.GetTTL()
+		record = _StoreRecord(
+			key=key,
+			item=item,
+			expireAt=expireAt,
+			staleUntil=expireAt + self.staleTTL,
+			size=item.GetSize(),
+		)
+
+		with self._lock:
+			self._PurgeExpiredLocked(now)
+
+			oldRecord = self._records.get(key, None)
+			if oldRecord is not None:
+				if raiseIfKeyExist:
+					raise KeyError(f'Key {key} already exists')
+				self._RemoveRecordLocked(oldRecord)
+
+			self._records[key] = record
+			self._numBytes += record.size
+			self._seqNum += 1
+			heapq.heappush(
+				self._expireHeap,
+				(record.staleUntil, self._seqNum, record)
+			)
+
+			self._EvictLocked()
+
+	def GetFreshItems(self) -> List[Tuple[StoreItem, float]]:
+		'''
+		# GetFreshItems
+		Get all items that haven't expired yet.
+
+		## Returns
+		- list: The `(item, remainingTTL)` tuples of the items, ordered from
+		  the next to be evicted to the last to be evicted.
+		'''
+		now = time.monotonic()
+		with self._lock:
+			return [
+				(record.item, record.expireAt - now)
+				for record in self._records.values()
+				if record.expireAt > now
+			]
+
+	def GetStats(self) -> Dict[str, Any]:
+		with self._lock:
+			return {
+				'entries': len(self._records),
+				'bytes': self._numBytes,
+				'evictions': self._numEvictions,
+				'expirations': self._numExpirations,
+			}
+
+	def GetNumEvictions(self) -> int:
+		with self._lock:
+			return self._numEvictions
+
+	def __len__(self) -> int:
+		with self._lock:
+			return len(self._records)
+
+	def Terminate(self) -> None:
+		with self._lock:
+			for record in self._records.values():
+				record.item.Terminate()
+			self._records.clear()
+			self._expireHeap.clear()
+			self._numBytes = 0
+
+
+class ShardedCacheStore(object):
+	'''
+	# ShardedCacheStore
+
+	A `CacheStore` split into `numShards` independent shards, where each key
+	is assigned to a shard by its hash.
+	Each shard has its own lock and its own expiry bookkeeping, so threads
+	looking up different keys rarely contend on the same lock.
+
+	The `maxEntries` and `maxBytes` bounds are split evenly across the
+	shards, and the eviction policy is applied per shard.
+	'''
+
+	def __init__(
+		self,
+		numShards: int,
+		maxEntries: Union[int, None] = None,
+		maxBytes: Union[int, None] = None,
+		evictPolicy: str = CacheStore.EVICT_POLICY_LRU,
+		staleTTL: float = 0.0,
+	) -> None:
+		super(ShardedCacheStore, self).__init__()
+
+		if numShards <= 0:
+			raise ValueError('numShards must be a positive integer')
+
+		self.numShards = numShards
+
+		self._shards = [
+			CacheStore(
+				maxEntries=self._SplitBound(maxEntries, numShards),
+				maxBytes=self._SplitBound(maxBytes, numShards),
+				evictPolicy=evictPolicy,
+				staleTTL=staleTTL,
+			)
+			for _ in range(numShards)
+		]
+
+	@classmethod
+	def _SplitBound(
+		cls,
+		bound: Union[int, None],
+		numShards: int,
+	) -> Union[int, None]:
+		if bound is None:
+			return None
+		# rounded up, so small bounds don't end up being zero
+		return max(1, (bound + numShards - 1) // numShards)
+
+	def _GetShard(self, key: Hashable) -> CacheStore:
+		return self._shards[hash(key) % self.numShards]
+
+	def GetAllowStale(self, key: Hashable) -> Tuple[Union[StoreItem, None], bool]:
+		return self._GetShard(key).GetAllowStale(key)
+
+	def Get(self, key: Hashable) -> Union[StoreItem, None]:
+		return self._GetShard(key).Get(key)
+
+	def Put(self, item: StoreItem, raiseIfKeyExist: bool = True) -> None:
+		keys = item.GetKeys()
+		if len(keys) != 1:
+			raise ValueError('CacheStore only supports items with a single key')
+		self._GetShard(keys[0]).Put(item, raiseIfKeyExist=raiseIfKeyExist)
+
+	def GetFreshItems(self) -> List[Tuple[StoreItem, float]]:
+		res = []
+		for shard in self._shards:
+			res += shard.GetFreshItems()
+		return res
+
+	def GetStats(self) -> Dict[str, Any]:
+		stats = {}
+		for shard in self._shards:
+			for k, v in shard.GetStats().items():
+				stats[k] = stats.get(k, 0) + v
+		return stats
+
+	def GetNumEvictions(self) -> int:
+		return sum([ x.GetNumEvictions() for x in self._shards ])
+
+	def __len__(self) -> int:
+		return sum([ len(x) for x in self._shards ])
+
+	def Terminate(self) -> None:
+		for shard in self._shards:
+			shard.Terminate()
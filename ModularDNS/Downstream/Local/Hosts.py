@@ -8,7 +8,6 @@
 ###
 
 
-import copy
 import ipaddress
 import threading
 
@@ -233,7 +232,8 @@ class Hosts(QuickLookup):
 				else:
 					return []
 
-			dataList = [ copy.deepcopy(rec) for rec in recSet ]
+			# Rdata objects are immutable, so they can be shared
+			dataList = tuple(recSet)
 
 			return [
 				AnsEntry.AnsEntry(
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import array
+import bisect
+import gzip
+import hashlib
+import itertools
+import os
+import struct
+import sys
+
+from typing import BinaryIO, Iterable, Set, Tuple, Union
+
+
+def _StableHash(name: bytes) -> int:
+	return int.from_bytes(
+		hashlib.blake2b(name, digest_size=8).digest(),
+		'little',
+		signed=True,
+	)
+
+
+def _TypecodeOfSize(typecodes: str, size: int) -> str:
+	# the sizes of the C types behind `array` typecodes depend on the
+	# platform, so the one with the exact size is picked
+	for typecode in typecodes:
+		if array.array(typecode).itemsize == size:
+			return typecode
+	raise RuntimeError(f'No array typecode in "{typecodes}" has {size} bytes')
+
+
+class _PackedNameSet(object):
+	'''
+	# _PackedNameSet
+
+	An immutable set of names packed into a few flat buffers, instead of one
+	Python object per name:
+	- all names, concatenated into a single `bytes` object;
+	- the offset of each name in the buffer, as an `array`;
+	- the hash of each name, as a sorted `array`, so a name can be found by a
+	  binary search (done in C by `bisect`).
+
+	The hash is a stable one (a truncated BLAKE2b digest), unlike the
+	randomized `hash()`, so the buffers can be saved and loaded as they are.
+
+	It costs about 12 bytes plus the length of the name per entry.
+	'''
+
+	HASH_SIZE = 8
+	OFFSET_SIZE = 4
+
+	HASH_TYPECODE = _TypecodeOfSize('qlh', HASH_SIZE)
+	OFFSET_TYPECODE = _TypecodeOfSize('ILH', OFFSET_SIZE)
+
+	@classmethod
+	def FromNames(cls, names: Iterable[bytes]) -> '_PackedNameSet':
+		hashedNames = sorted((_StableHash(x), x) for x in names)
+		names = [ x[1] for x in hashedNames ]
+
+		return cls(
+			hashes=array.array(
+				cls.HASH_TYPECODE,
+				[ x[0] for x in hashedNames ]
+			),
+			offsets=array.array(
+				cls.OFFSET_TYPECODE,
+				itertools.accumulate(map(len, names), initial=0)
+			),
+			buf=b''.join(names),
+		)
+
+	def __init__(
+		self,
+		hashes: array.array,
+		offsets: array.array,
+		buf: bytes,
+	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `hashes`: The sorted hashes of the names.
+		- `offsets`: The offsets of the names in `buf`, in the same order as
+		  `hashes`, followed by the length of `buf`.
+		- `buf`: All names concatenated.
+		'''
+		super(_PackedNameSet, self).__init__()
+
+		self._hashes = hashes
+		self._offsets = offsets
+		self._buf = buf
+
+	def __len__(self) -> int:
+		return len(self._hashes)
+
+	def __contains__(self, name: bytes) -> bool:
+		h = _StableHash(name)
+		i = bisect.bisect_left(self._hashes, h)
+		# there might be multiple names with the same hash
+		while (i < len(self._hashes)) and (self._hashes[i] == h):
+			if self._buf[self._offsets[i]:self._offsets[i + 1]] == name:
+				return True
+			i += 1
+		return False
+
+	def GetBuffers(self) -> Tuple[array.array, array.array, bytes]:
+		return self._hashes, self._offsets, self._buf
+
+	def GetNumBytes(self) -> int:
+		return (
+			len(self._buf) +
+			(self._hashes.itemsize * len(self._hashes)) +
+			(self._offsets.itemsize * len(self._offsets))
+		)
+
+
+class DomainList(object):
+	'''
+	# DomainList
+
+	A list of domains, typically loaded from a file with a large number of
+	domains, e.g., a geosite-style list, or an ad blocking list.
+
+	Each line of a text list file is one of the following, where a name
+	matches a domain if it is the domain itself or any of its subdomains:
+	- `example.com` or `domain:example.com`: matches the domain
+	- `full:example.com`: matches only the name `example.com` itself
+	- `# comment` or an empty line: ignored
+	Anything after the domain that is separated by a whitespace (e.g.,
+	geosite attributes like `@ads`) is ignored as well.
+	Text list files can be gzip-compressed.
+
+	Domains are case-insensitive, and are stored in `_PackedNameSet` objects.
+	A list can also be saved in a compact binary format by `Save()`, which
+	holds the buffers of the `_PackedNameSet` objects as they are, so it is
+	loaded without parsing, hashing, or sorting the domains again.
+	'''
+
+	BINARY_MAGIC = b'MDNSDL03'
+
+	_BINARY_MAGIC_PREFIX = b'MDNSDL'
+	_GZIP_MAGIC = b'\x1f\x8b'
+	# number of names, length of the buffer, size of a hash, size of an offset
+	_BINARY_HEADER = struct.Struct('<IIBB')
+
+	SUB_PREFIX = 'domain:'
+	FULL_PREFIX = 'full:'
+
+	@classmethod
+	def FromFile(cls, path: str) -> 'DomainList':
+		'''
+		# FromFile
+		Load a domain list file, either in the text format (optionally
+		gzip-compressed), or in the binary format.
+
+		## Parameters
+		- `path`: The path to the domain list file.
+
+		## Returns
+		- DomainList: The domain list loaded.
+		'''
+		with open(path, 'rb') as f:
+			magic = f.read(len(cls.BINARY_MAGIC))
+			f.seek(0, os.SEEK_SET)
+
+			if magic == cls.BINARY_MAGIC:
+				return cls._FromBinaryFile(f)
+			elif magic.startswith(cls._BINARY_MAGIC_PREFIX):
+				raise ValueError(
+					f'Unsupported version of the binary domain list file {path}'
+				)
+			elif magic.startswith(cls._GZIP_MAGIC):
+				with gzip.GzipFile(fileobj=f, mode='rb') as gzf:
+					return cls.FromLines(gzf, source=path)
+			else:
+				return cls.FromLines(f, source=path)
+
+	@classmethod
+	def FromLines(
+		cls,
+		lines: Iterable[bytes],
+		source: str = '<lines>',
+	) -> 'DomainList':
+		'''
+		# FromLines
+		Parse the lines of a domain list in the text format.
+
+		## Parameters
+		- `lines`: The lines of the domain list.
+		- `source`: Where the lines come from, used in error messages.
+
+		## Returns
+		- DomainList: The domain list parsed.
+		'''
+		subDomains: Set[bytes] = set()
+		fullDomains: Set[bytes] = set()
+		for lineNum, line in enumerate(lines, start=1):
+			line = line.split(b'#', 1)[0].strip()
+			if len(line) == 0:
+				continue
+
+			entry = line.split(maxsplit=1)[0].decode('utf-8').lower()
+			if entry.startswith(cls.FULL_PREFIX):
+				domains = fullDomains
+				entry = entry[len(cls.FULL_PREFIX):]
+			elif entry.startswith(cls.SUB_PREFIX):
+				domains = subDomains
+				entry = entry[len(cls.SUB_PREFIX):]
+			elif ':' in entry:
+				raise ValueError(
+					f'Unsupported domain list entry "{entry}" '
+					f'at {source}:{lineNum}'
+				)
+			else:
+				domains = subDomains
+
+			entry = entry.rstrip('.')
+			if len(entry) == 0:
+				raise ValueError(
+					f'Empty domain list entry at {source}:{lineNum}'
+				)
+			domains.add(entry.encode('utf-8'))
+
+		return cls(subDomains=subDomains, fullDomains=fullDomains)
+
+	@classmethod
+	def _ReadExactly(cls, f: BinaryIO, size: int) -> bytes:
+		data = f.read(size)
+		if len(data) != size:
+			raise EOFError('Truncated domain list file')
+		return data
+
+	@classmethod
+	def _ReadArray(cls, f: BinaryIO, typecode: str, num: int) -> array.array:
+		arr = array.array(typecode)
+		arr.frombytes(cls._ReadExactly(f, arr.itemsize * num))
+		# the arrays are stored in little-endian
+		if sys.byteorder != 'little':
+			arr.byteswap()
+		return arr
+
+	@classmethod
+	def _WriteArray(cls, f: BinaryIO, arr: array.array) -> None:
+		if sys.byteorder != 'little':
+			arr = array.array(arr.typecode, arr)
+			arr.byteswap()
+		f.write(arr.tobytes())
+
+	@classmethod
+	def _ReadNameSet(cls, f: BinaryIO) -> _PackedNameSet:
+		numNames, bufLen, hashSize, offsetSize = cls._BINARY_HEADER.unpack(
+			cls._ReadExactly(f, cls._BINARY_HEADER.size)
+		)
+		if (
+			(hashSize != _PackedNameSet.HASH_SIZE) or
+			(offsetSize != _PackedNameSet.OFFSET_SIZE)
+		):
+			raise ValueError('Corrupted domain list file')
+
+		hashes = cls._ReadArray(f, _PackedNameSet.HASH_TYPECODE, numNames)
+		offsets = cls._ReadArray(
+			f,
+			_PackedNameSet.OFFSET_TYPECODE,
+			numNames + 1
+		)
+		buf = cls._ReadExactly(f, bufLen)
+
+		if (offsets[0] != 0) or (offsets[-1] != bufLen):
+			raise ValueError('Corrupted domain list file')
+		return _PackedNameSet(hashes=hashes, offsets=offsets, buf=buf)
+
+	@classmethod
+	def _FromBinaryFile(cls, f: BinaryIO) -> 'DomainList':
+		f.read(len(cls.BINARY_MAGIC))
+		subDomains = cls._ReadNameSet(f)
+		fullDomains = cls._ReadNameSet(f)
+
+		return cls(subDomains=subDomains, fullDomains=fullDomains)
+
+	def __init__(
+		self,
+		subDomains: Union[Iterable[bytes], _PackedNameSet],
+		fullDomains: Union[Iterable[bytes], _PackedNameSet],
+	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `subDomains`: The domains matching themselves and their subdomains,
+		  in lower case, without the final dot, and encoded in UTF-8.
+		- `fullDomains`: The domains only matching themselves, in the same
+		  format as `subDomains`.
+		Either of them can also be a `_PackedNameSet` already built.
+		'''
+		super(DomainList, self).__init__()
+
+		self._subDomains = self._ToNameSet(subDomains)
+		self._fullDomains = self._ToNameSet(fullDomains)
+
+	@classmethod
+	def _ToNameSet(
+		cls,
+		names: Union[Iterable[bytes], _PackedNameSet],
+	) -> _PackedNameSet:
+		if isinstance(names, _PackedNameSet):
+			return names
+		return _PackedNameSet.FromNames(names)
+
+	def Save(self, path: str) -> None:
+		'''
+		# Save
+		Save this domain list in the binary format.
+
+		## Parameters
+		- `path`: The path to the file to be written.
+		'''
+		with open(path, 'wb') as f:
+			f.write(self.BINARY_MAGIC)
+			for nameSet in (self._subDomains, self._fullDomains):
+				hashes, offsets, buf = nameSet.GetBuffers()
+				f.write(
+					self._BINARY_HEADER.pack(
+						len(nameSet),
+						len(buf),
+						_PackedNameSet.HASH_SIZE,
+						_PackedNameSet.OFFSET_SIZE,
+					)
+				)
+				self._WriteArray(f, hashes)
+				self._WriteArray(f, offsets)
+				f.write(buf)
+
+	def Match(self, nameStr: str) -> bool:
+		'''
+		# Match
+		Check whether the given name matches any domain in this list.
+
+		## Parameters
+		- `nameStr`: The name to be matched, without the final dot.
+
+		## Returns
+		- bool: Whether the name matches.
+		'''
+		name = nameStr.lower().encode('utf-8')
+		if name in self._fullDomains:
+			return True
+
+		# check the name itself and all of its parent domains
+		while True:
+			if name in self._subDomains:
+				return True
+			i = name.find(b'.')
+			if i < 0:
+				return False
+			name = name[i + 1:]
+
+	def GetStats(self) -> Tuple[int, int]:
+		'''
+		# GetStats
+
+		## Returns
+		- int: The number of domains in this list.
+		- int: The number of bytes used to store the domains.
+		'''
+		return (
+			len(self._subDomains) + len(self._fullDomains),
+			self._subDomains.GetNumBytes() + self._fullDomains.GetNumBytes(),
+		)
@@ -8,13 +8,14 @@
 ###
 
 
-from typing import List, Tuple, Type
+from typing import Dict, List, Tuple, Type, Union
 
 from ... import Exceptions as _ModularDNSExceptions
 from ...MsgEntry import MsgEntry, QuestionEntry
 from ..DownstreamCollection import DownstreamCollection
 from ..QuickLookup import QuickLookup
 from ..HandlerByQuestion import HandlerByQuestion
+from ..Utils import CircuitBreaker
 
 
 class Failover(QuickLookup):
@@ -31,13 +32,31 @@ class Failover(QuickLookup):
 		cls.__name__ for cls in DEFAULT_EXCEPT_LIST
 	]
 
+	DEFAULT_BREAKER_WINDOW: float = 10.0
+	DEFAULT_BREAKER_COOLDOWN: float = 30.0
+
+	DEFAULT_BREAKER_EXCEPT_LIST: List[Type[Exception]] = [
+		_ModularDNSExceptions.DNSRequestRefusedError,
+		_ModularDNSExceptions.DNSServerFaultError,
+		_ModularDNSExceptions.ServerNetworkError,
+	]
+
+	DEFAULT_BREAKER_EXCEPT_STR_LIST: List[str] = [
+		cls.__name__ for cls in DEFAULT_BREAKER_EXCEPT_LIST
+	]
+
 	@classmethod
 	def FromConfig(
 		cls,
 		dCollection: DownstreamCollection,
 		initialHandler: str,
 		failoverHandler: str,
-		exceptList: List[str] = DEFAULT_EXCEPT_STR_LIST
+		exceptList: List[str] = DEFAULT_EXCEPT_STR_LIST,
+		breakerThreshold: int = 0,
+		breakerWindow: float = DEFAULT_BREAKER_WINDOW,
+		breakerCooldown: float = DEFAULT_BREAKER_COOLDOWN,
+		breakerProbes: int = 1,
+		breakerExceptList: List[str] = DEFAULT_BREAKER_EXCEPT_STR_LIST,
 	) -> 'Failover':
 		return cls(
 			initialHandler=dCollection.GetHandlerByQuestion(initialHandler),
@@ -46,19 +65,62 @@ class Failover(QuickLookup):
 				_ModularDNSExceptions.GetExceptionByName(exceptName)
 				for exceptName in exceptList
 			],
+			breakerThreshold=breakerThreshold,
+			breakerWindow=breakerWindow,
+			breakerCooldown=breakerCooldown,
+			breakerProbes=breakerProbes,
+			breakerExceptList=[
+				_ModularDNSExceptions.GetExceptionByName(exceptName)
+				for exceptName in breakerExceptList
+			],
 		)
 
 	def __init__(
 		self,
 		initialHandler: HandlerByQuestion,
 		failoverHandler: HandlerByQuestion,
-		exceptList: List[Type[Exception]] = DEFAULT_EXCEPT_LIST
+		exceptList: List[Type[Exception]] = DEFAULT_EXCEPT_LIST,
+		breakerThreshold: int = 0,
+		breakerWindow: float = DEFAULT_BREAKER_WINDOW,
+		breakerCooldown: float = DEFAULT_BREAKER_COOLDOWN,
+		breakerProbes: int = 1,
+		breakerExceptList: List[Type[Exception]] = DEFAULT_BREAKER_EXCEPT_LIST,
 	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `initialHandler`: The handler tried first.
+		- `failoverHandler`: The handler tried if the initial one raises an
+		  exception in `exceptList`.
+		- `exceptList`: The exceptions to fail over on.
+		- `breakerThreshold`: If positive, a circuit breaker guards the
+		  initial handler, which is opened after this number of failures
+		  (i.e., exceptions in `breakerExceptList`) within `breakerWindow`
+		  seconds; while it is open, questions go to the failover handler
+		  directly.
+		- `breakerWindow`: See `breakerThreshold`.
+		- `breakerCooldown`: The time, in seconds, the circuit stays open
+		  before probe requests are sent to the initial handler again.
+		- `breakerProbes`: The maximum number of concurrent probe requests.
+		- `breakerExceptList`: The exceptions regarded as failures of the
+		  initial handler by the circuit breaker.
+		'''
 		super(Failover, self).__init__()
 
 		self.initialHandler = initialHandler
 		self.failoverHandler = failoverHandler
 		self.exceptList = exceptList
+		self.breakerExceptList = breakerExceptList
+
+		self.breaker = None
+		if breakerThreshold > 0:
+			self.breaker = CircuitBreaker(
+				threshold=breakerThreshold,
+				window=breakerWindow,
+				cooldown=breakerCooldown,
+				numProbes=breakerProbes,
+			)
 
 	def HandleQuestion(
 		self,
@@ -71,18 +133,56 @@ class Failover(QuickLookup):
 			self.HandleQuestion
 		)
 
-		try:
-			return self.initialHandler.HandleQuestion(
-				msgEntry,
-				senderAddr,
-				newRecStack,
-			)
-		except tuple(self.exceptList):
-			return self.failoverHandler.HandleQuestion(
-				msgEntry,
-				senderAddr,
-				newRecStack,
-			)
+		if self.breaker is None:
+			try:
+				return self.initialHandler.HandleQuestion(
+					msgEntry,
+					senderAddr,
+					newRecStack,
+				)
+			except tuple(self.exceptList):
+				pass
+		else:
+			allowedState = self.breaker.Allow()
+			if allowedState is not None:
+				# anything interrupting the request, even if it isn't an
+				# `Exception`, counts as a failure, so the outcome is always
+				# recorded and a half-open probe slot is never leaked
+				isFailure = True
+				try:
+					ans = self.initialHandler.HandleQuestion(
+						msgEntry,
+						senderAddr,
+						newRecStack,
+					)
+					isFailure = False
+					return ans
+				except Exception as e:
+					isFailure = isinstance(e, tuple(self.breakerExceptList))
+					if not isinstance(e, tuple(self.exceptList)):
+						raise
+				finally:
+					self.breaker.Record(allowedState, isFailure)
+
+		return self.failoverHandler.HandleQuestion(
+			msgEntry,
+			senderAddr,
+			newRecStack,
+		)
+
+	def GetBreakerStats(self) -> Union[Dict[str, Union[int, str]], None]:
+		'''
+		# GetBreakerStats
+
+		## Returns
+		- dict: The `state` of the circuit breaker, the number of times it
+		  has been `opened`, and the number of questions `rejected` by it
+		  (i.e., sent to the failover handler directly); or `None` if there
+		  is no circuit breaker.
+		'''
+		if self.breaker is None:
+			return None
+		return self.breaker.GetStats()
 
 	def Terminate(self) -> None:
 		self.initialHandler.Terminate()
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import collections
+import concurrent.futures
+import threading
+import time
+
+from typing import Dict, List, Tuple, Type, Union
+
+from ... import Exceptions as _ModularDNSExceptions
+from ...Exceptions import CopyException
+from ...MsgEntry import MsgEntry, QuestionEntry
+from ..DownstreamCollection import DownstreamCollection
+from ..QuickLookup import QuickLookup
+from ..HandlerByQuestion import HandlerByQuestion
+
+
+class Hedged(QuickLookup):
+	'''
+	# Hedged
+
+	Send each question to the primary handler, and if it has not answered
+	within the hedge delay, also send it to the next secondary handler, and
+	so on; the first answer wins, and the rest are discarded.
+
+	- The hedge delay is either fixed, or the given percentile of the recent
+	  latencies of the primary handler.
+	- A handler raising an exception in `exceptList` is regarded as having
+	  failed, and once all handlers in flight have failed, the next secondary
+	  handler is tried right away; other exceptions (e.g., NXDOMAIN) are
+	  answers, and are raised to the caller.
+	- Hedged requests are limited to `maxHedgeRatio` of the questions
+	  (with bursts of up to `hedgeBurst`), so that hedging cannot multiply the
+	  load on the upstreams.
+	- Requests are sent by a pool of at most `maxWorkers` threads, and are
+	  never queued there: a hedged request is skipped if no worker is free,
+	  and if no worker is free for the primary request, the question is
+	  handled on the calling thread without hedging (trying the secondary
+	  handlers in order on failures, as `Failover` does). The requests that
+	  lost the race keep running on the workers until they finish, and are
+	  waited for on `Terminate()`.
+	- The hedge delay starts when the primary request starts.
+	'''
+
+	DEFAULT_HEDGE_DELAY: float = 0.1
+	DEFAULT_MAX_HEDGE_RATIO: float = 0.1
+	DEFAULT_HEDGE_BURST: float = 10.0
+	DEFAULT_MAX_WORKERS: int = 32
+
+	LATENCY_WINDOW_SIZE: int = 200
+	'''
+	Number of recent latencies of the primary handler kept
+	'''
+	MIN_LATENCY_SAMPLES: int = 20
+	'''
+	Minimum number of latencies needed before the percentile is used
+	'''
+
+	DEFAULT_EXCEPT_LIST: List[Type[Exception]] = [
+		_ModularDNSExceptions.DNSRequestRefusedError,
+		_ModularDNSExceptions.DNSServerFaultError,
+		_ModularDNSExceptions.ServerNetworkError,
+	]
+
+	DEFAULT_EXCEPT_STR_LIST: List[str] = [
+		cls.__name__ for cls in DEFAULT_EXCEPT_LIST
+	]
+
+	@classmethod
+	def FromConfig(
+		cls,
+		dCollection: DownstreamCollection,
+		primaryHandler: str,
+		secondaryHandlerList: List[str],
+		hedgeDelay: float = DEFAULT_HEDGE_DELAY,
+		hedgePercentile: Union[float, None] = None,
+		maxHedgeRatio: float = DEFAULT_MAX_HEDGE_RATIO,
+		hedgeBurst: float = DEFAULT_HEDGE_BURST,
+		exceptList: List[str] = DEFAULT_EXCEPT_STR_LIST,
+		maxWorkers: int = DEFAULT_MAX_WORKERS,
+	) -> 'Hedged':
+		return cls(
+			primaryHandler=dCollection.GetHandlerByQuestion(primaryHandler),
+			secondaryHandlerList=[
+				dCollection.GetHandlerByQuestion(handlerStr)
+				for handlerStr in secondaryHandlerList
+			],
+			hedgeDelay=hedgeDelay,
+			hedgePercentile=hedgePercentile,
+			maxHedgeRatio=maxHedgeRatio,
+			hedgeBurst=hedgeBurst,
+			exceptList=[
+				_ModularDNSExceptions.GetExceptionByName(exceptName)
+				for exceptName in exceptList
+			],
+			maxWorkers=maxWorkers,
+		)
+
+	def __init__(
+		self,
+		primaryHandler: HandlerByQuestion,
+		secondaryHandlerList: List[HandlerByQuestion],
+		hedgeDelay: float = DEFAULT_HEDGE_DELAY,
+		hedgePercentile: Union[float, None] = None,
+		maxHedgeRatio: float = DEFAULT_MAX_HEDGE_RATIO,
+		hedgeBurst: float = DEFAULT_HEDGE_BURST,
+		exceptList: List[Type[Exception]] = DEFAULT_EXCEPT_LIST,
+		maxWorkers: int = DEFAULT_MAX_WORKERS,
+	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `primaryHandler`: The handler every question is sent to first.
+		- `secondaryHandlerList`: The handlers hedged requests are sent to,
+		  in order.
+		- `hedgeDelay`: The time, in seconds, to wait for an answer before
+		  sending a hedged request; also used when `hedgePercentile` is given
+		  but there are not enough latency samples yet.
+		- `hedgePercentile`: If given (e.g., `95`), the hedge delay is this
+		  percentile of the recent latencies of the primary handler.
+		- `maxHedgeRatio`: The maximum number of hedged requests per
+		  question, on average.
+		- `hedgeBurst`: The maximum number of hedged requests that can be
+		  sent in a row.
+		- `exceptList`: The exceptions regarded as failures of a handler.
+		- `maxWorkers`: The maximum number of threads sending requests in
+		  the background.
+		'''
+		super(Hedged, self).__init__()
+
+		if len(secondaryHandlerList) == 0:
+			raise ValueError('There must be at least one secondary handler')
+		if hedgeDelay < 0:
+			raise ValueError('hedgeDelay must not be negative')
+		if (
+			(hedgePercentile is not None) and
+			((hedgePercentile <= 0) or (hedgePercentile > 100))
+		):
+			raise ValueError('hedgePercentile must be within (0, 100]')
+		if maxHedgeRatio < 0:
+			raise ValueError('maxHedgeRatio must not be negative')
+		if hedgeBurst < 1:
+			raise ValueError('hedgeBurst must be at least 1')
+		if maxWorkers < 1:
+			raise ValueError('maxWorkers must be at least 1')
+
+		self.primaryHandler = primaryHandler
+		self.secondaryHandlerList = secondaryHandlerList
+		self.hedgeDelay = hedgeDelay
+		self.hedgePercentile = hedgePercentile
+		self.maxHedgeRatio = maxHedgeRatio
+		self.hedgeBurst = hedgeBurst
+		self.exceptList = exceptList
+
+		self._lock = threading.Lock()
+		self._latencies = collections.deque(maxlen=self.LATENCY_WINDOW_SIZE)
+		self._hedgeTokens = hedgeBurst
+
+		self._numQuestions = 0
+		self._numHedged = 0
+		self._numHedgeWins = 0
+		self._numThrottled = 0
+		self._numSkipped = 0
+		self._numInline = 0
+
+		self._executor = concurrent.futures.ThreadPoolExecutor(
+			max_workers=maxWorkers,
+			thread_name_prefix=self._clsName,
+		)
+		# a slot is taken before a request is submitted to the executor, so
+		# requests are never queued there waiting for a worker
+		self._workerSlots = threading.BoundedSemaphore(maxWorkers)
+
+	def GetHedgeDelay(self) -> float:
+		'''
+		# GetHedgeDelay
+
+		## Returns
+		- float: The current hedge delay, in seconds.
+		'''
+		if self.hedgePercentile is None:
+			return self.hedgeDelay
+
+		with self._lock:
+			latencies = sorted(self._latencies)
+		if len(latencies) < self.MIN_LATENCY_SAMPLES:
+			return self.hedgeDelay
+
+		idx = int(len(latencies) * self.hedgePercentile / 100.0)
+		return latencies[min(idx, len(latencies) - 1)]
+
+	def _TryAcquireHedge(self) -> bool:
+		with self._lock:
+			if self._hedgeTokens >= 1:
+				self._hedgeTokens -= 1
+				self._numHedged += 1
+				return True
+			else:
+				self._numThrottled += 1
+				return False
+
+	def _Call(
+		self,
+		idx: int,
+		handler: HandlerByQuestion,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> List[ MsgEntry.MsgEntry ]:
+		startTime = time.monotonic()
+		try:
+			return handler.HandleQuestion(
+				msgEntry,
+				senderAddr,
+				recDepthStack,
+			)
+		finally:
+			if idx == 0:
+				with self._lock:
+					self._latencies.append(time.monotonic() - startTime)
+
+	def _GetHandler(self, idx: int) -> HandlerByQuestion:
+		return (
+			self.primaryHandler if idx == 0
+			else self.secondaryHandlerList[idx - 1]
+		)
+
+	def _CallOnWorker(
+		self,
+		started: threading.Event,
+		idx: int,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> List[ MsgEntry.MsgEntry ]:
+		started.set()
+		try:
+			return self._Call(
+				idx,
+				self._GetHandler(idx),
+				msgEntry,
+				senderAddr,
+				recDepthStack,
+			)
+		finally:
+			self._workerSlots.release()
+
+	def _TryLaunch(
+		self,
+		idx: int,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> Union[Tuple[concurrent.futures.Future, threading.Event], None]:
+		'''
+		# _TryLaunch
+		Send a request on a worker thread, if there is a free one.
+
+		## Returns
+		- The future of the request, and the event set once the request is
+		  started; or `None` if no worker is free.
+		'''
+		if not self._workerSlots.acquire(blocking=False):
+			return None
+
+		started = threading.Event()
+		try:
+			future = self._executor.submit(
+				self._CallOnWorker,
+				started,
+				idx,
+				msgEntry,
+				senderAddr,
+				recDepthStack,
+			)
+		except BaseException:
+			self._workerSlots.release()
+			raise
+		return future, started
+
+	def _HandleInline(
+		self,
+		startIdx: int,
+		firstErr: Union[Exception, None],
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> List[ MsgEntry.MsgEntry ]:
+		# try the handlers in order on the calling thread, as `Failover` does
+		for idx in range(startIdx, 1 + len(self.secondaryHandlerList)):
+			try:
+				return self._Call(
+					idx,
+					self._GetHandler(idx),
+					msgEntry,
+					senderAddr,
+					recDepthStack,
+				)
+			except tuple(self.exceptList) as e:
+				if firstErr is None:
+					firstErr = e
+		raise CopyException(firstErr) from firstErr
+
+	def HandleQuestion(
+		self,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> List[ MsgEntry.MsgEntry ]:
+		newRecStack = self.CheckRecursionDepth(
+			recDepthStack,
+			self.HandleQuestion
+		)
+
+		with self._lock:
+			self._numQuestions += 1
+			self._hedgeTokens = min(
+				self.hedgeBurst,
+				self._hedgeTokens + self.maxHedgeRatio
+			)
+
+		hedgeDelay = self.GetHedgeDelay()
+		numHandlers = 1 + len(self.secondaryHandlerList)
+
+		launched = self._TryLaunch(0, msgEntry, senderAddr, newRecStack)
+		if launched is None:
+			# all workers are busy, so there is no way to hedge, and the
+			# primary request must not wait for a worker
+			with self._lock:
+				self._numInline += 1
+			return self._HandleInline(
+				0,
+				None,
+				msgEntry,
+				senderAddr,
+				newRecStack,
+			)
+
+		future, started = launched
+		# the index of the handler of each request in flight
+		inFlight: Dict[concurrent.futures.Future, int] = { future: 0 }
+		numLaunched = 1
+		canHedge = True
+		# the hedge delay starts when the primary request starts
+		started.wait()
+		nextHedgeTime = time.monotonic() + hedgeDelay
+		firstErr = None
+
+		while True:
+			timeout = None
+			if canHedge and (numLaunched < numHandlers):
+				timeout = max(0.0, nextHedgeTime - time.monotonic())
+
+			done, _ = concurrent.futures.wait(
+				inFlight.keys(),
+				timeout=timeout,
+				return_when=concurrent.futures.FIRST_COMPLETED,
+			)
+			if len(done) == 0:
+				# no answer yet, hedge if it is within the budget, and there
+				# is a free worker
+				if not self._TryAcquireHedge():
+					canHedge = False
+					continue
+				launched = self._TryLaunch(
+					numLaunched,
+					msgEntry,
+					senderAddr,
+					newRecStack,
+				)
+				if launched is None:
+					with self._lock:
+						# give the budget back
+						self._hedgeTokens = min(
+							self.hedgeBurst,
+							self._hedgeTokens + 1
+						)
+						self._numHedged -= 1
+						self._numSkipped += 1
+					canHedge = False
+					continue
+				future, started = launched
+				inFlight[future] = numLaunched
+				numLaunched += 1
+				started.wait()
+				nextHedgeTime = time.monotonic() + hedgeDelay
+				continue
+
+			for future in done:
+				idx = inFlight.pop(future)
+				err = future.exception()
+				if err is None:
+					if idx != 0:
+						with self._lock:
+							self._numHedgeWins += 1
+					return future.result()
+				if not isinstance(err, tuple(self.exceptList)):
+					# the exception object is kept by the future, so raise a
+					# copy of it
+					raise CopyException(err) from err
+
+				if firstErr is None:
+					firstErr = err
+
+			if len(inFlight) == 0:
+				# everything in flight has failed, so move on to the rest of
+				# the handlers right away, on this thread, as `Failover` does
+				return self._HandleInline(
+					numLaunched,
+					firstErr,
+					msgEntry,
+					senderAddr,
+					newRecStack,
+				)
+
+	def GetStats(self) -> Dict[str, Union[int, float]]:
+		'''
+		# GetStats
+
+		## Returns
+		- dict: The number of `questions`, `hedged` requests sent, questions
+		  answered by a hedged request (`hedgeWins`), hedged requests not sent
+		  due to the rate limit (`throttled`) or because no worker was free
+		  (`skipped`), questions handled on the calling thread because no
+		  worker was free (`inline`), and the current `hedgeDelay`.
+		'''
+		hedgeDelay = self.GetHedgeDelay()
+		with self._lock:
+			return {
+				'questions': self._numQuestions,
+				'hedged': self._numHedged,
+				'hedgeWins': self._numHedgeWins,
+				'throttled': self._numThrottled,
+				'skipped': self._numSkipped,
+				'inline': self._numInline,
+				'hedgeDelay': hedgeDelay,
+			}
+
+	def Terminate(self) -> None:
+		# wait for the requests still in flight
+		self._executor.shutdown(wait=True)
+
+		self.primaryHandler.Terminate()
+		for handler in self.secondaryHandlerList:
+			handler.Terminate()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import math
+import random
+import threading
+import time
+
+from typing import Dict, List, Tuple, Type, Union
+
+from ... import Exceptions as _ModularDNSExceptions
+from ...MsgEntry import MsgEntry, QuestionEntry
+from ..DownstreamCollection import DownstreamCollection
+from ..QuickLookup import QuickLookup
+from ..HandlerByQuestion import HandlerByQuestion
+
+
+class _HandlerStats(object):
+	'''
+	The exponentially weighted moving averages of the latency and the error
+	rate of a handler, plus its number of outstanding requests.
+	'''
+
+	def __init__(self, alpha: float, decayTime: float) -> None:
+		super(_HandlerStats, self).__init__()
+
+		self.alpha = alpha
+		self.decayTime = decayTime
+
+		self.latency = 0.0
+		self.errorRate = 0.0
+		self.lastTime = time.monotonic()
+
+		self.outstanding = 0
+		self.numReqs = 0
+		self.numErrors = 0
+
+	def Record(self, latency: float, isError: bool, now: float) -> None:
+		if self.numReqs == 0:
+			self.latency = latency
+		else:
+			self.latency += self.alpha * (latency - self.latency)
+		self.errorRate += \
+			self.alpha * ((1.0 if isError else 0.0) - self.errorRate)
+		self.lastTime = now
+
+		self.numReqs += 1
+		if isError:
+			self.numErrors += 1
+
+	def GetCost(self, errorPenalty: float, now: float) -> float:
+		# the averages of a handler that has not been used for a while are
+		# decayed towards zero, so it is tried again after it recovers
+		w = math.exp(-max(0.0, now - self.lastTime) / self.decayTime)
+		return (
+			((self.latency + (errorPenalty * self.errorRate)) * w) *
+			(self.outstanding + 1)
+		)
+
+
+class LatencyAware(QuickLookup):
+	'''
+	# LatencyAware
+
+	Forward each question to one of the given handlers, preferring the ones
+	with lower latency, error rate, and number of outstanding requests.
+
+	- `p2c`: Pick two handlers at random, and use the one with the lower cost,
+	  which is `(latency + errorPenalty * errorRate) * (outstanding + 1)`.
+	- `leastOutstanding`: Use the handler with the fewest outstanding
+	  requests, with ties broken by the cost above.
+
+	The latency and error rate are moving averages with the smoothing factor
+	`alpha`, and are decayed by `exp(-idle / decayTime)` while a handler is
+	not used, so that an avoided handler is eventually tried again. Only the
+	exceptions in `errorList` count as errors, and the others (e.g.,
+	NXDOMAIN) are regarded as valid answers.
+	'''
+
+	STRATEGY_P2C = 'p2c'
+	STRATEGY_LEAST_OUTSTANDING = 'leastOutstanding'
+
+	STRATEGIES = (
+		STRATEGY_P2C,
+		STRATEGY_LEAST_OUTSTANDING,
+	)
+
+	DEFAULT_ALPHA: float = 0.3
+	DEFAULT_DECAY_TIME: float = 60.0
+	DEFAULT_ERROR_PENALTY: float = 1.0
+
+	DEFAULT_ERROR_LIST: List[Type[Exception]] = [
+		_ModularDNSExceptions.DNSRequestRefusedError,
+		_ModularDNSExceptions.DNSServerFaultError,
+		_ModularDNSExceptions.ServerNetworkError,
+	]
+
+	DEFAULT_ERROR_STR_LIST: List[str] = [
+		cls.__name__ for cls in DEFAULT_ERROR_LIST
+	]
+
+	@classmethod
+	def FromConfig(
+		cls,
+		dCollection: DownstreamCollection,
+		handlerList: List[str],
+		strategy: str = STRATEGY_P2C,
+		alpha: float = DEFAULT_ALPHA,
+		decayTime: float = DEFAULT_DECAY_TIME,
+		errorPenalty: float = DEFAULT_ERROR_PENALTY,
+		errorList: List[str] = DEFAULT_ERROR_STR_LIST,
+	) -> 'LatencyAware':
+		return cls(
+			handlerList=[
+				dCollection.GetHandlerByQuestion(handlerStr)
+				for handlerStr in handlerList
+			],
+			strategy=strategy,
+			alpha=alpha,
+			decayTime=decayTime,
+			errorPenalty=errorPenalty,
+			errorList=[
+				_ModularDNSExceptions.GetExceptionByName(exceptName)
+				for exceptName in errorList
+			],
+		)
+
+	def __init__(
+		self,
+		handlerList: List[HandlerByQuestion],
+		strategy: str = STRATEGY_P2C,
+		alpha: float = DEFAULT_ALPHA,
+		decayTime: float = DEFAULT_DECAY_TIME,
+		errorPenalty: float = DEFAULT_ERROR_PENALTY,
+		errorList: List[Type[Exception]] = DEFAULT_ERROR_LIST,
+	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `handlerList`: The handlers to choose from.
+		- `strategy`: `p2c` (power of two choices) or `leastOutstanding`.
+		- `alpha`: The weight of each new sample in the moving averages,
+		  within (0, 1].
+		- `decayTime`: The time, in seconds, for the averages of a handler not
+		  in use to decay to `1/e` of their values.
+		- `errorPenalty`: The latency, in seconds, added to the cost of a
+		  handler whose requests all fail.
+		- `errorList`: The exceptions counted as errors of a handler.
+		'''
+		super(LatencyAware, self).__init__()
+
+		if len(handlerList) == 0:
+			raise ValueError('There must be at least one handler')
+		if strategy not in self.STRATEGIES:
+			raise ValueError(
+				f'Unknown strategy {strategy}, '
+				f'must be one of {list(self.STRATEGIES)}'
+			)
+		if (alpha <= 0) or (alpha > 1):
+			raise ValueError('alpha must be within (0, 1]')
+		if decayTime <= 0:
+			raise ValueError('decayTime must be positive')
+		if errorPenalty < 0:
+			raise ValueError('errorPenalty must not be negative')
+
+		self.handlerList = handlerList
+		self.strategy = strategy
+		self.errorPenalty = errorPenalty
+		self.errorList = errorList
+
+		self._lock = threading.Lock()
+		self._stats = [ _HandlerStats(alpha, decayTime) for _ in handlerList ]
+
+	def _ChooseLocked(self, now: float) -> int:
+		numHandlers = len(self.handlerList)
+		if numHandlers == 1:
+			return 0
+
+		if self.strategy == self.STRATEGY_P2C:
+			i, j = random.sample(range(numHandlers), 2)
+			costI = self._stats[i].GetCost(self.errorPenalty, now)
+			costJ = self._stats[j].GetCost(self.errorPenalty, now)
+			return i if costI <= costJ else j
+		else:
+			# shuffle so that ties are broken randomly
+			indices = random.sample(range(numHandlers), numHandlers)
+			return min(
+				indices,
+				key=lambda i: (
+					self._stats[i].outstanding,
+					self._stats[i].GetCost(self.errorPenalty, now),
+				)
+			)
+
+	def HandleQuestion(
+		self,
+		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Tuple[str, int],
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> List[ MsgEntry.MsgEntry ]:
+		newRecStack = self.CheckRecursionDepth(
+			recDepthStack,
+			self.HandleQuestion
+		)
+
+		with self._lock:
+			idx = self._ChooseLocked(time.monotonic())
+			stats = self._stats[idx]
+			stats.outstanding += 1
+
+		isError = False
+		startTime = time.monotonic()
+		try:
+			return self.handlerList[idx].HandleQuestion(
+				msgEntry,
+				senderAddr,
+				newRecStack,
+			)
+		except tuple(self.errorList):
+			isError = True
+			raise
+		finally:
+			endTime = time.monotonic()
+			with self._lock:
+				stats.outstanding -= 1
+				stats.Record(endTime - startTime, isError, endTime)
+
+	def GetStats(self) -> List[Dict[str, Union[int, float]]]:
+		'''
+		# GetStats
+
+		## Returns
+		- list: The statistics of each handler, in the order of
+		  `handlerList`, including the moving averages of `latency` (in
+		  seconds) and `errorRate`, the current `cost`, and the number of
+		  `outstanding` requests, `requests`, and `errors`.
+		'''
+		now = time.monotonic()
+		with self._lock:
+			return [
+				{
+					'latency': stats.latency,
+					'errorRate': stats.errorRate,
+					'cost': stats.GetCost(self.errorPenalty, now),
+					'outstanding': stats.outstanding,
+					'requests': stats.numReqs,
+					'errors': stats.numErrors,
+				}
+				for stats in self._stats
+			]
+
+	def Terminate(self) -> None:
+		for handler in self.handlerList:
+			handler.Terminate()
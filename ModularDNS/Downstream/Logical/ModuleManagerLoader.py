@@ -12,6 +12,8 @@ from ...ModuleManager import ModuleManager
 
 from .ConstAns import ConstAns
 from .Failover import Failover
+from .Hedged import Hedged
+from .LatencyAware import LatencyAware
 from .LimitConcurrentReq import LimitConcurrentReq
 from .QtAnsLog import QtAnsLog
 from .QuestionRuleSet import QuestionRuleSet
@@ -22,6 +24,8 @@ from .RandomChoice import RandomChoice
 MODULE_MGR = ModuleManager()
 MODULE_MGR.RegisterModule('ConstAns', ConstAns)
 MODULE_MGR.RegisterModule('Failover', Failover)
+MODULE_MGR.RegisterModule('Hedged', Hedged)
+MODULE_MGR.RegisterModule('LatencyAware', LatencyAware)
 MODULE_MGR.RegisterModule('LimitConcurrentReq', LimitConcurrentReq)
 MODULE_MGR.RegisterModule('QtAnsLog', QtAnsLog)
 MODULE_MGR.RegisterModule('QuestionRuleSet', QuestionRuleSet)
@@ -8,24 +8,66 @@
 ###
 
 
+import ipaddress
 import re
 
-from typing import Tuple
+from typing import Tuple, Union
 
+import dns.rdataclass
+import dns.rdatatype
+
+from .DomainList import DomainList
 from ...MsgEntry import QuestionEntry
 
 
+IPAddressType = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+def SenderIPAddress(
+	senderAddr: Union[Tuple[str, int], None],
+) -> Union[IPAddressType, None]:
+	'''
+	# SenderIPAddress
+	Get the IP address of the sender, where IPv4-mapped IPv6 addresses are
+	converted to IPv4 addresses.
+
+	## Parameters
+	- `senderAddr`: The address of the sender, i.e., `(host, port)`.
+
+	## Returns
+	- IP address: The IP address of the sender, or `None` if it is not given
+	  or is not an IP address.
+	'''
+	if senderAddr is None:
+		return None
+
+	try:
+		ipAddr = ipaddress.ip_address(senderAddr[0])
+	except ValueError:
+		return None
+
+	if (ipAddr.version == 6) and (ipAddr.ipv4_mapped is not None):
+		ipAddr = ipAddr.ipv4_mapped
+	return ipAddr
+
+
 class Rule(object):
 	def __init__(self) -> None:
 		super(Rule, self).__init__()
 
-	def Match(self, question: QuestionEntry.QuestionEntry) -> Tuple[bool, int]:
+	def Match(
+		self,
+		question: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Tuple[bool, int]:
 		'''
 		# Match
 		Match the question with this rule.
 
 		## Parameters
 		- `question`: The question to be matched.
+		- `senderAddr`: The address of the sender who sent the question, if
+		  known.
 
 		## Returns
 		- bool: Whether the question matches this rule.
@@ -101,7 +143,11 @@ class SubDomainRule(ConfigurableWeightRule):
 	def __init__(self, ruleStr: str) -> None:
 		super(SubDomainRule, self).__init__(self.DEFAULT_WEIGHT, ruleStr)
 
-	def Match(self, question: QuestionEntry.QuestionEntry) -> Tuple[bool, int]:
+	def Match(
+		self,
+		question: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Tuple[bool, int]:
 		if question.GetNameStr(omitFinalDot=True).endswith(self._ruleBody):
 			return (True, self._weight)
 		else:
@@ -116,13 +162,125 @@ class FullMatchRule(ConfigurableWeightRule):
 	def __init__(self, ruleStr: str) -> None:
 		super(FullMatchRule, self).__init__(self.DEFAULT_WEIGHT, ruleStr)
 
-	def Match(self, question: QuestionEntry.QuestionEntry) -> Tuple[bool, int]:
+	def Match(
+		self,
+		question: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Tuple[bool, int]:
 		if question.GetNameStr(omitFinalDot=True) == self._ruleBody:
 			return (True, self._weight)
 		else:
 			return (False, self._weight)
 
 
+class RegexRule(ConfigurableWeightRule):
+
+	RULE_TYPE_LABEL = 'regex'
+	DEFAULT_WEIGHT = 70
+
+	def __init__(self, ruleStr: str) -> None:
+		super(RegexRule, self).__init__(self.DEFAULT_WEIGHT, ruleStr)
+
+		# the whole name (without the final dot) must match the pattern
+		self._regex = re.compile(self._ruleBody)
+
+	def Match(
+		self,
+		question: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Tuple[bool, int]:
+		if self._regex.fullmatch(question.GetNameStr(omitFinalDot=True)):
+			return (True, self._weight)
+		else:
+			return (False, self._weight)
+
+
+class DomainListRule(ConfigurableWeightRule):
+
+	RULE_TYPE_LABEL = 'list'
+	DEFAULT_WEIGHT = 50
+
+	def __init__(self, ruleStr: str) -> None:
+		super(DomainListRule, self).__init__(self.DEFAULT_WEIGHT, ruleStr)
+
+		# the rule body is the path to the domain list file
+		self._domainList = DomainList.FromFile(self._ruleBody)
+
+	def Match(
+		self,
+		question: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Tuple[bool, int]:
+		if self._domainList.Match(question.GetNameStr(omitFinalDot=True)):
+			return (True, self._weight)
+		else:
+			return (False, self._weight)
+
+
+class CIDRRule(ConfigurableWeightRule):
+
+	RULE_TYPE_LABEL = 'cidr'
+	DEFAULT_WEIGHT = 60
+
+	def __init__(self, ruleStr: str) -> None:
+		super(CIDRRule, self).__init__(self.DEFAULT_WEIGHT, ruleStr)
+
+		self._network = ipaddress.ip_network(self._ruleBody)
+
+	def Match(
+		self,
+		question: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Tuple[bool, int]:
+		ipAddr = SenderIPAddress(senderAddr)
+		if (ipAddr is not None) and (ipAddr in self._network):
+			return (True, self._weight)
+		else:
+			return (False, self._weight)
+
+
+class QTypeRule(ConfigurableWeightRule):
+
+	RULE_TYPE_LABEL = 'qtype'
+	DEFAULT_WEIGHT = 40
+
+	def __init__(self, ruleStr: str) -> None:
+		super(QTypeRule, self).__init__(self.DEFAULT_WEIGHT, ruleStr)
+
+		self._rdType = dns.rdatatype.from_text(self._ruleBody)
+
+	def Match(
+		self,
+		question: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Tuple[bool, int]:
+		if question.rdType == self._rdType:
+			return (True, self._weight)
+		else:
+			return (False, self._weight)
+
+
+class QClassRule(ConfigurableWeightRule):
+
+	RULE_TYPE_LABEL = 'qclass'
+	DEFAULT_WEIGHT = 40
+
+	def __init__(self, ruleStr: str) -> None:
+		super(QClassRule, self).__init__(self.DEFAULT_WEIGHT, ruleStr)
+
+		self._rdCls = dns.rdataclass.from_text(self._ruleBody)
+
+	def Match(
+		self,
+		question: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Tuple[bool, int]:
+		if question.rdCls == self._rdCls:
+			return (True, self._weight)
+		else:
+			return (False, self._weight)
+
+
 class DefaultRule(ConfigurableWeightRule):
 
 	RULE_TYPE_LABEL = 'default'
@@ -135,7 +293,11 @@ class DefaultRule(ConfigurableWeightRule):
 			noSepAsWeight=True,
 		)
 
-	def Match(self, question: QuestionEntry.QuestionEntry) -> Tuple[bool, int]:
+	def Match(
+		self,
+		question: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Tuple[bool, int]:
 		return (True, self._weight)
 
 
@@ -143,7 +305,11 @@ RULE_TYPE_MAP = {
 	DefaultRule.RULE_TYPE_LABEL:        DefaultRule,
 	SubDomainRule.RULE_TYPE_LABEL:      SubDomainRule,
 	FullMatchRule.RULE_TYPE_LABEL:      FullMatchRule,
-	# 'regex':    RegexRule, # plan for future support
+	RegexRule.RULE_TYPE_LABEL:          RegexRule,
+	DomainListRule.RULE_TYPE_LABEL:     DomainListRule,
+	CIDRRule.RULE_TYPE_LABEL:           CIDRRule,
+	QTypeRule.RULE_TYPE_LABEL:          QTypeRule,
+	QClassRule.RULE_TYPE_LABEL:         QClassRule,
 }
 
 
@@ -8,11 +8,37 @@
 ###
 
 
-import heapq
+import functools
+import ipaddress
+import re
 
-from typing import Dict, List, Tuple
+try:
+	from re import _parser as _ReParser
+except ImportError:
+	try:
+		# Python < 3.11
+		import sre_parse as _ReParser
+	except ImportError:
+		# the regex parser is private to CPython, so without it, no literal
+		# is extracted from the patterns, and they are always tried
+		_ReParser = None
 
-from .QuestionRule import Rule, RuleFromStr
+from typing import Callable, Dict, Hashable, List, Tuple, Union
+
+from .QuestionRule import (
+	CIDRRule,
+	DefaultRule,
+	DomainListRule,
+	FullMatchRule,
+	IPAddressType,
+	QClassRule,
+	QTypeRule,
+	RegexRule,
+	Rule,
+	RuleFromStr,
+	SenderIPAddress,
+	SubDomainRule,
+)
 from ..DownstreamCollection import DownstreamCollection
 from ..QuickLookup import QuickLookup
 from ..HandlerByQuestion import HandlerByQuestion
@@ -20,27 +46,295 @@ from ..HandlerByQuestion import HandlerByQuestion
 from ...MsgEntry import MsgEntry, QuestionEntry
 
 
+# the key used to pick the matched rule with the highest priority, i.e.,
+# `(-weight, index)`, where `index` is the position of the rule in the rule set
+_RulePriority = Tuple[int, int]
+
+
+# regex patterns that can't be combined with others, since they use
+# numbered back references, or global flags that must be at the start
+_NON_COMBINABLE_REGEX = re.compile(r'\\[1-9]|^\(\?[aiLmsux]+\)')
+
+
+class _CombinedRegex(object):
+
+	def __init__(self, rules: List[Tuple[RegexRule, _RulePriority]]) -> None:
+		super(_CombinedRegex, self).__init__()
+
+		# rules are tried in order, so they are sorted by priority, and the
+		# first one that matches has the highest priority
+		rules = sorted(rules, key=lambda x: x[1])
+
+		# an empty group is appended to each pattern, which is the last group
+		# to be closed when that pattern matches, so `lastindex` of the match
+		# tells which pattern it is
+		alternatives = []
+		self._prioByGroup: Dict[int, _RulePriority] = {}
+		numGroups = 0
+		for rule, prio in rules:
+			alternatives.append(f'(?:{rule._ruleBody})()')
+			numGroups += rule._regex.groups + 1
+			self._prioByGroup[numGroups] = prio
+
+		try:
+			self._regex = re.compile('|'.join(alternatives))
+			self._rules = []
+		except re.error:
+			# e.g., the same group name is used by multiple patterns,
+			# so these patterns have to be matched one by one
+			self._regex = None
+			self._rules = rules
+
+	def Match(self, nameStr: str) -> Union[_RulePriority, None]:
+		if self._regex is not None:
+			m = self._regex.fullmatch(nameStr)
+			return None if m is None else self._prioByGroup[m.lastindex]
+
+		for rule, prio in self._rules:
+			if rule._regex.fullmatch(nameStr):
+				return prio
+		return None
+
+
+class _RegexMatcher(object):
+	'''
+	# _RegexMatcher
+
+	Find the matching `regex` rule with the highest priority.
+
+	Combining thousands of patterns into one alternation still makes the regex
+	engine try each of them, so a literal string that every matching name must
+	contain is extracted from each pattern, and the pattern is put into the
+	bucket of the least common n-gram of that literal.
+	A name is then only matched against the buckets of the n-grams it
+	contains, where the patterns in each bucket are combined into a single
+	alternation.
+	Patterns without such a literal are combined into one more alternation
+	that is always tried, and those can't be combined (e.g., with numbered
+	back references) are matched one by one.
+	'''
+
+	NGRAM_LEN = 3
+
+	def __init__(self, rules: List[Tuple[RegexRule, _RulePriority]]) -> None:
+		super(_RegexMatcher, self).__init__()
+
+		self._singleRules: List[Tuple[RegexRule, _RulePriority]] = []
+		combinable: List[Tuple[RegexRule, _RulePriority, List[str]]] = []
+		ngramCounts: Dict[str, int] = {}
+		for rule, prio in rules:
+			if _NON_COMBINABLE_REGEX.search(rule._ruleBody):
+				self._singleRules.append((rule, prio))
+				continue
+
+			ngrams = self._GetNgrams(self._GetRequiredLiteral(rule._ruleBody))
+			for ngram in ngrams:
+				ngramCounts[ngram] = ngramCounts.get(ngram, 0) + 1
+			combinable.append((rule, prio, ngrams))
+		self._singleRules.sort(key=lambda x: x[1])
+
+		anyRules: List[Tuple[RegexRule, _RulePriority]] = []
+		bucketRules: Dict[str, List[Tuple[RegexRule, _RulePriority]]] = {}
+		for rule, prio, ngrams in combinable:
+			if len(ngrams) == 0:
+				anyRules.append((rule, prio))
+			else:
+				ngram = min(ngrams, key=lambda x: (ngramCounts[x], x))
+				bucketRules.setdefault(ngram, []).append((rule, prio))
+
+		self._anyRegex = _CombinedRegex(anyRules) if len(anyRules) > 0 else None
+		self._buckets: Dict[str, _CombinedRegex] = {
+			ngram: _CombinedRegex(x) for ngram, x in bucketRules.items()
+		}
+
+	@classmethod
+	def _GetNgrams(cls, s: str) -> List[str]:
+		return list(set([
+			s[i:i + cls.NGRAM_LEN] for i in range(len(s) - cls.NGRAM_LEN + 1)
+		]))
+
+	@classmethod
+	def _GetRequiredLiteral(cls, pattern: str) -> str:
+		'''
+		# _GetRequiredLiteral
+		Get the longest literal string that any string matching the pattern
+		must contain.
+		Only the literals at the top level of the pattern (i.e., outside of
+		any group, alternation, or repetition) are considered, which is
+		conservative, but good enough for the patterns of domain names.
+
+		## Parameters
+		- `pattern`: The regex pattern.
+
+		## Returns
+		- str: The literal string, which can be empty (e.g., when the private
+		  regex parser of CPython is unavailable, or has changed).
+		'''
+		if _ReParser is None:
+			return ''
+
+		try:
+			parsed = _ReParser.parse(pattern)
+			if parsed.state.flags & re.IGNORECASE:
+				return ''
+
+			# let the regex parser deal with the escapes (e.g., `\x2e`) and
+			# the quantifiers, so only the `LITERAL` items need to be looked at
+			literals = []
+			literal = []
+			for op, av in parsed:
+				if op == _ReParser.LITERAL:
+					literal.append(chr(av))
+				else:
+					literals.append(''.join(literal))
+					literal = []
+			literals.append(''.join(literal))
+		except Exception:
+			# the pattern is always tried, which is slower, but still correct
+			return ''
+
+		return max(literals, key=len)
+
+	def Match(self, nameStr: str) -> Union[_RulePriority, None]:
+		matchedPrio: List[_RulePriority] = []
+
+		if self._anyRegex is not None:
+			prio = self._anyRegex.Match(nameStr)
+			if prio is not None:
+				matchedPrio.append(prio)
+
+		for ngram in self._GetNgrams(nameStr):
+			bucket = self._buckets.get(ngram, None)
+			if bucket is not None:
+				prio = bucket.Match(nameStr)
+				if prio is not None:
+					matchedPrio.append(prio)
+
+		# rules are sorted by priority, so we can stop at the first match
+		for rule, prio in self._singleRules:
+			if rule._regex.fullmatch(nameStr):
+				matchedPrio.append(prio)
+				break
+
+		return min(matchedPrio) if len(matchedPrio) > 0 else None
+
+
+class _CIDRMatcher(object):
+	'''
+	# _CIDRMatcher
+
+	Find the `cidr` rule with the highest priority that matches an address.
+
+	Networks are kept in one hash table per prefix length, so looking up an
+	address takes at most one masking and one lookup per prefix length in use
+	(i.e., bounded by the number of bits of the address), regardless of the
+	number of networks.
+	Among the matching rules with the same weight, the one with the longest
+	prefix wins.
+	'''
+
+	def __init__(self) -> None:
+		super(_CIDRMatcher, self).__init__()
+
+		# IP version -> [ (prefix length, netmask, network -> priority) ]
+		self._luts: Dict[
+			int,
+			List[Tuple[int, int, Dict[int, Tuple[int, int, int]]]]
+		] = {
+			4: [],
+			6: [],
+		}
+
+	def Add(
+		self,
+		network: Union[ipaddress.IPv4Network, ipaddress.IPv6Network],
+		prio: _RulePriority,
+	) -> None:
+		luts = self._luts[network.version]
+		lut = None
+		for prefixLen, _, x in luts:
+			if prefixLen == network.prefixlen:
+				lut = x
+				break
+		if lut is None:
+			lut = {}
+			luts.append((network.prefixlen, int(network.netmask), lut))
+			luts.sort(key=lambda x: x[0], reverse=True)
+
+		# `(-weight, -prefixLen, index)`, so the longest prefix wins among the
+		# rules with the same weight
+		cidrPrio = (prio[0], -network.prefixlen, prio[1])
+		netAddr = int(network.network_address)
+		if (netAddr not in lut) or (cidrPrio < lut[netAddr]):
+			lut[netAddr] = cidrPrio
+
+	def Match(self, ipAddr: IPAddressType) -> Union[_RulePriority, None]:
+		addr = int(ipAddr)
+		best = None
+		for _, netmask, lut in self._luts[ipAddr.version]:
+			cidrPrio = lut.get(addr & netmask, None)
+			if (cidrPrio is not None) and ((best is None) or (cidrPrio < best)):
+				best = cidrPrio
+
+		return None if best is None else (best[0], best[2])
+
+
 class QuestionRuleSet(QuickLookup):
+	'''
+	# QuestionRuleSet
+
+	Dispatch each question to the handler of the matching rule with the highest
+	weight; if there are multiple of them, the one given first wins.
+
+	The `sub`, `full`, and `default` rules are compiled into lookup tables when
+	the rule set is constructed, so the cost of matching a question doesn't
+	grow with the number of these rules:
+	- `full` rules are looked up by the whole name.
+	- `sub` rules are looked up by the suffixes of the name, one for each
+	  distinct length of the rule bodies.
+	- `regex` rules are combined into alternations ordered by their priority,
+	  so one pass of the regex engine finds the matching one with the highest
+	  priority (see `_RegexMatcher`).
+	- `list` rules are looked up in their domain lists (see `DomainList`).
+	- only the `default` rule with the highest priority is kept.
+	- `qtype` and `qclass` rules are looked up by the type and the class of
+	  the question.
+	- `cidr` rules are looked up by the IP address of the sender, one for each
+	  distinct prefix length (see `_CIDRMatcher`).
+	Any other rule is matched one by one.
+
+	The results of matching the names above are memoized in a LRU cache of
+	`cacheSize` names.
+	'''
+
+	DEFAULT_CACHE_SIZE = 4096
 
 	@classmethod
 	def FromConfig(
 		cls,
 		dCollection: DownstreamCollection,
 		ruleAndHandlers: Dict[str, str],
+		cacheSize: int = DEFAULT_CACHE_SIZE,
 	) -> 'QuestionRuleSet':
 		return cls(
 			ruleAndHandlers={
 				ruleStr: dCollection.GetHandlerByQuestion(handlerStr)
 				for ruleStr, handlerStr in ruleAndHandlers.items()
-			}
+			},
+			cacheSize=cacheSize,
 		)
 
 	def __init__(
 		self,
 		ruleAndHandlers: Dict[str, HandlerByQuestion],
+		cacheSize: int = DEFAULT_CACHE_SIZE,
 	) -> None:
 		super(QuestionRuleSet, self).__init__()
 
+		if cacheSize < 0:
+			raise ValueError('cacheSize must not be negative')
+		self.cacheSize = cacheSize
+
 		self.lut: Dict[Rule, HandlerByQuestion] = {}
 		for ruleStr, handler in ruleAndHandlers.items():
 			rule = RuleFromStr(ruleStr)
@@ -50,33 +344,160 @@ class QuestionRuleSet(QuickLookup):
 				)
 			self.lut[rule] = handler
 
+		self._Compile()
+
+	def _Compile(self) -> None:
+		self._handlers: List[HandlerByQuestion] = []
+		self._fullLut: Dict[str, _RulePriority] = {}
+		self._subLut: Dict[str, _RulePriority] = {}
+		self._defaultPrio: Union[_RulePriority, None] = None
+		self._qtypeLut: Dict[int, _RulePriority] = {}
+		self._qclassLut: Dict[int, _RulePriority] = {}
+		self._cidrMatcher = _CIDRMatcher()
+		self._hasCIDRRule = False
+		self._otherRules: List[Tuple[Rule, int]] = []
+		regexRules: List[Tuple[RegexRule, _RulePriority]] = []
+		self._listRules: List[Tuple[DomainListRule, _RulePriority]] = []
+
+		for i, (rule, handler) in enumerate(self.lut.items()):
+			self._handlers.append(handler)
+
+			if isinstance(rule, DefaultRule):
+				prio = (-rule._weight, i)
+				if (self._defaultPrio is None) or (prio < self._defaultPrio):
+					self._defaultPrio = prio
+			elif isinstance(rule, FullMatchRule):
+				self._AddToLut(self._fullLut, rule._ruleBody, (-rule._weight, i))
+			elif isinstance(rule, SubDomainRule):
+				self._AddToLut(self._subLut, rule._ruleBody, (-rule._weight, i))
+			elif isinstance(rule, RegexRule):
+				regexRules.append((rule, (-rule._weight, i)))
+			elif isinstance(rule, DomainListRule):
+				self._listRules.append((rule, (-rule._weight, i)))
+			elif isinstance(rule, QTypeRule):
+				self._AddToLut(self._qtypeLut, rule._rdType, (-rule._weight, i))
+			elif isinstance(rule, QClassRule):
+				self._AddToLut(self._qclassLut, rule._rdCls, (-rule._weight, i))
+			elif isinstance(rule, CIDRRule):
+				self._cidrMatcher.Add(rule._network, (-rule._weight, i))
+				self._hasCIDRRule = True
+			else:
+				self._otherRules.append((rule, i))
+
+		# `sub` rules match by `str.endswith`, so the name is only needed to
+		# be sliced at the lengths of the rule bodies
+		self._subLens = sorted(set([ len(x) for x in self._subLut.keys() ]))
+		self._listRules.sort(key=lambda x: x[1])
+
+		self._regexMatcher = (
+			_RegexMatcher(regexRules) if len(regexRules) > 0 else None
+		)
+
+		self._MatchName: Callable[[str], Union[_RulePriority, None]]
+		if self.cacheSize > 0:
+			self._MatchName = functools.lru_cache(maxsize=self.cacheSize)(
+				self._MatchNameUncached
+			)
+		else:
+			self._MatchName = self._MatchNameUncached
+
+	@classmethod
+	def _AddToLut(
+		cls,
+		lut: Dict[Hashable, _RulePriority],
+		key: Hashable,
+		prio: _RulePriority,
+	) -> None:
+		if (key not in lut) or (prio < lut[key]):
+			lut[key] = prio
+
+	def _MatchNameUncached(self, nameStr: str) -> Union[_RulePriority, None]:
+		'''
+		# _MatchNameUncached
+		Match the name with all rules that only depend on the name.
+
+		## Parameters
+		- `nameStr`: The name to be matched, without the final dot.
+
+		## Returns
+		- tuple: The priority of the matched rule with the highest priority,
+		  or `None` if there is no matching rule.
+		'''
+		nameLen = len(nameStr)
+
+		# collect the priority of matched rules;
+		# `-weight` is used so the highest weight comes first
+		matchedPrio: List[_RulePriority] = []
+
+		if self._defaultPrio is not None:
+			matchedPrio.append(self._defaultPrio)
+
+		prio = self._fullLut.get(nameStr, None)
+		if prio is not None:
+			matchedPrio.append(prio)
+
+		for subLen in self._subLens:
+			if subLen > nameLen:
+				break
+			prio = self._subLut.get(
+				nameStr[nameLen - subLen:] if subLen > 0 else '',
+				None
+			)
+			if prio is not None:
+				matchedPrio.append(prio)
+
+		if self._regexMatcher is not None:
+			prio = self._regexMatcher.Match(nameStr)
+			if prio is not None:
+				matchedPrio.append(prio)
+
+		# rules are sorted by priority, so we can stop at the first match
+		for rule, prio in self._listRules:
+			if rule._domainList.Match(nameStr):
+				matchedPrio.append(prio)
+				break
+
+		return min(matchedPrio) if len(matchedPrio) > 0 else None
+
 	def MatchHandler(
 		self,
 		msgEntry: QuestionEntry.QuestionEntry,
+		senderAddr: Union[Tuple[str, int], None] = None,
 	) -> HandlerByQuestion:
-		# match with all rules
-		indexedHdlr: List[HandlerByQuestion] = []
-		heapHdlr: List[Tuple[int, int]] = []
-		for rule, handler in self.lut.items():
-			isMatch, weight = rule.Match(msgEntry)
-			if isMatch:
-				# we need to put index to the heap, since handlers are
-				# non-comparable
-				indexedHdlr.append(handler)
-				i = len(indexedHdlr) - 1
+		matchedPrio: List[_RulePriority] = []
 
-				# `-weight` is used to make the heap a max-heap
-				heapq.heappush(heapHdlr, (-weight, i))
+		prio = self._MatchName(msgEntry.GetNameStr(omitFinalDot=True))
+		if prio is not None:
+			matchedPrio.append(prio)
+
+		prio = self._qtypeLut.get(msgEntry.rdType, None)
+		if prio is not None:
+			matchedPrio.append(prio)
+		prio = self._qclassLut.get(msgEntry.rdCls, None)
+		if prio is not None:
+			matchedPrio.append(prio)
+
+		if self._hasCIDRRule:
+			ipAddr = SenderIPAddress(senderAddr)
+			if ipAddr is not None:
+				prio = self._cidrMatcher.Match(ipAddr)
+				if prio is not None:
+					matchedPrio.append(prio)
+
+		for rule, i in self._otherRules:
+			isMatch, weight = rule.Match(msgEntry, senderAddr=senderAddr)
+			if isMatch:
+				matchedPrio.append((-weight, i))
 
 		# get the handler with the highest weight
-		if len(heapHdlr) == 0:
+		if len(matchedPrio) == 0:
 			raise RuntimeError(
 				f'No handler found for question {msgEntry}'
 			)
 
 		# get the index of the handler with the highest weight
-		_, i = heapq.heappop(heapHdlr)
-		handler = indexedHdlr[i]
+		_, i = min(matchedPrio)
+		handler = self._handlers[i]
 
 		return handler
 
@@ -91,7 +512,7 @@ class QuestionRuleSet(QuickLookup):
 			self.HandleQuestion
 		)
 
-		handler = self.MatchHandler(msgEntry=msgEntry)
+		handler = self.MatchHandler(msgEntry=msgEntry, senderAddr=senderAddr)
 
 		return handler.HandleQuestion(
 			msgEntry=msgEntry,
@@ -99,8 +520,13 @@ class QuestionRuleSet(QuickLookup):
 			recDepthStack=newRecStack,
 		)
 
+	def IsSenderDependent(self) -> bool:
+		# `cidr` rules route by the address of the sender
+		return self._hasCIDRRule
+
 	def Terminate(self) -> None:
 		for handler in self.lut.values():
 			handler.Terminate()
 		self.lut.clear()
+		self._Compile()
 
@@ -8,6 +8,7 @@
 ###
 
 
+from typing import Union
 
 from ..DownstreamCollection import DownstreamCollection
 from .Remote import DEFAULT_TIMEOUT
@@ -15,12 +16,14 @@ from .Remote import DEFAULT_TIMEOUT
 from .HTTPS import HTTPS
 from .Remote import Remote
 from .TCP import TCP
+from .TLS import TLS
 from .UDP import UDP
 
 
 REMOTE_HANDLER_MAP = {
 	'https': HTTPS,
 	'tcp': TCP,
+	'tls': TLS,
 	'udp': UDP,
 }
 
@@ -33,6 +36,7 @@ class ByProtocol:
 		dCollection: DownstreamCollection,
 		endpoint: str,
 		timeout: float = DEFAULT_TIMEOUT,
+		minTimeout: Union[float, None] = None,
 	) -> Remote:
 		endpointObj = dCollection.GetEndpoint(endpoint)
 		proto = endpointObj.proto
@@ -42,8 +46,14 @@ class ByProtocol:
 
 		remoteCls = REMOTE_HANDLER_MAP[proto]
 
+		kwargs = {}
+		if remoteCls is UDP:
+			# only UDP retransmits, the other protocols rely on the transport
+			kwargs['minTimeout'] = minTimeout
+
 		return remoteCls(
 			endpoint=endpointObj,
-			timeout=timeout
+			timeout=timeout,
+			**kwargs,
 		)
 
@@ -8,38 +8,21 @@
 ###
 
 
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple, Union
 
 import dns.message
 
-from CacheLib.TTL import Interfaces, ObjFactoryCache
-
 from .Endpoint import Endpoint
 from .Protocol import Protocol, _REMOTE_INFO
-
-
-class ConcurrentMgrCache(ObjFactoryCache.ObjFactoryCache):
-
-	WARNING_SIZE_LIMIT: int = 500
-
-	def Get(self, trackInUse: bool = ...) -> Interfaces.Terminable:
-		obj = super(ConcurrentMgrCache, self).Get(trackInUse)
-
-		sizeCount = len(self)
-		if sizeCount >= self.WARNING_SIZE_LIMIT:
-			self.logger.warning(
-				f'Number of session, {sizeCount}, '
-				f'exceeds warning limit {self.WARNING_SIZE_LIMIT}'
-			)
-
-		return obj
+from .RTTEstimator import RTTEstimator
+from .SessionPool import SessionPool
 
 
 class ConcurrentMgr(Protocol):
 
-	MAX_SESSION_TTL: float = 600.0
+	MAX_SESSION_TTL: float = SessionPool.DEFAULT_IDLE_TIMEOUT
 	'''
-	Keep the underlying protocol session object for 10 minutes
+	Keep an idle underlying protocol session object for 10 minutes by default
 	'''
 
 	SESSION_CLASS: Protocol = None
@@ -49,19 +32,54 @@ class ConcurrentMgr(Protocol):
 	This MUST be overridden by the subclass and it MUST be a subclass of `Protocol`
 	'''
 
-	def __init__(self, endpoint: Endpoint, timeout: float) -> None:
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float,
+		sessionKwargs: Union[Dict[str, Any], None] = None,
+		poolConfig: Union[Dict[str, Any], None] = None,
+		rttEstimator: Union[RTTEstimator, None] = None,
+	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `endpoint`: The endpoint of the remote server.
+		- `timeout`: The timeout for each query.
+		- `sessionKwargs`: Additional keyword arguments passed to the
+		  constructor of `SESSION_CLASS`.
+		- `poolConfig`: Keyword arguments passed to the `SessionPool` holding
+		  the sessions, e.g., `minIdle`, `maxSize`, `idleTimeout`,
+		  `waitTimeout`, and `maxWaiters`; the `minIdle` sessions created in
+		  advance are connected by `Protocol.Warm()`.
+		- `rttEstimator`: The RTT estimator shared by all sessions, which
+		  gives the retransmission timeout of each query.
+		'''
 		super(ConcurrentMgr, self).__init__(
 			endpoint=endpoint,
-			timeout=timeout
+			timeout=timeout,
+			rttEstimator=rttEstimator,
 		)
 
-		self.cache = ConcurrentMgrCache(
-			ttl=self.MAX_SESSION_TTL,
-			objCls=self.SESSION_CLASS,
-			objKwargs={
-				'endpoint': self.endpoint,
-				'timeout': self.timeout,
-			}
+		objKwargs = {
+			'endpoint': self.endpoint,
+			'timeout': self.timeout,
+		}
+		if self.rttEstimator is not None:
+			objKwargs['rttEstimator'] = self.rttEstimator
+		if sessionKwargs is not None:
+			objKwargs.update(sessionKwargs)
+
+		poolKwargs = {
+			'idleTimeout': self.MAX_SESSION_TTL,
+		}
+		if poolConfig is not None:
+			poolKwargs.update(poolConfig)
+
+		self.pool = SessionPool(
+			factory=lambda: self.SESSION_CLASS(**objKwargs),
+			warmUp=lambda session: session.Warm(recDepthStack=[]),
+			**poolKwargs,
 		)
 
 	def Query(
@@ -70,20 +88,19 @@ class ConcurrentMgr(Protocol):
 		recDepthStack: List[ Tuple[ int, str ] ],
 	) -> Tuple[dns.message.Message, _REMOTE_INFO]:
 
-		# Get a session object from the cache
+		# Get a session object from the pool
 		# and remember to put it back after use
 		# even if an exception is raised
-		session: Protocol = self.cache.Get()
+		session: Protocol = self.pool.Get()
 		try:
 			resp = session.Query(
 				q=q,
 				recDepthStack=recDepthStack
 			)
 		finally:
-			self.cache.Put(session)
+			self.pool.Put(session)
 
 		return resp
 
 	def Terminate(self) -> None:
-		self.cache.Terminate()
-
+		self.pool.Terminate()
@@ -9,13 +9,20 @@
 
 
 import base64
+import ssl
 
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple, Union
 
 import dns.message
 import requests
 import requests.exceptions
 
+try:
+	import httpx
+except ImportError:
+	# HTTP/2 is an optional feature, see `HTTP2Protocol`
+	httpx = None
+
 from ...Exceptions import ServerNetworkError
 from ...MsgEntry import AnsEntry, MsgEntry, QuestionEntry
 from ..DownstreamCollection import DownstreamCollection
@@ -23,49 +30,180 @@ from ..Utils import CommonDNSRespHandling
 from .ConcurrentMgr import ConcurrentMgr
 from .Endpoint import Endpoint
 from .HTTPSAdapters import SmartAndSecureAdapter
+from .HTTPSRespMemo import HTTPSRespMemo
 from .Protocol import Protocol, _REMOTE_INFO
 from .Remote import DEFAULT_TIMEOUT, Remote
 
 
-class HTTPSProtocol(Protocol):
+class DoHProtocol(Protocol):
 
-	def __init__(self, endpoint: Endpoint, timeout: float) -> None:
-		super(HTTPSProtocol, self).__init__(
+	'''
+	The common part of the implementations of DNS-over-HTTPS protocol
+	(RFC 8484), where queries are sent either via GET, with the query encoded
+	in base64url as the `dns` parameter, or via POST, with the query in wire
+	format as the body
+	'''
+
+	METHOD_GET  = 'GET'
+	METHOD_POST = 'POST'
+
+	METHODS = [
+		METHOD_GET,
+		METHOD_POST,
+	]
+
+	CONTENT_TYPE = 'application/dns-message'
+
+	@classmethod
+	def MakeGetParams(cls, rawMsg: bytes) -> dict:
+		rawMsgB64 = base64.urlsafe_b64encode(rawMsg)
+		rawMsgB64 = rawMsgB64.decode("utf-8").strip("=")
+		return {
+			'dns': rawMsgB64,
+			'ct': cls.CONTENT_TYPE,
+		}
+
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float,
+		method: str = METHOD_GET,
+		respMemo: Union[HTTPSRespMemo, None] = None,
+	) -> None:
+		super(DoHProtocol, self).__init__(
 			endpoint=endpoint.FromCopy(endpoint),
 			timeout=timeout
 		)
 
-		self.session = requests.Session()
-		self.session.mount('https://', SmartAndSecureAdapter())
+		if method not in self.METHODS:
+			raise ValueError(f'Unsupported HTTP method: {method}')
+
+		self.method = method
+		self.respMemo = respMemo
+
+	def _SendRequest(
+		self,
+		url: str,
+		hostname: str,
+		rawMsg: bytes,
+	) -> Tuple[bytes, Union[str, None]]:
+		'''
+		# _SendRequest
+		Send the DoH request to the server.
+
+		## Parameters
+		- `url`: The URL of the request, with the IP address of the server.
+		- `hostname`: The host name of the server.
+		- `rawMsg`: The query message in wire format.
+
+		## Returns
+		- bytes: The body of the response.
+		- str: The `Cache-Control` header of the response, or `None`.
+		'''
+		raise NotImplementedError(
+			f'{self.__class__.__name__}._SendRequest() is not implemented'
+		)
 
 	def Query(
 		self,
 		q: dns.message.Message,
 		recDepthStack: List[ Tuple[ int, str ] ],
 	) -> Tuple[dns.message.Message, _REMOTE_INFO]:
-		with self.lock:
-			rawMsg = q.to_wire()
-			rawMsgB64 = base64.urlsafe_b64encode(rawMsg)
-			rawMsgB64 = rawMsgB64.decode("utf-8").strip("=")
-			params = {
-				'dns': rawMsgB64,
-				'ct': 'application/dns-message',
-			}
-
-			ipAddr = self.endpoint.GetIPAddr(recDepthStack=recDepthStack)
-			port = self.endpoint.port
-			hostname = self.endpoint.GetHostName()
+		rawMsg = q.to_wire()
+
+		memoKey = None
+		if self.respMemo is not None:
+			memoKey = self.respMemo.MakeKey(rawMsg)
+			memoized = self.respMemo.Get(memoKey)
+			if memoized is not None:
+				return memoized
+
+		ipAddr = self.endpoint.GetIPAddr(recDepthStack=recDepthStack)
+		port = self.endpoint.port
+		hostname = self.endpoint.GetHostName()
+		urlHost = f'[{ipAddr}]' if ipAddr.version == 6 else str(ipAddr)
 
+		content, cacheControl = self._SendRequest(
+			url=f'https://{urlHost}:{port}/dns-query',
+			hostname=hostname,
+			rawMsg=rawMsg,
+		)
+
+		respMsg = dns.message.from_wire(content)
+		remote = (hostname, str(ipAddr), port)
+
+		if memoKey is not None:
+			self.respMemo.Put(
+				key=memoKey,
+				wire=content,
+				msg=respMsg,
+				remote=remote,
+				maxAge=self.respMemo.ParseMaxAge(cacheControl),
+			)
+
+		return (respMsg, remote)
+
+	def Warm(self, recDepthStack: List[ Tuple[ int, str ] ]) -> None:
+		# there is no way to only open the connection via the HTTP client, so
+		# send a request for the root NS records, and discard the response
+		ipAddr = self.endpoint.GetIPAddr(recDepthStack=recDepthStack)
+		urlHost = f'[{ipAddr}]' if ipAddr.version == 6 else str(ipAddr)
+		self._SendRequest(
+			url=f'https://{urlHost}:{self.endpoint.port}/dns-query',
+			hostname=self.endpoint.GetHostName(),
+			rawMsg=dns.message.make_query('.', 'NS').to_wire(),
+		)
+
+
+class HTTPSProtocol(DoHProtocol):
+
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float,
+		method: str = DoHProtocol.METHOD_GET,
+		respMemo: Union[HTTPSRespMemo, None] = None,
+	) -> None:
+		super(HTTPSProtocol, self).__init__(
+			endpoint=endpoint,
+			timeout=timeout,
+			method=method,
+			respMemo=respMemo,
+		)
+
+		self.session = requests.Session()
+		self.session.mount('https://', SmartAndSecureAdapter())
+
+	def _SendRequest(
+		self,
+		url: str,
+		hostname: str,
+		rawMsg: bytes,
+	) -> Tuple[bytes, Union[str, None]]:
+		with self.lock:
 			try:
-				resp = self.session.get(
-					f'https://{ipAddr}:{port}/dns-query',
-					headers={
-						'Host': hostname,
-					},
-					params=params,
-					timeout=self.timeout,
-					verify=True,
-				)
+				if self.method == self.METHOD_POST:
+					resp = self.session.post(
+						url,
+						headers={
+							'Host': hostname,
+							'Content-Type': self.CONTENT_TYPE,
+							'Accept': self.CONTENT_TYPE,
+						},
+						data=rawMsg,
+						timeout=self.timeout,
+						verify=True,
+					)
+				else:
+					resp = self.session.get(
+						url,
+						headers={
+							'Host': hostname,
+						},
+						params=self.MakeGetParams(rawMsg),
+						timeout=self.timeout,
+						verify=True,
+					)
 			except (
 				requests.exceptions.ConnectTimeout,
 				requests.exceptions.ReadTimeout,
@@ -75,16 +213,111 @@ class HTTPSProtocol(Protocol):
 
 			resp.raise_for_status()
 
-			return (
-				dns.message.from_wire(resp.content),
-				(hostname, str(ipAddr), port)
-			)
+			return (resp.content, resp.headers.get('Cache-Control', None))
 
 	def Terminate(self) -> None:
 		super(HTTPSProtocol, self)._Terminate()
 		self.session.close()
 
 
+class HTTP2Protocol(DoHProtocol):
+
+	'''
+	Implementation of DNS-over-HTTPS protocol over HTTP/2, where concurrent
+	queries are multiplexed as streams over a few connections per endpoint
+	This class is thread-safe
+
+	It requires the optional `httpx[http2]` dependency, which can be
+	installed via `pip install ModularDNS[http2]`.
+	'''
+
+	MAX_CONNS: int = 4
+	'''
+	The maximum number of connections to the endpoint; a new connection is
+	only opened when the existing ones have reached their limits of
+	concurrent streams
+	'''
+
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float,
+		method: str = DoHProtocol.METHOD_GET,
+		respMemo: Union[HTTPSRespMemo, None] = None,
+	) -> None:
+		super(HTTP2Protocol, self).__init__(
+			endpoint=endpoint,
+			timeout=timeout,
+			method=method,
+			respMemo=respMemo,
+		)
+
+		if httpx is None:
+			raise ImportError(
+				'HTTP/2 support requires the httpx[http2] package, '
+				'which can be installed via `pip install ModularDNS[http2]`'
+			)
+
+		# the same TLS requirements as `SmartAndSecureAdapter`
+		sslContext = ssl.create_default_context()
+		sslContext.minimum_version = SmartAndSecureAdapter.TLS_MIN_VERSION
+
+		self.client = httpx.Client(
+			http2=True,
+			verify=sslContext,
+			timeout=timeout,
+			limits=httpx.Limits(max_connections=self.MAX_CONNS),
+		)
+
+	def _SendRequest(
+		self,
+		url: str,
+		hostname: str,
+		rawMsg: bytes,
+	) -> Tuple[bytes, Union[str, None]]:
+		# like `SmartAdapter`, we connect to the IP address, while using
+		# the host name for SNI, certificate verification, and the
+		# `:authority` of the requests
+		extensions = {
+			'sni_hostname': hostname,
+		}
+		try:
+			if self.method == self.METHOD_POST:
+				resp = self.client.post(
+					url,
+					headers={
+						'Host': hostname,
+						'Content-Type': self.CONTENT_TYPE,
+						'Accept': self.CONTENT_TYPE,
+					},
+					content=rawMsg,
+					extensions=extensions,
+				)
+			else:
+				resp = self.client.get(
+					url,
+					headers={
+						'Host': hostname,
+					},
+					params=self.MakeGetParams(rawMsg),
+					extensions=extensions,
+				)
+		except (
+			httpx.TimeoutException,
+			httpx.NetworkError,
+			httpx.RemoteProtocolError,
+		) as e:
+			raise ServerNetworkError(str(e))
+
+		resp.raise_for_status()
+
+		return (resp.content, resp.headers.get('Cache-Control', None))
+
+	def Terminate(self) -> None:
+		super(HTTP2Protocol, self)._Terminate()
+		self.client.close()
+
+
 class ConcurrentHTTPS(ConcurrentMgr):
 
 	SESSION_CLASS: Protocol = HTTPSProtocol
@@ -98,21 +331,67 @@ class HTTPS(Remote):
 		dCollection: DownstreamCollection,
 		endpoint: str,
 		timeout: float = DEFAULT_TIMEOUT,
+		http2: bool = False,
+		method: str = DoHProtocol.METHOD_GET,
+		memoSize: int = 0,
+		sessionPool: Union[Dict[str, Any], None] = None,
 	) -> 'HTTPS':
 		return cls(
 			endpoint=dCollection.GetEndpoint(endpoint),
-			timeout=timeout
+			timeout=timeout,
+			http2=http2,
+			method=method,
+			memoSize=memoSize,
+			sessionPool=sessionPool,
 		)
 
 	def __init__(
 		self,
 		endpoint: Endpoint,
 		timeout: float = DEFAULT_TIMEOUT,
+		http2: bool = False,
+		method: str = DoHProtocol.METHOD_GET,
+		memoSize: int = 0,
+		sessionPool: Union[Dict[str, Any], None] = None,
 	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `endpoint`: The endpoint of the remote server.
+		- `timeout`: The timeout for each query.
+		- `http2`: Whether to multiplex queries over HTTP/2 connections (see
+		  `HTTP2Protocol`), instead of using one HTTP/1.1 session per
+		  concurrent query.
+		- `method`: The HTTP method used to send queries, either `GET` or
+		  `POST`.
+		- `memoSize`: If greater than zero, up to this number of responses
+		  are kept for the `max-age` given by the server (see
+		  `HTTPSRespMemo`), and are reused for identical queries.
+		- `sessionPool`: The configuration of the pool of sessions used when
+		  queries are not multiplexed (see `SessionPool`), e.g.,
+		  `{ "minIdle": 2, "maxSize": 64 }`.
+		'''
 		super(HTTPS, self).__init__(timeout=timeout)
 
-		self.underlying = ConcurrentHTTPS(
-			endpoint=endpoint,
-			timeout=timeout
-		)
+		self.respMemo = None
+		if memoSize > 0:
+			self.respMemo = HTTPSRespMemo(maxEntries=memoSize)
 
+		if http2:
+			self.underlying = HTTP2Protocol(
+				endpoint=endpoint,
+				timeout=timeout,
+				method=method,
+				respMemo=self.respMemo,
+			)
+		else:
+			self.underlying = ConcurrentHTTPS(
+				endpoint=endpoint,
+				timeout=timeout,
+				sessionKwargs={
+					'method': method,
+					'respMemo': self.respMemo,
+				},
+				poolConfig=sessionPool,
+			)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import collections
+import threading
+import time
+
+from typing import Any, Dict, Tuple, Union
+
+import dns.message
+
+
+class _MemoEntry(object):
+
+	__slots__ = ('wire', 'msg', 'remote', 'storedAt', 'expireAt')
+
+	def __init__(
+		self,
+		wire: bytes,
+		msg: dns.message.Message,
+		remote: Any,
+		storedAt: float,
+		expireAt: float,
+	) -> None:
+		self.wire = wire
+		self.msg = msg
+		self.remote = remote
+		self.storedAt = storedAt
+		self.expireAt = expireAt
+
+
+class HTTPSRespMemo(object):
+	'''
+	# HTTPSRespMemo
+
+	A small, thread-safe memo of DNS-over-HTTPS responses, keyed on the wire
+	format of the query (with the message ID zeroed), where each response is
+	kept for the freshness lifetime given by the `max-age` directive of its
+	`Cache-Control` header (RFC 8484, section 5.1).
+
+	Responses without `max-age`, or with `no-store` or `no-cache`, are not
+	kept. When a response older than one second is returned, the TTLs of its
+	records are decreased by its age.
+	'''
+
+	DEFAULT_MAX_ENTRIES = 1024
+
+	_NO_STORE_DIRECTIVES = ('no-store', 'no-cache')
+
+	@classmethod
+	def MakeKey(cls, rawQuery: bytes) -> bytes:
+		return b'\x00\x00' + rawQuery[2:]
+
+	@classmethod
+	def ParseMaxAge(cls, cacheControl: Union[str, None]) -> Union[int, None]:
+		'''
+		# ParseMaxAge
+
+		## Parameters
+		- `cacheControl`: The value of the `Cache-Control` header.
+
+		## Returns
+		- int: The `max-age` in seconds, or `None` if the response must not
+		  be kept.
+		'''
+		if cacheControl is None:
+			return None
+
+		maxAge = None
+		for directive in cacheControl.split(','):
+			name, _, value = directive.strip().partition('=')
+			name = name.strip().lower()
+			if name in cls._NO_STORE_DIRECTIVES:
+				return None
+			if name == 'max-age':
+				try:
+					maxAge = int(value.strip().strip('"'))
+				except ValueError:
+					return None
+		return maxAge
+
+	def __init__(self, maxEntries: int = DEFAULT_MAX_ENTRIES) -> None:
+		super(HTTPSRespMemo, self).__init__()
+
+		if maxEntries <= 0:
+			raise ValueError('maxEntries must be a positive integer')
+
+		self.maxEntries = maxEntries
+
+		self._lock = threading.Lock()
+		self._entries: Dict[bytes, _MemoEntry] = collections.OrderedDict()
+		self._numHits = 0
+		self._numMisses = 0
+
+	@classmethod
+	def _MakeAgedMsg(cls, wire: bytes, age: int) -> dns.message.Message:
+		msg = dns.message.from_wire(wire)
+		for section in (msg.answer, msg.authority, msg.additional):
+			for rrset in section:
+				rrset.ttl = max(0, rrset.ttl - age)
+		return msg
+
+	def Get(self, key: bytes) -> Union[Tuple[dns.message.Message, Any], None]:
+		'''
+		# Get
+
+		## Parameters
+		- `key`: The key made by `MakeKey()`.
+
+		## Returns
+		- tuple: The `(response message, remote info)` kept, or `None` if
+		  there is no fresh response for the key.
+		'''
+		now = time.monotonic()
+		with self._lock:
+			entry = self._entries.get(key, None)
+			if (entry is not None) and (entry.expireAt <= now):
+				del self._entries[key]
+				entry = None
+
+			if entry is None:
+				self._numMisses += 1
+				return None
+
+			self._entries.move_to_end(key)
+			self._numHits += 1
+
+		age = int(now - entry.storedAt)
+		if age == 0:
+			return (entry.msg, entry.remote)
+		return (self._MakeAgedMsg(entry.wire, age), entry.remote)
+
+	def Put(
+		self,
+		key: bytes,
+		wire: bytes,
+		msg: dns.message.Message,
+		remote: Any,
+		maxAge: Union[int, None],
+	) -> None:
+		'''
+		# Put
+
+		## Parameters
+		- `key`: The key made by `MakeKey()`.
+		- `wire`: The response in wire format.
+		- `msg`: The response message parsed from `wire`.
+		- `remote`: The information of the server that responded.
+		- `maxAge`: The `max-age` returned by `ParseMaxAge()`.
+		'''
+		if (maxAge is None) or (maxAge <= 0):
+			return
+
+		now = time.monotonic()
+		entry = _MemoEntry(
+			wire=wire,
+			msg=msg,
+			remote=remote,
+			storedAt=now,
+			expireAt=now + maxAge,
+		)
+		with self._lock:
+			self._entries[key] = entry
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxEntries:
+				self._entries.popitem(last=False)
+
+	def GetStats(self) -> Dict[str, int]:
+		with self._lock:
+			return {
+				'entries': len(self._entries),
+				'hits': self._numHits,
+				'misses': self._numMisses,
+			}
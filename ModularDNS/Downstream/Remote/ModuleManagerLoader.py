@@ -14,6 +14,7 @@ from .ByProtocol import ByProtocol
 from .Endpoint import Endpoint, StaticEndpoint
 from .HTTPS import HTTPS
 from .TCP import TCP
+from .TLS import TLS
 from .UDP import UDP
 
 
@@ -23,5 +24,6 @@ MODULE_MGR.RegisterModule('Endpoint', Endpoint)
 MODULE_MGR.RegisterModule('StaticEndpoint', StaticEndpoint)
 MODULE_MGR.RegisterModule('HTTPS', HTTPS)
 MODULE_MGR.RegisterModule('TCP', TCP)
+MODULE_MGR.RegisterModule('TLS', TLS)
 MODULE_MGR.RegisterModule('UDP', UDP)
 
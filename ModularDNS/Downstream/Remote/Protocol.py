@@ -20,6 +20,7 @@ from CacheLib.TTL import Interfaces
 
 from ...Exceptions import ServerNetworkError
 from .Endpoint import Endpoint
+from .RTTEstimator import RTTEstimator
 
 
 _REMOTE_INFO = Tuple[str, str, int]
@@ -72,11 +73,17 @@ class Protocol(Interfaces.Terminable):
 		):
 			raise ServerNetworkError(msg)
 
-	def __init__(self, endpoint: Endpoint, timeout: float) -> None:
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float,
+		rttEstimator: Union[RTTEstimator, None] = None,
+	) -> None:
 		super(Protocol, self).__init__()
 
 		self.endpoint = endpoint
 		self.timeout = timeout
+		self.rttEstimator = rttEstimator
 
 		# we assume that this object will only be used by one thread
 		# at a time, and the upper layer should handle this properly
@@ -92,6 +99,19 @@ class Protocol(Interfaces.Terminable):
 	) -> Tuple[dns.message.Message, _REMOTE_INFO]:
 		raise NotImplementedError('Protocol.Query() is not implemented')
 
+	def Warm(self, recDepthStack: List[ Tuple[ int, str ] ]) -> None:
+		'''
+		# Warm
+		Set up the connection to the server in advance, if this protocol has
+		one, so the first query doesn't pay for it; by default, there is
+		nothing to set up.
+
+		## Parameters
+		- `recDepthStack`: The recursion depth stack, used to resolve the
+		  endpoint.
+		'''
+		pass
+
 	def _Terminate(self) -> None:
 		self.endpoint.Terminate()
 
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import threading
+import time
+
+from typing import Any, Callable, Dict, Union
+
+
+class RTTEstimator(object):
+	'''
+	# RTTEstimator
+
+	A thread-safe estimator of the round-trip time (RTT) to a server, and the
+	retransmission timeout (RTO) derived from it, as specified by RFC 6298,
+	with the RTO clamped within `[minRTO, maxRTO]`.
+
+	Until the first sample is taken, the RTO is `initialRTO`.
+	'''
+
+	ALPHA: float = 1.0 / 8.0
+	BETA: float = 1.0 / 4.0
+	K: float = 4.0
+
+	CLOCK_GRANULARITY: float = 0.001
+
+	def __init__(
+		self,
+		minRTO: float,
+		maxRTO: float,
+		initialRTO: Union[float, None] = None,
+	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `minRTO`: The lower bound of the RTO, in seconds.
+		- `maxRTO`: The upper bound of the RTO, in seconds.
+		- `initialRTO`: The RTO before any sample is taken; it is `maxRTO` if
+		  not given.
+		'''
+		super(RTTEstimator, self).__init__()
+
+		if minRTO <= 0:
+			raise ValueError('minRTO must be positive')
+		if maxRTO < minRTO:
+			raise ValueError('maxRTO must not be less than minRTO')
+		if initialRTO is None:
+			initialRTO = maxRTO
+
+		self.minRTO = minRTO
+		self.maxRTO = maxRTO
+
+		self._lock = threading.Lock()
+		self._srtt: Union[float, None] = None
+		self._rttvar: Union[float, None] = None
+		self._rto = self._Clamp(initialRTO)
+
+		self._numSamples = 0
+		self._numBackoffs = 0
+
+	def _Clamp(self, rto: float) -> float:
+		return min(max(rto, self.minRTO), self.maxRTO)
+
+	def AddSample(self, rtt: float) -> None:
+		'''
+		# AddSample
+		Update the estimation with the RTT of a request that was not
+		retransmitted (i.e., Karn's algorithm).
+
+		## Parameters
+		- `rtt`: The measured RTT, in seconds.
+		'''
+		with self._lock:
+			if self._srtt is None:
+				self._srtt = rtt
+				self._rttvar = rtt / 2.0
+			else:
+				self._rttvar = (
+					((1.0 - self.BETA) * self._rttvar) +
+					(self.BETA * abs(self._srtt - rtt))
+				)
+				self._srtt = ((1.0 - self.ALPHA) * self._srtt) + (self.ALPHA * rtt)
+
+			self._rto = self._Clamp(
+				self._srtt + max(self.CLOCK_GRANULARITY, self.K * self._rttvar)
+			)
+			self._numSamples += 1
+
+	def Backoff(self) -> None:
+		'''
+		# Backoff
+		Double the RTO after a request has timed out.
+		'''
+		with self._lock:
+			self._rto = self._Clamp(self._rto * 2.0)
+			self._numBackoffs += 1
+
+	def GetRTO(self) -> float:
+		with self._lock:
+			return self._rto
+
+	def GetStats(self) -> Dict[str, Union[float, int, None]]:
+		with self._lock:
+			return {
+				'srtt': self._srtt,
+				'rttvar': self._rttvar,
+				'rto': self._rto,
+				'samples': self._numSamples,
+				'backoffs': self._numBackoffs,
+			}
+
+
+def QueryWithRetransmits(
+	send: Callable[[], None],
+	wait: Callable[[float], Any],
+	timeout: float,
+	rttEstimator: Union[RTTEstimator, None],
+) -> Any:
+	'''
+	# QueryWithRetransmits
+	Send a request over an unreliable transport (e.g., UDP), and retransmit
+	it whenever no response arrives within the RTO, with the RTO doubled
+	each time, until a response arrives or `timeout` is reached.
+
+	If `rttEstimator` is `None`, the request is sent once, and waited for
+	`timeout` seconds.
+
+	## Parameters
+	- `send`: Send (or resend) the request.
+	- `wait`: Wait for the response for up to the given number of seconds,
+	  and return it, or `None` if there is no response in time; a response to
+	  any of the transmissions should be accepted.
+	- `timeout`: The total time, in seconds, to wait for a response.
+	- `rttEstimator`: The RTT estimator of the server.
+
+	## Returns
+	- Any: The response returned by `wait`, or `None` if the query has timed
+	  out.
+	'''
+	startTime = time.monotonic()
+	deadline = startTime + timeout
+	rto = timeout if rttEstimator is None else rttEstimator.GetRTO()
+	isRetransmitted = False
+
+	while True:
+		send()
+
+		remaining = deadline - time.monotonic()
+		resp = wait(max(0.0, min(rto, remaining)))
+		if resp is not None:
+			if (rttEstimator is not None) and (not isRetransmitted):
+				rttEstimator.AddSample(time.monotonic() - startTime)
+			return resp
+
+		if rttEstimator is not None:
+			rttEstimator.Backoff()
+		if time.monotonic() >= deadline:
+			return None
+
+		rto *= 2.0
+		isRetransmitted = True
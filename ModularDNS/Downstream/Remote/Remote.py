@@ -10,10 +10,13 @@
 
 from typing import List, Tuple
 
-from ...MsgEntry import AddEntry, AnsEntry, MsgEntry, QuestionEntry
+import dns.message
+import dns.rdatatype
+
+from ...MsgEntry import AddEntry, AnsEntry, AuthEntry, MsgEntry, QuestionEntry
 from ..QuickLookup import QuickLookup
 from ..Utils import CommonDNSRespHandling
-from .Protocol import Protocol
+from .Protocol import Protocol, _REMOTE_INFO
 
 
 DEFAULT_TIMEOUT: float = 2.0
@@ -26,6 +29,45 @@ class Remote(QuickLookup):
 
 		self.timeout = timeout
 
+	def MakeQuery(
+		self,
+		msgEntry: QuestionEntry.QuestionEntry,
+	) -> dns.message.Message:
+		'''
+		# MakeQuery
+		Make the query message to be sent to the remote server.
+
+		## Parameters
+		- `msgEntry`: The question to be queried.
+
+		## Returns
+		- dns.message.Message: The query message.
+		'''
+		return msgEntry.MakeQuery()
+
+	def Query(
+		self,
+		q: dns.message.Message,
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> Tuple[dns.message.Message, _REMOTE_INFO]:
+		'''
+		# Query
+		Send the query message to the remote server via the underlying
+		protocol.
+
+		## Parameters
+		- `q`: The query message.
+		- `recDepthStack`: The recursion depth stack.
+
+		## Returns
+		- dns.message.Message: The response message.
+		- tuple: The information of the remote server, i.e.,
+		  `(host name, IP address, port)`.
+		'''
+		self.underlying: Protocol
+
+		return self.underlying.Query(q=q, recDepthStack=recDepthStack)
+
 	def HandleQuestion(
 		self,
 		msgEntry: QuestionEntry.QuestionEntry,
@@ -39,9 +81,9 @@ class Remote(QuickLookup):
 			self.HandleQuestion
 		)
 
-		dnsQuery = msgEntry.MakeQuery()
+		dnsQuery = self.MakeQuery(msgEntry)
 
-		dnsResp, remote = self.underlying.Query(
+		dnsResp, remote = self.Query(
 			q=dnsQuery,
 			recDepthStack=newRecStack
 		)
@@ -54,6 +96,12 @@ class Remote(QuickLookup):
 		)
 		ansEntries = []
 		ansEntries += AnsEntry.AnsEntry.FromRRSetList(dnsResp.answer)
+		if len(dnsResp.answer) == 0:
+			# a NODATA response; keep its SOA record so the negative result
+			# can be cached for the right amount of time (RFC 2308)
+			ansEntries += AuthEntry.AuthEntry.FromRRSetList(
+				[ x for x in dnsResp.authority if x.rdtype == dns.rdatatype.SOA ]
+			)
 		ansEntries += AddEntry.AddEntry.FromRRSetList(dnsResp.additional)
 
 		return ansEntries
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import collections
+import logging
+import threading
+import time
+
+from typing import Any, Callable, Deque, Dict, List, Tuple, Union
+
+from ...Exceptions import ServerNetworkError
+
+
+class SessionPool(object):
+	'''
+	# SessionPool
+
+	A thread-safe pool of session objects (anything with a `Terminate()`
+	method), created by `factory` on demand.
+
+	- Idle sessions are handed out most recently returned first, so the ones
+	  with warm connections are reused, and the rest can become idle long
+	  enough to be evicted.
+	- Sessions idle for more than `idleTimeout` seconds are evicted (when the
+	  pool is used), while at least `minIdle` idle sessions are kept.
+	- `minIdle` sessions are created in advance when the pool is created, and
+	  are passed to `warmUp` (if given), e.g., to connect them to the server;
+	  a session failing to warm up is kept, and is set up on its first use.
+	- At most `maxSize` sessions exist at the same time (unbounded if it is
+	  `None`); once all of them are in use, callers wait for one to be
+	  returned for up to `waitTimeout` seconds, and at most `maxWaiters`
+	  callers can wait at the same time, after which a `ServerNetworkError`
+	  is raised.
+	'''
+
+	DEFAULT_IDLE_TIMEOUT: float = 600.0
+	DEFAULT_MAX_SIZE: int = 500
+	DEFAULT_WAIT_TIMEOUT: float = 1.0
+
+	WARNING_SIZE_LIMIT: int = 500
+
+	def __init__(
+		self,
+		factory: Callable[[], Any],
+		minIdle: int = 0,
+		maxSize: Union[int, None] = DEFAULT_MAX_SIZE,
+		idleTimeout: float = DEFAULT_IDLE_TIMEOUT,
+		waitTimeout: float = DEFAULT_WAIT_TIMEOUT,
+		maxWaiters: Union[int, None] = None,
+		warmUp: Union[Callable[[Any], None], None] = None,
+	) -> None:
+		super(SessionPool, self).__init__()
+
+		if minIdle < 0:
+			raise ValueError('minIdle must not be negative')
+		if (maxSize is not None) and (maxSize <= 0):
+			raise ValueError('maxSize must be a positive integer')
+		if (maxSize is not None) and (minIdle > maxSize):
+			raise ValueError('minIdle must not be greater than maxSize')
+		if idleTimeout <= 0:
+			raise ValueError('idleTimeout must be positive')
+		if waitTimeout < 0:
+			raise ValueError('waitTimeout must not be negative')
+		if (maxWaiters is not None) and (maxWaiters < 0):
+			raise ValueError('maxWaiters must not be negative')
+
+		self.factory = factory
+		self.minIdle = minIdle
+		self.maxSize = maxSize
+		self.idleTimeout = idleTimeout
+		self.waitTimeout = waitTimeout
+		self.maxWaiters = maxWaiters
+
+		self.logger = logging.getLogger(
+			f'{__name__}.{self.__class__.__name__}'
+		)
+
+		self._cond = threading.Condition()
+		# (returned at, session), from the least to the most recently returned
+		self._idle: Deque[Tuple[float, Any]] = collections.deque()
+		self._numInUse = 0
+		self._numCreating = 0
+		self._numWaiting = 0
+		self._isTerminated = False
+
+		self._numCreated = 0
+		self._numWaited = 0
+		self._numRejected = 0
+		self._numEvicted = 0
+
+		# pre-warm the pool
+		for _ in range(minIdle):
+			session = self.factory()
+			self._numCreated += 1
+			if warmUp is not None:
+				try:
+					warmUp(session)
+				except Exception as e:
+					self.logger.warning(f'Failed to warm up a session: {e}')
+			self._idle.append((time.monotonic(), session))
+
+	def _SizeLocked(self) -> int:
+		return self._numInUse + self._numCreating + len(self._idle)
+
+	def _EvictIdleLocked(self, now: float) -> List[Any]:
+		evicted = []
+		while (
+			(len(self._idle) > self.minIdle) and
+			((self._idle[0][0] + self.idleTimeout) <= now)
+		):
+			evicted.append(self._idle.popleft()[1])
+		self._numEvicted += len(evicted)
+		return evicted
+
+	@classmethod
+	def _TerminateAll(cls, sessions: List[Any]) -> None:
+		for session in sessions:
+			session.Terminate()
+
+	def Get(self) -> Any:
+		'''
+		# Get
+		Get a session from the pool, which must be returned via `Put()`
+		after use.
+
+		## Returns
+		- Any: The session.
+		'''
+		evicted = []
+		try:
+			with self._cond:
+				evicted = self._EvictIdleLocked(time.monotonic())
+
+				hasWaited = False
+				deadline = None
+				while True:
+					if self._isTerminated:
+						raise ServerNetworkError(
+							'The session pool has been terminated'
+						)
+
+					if len(self._idle) > 0:
+						_, session = self._idle.pop()
+						self._numInUse += 1
+						return session
+
+					if (
+						(self.maxSize is None) or
+						(self._SizeLocked() < self.maxSize)
+					):
+						self._numCreating += 1
+						break
+
+					# the pool is exhausted
+					if not hasWaited:
+						if (
+							(self.maxWaiters is not None) and
+							(self._numWaiting >= self.maxWaiters)
+						):
+							self._numRejected += 1
+							raise ServerNetworkError(
+								'The session pool is exhausted, and there '
+								'are too many requests waiting'
+							)
+						hasWaited = True
+						self._numWaited += 1
+						deadline = time.monotonic() + self.waitTimeout
+
+					remaining = deadline - time.monotonic()
+					if remaining <= 0:
+						self._numRejected += 1
+						raise ServerNetworkError(
+							'Timed out waiting for a session from the pool'
+						)
+					self._numWaiting += 1
+					try:
+						self._cond.wait(remaining)
+					finally:
+						self._numWaiting -= 1
+		finally:
+			self._TerminateAll(evicted)
+
+		# create a new session outside of the lock
+		try:
+			session = self.factory()
+		except BaseException:
+			with self._cond:
+				self._numCreating -= 1
+				self._cond.notify()
+			raise
+
+		with self._cond:
+			self._numCreating -= 1
+			self._numInUse += 1
+			self._numCreated += 1
+			size = self._SizeLocked()
+		if size >= self.WARNING_SIZE_LIMIT:
+			self.logger.warning(
+				f'Number of session, {size}, '
+				f'exceeds warning limit {self.WARNING_SIZE_LIMIT}'
+			)
+		return session
+
+	def Put(self, session: Any) -> None:
+		'''
+		# Put
+		Return a session got from `Get()` to the pool.
+
+		## Parameters
+		- `session`: The session.
+		'''
+		now = time.monotonic()
+		with self._cond:
+			self._numInUse -= 1
+			if self._isTerminated:
+				evicted = [ session ]
+			else:
+				self._idle.append((now, session))
+				evicted = self._EvictIdleLocked(now)
+				self._cond.notify()
+		self._TerminateAll(evicted)
+
+	def __len__(self) -> int:
+		with self._cond:
+			return self._SizeLocked()
+
+	def NumberOfIdle(self) -> int:
+		with self._cond:
+			return len(self._idle)
+
+	def GetStats(self) -> Dict[str, int]:
+		with self._cond:
+			return {
+				'inUse': self._numInUse,
+				'idle': len(self._idle),
+				'created': self._numCreated,
+				'waited': self._numWaited,
+				'rejected': self._numRejected,
+				'evicted': self._numEvicted,
+			}
+
+	def Terminate(self) -> None:
+		'''
+		# Terminate
+		Terminate all idle sessions; the sessions in use are terminated once
+		they are returned.
+		'''
+		with self._cond:
+			self._isTerminated = True
+			sessions = [ x[1] for x in self._idle ]
+			self._idle.clear()
+			self._cond.notify_all()
+		self._TerminateAll(sessions)
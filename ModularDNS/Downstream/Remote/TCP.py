@@ -12,7 +12,7 @@ import selectors
 import socket
 import threading
 
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple, Union
 
 import dns.message
 
@@ -22,6 +22,7 @@ from .ConcurrentMgr import ConcurrentMgr
 from .Endpoint import Endpoint
 from .Protocol import Protocol, _REMOTE_INFO
 from .Remote import DEFAULT_TIMEOUT, Remote
+from .TCPMux import TCPConnectionPool
 
 
 class TCPProtocol(Protocol):
@@ -141,12 +142,71 @@ class TCPProtocol(Protocol):
 			(self.endpoint.GetHostName(), self.peername[0], self.peername[1])
 		)
 
+	def Warm(self, recDepthStack: List[ Tuple[ int, str ] ]) -> None:
+		with self.lock:
+			if self.sockAndSelector is not None:
+				return
+			try:
+				self.SysIOExceptionToServerNetworkError(
+					lambda: self._CreateSocket(recDepthStack),
+					'System IO error while connecting to the TCP server'
+				)
+			except Exception:
+				self._DestroySocket()
+				raise
+
 	def Terminate(self) -> None:
 		super(TCPProtocol, self)._Terminate()
 		self.isTerminated.set()
 		self._DestroySocket()
 
 
+class MuxTCPProtocol(Protocol):
+
+	'''
+	Implementation of DNS-over-TCP protocol, where queries are pipelined over
+	a small number of long-lived connections (see `TCPConnectionPool`)
+	This class is thread-safe
+	'''
+
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float,
+		numConns: int = TCPConnectionPool.DEFAULT_NUM_CONNS,
+	) -> None:
+		super(MuxTCPProtocol, self).__init__(
+			endpoint=endpoint,
+			timeout=timeout
+		)
+
+		self.pool = TCPConnectionPool(numConns=numConns)
+
+	def Query(
+		self,
+		q: dns.message.Message,
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> Tuple[dns.message.Message, _REMOTE_INFO]:
+		ip = self.endpoint.GetIPAddr(recDepthStack=recDepthStack)
+		port = self.endpoint.port
+
+		resp = self.pool.Query(
+			q=q,
+			where=ip,
+			port=port,
+			timeout=self.timeout,
+		)
+
+		return (
+			resp,
+			(self.endpoint.GetHostName(), str(ip), port)
+		)
+
+	def Terminate(self) -> None:
+		super(MuxTCPProtocol, self)._Terminate()
+		self.pool.Terminate()
+
+
 class ConcurrentTCP(ConcurrentMgr):
 
 	SESSION_CLASS: Protocol = TCPProtocol
@@ -160,21 +220,48 @@ class TCP(Remote):
 		dCollection: DownstreamCollection,
 		endpoint: str,
 		timeout: float = DEFAULT_TIMEOUT,
+		muxConns: int = 0,
+		sessionPool: Union[Dict[str, Any], None] = None,
 	) -> 'TCP':
 		return cls(
 			endpoint=dCollection.GetEndpoint(endpoint),
-			timeout=timeout
+			timeout=timeout,
+			muxConns=muxConns,
+			sessionPool=sessionPool,
 		)
 
 	def __init__(
 		self,
 		endpoint: Endpoint,
 		timeout: float = DEFAULT_TIMEOUT,
+		muxConns: int = 0,
+		sessionPool: Union[Dict[str, Any], None] = None,
 	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `endpoint`: The endpoint of the remote server.
+		- `timeout`: The timeout for each query.
+		- `muxConns`: If greater than zero, queries are pipelined over this
+		  number of long-lived connections, instead of using one connection
+		  per concurrent query.
+		- `sessionPool`: The configuration of the pool of sessions used when
+		  queries are not multiplexed (see `SessionPool`), e.g.,
+		  `{ "minIdle": 2, "maxSize": 64 }`.
+		'''
 		super(TCP, self).__init__(timeout=timeout)
 
-		self.underlying = ConcurrentTCP(
-			endpoint=endpoint,
-			timeout=timeout
-		)
+		if muxConns > 0:
+			self.underlying = MuxTCPProtocol(
+				endpoint=endpoint,
+				timeout=timeout,
+				numConns=muxConns,
+			)
+		else:
+			self.underlying = ConcurrentTCP(
+				endpoint=endpoint,
+				timeout=timeout,
+				poolConfig=sessionPool,
+			)
 
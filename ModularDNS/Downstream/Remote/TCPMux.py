@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import logging
+import secrets
+import selectors
+import socket
+import threading
+import time
+
+from typing import Dict, List, Tuple, Union
+
+import dns.exception
+import dns.message
+
+from ...Exceptions import ServerNetworkError
+from .UDPMux import IPAddressType, _PendingQuery
+
+
+class _ConnectionClosedError(ServerNetworkError):
+	'''
+	The connection was closed before the response was received
+	'''
+	pass
+
+
+class _TCPMuxConnection(object):
+	'''
+	# _TCPMuxConnection
+
+	A single TCP connection carrying many in-flight queries at the same time,
+	where responses can arrive in any order (RFC 7766, section 6.2.1).
+	Queries are written back-to-back by the querying threads, and a reader
+	thread routes each response to the waiting query by its transaction ID.
+
+	Subclasses can layer another protocol on top of the TCP connection by
+	overriding `_Connect()`, `_RecvSome()`, and `_SendAll()`.
+	'''
+
+	MAX_NUM_PENDING = 65536
+	RECV_SIZE = 65536
+
+	def __init__(
+		self,
+		where: IPAddressType,
+		port: int,
+		timeout: float,
+		idleTimeout: float,
+		logger: logging.Logger,
+	) -> None:
+		super(_TCPMuxConnection, self).__init__()
+
+		self.whereStr = str(where)
+		self.port = port
+		self.idleTimeout = idleTimeout
+		# how often the reader checks whether the connection is idle
+		self.pollInterval = min(timeout, idleTimeout)
+
+		self._logger = logger
+
+		self._lock = threading.Lock()
+		self._sendLock = threading.Lock()
+		self._pending: Dict[int, _PendingQuery] = {}
+		self._numDropped = 0
+		self._isClosed = threading.Event()
+		# only the reader thread waits on this selector
+		self._readSelector = selectors.DefaultSelector()
+
+		af = socket.AF_INET6 if where.version == 6 else socket.AF_INET
+		sock = socket.socket(af, socket.SOCK_STREAM)
+		try:
+			# the timeout also limits how long a blocked send can take
+			sock.settimeout(timeout)
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			sock.connect((self.whereStr, port))
+			sock = self._Connect(sock)
+			self._readSelector.register(sock, selectors.EVENT_READ)
+		except OSError as e:
+			sock.close()
+			self._readSelector.close()
+			raise ServerNetworkError(
+				f'Failed to connect to {self.whereStr}:{port}: {e}'
+			)
+		self._sock = sock
+		self._lastActive = time.monotonic()
+
+		self._reader = threading.Thread(
+			target=self._ReaderLoop,
+			name=f'{self.__class__.__name__}.Reader',
+			daemon=True,
+		)
+		self._reader.start()
+
+	def _Connect(self, sock: socket.socket) -> socket.socket:
+		'''
+		# _Connect
+		Called once the TCP connection is established.
+
+		## Parameters
+		- `sock`: The connected TCP socket.
+
+		## Returns
+		- socket.socket: The socket to be used for the rest of the connection.
+		'''
+		return sock
+
+	def _RecvSome(self, sock: socket.socket) -> bytes:
+		'''
+		# _RecvSome
+		Receive some bytes from the connection, or raise `socket.timeout`
+		if nothing is received within `pollInterval`.
+
+		## Parameters
+		- `sock`: The socket returned by `_Connect()`.
+
+		## Returns
+		- bytes: The bytes received, or an empty one if the connection is
+		  closed by the server.
+		'''
+		if len(self._readSelector.select(self.pollInterval)) == 0:
+			raise socket.timeout('Timed out waiting for data')
+		return sock.recv(self.RECV_SIZE)
+
+	def _SendAll(self, sock: socket.socket, data: bytes) -> None:
+		'''
+		# _SendAll
+		Send all given bytes over the connection.
+		It is called by one thread at a time.
+
+		## Parameters
+		- `sock`: The socket returned by `_Connect()`.
+		- `data`: The bytes to be sent.
+		'''
+		sock.sendall(data)
+
+	def _Dispatch(self, wire: bytes) -> None:
+		if len(wire) < 2:
+			self._numDropped += 1
+			return
+
+		with self._lock:
+			pending = self._pending.get(int.from_bytes(wire[:2], 'big'), None)
+			self._lastActive = time.monotonic()
+		if (pending is None) or pending.event.is_set():
+			# a late response to a query that has timed out
+			self._numDropped += 1
+			return
+
+		try:
+			resp = dns.message.from_wire(wire)
+		except dns.exception.DNSException:
+			self._numDropped += 1
+			return
+
+		if not pending.query.is_response(resp):
+			self._numDropped += 1
+			return
+
+		pending.resp = resp
+		pending.event.set()
+
+	def _IsIdle(self) -> bool:
+		with self._lock:
+			if (
+				(len(self._pending) == 0) and
+				((time.monotonic() - self._lastActive) >= self.idleTimeout)
+			):
+				# mark it as closed while holding the lock, so no new query
+				# can be added to it
+				self._isClosed.set()
+				return True
+			return False
+
+	def _ReaderLoop(self) -> None:
+		sock = self._sock
+		buf = bytearray()
+		try:
+			while not self._isClosed.is_set():
+				try:
+					data = self._RecvSome(sock)
+				except socket.timeout:
+					if self._IsIdle():
+						self._logger.debug(
+							f'Closing the idle connection to '
+							f'{self.whereStr}:{self.port}'
+						)
+						return
+					continue
+
+				if len(data) == 0:
+					self._logger.debug(
+						f'The connection to {self.whereStr}:{self.port} '
+						'was closed by the server'
+					)
+					return
+
+				buf += data
+				while len(buf) >= 2:
+					msgLen = int.from_bytes(buf[:2], 'big')
+					if len(buf) < (2 + msgLen):
+						break
+					self._Dispatch(bytes(buf[2:2 + msgLen]))
+					del buf[:2 + msgLen]
+		except OSError as e:
+			if not self._isClosed.is_set():
+				self._logger.debug(f'Failed to receive: {e}')
+		finally:
+			self.Close()
+			self._readSelector.close()
+
+	def IsAlive(self) -> bool:
+		return not self._isClosed.is_set()
+
+	def Query(
+		self,
+		q: dns.message.Message,
+		timeout: float,
+	) -> dns.message.Message:
+		pending = _PendingQuery(q)
+		with self._lock:
+			if self._isClosed.is_set():
+				raise _ConnectionClosedError(
+					f'The connection to {self.whereStr}:{self.port} is closed'
+				)
+			if len(self._pending) >= self.MAX_NUM_PENDING:
+				raise ServerNetworkError(
+					f'Too many in-flight queries to {self.whereStr}:{self.port}'
+				)
+			while True:
+				txId = secrets.randbits(16)
+				if txId not in self._pending:
+					break
+			q.id = txId
+			self._pending[txId] = pending
+			self._lastActive = time.monotonic()
+			sock = self._sock
+
+		try:
+			wire = q.to_wire()
+			try:
+				with self._sendLock:
+					self._SendAll(sock, len(wire).to_bytes(2, 'big') + wire)
+			except OSError as e:
+				self.Close()
+				raise _ConnectionClosedError(
+					f'Failed to send the query to {self.whereStr}:{self.port}: {e}'
+				)
+
+			if not pending.event.wait(timeout):
+				raise ServerNetworkError(
+					f'The query to {self.whereStr}:{self.port} timed out '
+					f'after {timeout}s'
+				)
+			if pending.resp is None:
+				raise _ConnectionClosedError(
+					f'The connection to {self.whereStr}:{self.port} was closed '
+					'before the response was received'
+				)
+
+			return pending.resp
+		finally:
+			with self._lock:
+				self._pending.pop(txId, None)
+				self._lastActive = time.monotonic()
+
+	def GetNumPending(self) -> int:
+		with self._lock:
+			return len(self._pending)
+
+	def GetNumDropped(self) -> int:
+		return self._numDropped
+
+	def Close(self) -> None:
+		with self._lock:
+			self._isClosed.set()
+			sock, self._sock = self._sock, None
+			pendings = list(self._pending.values())
+
+		if sock is not None:
+			try:
+				sock.shutdown(socket.SHUT_RDWR)
+			except OSError:
+				# it may raise an exception if the socket is not connected
+				pass
+			sock.close()
+
+		# wake up all queries still waiting
+		for pending in pendings:
+			pending.event.set()
+
+	def Join(self) -> None:
+		if self._reader is not threading.current_thread():
+			self._reader.join()
+
+
+class _ConnectionSlot(object):
+
+	__slots__ = ('lock', 'conn')
+
+	def __init__(self) -> None:
+		self.lock = threading.Lock()
+		self.conn: Union[_TCPMuxConnection, None] = None
+
+
+class TCPConnectionPool(object):
+	'''
+	# TCPConnectionPool
+
+	A small, fixed number of TCP connections per server, over which many
+	in-flight queries from multiple threads are pipelined (RFC 7766).
+
+	Each query is sent with a random transaction ID that is unique among the
+	in-flight queries on its connection, and the responses are matched by the
+	transaction ID, so they can come back in any order.
+	Connections are established on demand, and are closed once they have been
+	idle for `idleTimeout` seconds.
+	If a reused connection turns out to be closed by the server (e.g., due to
+	the server's own idle timeout), the query is retried once on another
+	connection.
+	'''
+
+	DEFAULT_NUM_CONNS = 2
+	DEFAULT_IDLE_TIMEOUT = 10.0
+
+	CONN_CLASS = _TCPMuxConnection
+
+	def __init__(
+		self,
+		numConns: int = DEFAULT_NUM_CONNS,
+		idleTimeout: float = DEFAULT_IDLE_TIMEOUT,
+	) -> None:
+		super(TCPConnectionPool, self).__init__()
+
+		if numConns <= 0:
+			raise ValueError('numConns must be a positive integer')
+		if idleTimeout <= 0:
+			raise ValueError('idleTimeout must be positive')
+
+		self.numConns = numConns
+		self.idleTimeout = idleTimeout
+
+		self._logger = logging.getLogger(
+			f'{__name__}.{self.__class__.__name__}'
+		)
+
+		self._lock = threading.Lock()
+		self._slots: Dict[Tuple[str, int], List[_ConnectionSlot]] = {}
+		self._nextSlot = 0
+		self._numConnects = 0
+		self._numDroppedClosed = 0
+		self._isTerminated = threading.Event()
+
+	def _MakeConnection(
+		self,
+		where: IPAddressType,
+		port: int,
+		timeout: float,
+	) -> _TCPMuxConnection:
+		return self.CONN_CLASS(
+			where=where,
+			port=port,
+			timeout=timeout,
+			idleTimeout=self.idleTimeout,
+			logger=self._logger,
+		)
+
+	def _GetConnection(
+		self,
+		where: IPAddressType,
+		port: int,
+		timeout: float,
+	) -> Tuple[_TCPMuxConnection, bool]:
+		key = (str(where), port)
+		with self._lock:
+			slots = self._slots.get(key, None)
+			if slots is None:
+				slots = [ _ConnectionSlot() for _ in range(self.numConns) ]
+				self._slots[key] = slots
+			slot = slots[self._nextSlot % self.numConns]
+			self._nextSlot += 1
+
+		with slot.lock:
+			if self._isTerminated.is_set():
+				raise ServerNetworkError(
+					'The connection pool has been terminated'
+				)
+
+			if (slot.conn is not None) and slot.conn.IsAlive():
+				return (slot.conn, False)
+
+			if slot.conn is not None:
+				with self._lock:
+					self._numDroppedClosed += slot.conn.GetNumDropped()
+
+			slot.conn = self._MakeConnection(where, port, timeout)
+			with self._lock:
+				self._numConnects += 1
+			return (slot.conn, True)
+
+	def Query(
+		self,
+		q: dns.message.Message,
+		where: IPAddressType,
+		port: int,
+		timeout: float,
+	) -> dns.message.Message:
+		'''
+		# Query
+		Send the query to the server, and wait for the response.
+		The transaction ID of the query will be replaced by a random one.
+
+		## Parameters
+		- `q`: The query message.
+		- `where`: The IP address of the server.
+		- `port`: The port of the server.
+		- `timeout`: The time, in seconds, to connect to the server, and to
+		  wait for the response.
+
+		## Returns
+		- dns.message.Message: The response message.
+		'''
+		conn, isNew = self._GetConnection(where, port, timeout)
+		try:
+			return conn.Query(q, timeout)
+		except _ConnectionClosedError:
+			if isNew or self._isTerminated.is_set():
+				raise
+			self._logger.debug(
+				f'The connection to {where}:{port} was closed, '
+				'retrying on another connection'
+			)
+
+		conn, _ = self._GetConnection(where, port, timeout)
+		return conn.Query(q, timeout)
+
+	def _GetConnections(self) -> List[_TCPMuxConnection]:
+		with self._lock:
+			return [
+				slot.conn
+				for slots in self._slots.values()
+				for slot in slots
+				if slot.conn is not None
+			]
+
+	def GetStats(self) -> Dict[str, int]:
+		conns = self._GetConnections()
+		aliveConns = [ x for x in conns if x.IsAlive() ]
+		with self._lock:
+			return {
+				'connections': len(aliveConns),
+				'connects': self._numConnects,
+				'pending': sum([ x.GetNumPending() for x in aliveConns ]),
+				'dropped': (
+					self._numDroppedClosed +
+					sum([ x.GetNumDropped() for x in conns ])
+				),
+			}
+
+	def Terminate(self) -> None:
+		if self._isTerminated.is_set():
+			return
+		self._isTerminated.set()
+
+		with self._lock:
+			slots = [ slot for x in self._slots.values() for slot in x ]
+
+		for slot in slots:
+			with slot.lock:
+				if slot.conn is not None:
+					slot.conn.Close()
+					slot.conn.Join()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import ssl
+
+from typing import List, Tuple, Union
+
+import dns.message
+
+from ..DownstreamCollection import DownstreamCollection
+from .Endpoint import Endpoint
+from .Protocol import Protocol, _REMOTE_INFO
+from .Remote import DEFAULT_TIMEOUT, Remote
+from .TLSMux import TLSConnectionPool
+
+
+class TLSProtocol(Protocol):
+
+	'''
+	Implementation of DNS-over-TLS protocol, where queries are pipelined over
+	a small number of long-lived connections (see `TLSConnectionPool`)
+	This class is thread-safe
+	'''
+
+	TLS_MIN_VERSION = ssl.TLSVersion.TLSv1_2
+
+	@classmethod
+	def CreateSSLContext(
+		cls,
+		caFile: Union[str, None] = None,
+	) -> ssl.SSLContext:
+		sslContext = ssl.create_default_context(cafile=caFile)
+		sslContext.minimum_version = cls.TLS_MIN_VERSION
+		return sslContext
+
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float,
+		numConns: int = TLSConnectionPool.DEFAULT_NUM_CONNS,
+		caFile: Union[str, None] = None,
+	) -> None:
+		super(TLSProtocol, self).__init__(
+			endpoint=endpoint,
+			timeout=timeout
+		)
+
+		self.pool = TLSConnectionPool(
+			sslContext=self.CreateSSLContext(caFile=caFile),
+			serverHostname=self.endpoint.GetHostName(),
+			numConns=numConns,
+		)
+
+	def Query(
+		self,
+		q: dns.message.Message,
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> Tuple[dns.message.Message, _REMOTE_INFO]:
+		ip = self.endpoint.GetIPAddr(recDepthStack=recDepthStack)
+		port = self.endpoint.port
+
+		resp = self.pool.Query(
+			q=q,
+			where=ip,
+			port=port,
+			timeout=self.timeout,
+		)
+
+		return (
+			resp,
+			(self.endpoint.GetHostName(), str(ip), port)
+		)
+
+	def Terminate(self) -> None:
+		super(TLSProtocol, self)._Terminate()
+		self.pool.Terminate()
+
+
+class TLS(Remote):
+
+	@classmethod
+	def FromConfig(
+		cls,
+		dCollection: DownstreamCollection,
+		endpoint: str,
+		timeout: float = DEFAULT_TIMEOUT,
+		numConns: int = TLSConnectionPool.DEFAULT_NUM_CONNS,
+		caFile: Union[str, None] = None,
+	) -> 'TLS':
+		return cls(
+			endpoint=dCollection.GetEndpoint(endpoint),
+			timeout=timeout,
+			numConns=numConns,
+			caFile=caFile,
+		)
+
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float = DEFAULT_TIMEOUT,
+		numConns: int = TLSConnectionPool.DEFAULT_NUM_CONNS,
+		caFile: Union[str, None] = None,
+	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `endpoint`: The endpoint of the remote server, whose host name is
+		  used to verify the certificate of the server.
+		- `timeout`: The timeout for each query.
+		- `numConns`: The number of long-lived connections over which queries
+		  are pipelined.
+		- `caFile`: The file of CA certificates used to verify the server;
+		  the system's default CA certificates are used if it is not given.
+		'''
+		super(TLS, self).__init__(timeout=timeout)
+
+		self.underlying = TLSProtocol(
+			endpoint=endpoint,
+			timeout=timeout,
+			numConns=numConns,
+			caFile=caFile,
+		)
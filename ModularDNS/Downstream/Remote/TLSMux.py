@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import logging
+import selectors
+import socket
+import ssl
+import threading
+import time
+
+from typing import Callable, Dict, Tuple, Union
+
+from .TCPMux import TCPConnectionPool, _TCPMuxConnection
+from .UDPMux import IPAddressType
+
+
+class _TLSMuxConnection(_TCPMuxConnection):
+	'''
+	# _TLSMuxConnection
+
+	A `_TCPMuxConnection` wrapped in TLS.
+
+	An SSL object must not be used by multiple threads at the same time, so
+	the socket is set to non-blocking mode after the handshake, and every
+	read or write on it is done while holding a lock, which is never held
+	while waiting for the socket to become readable or writable.
+	'''
+
+	def __init__(
+		self,
+		where: IPAddressType,
+		port: int,
+		timeout: float,
+		idleTimeout: float,
+		logger: logging.Logger,
+		sslContext: ssl.SSLContext,
+		serverHostname: str,
+		session: Union[ssl.SSLSession, None],
+		onSession: Callable[[ssl.SSLSession], None],
+	) -> None:
+		self.sslContext = sslContext
+		self.serverHostname = serverHostname
+		self.timeout = timeout
+		self.isResumed = False
+
+		self._session = session
+		self._onSession = onSession
+		self._ioLock = threading.Lock()
+
+		super(_TLSMuxConnection, self).__init__(
+			where=where,
+			port=port,
+			timeout=timeout,
+			idleTimeout=idleTimeout,
+			logger=logger,
+		)
+
+	def _Connect(self, sock: socket.socket) -> socket.socket:
+		tlsSock = self.sslContext.wrap_socket(
+			sock,
+			server_hostname=self.serverHostname,
+			session=self._session,
+		)
+		self.isResumed = tlsSock.session_reused
+
+		tlsSock.setblocking(False)
+		return tlsSock
+
+	def _RecvSome(self, sock: ssl.SSLSocket) -> bytes:
+		while True:
+			with self._ioLock:
+				try:
+					data = sock.recv(self.RECV_SIZE)
+				except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+					# no application data yet, e.g., only a session ticket
+					# has been received
+					data = None
+				else:
+					if self._onSession is not None:
+						# with TLS 1.3, session tickets are sent after the
+						# handshake, so the session is only resumable now
+						self._onSession(sock.session)
+						self._onSession = None
+
+			if data is not None:
+				return data
+
+			if len(self._readSelector.select(self.pollInterval)) == 0:
+				raise socket.timeout('Timed out waiting for data')
+
+	def _SendAll(self, sock: ssl.SSLSocket, data: bytes) -> None:
+		view = memoryview(data)
+		deadline = time.monotonic() + self.timeout
+		while len(view) > 0:
+			with self._ioLock:
+				try:
+					numSent = sock.send(view)
+				except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+					numSent = 0
+
+			if numSent > 0:
+				view = view[numSent:]
+				continue
+
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				raise socket.timeout('Timed out sending data')
+			with selectors.DefaultSelector() as selector:
+				selector.register(sock, selectors.EVENT_WRITE)
+				selector.select(remaining)
+
+	def Close(self) -> None:
+		# shutting down an SSL socket also drops its SSL object
+		with self._ioLock:
+			super(_TLSMuxConnection, self).Close()
+
+
+class TLSConnectionPool(TCPConnectionPool):
+	'''
+	# TLSConnectionPool
+
+	A `TCPConnectionPool` over TLS connections (RFC 7858).
+
+	The TLS session of each server is kept after the connection is
+	established, so the next connection to the same server, e.g., after the
+	previous one is closed for being idle, can be resumed with an abbreviated
+	handshake.
+	'''
+
+	CONN_CLASS = _TLSMuxConnection
+
+	def __init__(
+		self,
+		sslContext: ssl.SSLContext,
+		serverHostname: str,
+		numConns: int = TCPConnectionPool.DEFAULT_NUM_CONNS,
+		idleTimeout: float = TCPConnectionPool.DEFAULT_IDLE_TIMEOUT,
+	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `sslContext`: The SSL context used to establish TLS connections.
+		- `serverHostname`: The host name used to verify the certificate of
+		  the server.
+		- `numConns`: The number of connections per server.
+		- `idleTimeout`: The time, in seconds, after which an idle connection
+		  is closed.
+		'''
+		super(TLSConnectionPool, self).__init__(
+			numConns=numConns,
+			idleTimeout=idleTimeout,
+		)
+
+		self.sslContext = sslContext
+		self.serverHostname = serverHostname
+
+		self._sessions: Dict[Tuple[str, int], ssl.SSLSession] = {}
+		self._numResumed = 0
+
+	def _SaveSession(
+		self,
+		key: Tuple[str, int],
+		session: Union[ssl.SSLSession, None],
+	) -> None:
+		if session is not None:
+			with self._lock:
+				self._sessions[key] = session
+
+	def _MakeConnection(
+		self,
+		where: IPAddressType,
+		port: int,
+		timeout: float,
+	) -> _TLSMuxConnection:
+		key = (str(where), port)
+		with self._lock:
+			session = self._sessions.get(key, None)
+
+		conn = self.CONN_CLASS(
+			where=where,
+			port=port,
+			timeout=timeout,
+			idleTimeout=self.idleTimeout,
+			logger=self._logger,
+			sslContext=self.sslContext,
+			serverHostname=self.serverHostname,
+			session=session,
+			onSession=lambda x: self._SaveSession(key, x),
+		)
+
+		if conn.isResumed:
+			with self._lock:
+				self._numResumed += 1
+		return conn
+
+	def GetStats(self) -> Dict[str, int]:
+		stats = super(TLSConnectionPool, self).GetStats()
+		with self._lock:
+			stats['resumed'] = self._numResumed
+		return stats
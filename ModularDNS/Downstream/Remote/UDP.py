@@ -10,10 +10,13 @@
 
 import socket
 import threading
+import time
 
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple, Union
 
 import dns.exception
+import dns.flags
+import dns.inet
 import dns.message
 import dns.query
 
@@ -25,19 +28,30 @@ from .ConcurrentMgr import ConcurrentMgr
 from .Endpoint import Endpoint
 from .Protocol import Protocol, _REMOTE_INFO
 from .Remote import DEFAULT_TIMEOUT, Remote
+from .RTTEstimator import QueryWithRetransmits, RTTEstimator
+from .TCP import ConcurrentTCP
+from .UDPMux import UDPSocketPool
 
 
 class UDPProtocol(Protocol):
 
 	'''
 	Implementation of DNS-over-UDP protocol
+	If there is an `rttEstimator`, the query is retransmitted whenever there
+	is no response within the RTO, until `timeout` is reached
 	WARNING: This class is not thread-safe
 	'''
 
-	def __init__(self, endpoint: Endpoint, timeout: float) -> None:
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float,
+		rttEstimator: Union[RTTEstimator, None] = None,
+	) -> None:
 		super(UDPProtocol, self).__init__(
 			endpoint=endpoint,
-			timeout=timeout
+			timeout=timeout,
+			rttEstimator=rttEstimator,
 		)
 
 		self.isTerminated = threading.Event()
@@ -47,10 +61,12 @@ class UDPProtocol(Protocol):
 
 	def CreateSocket(self) -> None:
 		for ver, af in self.IP_VER_TO_AF_MAP.items():
+			# dnspython requires the given sockets to be non-blocking, so
+			# its own timeout can take effect
 			self.sock[ver] = self.SysSocketCreate(
 				af,
 				socket.SOCK_DGRAM,
-				timeout=None,
+				timeout=0.0,
 			)
 
 	def DestroySocket(self) -> None:
@@ -72,23 +88,49 @@ class UDPProtocol(Protocol):
 		if ip.version not in self.sock:
 			raise ValueError(f'Unsupported IP version: {ip.version}')
 		sock = self.sock[ip.version]
+		destination = dns.inet.low_level_address_tuple(
+			(str(ip), port),
+			self.IP_VER_TO_AF_MAP[ip.version],
+		)
+		wire = q.to_wire()
+
+		def _Send() -> None:
+			self.SysIOExceptionToServerNetworkError(
+				lambda: dns.query.send_udp(sock, wire, destination),
+				f'Failed to send the query to {ip}:{port}',
+			)
+
+		def _Wait(waitTime: float) -> Union[dns.message.Message, None]:
+			try:
+				# responses to any of the transmissions are accepted, as they
+				# all share the same socket and transaction ID
+				resp, _ = dns.query.receive_udp(
+					sock,
+					destination=destination,
+					expiration=time.time() + waitTime,
+					ignore_errors=True,
+					query=q,
+				)
+			except dns.exception.Timeout:
+				return None
+			return resp
 
 		try:
-			resp = dns.query.udp(
-				q=q,
-				where=str(ip),
-				port=port,
+			resp = QueryWithRetransmits(
+				send=_Send,
+				wait=_Wait,
 				timeout=self.timeout,
-				sock=sock,
+				rttEstimator=self.rttEstimator,
 			)
-		except (
-			dns.exception.Timeout,
-		) as e:
-			raise ServerNetworkError(str(e))
 		finally:
 			if not self.isTerminated.is_set():
 				self.ResetSocket()
 
+		if resp is None:
+			raise ServerNetworkError(
+				f'The query to {ip}:{port} timed out after {self.timeout}s'
+			)
+
 		return (
 			resp,
 			(self.endpoint.GetHostName(), str(ip), port)
@@ -100,6 +142,55 @@ class UDPProtocol(Protocol):
 		self.DestroySocket()
 
 
+class MuxUDPProtocol(Protocol):
+
+	'''
+	Implementation of DNS-over-UDP protocol, where queries are multiplexed
+	over a pool of long-lived sockets (see `UDPSocketPool`)
+	This class is thread-safe
+	'''
+
+	def __init__(
+		self,
+		endpoint: Endpoint,
+		timeout: float,
+		numSockets: int = UDPSocketPool.DEFAULT_NUM_SOCKETS,
+		rttEstimator: Union[RTTEstimator, None] = None,
+	) -> None:
+		super(MuxUDPProtocol, self).__init__(
+			endpoint=endpoint,
+			timeout=timeout,
+			rttEstimator=rttEstimator,
+		)
+
+		self.pool = UDPSocketPool(numSockets=numSockets)
+
+	def Query(
+		self,
+		q: dns.message.Message,
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> Tuple[dns.message.Message, _REMOTE_INFO]:
+		ip = self.endpoint.GetIPAddr(recDepthStack=recDepthStack)
+		port = self.endpoint.port
+
+		resp = self.pool.Query(
+			q=q,
+			where=ip,
+			port=port,
+			timeout=self.timeout,
+			rttEstimator=self.rttEstimator,
+		)
+
+		return (
+			resp,
+			(self.endpoint.GetHostName(), str(ip), port)
+		)
+
+	def Terminate(self) -> None:
+		super(MuxUDPProtocol, self)._Terminate()
+		self.pool.Terminate()
+
+
 class ConcurrentUDP(ConcurrentMgr):
 
 	SESSION_CLASS: Protocol = UDPProtocol
@@ -107,27 +198,162 @@ class ConcurrentUDP(ConcurrentMgr):
 
 class UDP(Remote):
 
+	DEFAULT_EDNS_PAYLOAD = 1232
+	'''
+	The EDNS(0) UDP payload size recommended by the DNS flag day 2020, which
+	avoids IP fragmentation on most networks
+	'''
+
 	@classmethod
 	def FromConfig(
 		cls,
 		dCollection: DownstreamCollection,
 		endpoint: str,
 		timeout: float = DEFAULT_TIMEOUT,
+		muxSockets: int = 0,
+		ednsPayload: int = DEFAULT_EDNS_PAYLOAD,
+		tcpFallback: bool = True,
+		sessionPool: Union[Dict[str, Any], None] = None,
+		minTimeout: Union[float, None] = None,
 	) -> 'UDP':
 		return cls(
 			endpoint=dCollection.GetEndpoint(endpoint),
-			timeout=timeout
+			timeout=timeout,
+			muxSockets=muxSockets,
+			ednsPayload=ednsPayload,
+			tcpFallback=tcpFallback,
+			sessionPool=sessionPool,
+			minTimeout=minTimeout,
 		)
 
 	def __init__(
 		self,
 		endpoint: Endpoint,
 		timeout: float = DEFAULT_TIMEOUT,
+		muxSockets: int = 0,
+		ednsPayload: int = DEFAULT_EDNS_PAYLOAD,
+		tcpFallback: bool = True,
+		sessionPool: Union[Dict[str, Any], None] = None,
+		minTimeout: Union[float, None] = None,
 	) -> None:
+		'''
+		# __init__
+
+		## Parameters
+		- `endpoint`: The endpoint of the remote server.
+		- `timeout`: The timeout for each query.
+		- `muxSockets`: If greater than zero, queries are multiplexed over
+		  this number of long-lived sockets, instead of using one session,
+		  with its own sockets, per concurrent query.
+		- `ednsPayload`: The UDP payload size advertised via EDNS(0);
+		  EDNS is not used if it is zero.
+		- `tcpFallback`: Whether to retry over TCP, to the same endpoint, when
+		  a truncated (TC) response is received.
+		- `sessionPool`: The configuration of the pool of sessions used when
+		  queries are not multiplexed (see `SessionPool`), e.g.,
+		  `{ "minIdle": 2, "maxSize": 64 }`.
+		- `minTimeout`: If given, queries are retransmitted whenever there is
+		  no response within the RTO, which adapts to the measured RTT of the
+		  server (see `RTTEstimator`) within `[minTimeout, timeout]`, until
+		  `timeout` is reached.
+		'''
 		super(UDP, self).__init__(timeout=timeout)
 
-		self.underlying = ConcurrentUDP(
-			endpoint=endpoint,
-			timeout=timeout
-		)
+		self.rttEstimator = None
+		if minTimeout is not None:
+			self.rttEstimator = RTTEstimator(
+				minRTO=minTimeout,
+				maxRTO=timeout,
+			)
+
+		if (ednsPayload != 0) and ((ednsPayload < 512) or (ednsPayload > 65535)):
+			raise ValueError('ednsPayload must be zero, or within [512, 65535]')
+
+		self.ednsPayload = ednsPayload
 
+		self._statsLock = threading.Lock()
+		self._numQueries = 0
+		self._numTruncated = 0
+		self._numTCPFallbackErrors = 0
+
+		self.tcpFallback = None
+		if tcpFallback:
+			self.tcpFallback = ConcurrentTCP(
+				endpoint=endpoint,
+				timeout=timeout,
+				poolConfig=sessionPool,
+			)
+
+		if muxSockets > 0:
+			self.underlying = MuxUDPProtocol(
+				endpoint=endpoint,
+				timeout=timeout,
+				numSockets=muxSockets,
+				rttEstimator=self.rttEstimator,
+			)
+		else:
+			self.underlying = ConcurrentUDP(
+				endpoint=endpoint,
+				timeout=timeout,
+				poolConfig=sessionPool,
+				rttEstimator=self.rttEstimator,
+			)
+
+	def MakeQuery(
+		self,
+		msgEntry: QuestionEntry.QuestionEntry,
+	) -> dns.message.Message:
+		q = msgEntry.MakeQuery()
+		if self.ednsPayload > 0:
+			q.use_edns(edns=0, payload=self.ednsPayload)
+		return q
+
+	def Query(
+		self,
+		q: dns.message.Message,
+		recDepthStack: List[ Tuple[ int, str ] ],
+	) -> Tuple[dns.message.Message, _REMOTE_INFO]:
+		resp, remote = self.underlying.Query(q=q, recDepthStack=recDepthStack)
+
+		isTruncated = (resp.flags & dns.flags.TC) != 0
+		with self._statsLock:
+			self._numQueries += 1
+			if isTruncated:
+				self._numTruncated += 1
+
+		if isTruncated and (self.tcpFallback is not None):
+			self.logger.debug(
+				f'Response from {remote} is truncated, retrying over TCP'
+			)
+			try:
+				resp, remote = self.tcpFallback.Query(
+					q=q,
+					recDepthStack=recDepthStack
+				)
+			except Exception:
+				with self._statsLock:
+					self._numTCPFallbackErrors += 1
+				raise
+
+		return resp, remote
+
+	def GetStats(self) -> Dict[str, int]:
+		'''
+		# GetStats
+
+		## Returns
+		- dict: The number of queries sent over UDP (`queries`), the number of
+		  truncated responses among them (`truncated`), and the number of
+		  failed TCP fallbacks (`tcpFallbackErrors`).
+		'''
+		with self._statsLock:
+			return {
+				'queries': self._numQueries,
+				'truncated': self._numTruncated,
+				'tcpFallbackErrors': self._numTCPFallbackErrors,
+			}
+
+	def Terminate(self) -> None:
+		if self.tcpFallback is not None:
+			self.tcpFallback.Terminate()
+		super(UDP, self).Terminate()
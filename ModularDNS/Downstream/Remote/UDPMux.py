@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import ipaddress
+import logging
+import random
+import secrets
+import selectors
+import socket
+import threading
+
+from typing import Any, Dict, List, Tuple, Union
+
+import dns.exception
+import dns.message
+
+from ...Exceptions import ServerNetworkError
+from .RTTEstimator import QueryWithRetransmits, RTTEstimator
+
+
+IPAddressType = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+# (socket file descriptor, transaction ID, remote IP, remote port)
+_PendingKey = Tuple[int, int, str, int]
+
+
+class _PendingQuery(object):
+
+	__slots__ = ('query', 'event', 'resp')
+
+	def __init__(self, query: dns.message.Message) -> None:
+		self.query = query
+		self.event = threading.Event()
+		self.resp: Union[dns.message.Message, None] = None
+
+
+class UDPSocketPool(object):
+	'''
+	# UDPSocketPool
+
+	A small pool of long-lived UDP sockets, over which many in-flight queries
+	from multiple threads are multiplexed.
+
+	Each socket is bound to a port picked by the OS (which is randomized on
+	most systems), and each query is sent with a random transaction ID that is
+	unique among the in-flight queries on that socket to that server.
+	A single receiver thread waits on all sockets, and routes each response to
+	the waiting query by the socket, the transaction ID, and the address of
+	the server; a response is only accepted if its question matches the query
+	as well, and all others are dropped.
+	'''
+
+	DEFAULT_NUM_SOCKETS = 4
+	MAX_UDP_SIZE = 65535
+
+	BIND_ADDR_MAP = {
+		4: ('0.0.0.0', 0),
+		6: ('::', 0),
+	}
+
+	IP_VER_TO_AF_MAP = {
+		4: socket.AF_INET,
+		6: socket.AF_INET6,
+	}
+
+	def __init__(self, numSockets: int = DEFAULT_NUM_SOCKETS) -> None:
+		super(UDPSocketPool, self).__init__()
+
+		if numSockets <= 0:
+			raise ValueError('numSockets must be a positive integer')
+
+		self.numSockets = numSockets
+
+		self._logger = logging.getLogger(
+			f'{__name__}.{self.__class__.__name__}'
+		)
+
+		self._lock = threading.Lock()
+		self._pending: Dict[_PendingKey, _PendingQuery] = {}
+		self._numDropped = 0
+
+		self._selector = selectors.DefaultSelector()
+		self._wakeupRecv, self._wakeupSend = socket.socketpair()
+		self._wakeupRecv.setblocking(False)
+		self._selector.register(self._wakeupRecv, selectors.EVENT_READ)
+
+		self._socks: Dict[int, List[socket.socket]] = {}
+		for ver, af in self.IP_VER_TO_AF_MAP.items():
+			try:
+				socks = []
+				for _ in range(numSockets):
+					sock = socket.socket(af, socket.SOCK_DGRAM)
+					socks.append(sock)
+					sock.setblocking(False)
+					sock.bind(self.BIND_ADDR_MAP[ver])
+			except OSError as e:
+				# e.g., IPv6 is not available on this host
+				self._logger.debug(f'IPv{ver} UDP sockets are unavailable: {e}')
+				for sock in socks:
+					sock.close()
+				continue
+
+			self._socks[ver] = socks
+			for sock in socks:
+				self._selector.register(sock, selectors.EVENT_READ)
+
+		self._isTerminated = threading.Event()
+		self._receiver = threading.Thread(
+			target=self._ReceiverLoop,
+			name=f'{self.__class__.__name__}.Receiver',
+			daemon=True,
+		)
+		self._receiver.start()
+
+	def _Dispatch(
+		self,
+		sock: socket.socket,
+		wire: bytes,
+		addr: Tuple[Any, ...],
+	) -> None:
+		if len(wire) < 2:
+			self._numDropped += 1
+			return
+
+		key = (sock.fileno(), int.from_bytes(wire[:2], 'big'), addr[0], addr[1])
+		with self._lock:
+			pending = self._pending.get(key, None)
+		if (pending is None) or pending.event.is_set():
+			# a late, duplicated, or unsolicited response
+			self._numDropped += 1
+			return
+
+		try:
+			resp = dns.message.from_wire(wire)
+		except dns.exception.DNSException:
+			self._numDropped += 1
+			return
+
+		if not pending.query.is_response(resp):
+			# the question doesn't match, so the query is kept waiting
+			self._numDropped += 1
+			return
+
+		pending.resp = resp
+		pending.event.set()
+
+	def _ReceiverLoop(self) -> None:
+		while not self._isTerminated.is_set():
+			for key, _ in self._selector.select():
+				sock: socket.socket = key.fileobj
+				if sock is self._wakeupRecv:
+					try:
+						sock.recv(1024)
+					except BlockingIOError:
+						pass
+					continue
+
+				# drain the socket
+				while True:
+					try:
+						wire, addr = sock.recvfrom(self.MAX_UDP_SIZE)
+					except (BlockingIOError, InterruptedError):
+						break
+					except OSError as e:
+						# e.g., ICMP port unreachable reported by the OS
+						self._logger.debug(f'Failed to receive: {e}')
+						break
+					self._Dispatch(sock, wire, addr)
+
+	def Query(
+		self,
+		q: dns.message.Message,
+		where: IPAddressType,
+		port: int,
+		timeout: float,
+		rttEstimator: Union[RTTEstimator, None] = None,
+	) -> dns.message.Message:
+		'''
+		# Query
+		Send the query to the server, and wait for the response.
+		The transaction ID of the query will be replaced by a random one.
+
+		## Parameters
+		- `q`: The query message.
+		- `where`: The IP address of the server.
+		- `port`: The port of the server.
+		- `timeout`: The time, in seconds, to wait for the response.
+		- `rttEstimator`: If given, the query is retransmitted, with the same
+		  transaction ID, whenever there is no response within the RTO (see
+		  `QueryWithRetransmits`).
+
+		## Returns
+		- dns.message.Message: The response message.
+		'''
+		if self._isTerminated.is_set():
+			raise ServerNetworkError('The UDP socket pool has been terminated')
+
+		if where.version not in self._socks:
+			raise ValueError(f'Unsupported IP version: {where.version}')
+		sock = random.choice(self._socks[where.version])
+		whereStr = str(where)
+
+		pending = _PendingQuery(q)
+		with self._lock:
+			while True:
+				q.id = secrets.randbits(16)
+				key = (sock.fileno(), q.id, whereStr, port)
+				if key not in self._pending:
+					break
+			self._pending[key] = pending
+
+		wire = q.to_wire()
+
+		def _Send() -> None:
+			try:
+				sock.sendto(wire, (whereStr, port))
+			except OSError as e:
+				raise ServerNetworkError(
+					f'Failed to send the query to {whereStr}:{port}: {e}'
+				)
+
+		def _Wait(waitTime: float) -> Union[dns.message.Message, None]:
+			if not pending.event.wait(waitTime):
+				return None
+			if pending.resp is None:
+				raise ServerNetworkError(
+					'The UDP socket pool has been terminated'
+				)
+			return pending.resp
+
+		try:
+			resp = QueryWithRetransmits(
+				send=_Send,
+				wait=_Wait,
+				timeout=timeout,
+				rttEstimator=rttEstimator,
+			)
+			if resp is None:
+				raise ServerNetworkError(
+					f'The query to {whereStr}:{port} timed out after {timeout}s'
+				)
+
+			return resp
+		finally:
+			with self._lock:
+				self._pending.pop(key, None)
+
+	def GetStats(self) -> Dict[str, int]:
+		with self._lock:
+			return {
+				'pending': len(self._pending),
+				'dropped': self._numDropped,
+			}
+
+	def Terminate(self) -> None:
+		if self._isTerminated.is_set():
+			return
+		self._isTerminated.set()
+
+		self._wakeupSend.send(b'\0')
+		self._receiver.join()
+
+		# wake up all queries still waiting
+		with self._lock:
+			for pending in self._pending.values():
+				pending.event.set()
+
+		for socks in self._socks.values():
+			for sock in socks:
+				self._selector.unregister(sock)
+				sock.close()
+		self._selector.close()
+		self._wakeupRecv.close()
+		self._wakeupSend.close()
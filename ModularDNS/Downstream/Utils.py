@@ -8,12 +8,17 @@
 ###
 
 
+import collections
 import logging
+import threading
+import time
 
-from typing import Any
+from typing import Any, Dict, List, Union
 
 import dns.message
 import dns.rcode
+import dns.rdatatype
+import dns.rrset
 
 from ..Exceptions import(
 	DNSNameNotFoundError,
@@ -22,6 +27,25 @@ from ..Exceptions import(
 )
 
 
+def GetNegativeTTL(authority: List[dns.rrset.RRset]) -> Union[int, None]:
+	'''
+	# GetNegativeTTL
+	Get the TTL of a negative response (i.e., NXDOMAIN or NODATA) from the SOA
+	record in its authority section, as specified by RFC 2308, section 5.
+
+	## Parameters
+	- `authority`: The authority section of the negative response.
+
+	## Returns
+	- int: The minimum of the SOA record's TTL and its `minimum` field, or
+	  `None` if there is no SOA record.
+	'''
+	for rrset in authority:
+		if (rrset.rdtype == dns.rdatatype.SOA) and (len(rrset) > 0):
+			return min(rrset.ttl, rrset[0].minimum)
+	return None
+
+
 def CommonDNSRespHandling(
 	dnsMsg: dns.message.Message,
 	remote: Any,
@@ -39,10 +63,186 @@ def CommonDNSRespHandling(
 			f' for name {queryName}'
 		raise DNSServerFaultError(errMsg)
 	if dnsMsg.rcode() == dns.rcode.NXDOMAIN:
-		raise DNSNameNotFoundError(queryName, remote)
+		raise DNSNameNotFoundError(
+			queryName,
+			remote,
+			negTTL=GetNegativeTTL(dnsMsg.authority),
+		)
 	else:
 		errMsg = f'The remote server {remote} returned' \
 			f' unsupported error code {dnsMsg.rcode()}' \
 			f' for name {queryName}'
 		raise DNSServerFaultError(errMsg)
 
+
+class TokenBucket(object):
+	'''
+	# TokenBucket
+
+	A thread-safe token bucket rate limiter, which allows `rate` operations
+	per second on average, and bursts of up to `burst` operations.
+	'''
+
+	def __init__(self, rate: float, burst: float) -> None:
+		super(TokenBucket, self).__init__()
+
+		if rate < 0:
+			raise ValueError('rate must not be negative')
+		if burst < 1:
+			raise ValueError('burst must be at least 1')
+
+		self.rate = rate
+		self.burst = burst
+
+		self._lock = threading.Lock()
+		self._tokens = burst
+		self._lastTime = time.monotonic()
+
+	def TryAcquire(self) -> bool:
+		'''
+		# TryAcquire
+		Try to take one token from the bucket without blocking.
+
+		## Returns
+		- bool: Whether a token has been taken.
+		'''
+		with self._lock:
+			now = time.monotonic()
+			self._tokens = min(
+				self.burst,
+				self._tokens + ((now - self._lastTime) * self.rate)
+			)
+			self._lastTime = now
+
+			if self._tokens >= 1:
+				self._tokens -= 1
+				return True
+			else:
+				return False
+
+
+class CircuitBreaker(object):
+	'''
+	# CircuitBreaker
+
+	A thread-safe circuit breaker guarding a handler.
+
+	- `closed`: All requests are allowed; after `threshold` failures within
+	  `window` seconds, the circuit is opened.
+	- `open`: No request is allowed for `cooldown` seconds, after which the
+	  circuit becomes half-open.
+	- `halfOpen`: Up to `numProbes` probe requests are allowed at the same
+	  time; the circuit is closed by a successful probe, and opened again by
+	  a failed one.
+	'''
+
+	STATE_CLOSED = 'closed'
+	STATE_OPEN = 'open'
+	STATE_HALF_OPEN = 'halfOpen'
+
+	def __init__(
+		self,
+		threshold: int,
+		window: float,
+		cooldown: float,
+		numProbes: int = 1,
+	) -> None:
+		super(CircuitBreaker, self).__init__()
+
+		if threshold < 1:
+			raise ValueError('threshold must be at least 1')
+		if window <= 0:
+			raise ValueError('window must be positive')
+		if cooldown <= 0:
+			raise ValueError('cooldown must be positive')
+		if numProbes < 1:
+			raise ValueError('numProbes must be at least 1')
+
+		self.threshold = threshold
+		self.window = window
+		self.cooldown = cooldown
+		self.numProbes = numProbes
+
+		self._lock = threading.Lock()
+		self._state = self.STATE_CLOSED
+		self._failureTimes = collections.deque()
+		self._openedAt = 0.0
+		self._numProbesInFlight = 0
+
+		self._numOpened = 0
+		self._numRejected = 0
+
+	def _OpenLocked(self, now: float) -> None:
+		self._state = self.STATE_OPEN
+		self._openedAt = now
+		self._failureTimes.clear()
+		self._numOpened += 1
+
+	def Allow(self) -> Union[str, None]:
+		'''
+		# Allow
+		Check if a request is allowed; if so, its result must be reported
+		via `Record()`.
+
+		## Returns
+		- str: The state in which the request is allowed, to be passed to
+		  `Record()`, or `None` if the request is not allowed.
+		'''
+		with self._lock:
+			if self._state == self.STATE_OPEN:
+				if time.monotonic() < (self._openedAt + self.cooldown):
+					self._numRejected += 1
+					return None
+				self._state = self.STATE_HALF_OPEN
+				self._numProbesInFlight = 0
+
+			if self._state == self.STATE_HALF_OPEN:
+				if self._numProbesInFlight >= self.numProbes:
+					self._numRejected += 1
+					return None
+				self._numProbesInFlight += 1
+
+			return self._state
+
+	def Record(self, allowedState: str, isFailure: bool) -> None:
+		'''
+		# Record
+		Report the result of a request allowed by `Allow()`.
+
+		## Parameters
+		- `allowedState`: The state returned by `Allow()`.
+		- `isFailure`: Whether the request has failed.
+		'''
+		now = time.monotonic()
+		with self._lock:
+			if allowedState == self.STATE_HALF_OPEN:
+				if self._state != self.STATE_HALF_OPEN:
+					# the circuit has been opened by another probe
+					return
+				self._numProbesInFlight -= 1
+				if isFailure:
+					self._OpenLocked(now)
+				else:
+					self._state = self.STATE_CLOSED
+				return
+
+			if (self._state != self.STATE_CLOSED) or (not isFailure):
+				return
+
+			self._failureTimes.append(now)
+			while (self._failureTimes[0] + self.window) <= now:
+				self._failureTimes.popleft()
+			if len(self._failureTimes) >= self.threshold:
+				self._OpenLocked(now)
+
+	def GetState(self) -> str:
+		with self._lock:
+			return self._state
+
+	def GetStats(self) -> Dict[str, Union[int, str]]:
+		with self._lock:
+			return {
+				'state': self._state,
+				'opened': self._numOpened,
+				'rejected': self._numRejected,
+			}
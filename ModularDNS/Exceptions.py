@@ -8,7 +8,7 @@
 ###
 
 
-from typing import Any, Type
+from typing import Any, Type, Union
 
 
 class DNSException(Exception):
@@ -17,18 +17,36 @@ class DNSException(Exception):
 
 
 class DNSNameNotFoundError(DNSException):
-	def __init__(self, name: str, respServer: str) -> None:
+	def __init__(
+		self,
+		name: str,
+		respServer: str,
+		negTTL: Union[int, None] = None,
+	) -> None:
 		super(DNSNameNotFoundError, self).__init__(
 			f'DNS name "{name}" not found by "{respServer}"'
 		)
 
+		self.name = name
+		self.respServer = respServer
+		# how long this negative result can be cached (RFC 2308), if known
+		self.negTTL = negTTL
+
 
 class DNSZeroAnswerError(DNSException):
-	def __init__(self, name: str) -> None:
+	def __init__(
+		self,
+		name: str,
+		negTTL: Union[int, None] = None,
+	) -> None:
 		super(DNSZeroAnswerError, self).__init__(
 			f'DNS name "{name}" has zero answer'
 		)
 
+		self.name = name
+		# how long this negative result can be cached (RFC 2308), if known
+		self.negTTL = negTTL
+
 
 class DNSRequestRefusedError(DNSException):
 	def __init__(self, sendAddr: Any, toAddr: Any) -> None:
@@ -63,3 +81,24 @@ def GetExceptionByName(name: str) -> Type[DNSException]:
 	else:
 		return EXCEPTION_MAP[name]
 
+
+def CopyException(e: BaseException) -> BaseException:
+	'''
+	# CopyException
+	Make a new exception object with the same type, arguments, and
+	attributes as the given one, but without its traceback.
+	The same exception object can't be raised by multiple threads at the
+	same time, since raising it modifies its `__traceback__`.
+
+	## Parameters
+	- `e`: The exception to copy.
+
+	## Returns
+	- BaseException: The new exception object.
+	'''
+	# the constructor is skipped, since its parameters can differ from
+	# `args`; the attributes are copied from the given object instead
+	newE = e.__class__.__new__(e.__class__, *e.args)
+	newE.args = e.args
+	newE.__dict__.update(e.__dict__)
+	return newE
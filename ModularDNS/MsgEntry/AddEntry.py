@@ -8,14 +8,15 @@
 ###
 
 
-import copy
-
 import dns.rrset
 
 from .MsgEntry import MsgEntry
 
 
 class AddEntry(MsgEntry):
+
+	__slots__ = ('_rawSet', )
+
 	@classmethod
 	def FromRRSet(cls, rrset: dns.rrset.RRset) -> 'AddEntry':
 		return cls(
@@ -34,28 +35,17 @@ class AddEntry(MsgEntry):
 	) -> None:
 		super(AddEntry, self).__init__(entryType='ADD')
 
-		self._rawSet = rawSet
+		# the given RRset is taken over, so it must not be modified afterwards
+		self._SetAttr('_rawSet', rawSet)
 
-	def ToRRSet(self) -> dns.rrset.RRset:
-		rrset = copy.deepcopy(self._rawSet)
-
-		return rrset
+	def _BuildRRSet(self) -> dns.rrset.RRset:
+		return self._rawSet
 
 	def ToValDict(self) -> dict:
 		return {
 			'rrset': str(self._rawSet.to_text()),
 		}
 
-	def __copy__(self) -> 'AddEntry':
-		return AddEntry(
-			rawSet=copy.copy(self._rawSet),
-		)
-
-	def __deepcopy__(self, memo) -> 'AddEntry':
-		return AddEntry(
-			rawSet=copy.deepcopy(self._rawSet, memo),
-		)
-
 	def __eq__(self, other: object) -> bool:
 		if isinstance(other, AddEntry):
 			return (
@@ -64,6 +54,9 @@ class AddEntry(MsgEntry):
 		else:
 			return False
 
-	def __hash__(self) -> int:
+	def _CalcHash(self) -> int:
 		return hash(self._rawSet.to_text())
 
+	def __hash__(self) -> int:
+		return self._GetHash()
+
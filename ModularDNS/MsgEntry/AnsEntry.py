@@ -8,10 +8,9 @@
 ###
 
 
-import copy
 import ipaddress
 
-from typing import List, Union
+from typing import Iterable, List, Tuple, Union
 
 import dns.name
 import dns.rdata
@@ -23,44 +22,52 @@ from .MsgEntry import MsgEntry
 
 
 class AnsEntry(MsgEntry):
+
+	__slots__ = ('name', 'rdCls', 'rdType', 'dataList', 'ttl')
+
 	@classmethod
 	def FromRRSet(cls, rrset: dns.rrset.RRset) -> 'AnsEntry':
-		return cls(
+		entry = cls(
 			name=rrset.name,
 			rdCls=rrset.rdclass,
 			rdType=rrset.rdtype,
-			dataList=[ x for x in rrset.items ],
+			dataList=rrset.items,
 			ttl=rrset.ttl,
 		)
+		# the given RRset is taken over, so it can be used as is
+		entry._SetAttr('_rrset', rrset)
+		return entry
 
 	def __init__(
 		self,
 		name: dns.name.Name,
 		rdCls: dns.rdataclass.RdataClass,
 		rdType: dns.rdatatype.RdataType,
-		dataList: List[ dns.rdata.Rdata ],
+		dataList: Iterable[ dns.rdata.Rdata ],
 		ttl: int = 3600,
 	) -> None:
 		super(AnsEntry, self).__init__(entryType='ANS')
 
-		self.name = name
-		self.rdCls = rdCls
-		self.rdType = rdType
-		self.dataList = dataList
-		self.ttl = ttl
+		dataList: Tuple[ dns.rdata.Rdata, ... ] = tuple(dataList)
 
 		# check if rdclass and rdtype are consistent
 		for d in dataList:
-			if d.rdclass != self.rdCls:
+			if d.rdclass != rdCls:
 				lName = dns.rdataclass.RdataClass.to_text(d.rdclass)
-				rName = dns.rdataclass.RdataClass.to_text(self.rdCls)
+				rName = dns.rdataclass.RdataClass.to_text(rdCls)
 				raise ValueError(f'Inconsistent rdclass: {lName} != {rName}')
-			if d.rdtype != self.rdType:
+			if d.rdtype != rdType:
 				lName = dns.rdatatype.RdataType.to_text(d.rdtype)
-				rName = dns.rdatatype.RdataType.to_text(self.rdType)
+				rName = dns.rdatatype.RdataType.to_text(rdType)
 				raise ValueError(f'Inconsistent rdtype: {lName} != {rName}')
 
-	def ToRRSet(self) -> dns.rrset.RRset:
+		self._SetAttr('name', name)
+		self._SetAttr('rdCls', rdCls)
+		self._SetAttr('rdType', rdType)
+		self._SetAttr('dataList', dataList)
+		self._SetAttr('ttl', ttl)
+
+	def _BuildRRSet(self) -> dns.rrset.RRset:
 		rrset = dns.rrset.from_rdata_list(
 			name=self.name,
 			ttl=self.ttl,
@@ -69,6 +76,28 @@ class AnsEntry(MsgEntry):
 
 		return rrset
 
+	def WithTTL(self, ttl: int) -> 'AnsEntry':
+		'''
+		# WithTTL
+		Get an entry that is the same as this one, except for the TTL value.
+
+		## Parameters
+		- `ttl`: The TTL value of the new entry.
+
+		## Returns
+		- AnsEntry: This entry if the TTL value is the same, otherwise a new
+		  entry.
+		'''
+		if ttl == self.ttl:
+			return self
+		return AnsEntry(
+			name=self.name,
+			rdCls=self.rdCls,
+			rdType=self.rdType,
+			dataList=self.dataList,
+			ttl=ttl,
+		)
+
 	def ToValDict(self) -> dict:
 		return {
 			'name': str(self.name.to_text()),
@@ -83,24 +112,6 @@ class AnsEntry(MsgEntry):
 	) -> List[Union[ipaddress.IPv4Address, ipaddress.IPv6Address]]:
 		return [ ipaddress.ip_address(x.address) for x in self.dataList ]
 
-	def __copy__(self) -> 'AnsEntry':
-		return AnsEntry(
-			name=copy.copy(self.name),
-			rdCls=copy.copy(self.rdCls),
-			rdType=copy.copy(self.rdType),
-			dataList=copy.copy(self.dataList),
-			ttl=self.ttl,
-		)
-
-	def __deepcopy__(self, memo) -> 'AnsEntry':
-		return AnsEntry(
-			name=copy.deepcopy(self.name, memo),
-			rdCls=copy.deepcopy(self.rdCls, memo),
-			rdType=copy.deepcopy(self.rdType, memo),
-			dataList=copy.deepcopy(self.dataList, memo),
-			ttl=self.ttl,
-		)
-
 	def __eq__(self, other: object) -> bool:
 		if isinstance(other, AnsEntry):
 			return (
@@ -113,13 +124,15 @@ class AnsEntry(MsgEntry):
 		else:
 			return False
 
-	def __hash__(self) -> int:
+	def _CalcHash(self) -> int:
 		return hash((
 			self.entryType,
 			self.name,
 			self.rdCls,
 			self.rdType,
-			tuple(self.dataList),
+			self.dataList,
 			self.ttl,
 		))
 
+	def __hash__(self) -> int:
+		return self._GetHash()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import dns.rrset
+
+from .MsgEntry import MsgEntry
+
+
+class AuthEntry(MsgEntry):
+
+	__slots__ = ('_rawSet', )
+
+	@classmethod
+	def FromRRSet(cls, rrset: dns.rrset.RRset) -> 'AuthEntry':
+		return cls(
+			rawSet=rrset,
+		)
+
+	@classmethod
+	def FromMsgEntry(cls, entry: MsgEntry) -> 'AuthEntry':
+		return cls(
+			rawSet=entry.ToRRSet(),
+		)
+
+	def __init__(
+		self,
+		rawSet: dns.rrset.RRset,
+	) -> None:
+		super(AuthEntry, self).__init__(entryType='AUTH')
+
+		# the given RRset is taken over, so it must not be modified afterwards
+		self._SetAttr('_rawSet', rawSet)
+
+	def _BuildRRSet(self) -> dns.rrset.RRset:
+		return self._rawSet
+
+	def ToValDict(self) -> dict:
+		return {
+			'rrset': str(self._rawSet.to_text()),
+		}
+
+	def __eq__(self, other: object) -> bool:
+		if isinstance(other, AuthEntry):
+			return (
+				(self._rawSet == other._rawSet)
+			)
+		else:
+			return False
+
+	def _CalcHash(self) -> int:
+		return hash(self._rawSet.to_text())
+
+	def __hash__(self) -> int:
+		return self._GetHash()
+
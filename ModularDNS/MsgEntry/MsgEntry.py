@@ -8,13 +8,28 @@
 ###
 
 
-from typing import List
+from typing import Any, List
 
 import dns.message
 import dns.rrset
 
 
 class MsgEntry(object):
+	'''
+	# MsgEntry
+
+	The base class of entries in a DNS message.
+
+	`MsgEntry` objects are immutable, so they can be shared by multiple
+	threads and handlers (e.g., returned straight from a cache) without being
+	copied.
+	The RRset form of an entry is built only once, when `ToRRSet()` is first
+	called, and the same RRset object is returned afterwards; thus, it must
+	not be modified either.
+	'''
+
+	__slots__ = ('entryType', '_rrset', '_hash')
+
 	@classmethod
 	def FromRRSet(cls, rrset: dns.rrset.RRset) -> 'MsgEntry':
 		raise NotImplementedError(
@@ -28,13 +43,46 @@ class MsgEntry(object):
 	def __init__(self, entryType: str) -> None:
 		super(MsgEntry, self).__init__()
 
-		self.entryType = entryType
+		self._SetAttr('entryType', entryType)
+		self._SetAttr('_rrset', None)
+		self._SetAttr('_hash', None)
+
+	def _SetAttr(self, name: str, value: Any) -> None:
+		# attributes can only be set by the object itself
+		object.__setattr__(self, name, value)
+
+	def __setattr__(self, name: str, value: Any) -> None:
+		raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+	def __delattr__(self, name: str) -> None:
+		raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+	def _BuildRRSet(self) -> dns.rrset.RRset:
+		raise NotImplementedError(
+			'MsgEntry._BuildRRSet() is not implemented'
+		)
 
 	def ToRRSet(self) -> dns.rrset.RRset:
+		rrset = self._rrset
+		if rrset is None:
+			# it's fine if multiple threads build it at the same time,
+			# since they are going to build identical RRsets
+			rrset = self._BuildRRSet()
+			self._SetAttr('_rrset', rrset)
+		return rrset
+
+	def _CalcHash(self) -> int:
 		raise NotImplementedError(
-			'MsgEntry.ToRRSet() is not implemented'
+			'MsgEntry._CalcHash() is not implemented'
 		)
 
+	def _GetHash(self) -> int:
+		h = self._hash
+		if h is None:
+			h = self._CalcHash()
+			self._SetAttr('_hash', h)
+		return h
+
 	def ToValDict(self) -> dict:
 		raise NotImplementedError(
 			'MsgEntry.ToValDict() is not implemented'
@@ -46,6 +94,14 @@ class MsgEntry(object):
 			'entry': self.ToValDict(),
 		}
 
+	def __copy__(self) -> 'MsgEntry':
+		# immutable, so there is no need to copy
+		return self
+
+	def __deepcopy__(self, memo) -> 'MsgEntry':
+		# immutable, so there is no need to copy
+		return self
+
 	def __str__(self) -> str:
 		return f'{self.ToDict()}'
 
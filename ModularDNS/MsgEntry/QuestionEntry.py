@@ -8,8 +8,6 @@
 ###
 
 
-import copy
-
 import dns.message
 import dns.name
 import dns.rdataclass
@@ -20,13 +18,19 @@ from .MsgEntry import MsgEntry
 
 
 class QuestionEntry(MsgEntry):
+
+	__slots__ = ('name', 'rdCls', 'rdType')
+
 	@classmethod
 	def FromRRSet(cls, rrset: dns.rrset.RRset) -> 'QuestionEntry':
-		return cls(
+		entry = cls(
 			name=rrset.name,
 			rdCls=rrset.rdclass,
 			rdType=rrset.rdtype,
 		)
+		# the given RRset is taken over, so it can be used as is
+		entry._SetAttr('_rrset', rrset)
+		return entry
 
 	def __init__(
 		self,
@@ -36,11 +40,11 @@ class QuestionEntry(MsgEntry):
 	) -> None:
 		super(QuestionEntry, self).__init__(entryType='QUEST')
 
-		self.name = name
-		self.rdCls = rdCls
-		self.rdType = rdType
+		self._SetAttr('name', name)
+		self._SetAttr('rdCls', rdCls)
+		self._SetAttr('rdType', rdType)
 
-	def ToRRSet(self) -> dns.rrset.RRset:
+	def _BuildRRSet(self) -> dns.rrset.RRset:
 		rrset = dns.rrset.RRset(
 			name=self.name,
 			rdclass=self.rdCls,
@@ -68,20 +72,6 @@ class QuestionEntry(MsgEntry):
 
 		return msg
 
-	def __copy__(self) -> 'QuestionEntry':
-		return QuestionEntry(
-			name=copy.copy(self.name),
-			rdCls=copy.copy(self.rdCls),
-			rdType=copy.copy(self.rdType),
-		)
-
-	def __deepcopy__(self, memo) -> 'QuestionEntry':
-		return QuestionEntry(
-			name=copy.deepcopy(self.name, memo),
-			rdCls=copy.deepcopy(self.rdCls, memo),
-			rdType=copy.deepcopy(self.rdType, memo),
-		)
-
 	def __eq__(self, other: object) -> bool:
 		if isinstance(other, QuestionEntry):
 			return (
@@ -92,6 +82,9 @@ class QuestionEntry(MsgEntry):
 		else:
 			return False
 
-	def __hash__(self) -> int:
+	def _CalcHash(self) -> int:
 		return hash((self.entryType, self.name, self.rdCls, self.rdType))
 
+	def __hash__(self) -> int:
+		return self._GetHash()
+
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import asyncio
+import concurrent.futures
+import ipaddress
+import socket
+import threading
+
+from typing import Tuple, Union
+
+from ..Downstream.Handler import DownstreamHandler
+from ..Downstream.DownstreamCollection import DownstreamCollection
+from .Server import Server
+from .Utils import CommonRawDNSMsgHandling, PacketCache
+
+
+class AsyncUDPHandler(asyncio.DatagramProtocol):
+
+	def __init__(self, server: 'AsyncUDPServer') -> None:
+		super(AsyncUDPHandler, self).__init__()
+
+		self.server = server
+		self.transport: Union[asyncio.DatagramTransport, None] = None
+
+	def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+		self.transport = transport
+
+	def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+		self.server._OnDatagram(self.transport, data, addr)
+
+	def error_received(self, exc: Exception) -> None:
+		self.server.handlerLogger.debug(
+			f'Error received on the UDP socket: {exc}'
+		)
+
+
+class AsyncUDPServer(Server):
+	'''
+	# AsyncUDPServer
+
+	A UDP server running on an asyncio event loop, which receives and replies
+	to the datagrams on a single thread, while the queries are handled by a
+	bounded pool of worker threads, since the downstream handlers may block.
+	Hits of the packet cache are answered on the event loop thread directly.
+
+	Once `maxPending` queries are being handled, further queries are dropped,
+	as if the socket's receive buffer were full.
+	'''
+
+	RequestHandlerClass = AsyncUDPHandler
+
+	def __init__(
+		self,
+		server_address: Tuple[str, int],
+		maxWorkers: int,
+		maxPending: int,
+	) -> None:
+		super(AsyncUDPServer, self).__init__()
+
+		if maxWorkers <= 0:
+			raise ValueError('maxWorkers must be a positive integer')
+		if maxPending <= 0:
+			raise ValueError('maxPending must be a positive integer')
+
+		self.maxWorkers = maxWorkers
+		self.maxPending = maxPending
+
+		self.socket = socket.socket(self.address_family, socket.SOCK_DGRAM)
+		try:
+			self.socket.bind(server_address)
+			self.socket.setblocking(False)
+		except Exception:
+			self.socket.close()
+			raise
+		self.server_address = self.socket.getsockname()
+
+		self._loop = asyncio.new_event_loop()
+		self._executor: Union[concurrent.futures.ThreadPoolExecutor, None] = None
+		self._stopFuture: Union[asyncio.Future, None] = None
+		# held while the event loop is running, so `_Shutdown` can wait for it
+		self._serveLock = threading.Lock()
+		# only accessed on the event loop thread
+		self._numPending = 0
+
+	def _HandleRawMsg(
+		self,
+		rawData: bytes,
+		addr: Tuple[str, int],
+		cacheKey: Union[bytes, None],
+	) -> Union[bytes, None]:
+		# the packet cache has been looked up on the event loop thread
+		rawResp = CommonRawDNSMsgHandling(
+			rawData=rawData,
+			senderAddr=addr,
+			downstreamHdlr=self.downstreamHandler,
+			logger=self.handlerLogger,
+		)
+		if (cacheKey is not None) and (rawResp is not None):
+			self.packetCache.Put(cacheKey, rawResp)
+		return rawResp
+
+	def _OnDatagram(
+		self,
+		transport: asyncio.DatagramTransport,
+		data: bytes,
+		addr: Tuple[str, int],
+	) -> None:
+		cacheKey = None
+		if self.packetCache is not None:
+			# answer the cache hits right away, without a worker thread
+			cacheKey = self.packetCache.MakeKey(data, addr)
+			if cacheKey is not None:
+				rawResp = self.packetCache.Get(cacheKey, data)
+				if rawResp is not None:
+					transport.sendto(rawResp, addr)
+					return
+
+		if self._numPending >= self.maxPending:
+			self.handlerLogger.debug(
+				f'Too many pending queries, dropping the one from {addr}'
+			)
+			return
+
+		self._numPending += 1
+		future = self._loop.run_in_executor(
+			self._executor,
+			self._HandleRawMsg,
+			data,
+			addr,
+			cacheKey,
+		)
+
+		def _OnDone(future: asyncio.Future) -> None:
+			self._numPending -= 1
+			if future.cancelled():
+				return
+			exc = future.exception()
+			if exc is not None:
+				self.handlerLogger.error(
+					f'Failed to handle the query from {addr}: {exc}'
+				)
+				return
+			rawResp = future.result()
+			if (rawResp is not None) and (not transport.is_closing()):
+				transport.sendto(rawResp, addr)
+
+		future.add_done_callback(_OnDone)
+
+	async def _Serve(self) -> None:
+		self._stopFuture = self._loop.create_future()
+		if self.terminateEvent.is_set():
+			# `_Shutdown` was called before the future is created
+			return
+
+		transport, _ = await self._loop.create_datagram_endpoint(
+			lambda: self.RequestHandlerClass(self),
+			sock=self.socket,
+		)
+		try:
+			await self._stopFuture
+		finally:
+			transport.close()
+			# let the transport finish closing
+			await asyncio.sleep(0)
+
+	def _StopServing(self) -> None:
+		if (self._stopFuture is not None) and (not self._stopFuture.done()):
+			self._stopFuture.set_result(None)
+
+	def _ServeForever(self) -> None:
+		with self._serveLock:
+			if self.terminateEvent.is_set():
+				return
+
+			self._executor = concurrent.futures.ThreadPoolExecutor(
+				max_workers=self.maxWorkers,
+				thread_name_prefix=f'{self._instName}.Worker',
+			)
+			asyncio.set_event_loop(self._loop)
+			self._loop.run_until_complete(self._Serve())
+
+	def _Shutdown(self) -> None:
+		if not self._loop.is_closed():
+			self._loop.call_soon_threadsafe(self._StopServing)
+		# wait for the event loop to stop, if it is running
+		with self._serveLock:
+			pass
+
+	def _CleanUp(self) -> None:
+		if self._executor is not None:
+			self._executor.shutdown(wait=True)
+		if not self._loop.is_closed():
+			self._loop.close()
+		self.socket.close()
+
+	def GetSrcPort(self) -> int:
+		return self.server_address[1]
+
+
+class AsyncUDPServerV4(AsyncUDPServer):
+	address_family = socket.AF_INET
+
+class AsyncUDPServerV6(AsyncUDPServer):
+	address_family = socket.AF_INET6
+
+
+class AsyncUDP:
+
+	DEFAULT_MAX_WORKERS: int = 32
+	DEFAULT_MAX_PENDING: int = 1024
+
+	@classmethod
+	def CreateServer(
+		cls,
+		server_address: Tuple[str, int],
+		downstreamHdlr: DownstreamHandler,
+		packetCacheSize: int = 0,
+		maxWorkers: int = DEFAULT_MAX_WORKERS,
+		maxPending: int = DEFAULT_MAX_PENDING,
+		packetCacheBySender: bool = False,
+	) -> Server:
+
+		serverIPVer = 6 \
+			if len(server_address[0]) == 0 else\
+				ipaddress.ip_address(server_address[0]).version
+		if serverIPVer == 4:
+			serverType = AsyncUDPServerV4
+		elif serverIPVer == 6:
+			serverType = AsyncUDPServerV6
+		else:
+			raise ValueError(f'Unsupported IP version: {serverIPVer}')
+
+		serverInst = serverType(
+			server_address,
+			maxWorkers=maxWorkers,
+			maxPending=maxPending,
+		)
+		serverInst.ServerInit({
+			'downstreamHandler': downstreamHdlr,
+			'packetCache': (
+				PacketCache(
+					maxEntries=packetCacheSize,
+					keyBySender=packetCacheBySender,
+				)
+				if packetCacheSize > 0 else None
+			),
+		})
+
+		return serverInst
+
+	@classmethod
+	def FromConfig(
+		cls,
+		dCollection: DownstreamCollection,
+		ip: str,
+		port: int,
+		downstream: str,
+		packetCacheSize: int = 0,
+		maxWorkers: int = DEFAULT_MAX_WORKERS,
+		maxPending: int = DEFAULT_MAX_PENDING,
+	) -> Server:
+
+		downstreamHdlr = dCollection.GetHandler(downstream)
+		serverAddr = (ip, port)
+
+		return cls.CreateServer(
+			server_address=serverAddr,
+			downstreamHdlr=downstreamHdlr,
+			packetCacheSize=packetCacheSize,
+			maxWorkers=maxWorkers,
+			maxPending=maxPending,
+			# the answers mustn't be shared between senders if they may
+			# depend on the sender
+			packetCacheBySender=dCollection.IsSenderDependent(),
+		)
@@ -10,11 +10,13 @@
 
 from ..ModuleManager import ModuleManager
 
+from .AsyncUDP import AsyncUDP
 from .TCP import TCP
 from .UDP import UDP
 
 
 MODULE_MGR = ModuleManager()
+MODULE_MGR.RegisterModule('AsyncUDP', AsyncUDP)
 MODULE_MGR.RegisterModule('TCP', TCP)
 MODULE_MGR.RegisterModule('UDP', UDP)
 
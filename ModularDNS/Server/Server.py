@@ -14,10 +14,11 @@ import socketserver
 import threading
 import uuid
 
-from typing import Any, Dict, Tuple, Type
+from typing import Any, Dict, Tuple, Type, Union
 
 from ..Downstream.Handler import DownstreamHandler
 from .PySocketServer import MitigateServeAndShutdown
+from .Utils import PacketCache
 
 
 class Server:
@@ -40,6 +41,8 @@ class Server:
 		self.handlerLoggerName = f'{self._instName}.{self.handlerName}'
 		self.handlerLogger = logging.getLogger(self.handlerLoggerName)
 
+		self.packetCache: Union[PacketCache, None] = None
+
 		for addDataKey, addDataVal in addData.items():
 			setattr(self, addDataKey, addDataVal)
 
@@ -131,6 +134,8 @@ def CreateServer(
 	handlerType: Type[socketserver.BaseRequestHandler],
 	serverV4Type: Type[Server],
 	serverV6Type: Type[Server],
+	packetCacheSize: int = 0,
+	packetCacheBySender: bool = False,
 ) -> Server:
 
 	serverIPVer = 6 \
@@ -146,6 +151,13 @@ def CreateServer(
 	serverInst = serverType(server_address, handlerType)
 	serverInst.ServerInit({
 		'downstreamHandler': downstreamHdlr,
+		'packetCache': (
+			PacketCache(
+				maxEntries=packetCacheSize,
+				keyBySender=packetCacheBySender,
+			)
+			if packetCacheSize > 0 else None
+		),
 	})
 
 	return serverInst
@@ -14,8 +14,6 @@ import socketserver
 
 from typing import Tuple
 
-import dns.message
-
 from ..Exceptions import ServerNetworkError
 from ..Downstream.Handler import DownstreamHandler
 from ..Downstream.DownstreamCollection import DownstreamCollection
@@ -24,7 +22,7 @@ from .Server import (
 	FromPySocketServer,
 	Server
 )
-from .Utils import CommonDNSMsgHandling
+from .Utils import CommonRawDNSMsgHandling
 
 
 class TCPHandler(socketserver.StreamRequestHandler):
@@ -49,22 +47,15 @@ class TCPHandler(socketserver.StreamRequestHandler):
 		msgLen = int.from_bytes(lenBytes, byteorder='big')
 		rawData = self.ReadBytes(msgLen)
 
-		try:
-			dnsMsg = dns.message.from_wire(rawData)
-		except Exception as e:
-			self.server.handlerLogger.debug(
-				f'Failed to parse DNS message with error {e}'
-			)
-			# the DNS message received is invalid, ignore it
-			return
-
-		dnsResp = CommonDNSMsgHandling(
-			dnsMsg=dnsMsg,
+		rawResp = CommonRawDNSMsgHandling(
+			rawData=rawData,
 			senderAddr=sender,
 			downstreamHdlr=self.server.downstreamHandler,
 			logger=self.server.handlerLogger,
+			packetCache=self.server.packetCache,
 		)
-		rawResp = dnsResp.to_wire()
+		if rawResp is None:
+			return
 		rawRespLenBytes = len(rawResp).to_bytes(2, byteorder='big')
 		self.wfile.write(rawRespLenBytes)
 		self.wfile.write(rawResp)
@@ -110,7 +101,9 @@ class TCP:
 	def CreateServer(
 		cls,
 		server_address: Tuple[str, int],
-		downstreamHdlr: DownstreamHandler
+		downstreamHdlr: DownstreamHandler,
+		packetCacheSize: int = 0,
+		packetCacheBySender: bool = False,
 	) -> Server:
 
 		return _CreateServerFromPySocketServer(
@@ -119,6 +112,8 @@ class TCP:
 			handlerType=TCPHandler,
 			serverV4Type=TCPServerV4,
 			serverV6Type=TCPServerV6,
+			packetCacheSize=packetCacheSize,
+			packetCacheBySender=packetCacheBySender,
 		)
 
 	@classmethod
@@ -128,6 +123,7 @@ class TCP:
 		ip: str,
 		port: int,
 		downstream: str,
+		packetCacheSize: int = 0,
 	) -> Server:
 
 		downstreamHdlr = dCollection.GetHandler(downstream)
@@ -136,5 +132,9 @@ class TCP:
 		return cls.CreateServer(
 			server_address=serverAddr,
 			downstreamHdlr=downstreamHdlr,
+			packetCacheSize=packetCacheSize,
+			# the answers mustn't be shared between senders if they may
+			# depend on the sender
+			packetCacheBySender=dCollection.IsSenderDependent(),
 		)
 
@@ -13,8 +13,6 @@ import socketserver
 
 from typing import Tuple
 
-import dns.message
-
 from ..Downstream.Handler import DownstreamHandler
 from ..Downstream.DownstreamCollection import DownstreamCollection
 from .Server import (
@@ -22,7 +20,7 @@ from .Server import (
 	FromPySocketServer,
 	Server
 )
-from .Utils import CommonDNSMsgHandling
+from .Utils import CommonRawDNSMsgHandling
 
 
 class UDPHandler(socketserver.DatagramRequestHandler):
@@ -33,22 +31,15 @@ class UDPHandler(socketserver.DatagramRequestHandler):
 		sender = self.client_address
 		rawData = self.rfile.read()
 
-		try:
-			dnsMsg = dns.message.from_wire(rawData)
-		except Exception as e:
-			self.server.handlerLogger.debug(
-				f'Failed to parse DNS message with error {e}'
-			)
-			# the DNS message received is invalid, ignore it
-			return
-
-		dnsResp = CommonDNSMsgHandling(
-			dnsMsg=dnsMsg,
+		rawResp = CommonRawDNSMsgHandling(
+			rawData=rawData,
 			senderAddr=sender,
 			downstreamHdlr=self.server.downstreamHandler,
 			logger=self.server.handlerLogger,
+			packetCache=self.server.packetCache,
 		)
-		rawResp = dnsResp.to_wire()
+		if rawResp is None:
+			return
 		self.wfile.write(rawResp)
 
 
@@ -67,7 +58,9 @@ class UDP:
 	def CreateServer(
 		cls,
 		server_address: Tuple[str, int],
-		downstreamHdlr: DownstreamHandler
+		downstreamHdlr: DownstreamHandler,
+		packetCacheSize: int = 0,
+		packetCacheBySender: bool = False,
 	) -> Server:
 
 		return _CreateServerFromPySocketServer(
@@ -76,6 +69,8 @@ class UDP:
 			handlerType=UDPHandler,
 			serverV4Type=UDPServerV4,
 			serverV6Type=UDPServerV6,
+			packetCacheSize=packetCacheSize,
+			packetCacheBySender=packetCacheBySender,
 		)
 
 	@classmethod
@@ -85,6 +80,7 @@ class UDP:
 		ip: str,
 		port: int,
 		downstream: str,
+		packetCacheSize: int = 0,
 	) -> Server:
 
 		downstreamHdlr = dCollection.GetHandler(downstream)
@@ -93,5 +89,9 @@ class UDP:
 		return cls.CreateServer(
 			server_address=serverAddr,
 			downstreamHdlr=downstreamHdlr,
+			packetCacheSize=packetCacheSize,
+			# the answers mustn't be shared between senders if they may
+			# depend on the sender
+			packetCacheBySender=dCollection.IsSenderDependent(),
 		)
 
@@ -8,9 +8,13 @@
 ###
 
 
+import collections
 import logging
+import struct
+import threading
+import time
 
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple, Union
 
 import dns.message
 import dns.rcode
@@ -77,3 +81,348 @@ def CommonDNSMsgHandling(
 		respMsg.set_rcode(dns.rcode.SERVFAIL)
 		return respMsg
 
+
+def CommonRawDNSMsgHandling(
+	rawData: bytes,
+	senderAddr: Tuple[str, int],
+	downstreamHdlr: DownstreamHandler,
+	logger: logging.Logger,
+	packetCache: Union['PacketCache', None] = None,
+) -> Union[bytes, None]:
+	'''
+	# CommonRawDNSMsgHandling
+	Handle a DNS query in wire format.
+
+	## Parameters
+	- `rawData`: The query in wire format.
+	- `senderAddr`: The address of the sender.
+	- `downstreamHdlr`: The handler to process the query.
+	- `logger`: The logger.
+	- `packetCache`: The optional packet cache, which is looked up before
+	  the query is parsed.
+
+	## Returns
+	- bytes: The response in wire format, or `None` if the query is invalid
+	  and should be ignored.
+	'''
+	key = None
+	if packetCache is not None:
+		key = packetCache.MakeKey(rawData, senderAddr)
+		if key is not None:
+			rawResp = packetCache.Get(key, rawData)
+			if rawResp is not None:
+				return rawResp
+
+	try:
+		dnsMsg = dns.message.from_wire(rawData)
+	except Exception as e:
+		logger.debug(
+			f'Failed to parse DNS message with error {e}'
+		)
+		# the DNS message received is invalid, ignore it
+		return None
+
+	dnsResp = CommonDNSMsgHandling(
+		dnsMsg=dnsMsg,
+		senderAddr=senderAddr,
+		downstreamHdlr=downstreamHdlr,
+		logger=logger,
+	)
+	rawResp = dnsResp.to_wire()
+
+	if key is not None:
+		packetCache.Put(key, rawResp)
+
+	return rawResp
+
+
+class _PacketCacheEntry(object):
+
+	__slots__ = ('rawResp', 'qnameLen', 'ttlOffsets', 'storedAt', 'expireAt')
+
+	def __init__(
+		self,
+		rawResp: bytes,
+		qnameLen: int,
+		ttlOffsets: List[Tuple[int, int]],
+		storedAt: float,
+		expireAt: float,
+	) -> None:
+		self.rawResp = rawResp
+		self.qnameLen = qnameLen
+		self.ttlOffsets = ttlOffsets
+		self.storedAt = storedAt
+		self.expireAt = expireAt
+
+
+class PacketCache(object):
+	'''
+	# PacketCache
+
+	A cache of DNS responses in wire format, which sits in front of the
+	server's downstream handler.
+
+	Queries are keyed on their wire format bytes after the message ID, with
+	the question name lower-cased; thus, the flags and the EDNS options of
+	the query are part of the key as well.
+	On a hit, only the message ID, the case of the question name, and the
+	TTL values of the cached response are patched, so the query doesn't need
+	to be parsed by dnspython or be processed by the downstream handler.
+
+	Only queries with a single question and no record other than an OPT
+	record, and responses with a NOERROR or NXDOMAIN rcode and at least one
+	record with a non-zero TTL, can be cached.
+	A response is cached for the shortest TTL of its records, which is capped
+	by `maxTTL`.
+
+	Since the downstream handler is skipped on a hit, if the answers may
+	depend on the sender of the query (e.g., `cidr` rules of a
+	`QuestionRuleSet`), `keyBySender` must be set, so the IP address of the
+	sender is part of the key as well.
+	'''
+
+	DEFAULT_MAX_TTL = 3600
+
+	HEADER_SIZE = 12
+
+	_RCODE_CACHEABLE = (dns.rcode.NOERROR, dns.rcode.NXDOMAIN)
+	_FLAG_TC = 0x0200
+	_RDTYPE_OPT = 41
+
+	def __init__(
+		self,
+		maxEntries: int,
+		maxTTL: int = DEFAULT_MAX_TTL,
+		keyBySender: bool = False,
+	) -> None:
+		super(PacketCache, self).__init__()
+
+		if maxEntries <= 0:
+			raise ValueError('maxEntries must be a positive integer')
+
+		self.maxEntries = maxEntries
+		self.maxTTL = maxTTL
+		self.keyBySender = keyBySender
+
+		self._lock = threading.Lock()
+		# ordered from the least recently used to the most recently used
+		self._entries: Dict[bytes, _PacketCacheEntry] = collections.OrderedDict()
+		self._numHits = 0
+		self._numMisses = 0
+
+	@classmethod
+	def _GetQNameLen(cls, rawMsg: bytes) -> Union[int, None]:
+		# the length of the (uncompressed) name right after the header
+		offset = cls.HEADER_SIZE
+		while offset < len(rawMsg):
+			labelLen = rawMsg[offset]
+			if labelLen == 0:
+				return offset + 1 - cls.HEADER_SIZE
+			if labelLen & 0xC0:
+				# compression pointers are not expected in the question
+				return None
+			offset += 1 + labelLen
+		return None
+
+	@classmethod
+	def _SkipName(cls, rawMsg: bytes, offset: int) -> int:
+		while True:
+			labelLen = rawMsg[offset]
+			if labelLen == 0:
+				return offset + 1
+			if (labelLen & 0xC0) == 0xC0:
+				# a compression pointer always ends the name
+				return offset + 2
+			offset += 1 + labelLen
+
+	@classmethod
+	def _FindTTLOffsets(
+		cls,
+		rawResp: bytes,
+		qnameLen: int,
+	) -> List[Tuple[int, int]]:
+		_, _, qdCount, anCount, nsCount, arCount = struct.unpack_from(
+			'>HHHHHH',
+			rawResp,
+			0
+		)
+		if qdCount != 1:
+			raise ValueError('Response must have exactly one question')
+
+		# skip the question
+		offset = cls.HEADER_SIZE + qnameLen + 4
+
+		ttlOffsets = []
+		for _ in range(anCount + nsCount + arCount):
+			offset = cls._SkipName(rawResp, offset)
+			rdType, _, ttl, rdLen = struct.unpack_from(
+				'>HHIH',
+				rawResp,
+				offset
+			)
+			if rdType != cls._RDTYPE_OPT:
+				# the TTL field of an OPT record holds the EDNS flags instead
+				ttlOffsets.append((offset + 4, ttl))
+			offset += 10 + rdLen
+
+		if offset != len(rawResp):
+			raise ValueError('Trailing bytes in the response')
+
+		return ttlOffsets
+
+	def MakeKey(
+		self,
+		rawQuery: bytes,
+		senderAddr: Union[Tuple[str, int], None] = None,
+	) -> Union[bytes, None]:
+		'''
+		# MakeKey
+		Make the key of the given query.
+
+		## Parameters
+		- `rawQuery`: The query in wire format.
+		- `senderAddr`: The address of the sender, which is required if
+		  `keyBySender` is set.
+
+		## Returns
+		- bytes: The key of the query, or `None` if the query can't be cached.
+		'''
+		if len(rawQuery) < self.HEADER_SIZE:
+			return None
+
+		_, _, qdCount, anCount, nsCount, arCount = struct.unpack_from(
+			'>HHHHHH',
+			rawQuery,
+			0
+		)
+		if (qdCount != 1) or (anCount != 0) or (nsCount != 0) or (arCount > 1):
+			return None
+
+		qnameLen = self._GetQNameLen(rawQuery)
+		if qnameLen is None:
+			return None
+
+		qnameEnd = self.HEADER_SIZE + qnameLen
+		key = (
+			rawQuery[2:self.HEADER_SIZE] +
+			rawQuery[self.HEADER_SIZE:qnameEnd].lower() +
+			rawQuery[qnameEnd:]
+		)
+		if self.keyBySender:
+			if senderAddr is None:
+				return None
+			# the IP address never contains a NUL, so the suffix after the
+			# last NUL is unambiguous; it is appended so that the QNAME
+			# stays at a fixed offset in the key, which `Put()` relies on
+			key = key + b'\x00' + senderAddr[0].encode('utf-8')
+		return key
+
+	def Get(self, key: bytes, rawQuery: bytes) -> Union[bytes, None]:
+		'''
+		# Get
+		Get the cached response to the given query.
+
+		## Parameters
+		- `key`: The key of the query, given by `MakeKey()`.
+		- `rawQuery`: The query in wire format.
+
+		## Returns
+		- bytes: The response in wire format, with the message ID, the
+		  question name, and the TTL values patched for the given query; or
+		  `None` if there is no such response.
+		'''
+		now = time.monotonic()
+		with self._lock:
+			entry = self._entries.get(key, None)
+			if (entry is not None) and (entry.expireAt <= now):
+				del self._entries[key]
+				entry = None
+
+			if entry is None:
+				self._numMisses += 1
+				return None
+
+			self._entries.move_to_end(key)
+			self._numHits += 1
+
+		elapsed = int(now - entry.storedAt)
+		qnameEnd = self.HEADER_SIZE + entry.qnameLen
+
+		rawResp = bytearray(entry.rawResp)
+		rawResp[0:2] = rawQuery[0:2]
+		# keep the case of the question name given by the sender (e.g., for
+		# DNS 0x20 encoding)
+		rawResp[self.HEADER_SIZE:qnameEnd] = rawQuery[self.HEADER_SIZE:qnameEnd]
+		if elapsed > 0:
+			for offset, ttl in entry.ttlOffsets:
+				struct.pack_into('>I', rawResp, offset, max(0, ttl - elapsed))
+
+		return bytes(rawResp)
+
+	def Put(self, key: bytes, rawResp: bytes) -> bool:
+		'''
+		# Put
+		Cache the response to a query.
+
+		## Parameters
+		- `key`: The key of the query, given by `MakeKey()`.
+		- `rawResp`: The response in wire format.
+
+		## Returns
+		- bool: Whether the response has been cached.
+		'''
+		if len(rawResp) < self.HEADER_SIZE:
+			return False
+
+		flags = struct.unpack_from('>H', rawResp, 2)[0]
+		if (flags & 0x000F) not in self._RCODE_CACHEABLE:
+			return False
+		if flags & self._FLAG_TC:
+			# truncated responses should be retried over TCP anyway
+			return False
+
+		qnameLen = self._GetQNameLen(rawResp)
+		if (
+			(qnameLen is None) or
+			(
+				rawResp[self.HEADER_SIZE:self.HEADER_SIZE + qnameLen].lower() !=
+				key[self.HEADER_SIZE - 2:self.HEADER_SIZE - 2 + qnameLen]
+			)
+		):
+			# the response is not for this query
+			return False
+
+		try:
+			ttlOffsets = self._FindTTLOffsets(rawResp, qnameLen)
+		except (ValueError, IndexError, struct.error):
+			return False
+
+		if len(ttlOffsets) == 0:
+			return False
+		ttl = min(self.maxTTL, min([ x[1] for x in ttlOffsets ]))
+		if ttl <= 0:
+			return False
+
+		now = time.monotonic()
+		entry = _PacketCacheEntry(
+			rawResp=bytes(rawResp),
+			qnameLen=qnameLen,
+			ttlOffsets=ttlOffsets,
+			storedAt=now,
+			expireAt=now + ttl,
+		)
+		with self._lock:
+			self._entries[key] = entry
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxEntries:
+				self._entries.popitem(last=False)
+
+		return True
+
+	def GetStats(self) -> Dict[str, Any]:
+		with self._lock:
+			return {
+				'entries': len(self._entries),
+				'hits': self._numHits,
+				'misses': self._numMisses,
+			}
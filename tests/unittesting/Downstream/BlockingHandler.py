@@ -48,3 +48,6 @@ class BlockingHandler(QuickLookup):
 			newRecStack,
 		)
 
+
+	def Terminate(self) -> None:
+		self.targetHandler.Terminate()
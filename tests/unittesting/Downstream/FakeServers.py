@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import ipaddress
+import os
+import random
+import socket
+import socketserver
+import ssl
+import threading
+import unittest
+
+import dns.message
+import dns.rrset
+
+
+FAKE_ANS_ADDR = '1.2.3.4'
+
+
+def MakeFakeResp(q: dns.message.Message) -> dns.message.Message:
+	resp = dns.message.make_response(q)
+	resp.answer.append(
+		dns.rrset.from_text(q.question[0].name, 300, 'IN', 'A', FAKE_ANS_ADDR)
+	)
+	return resp
+
+
+class FakeUDPServer(object):
+	'''
+	A DNS server answering every A query with `1.2.3.4`, where responses can
+	be reordered, or preceded by bogus responses, and the first `numDrops`
+	queries can be dropped
+	'''
+
+	def __init__(
+		self,
+		batchSize: int = 1,
+		sendBogus: bool = False,
+		respond: bool = True,
+		numDrops: int = 0,
+	) -> None:
+		self.batchSize = batchSize
+		self.sendBogus = sendBogus
+		self.respond = respond
+		self.numDrops = numDrops
+
+		self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.sock.bind(('127.0.0.1', 0))
+		self.sock.settimeout(0.01)
+		self.port = self.sock.getsockname()[1]
+		self.numQueries = 0
+
+		self.isTerminated = threading.Event()
+		self.thread = threading.Thread(target=self._Serve)
+		self.thread.start()
+
+	def _Serve(self) -> None:
+		batch = []
+		while not self.isTerminated.is_set():
+			try:
+				wire, addr = self.sock.recvfrom(65535)
+			except socket.timeout:
+				wire = None
+
+			if wire is not None:
+				self.numQueries += 1
+				if self.numQueries <= self.numDrops:
+					continue
+				batch.append((dns.message.from_wire(wire), addr))
+			if (
+				(len(batch) < self.batchSize) and
+				(wire is not None)
+			):
+				continue
+
+			random.shuffle(batch)
+			for q, addr in batch:
+				if not self.respond:
+					continue
+				if self.sendBogus:
+					# wrong transaction ID
+					bogus = MakeFakeResp(q)
+					bogus.id = (q.id + 1) % 65536
+					self.sock.sendto(bogus.to_wire(), addr)
+					# wrong question
+					bogus = MakeFakeResp(
+						dns.message.make_query('bogus.example.com', 'A')
+					)
+					bogus.id = q.id
+					self.sock.sendto(bogus.to_wire(), addr)
+					# garbage
+					self.sock.sendto(q.id.to_bytes(2, 'big') + b'\xff', addr)
+				self.sock.sendto(MakeFakeResp(q).to_wire(), addr)
+			batch = []
+
+	def Terminate(self) -> None:
+		self.isTerminated.set()
+		self.thread.join()
+		self.sock.close()
+
+
+class FakeTCPServer(object):
+	'''
+	A DNS-over-TCP server answering every A query with `1.2.3.4`, where
+	responses to pipelined queries can be reordered, and where connections can
+	be closed after a given number of responses
+	'''
+
+	def __init__(
+		self,
+		batchSize: int = 1,
+		respond: bool = True,
+		closeAfter: int = 0,
+	) -> None:
+		self.batchSize = batchSize
+		self.respond = respond
+		self.closeAfter = closeAfter
+
+		self.numConns = 0
+		self.numQueries = 0
+		self.isTerminated = threading.Event()
+		server = self
+
+		class Handler(socketserver.BaseRequestHandler):
+			def handle(self):
+				server.numConns += 1
+				server._Serve(self.request)
+
+		self.tcpServer = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+		self.port = self.tcpServer.server_address[1]
+		self.thread = threading.Thread(target=self.tcpServer.serve_forever)
+		self.thread.start()
+
+	def _Serve(self, sock: socket.socket) -> None:
+		sock.settimeout(0.01)
+		buf = bytearray()
+		batch = []
+		numResps = 0
+		while not self.isTerminated.is_set():
+			try:
+				data = sock.recv(65536)
+			except socket.timeout:
+				data = None
+			if data == b'':
+				return
+
+			if data is not None:
+				buf += data
+				while len(buf) >= 2:
+					msgLen = int.from_bytes(buf[:2], 'big')
+					if len(buf) < (2 + msgLen):
+						break
+					batch.append(dns.message.from_wire(bytes(buf[2:2 + msgLen])))
+					del buf[:2 + msgLen]
+					self.numQueries += 1
+				if len(batch) < self.batchSize:
+					continue
+
+			random.shuffle(batch)
+			for q in batch:
+				if not self.respond:
+					continue
+				wire = MakeFakeResp(q).to_wire()
+				sock.sendall(len(wire).to_bytes(2, 'big') + wire)
+				numResps += 1
+				if (self.closeAfter > 0) and (numResps >= self.closeAfter):
+					return
+			batch = []
+
+	def Terminate(self) -> None:
+		self.isTerminated.set()
+		self.tcpServer.shutdown()
+		self.tcpServer.server_close()
+		self.thread.join()
+
+
+TLS_CERTS_DIR = os.path.join(os.path.dirname(__file__), 'TLSCerts')
+TLS_CA_FILE = os.path.join(TLS_CERTS_DIR, 'ca.crt')
+TLS_SERVER_HOSTNAME = 'dns.test'
+
+
+class FakeTLSServer(FakeTCPServer):
+	'''
+	A `FakeTCPServer` over TLS, with a certificate for `dns.test` and
+	`127.0.0.1` issued by the testing CA in `TLSCerts`
+	'''
+
+	def __init__(self, *args, **kwargs) -> None:
+		self.sslContext = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+		self.sslContext.load_cert_chain(
+			os.path.join(TLS_CERTS_DIR, 'server.crt'),
+			os.path.join(TLS_CERTS_DIR, 'server.key'),
+		)
+		self.numHandshakeErrors = 0
+
+		super(FakeTLSServer, self).__init__(*args, **kwargs)
+
+	def _Serve(self, sock: socket.socket) -> None:
+		sock.settimeout(1.0)
+		try:
+			tlsSock = self.sslContext.wrap_socket(sock, server_side=True)
+		except (ssl.SSLError, OSError):
+			self.numHandshakeErrors += 1
+			return
+		with tlsSock:
+			super(FakeTLSServer, self)._Serve(tlsSock)
+
+
+def CreateTestingSSLContext() -> ssl.SSLContext:
+	return ssl.create_default_context(cafile=TLS_CA_FILE)
+
+
+class FakeServerTestCase(unittest.TestCase):
+	'''
+	Helpers to query the fake servers above through a socket or connection
+	pool, e.g., `UDPSocketPool`, `TCPConnectionPool`, or `TLSConnectionPool`
+	'''
+
+	def AssertResp(self, name: str, resp: dns.message.Message) -> None:
+		self.assertEqual(str(resp.question[0].name), name)
+		self.assertEqual(resp.answer[0][0].to_text(), FAKE_ANS_ADDR)
+
+	def Query(
+		self,
+		pool,
+		port: int,
+		name: str,
+		timeout: float = 1.0,
+		**kwargs,
+	) -> dns.message.Message:
+		return pool.Query(
+			q=dns.message.make_query(name, 'A'),
+			where=ipaddress.ip_address('127.0.0.1'),
+			port=port,
+			timeout=timeout,
+			**kwargs,
+		)
+
+	def QueryThread(self, pool, port, names, outErrors):
+		try:
+			for name in names:
+				self.AssertResp(name, self.Query(pool, port, name, 5.0))
+		except Exception as e:
+			outErrors.append(e)
@@ -8,22 +8,56 @@
 ###
 
 
+import ipaddress
+import os
+import tempfile
 import threading
 import time
 import unittest
 
 import dns.name
+import dns.rdata
 import dns.rdataclass
 import dns.rdatatype
+import dns.rrset
 
 from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
-from ModularDNS.Downstream.Local.Cache import Cache
+from ModularDNS.Downstream.Local import CacheSnapshot
+from ModularDNS.Downstream.Local.Cache import Cache, CacheItem
+from ModularDNS.Downstream.Logical.RaiseExcept import RaiseExcept
+from ModularDNS.Downstream.QuickLookup import QuickLookup
+from ModularDNS.Exceptions import (
+	DNSNameNotFoundError,
+	DNSServerFaultError,
+	DNSZeroAnswerError,
+)
 from ModularDNS.MsgEntry.AnsEntry import AnsEntry
+from ModularDNS.MsgEntry.AuthEntry import AuthEntry
 from ModularDNS.MsgEntry.QuestionEntry import QuestionEntry
 
+from .BlockingHandler import BlockingHandler
 from .TestLocalHosts import BuildTestingHosts, CountingHosts
 
 
+class NoDataHandler(QuickLookup):
+	'''
+	Answer every question with the given response, which has no answer.
+	'''
+
+	def __init__(self, resps: list) -> None:
+		super(NoDataHandler, self).__init__()
+
+		self.resps = resps
+		self.counter = 0
+
+	def HandleQuestion(self, msgEntry, senderAddr, recDepthStack):
+		self.counter += 1
+		return list(self.resps)
+
+	def Terminate(self) -> None:
+		pass
+
+
 class TestLocalCache(unittest.TestCase):
 
 	def setUp(self):
@@ -173,3 +207,754 @@ class TestLocalCache(unittest.TestCase):
 		)
 		self.assertIsInstance(cache, Cache)
 
+		cache = Cache.FromConfig(
+			dCollection=dCollection,
+			fallback='s:hosts',
+			maxEntries=1000,
+			maxBytes=1024 * 1024,
+			evictPolicy='fifo',
+			staleTTL=3600.0,
+			staleAnsTTL=30,
+			numBgWorkers=2,
+			prefetchMinHits=10,
+			prefetchRemainFrac=0.1,
+			prefetchRate=5.0,
+			negTTL=60.0,
+			numShards=4,
+		)
+		self.assertIsInstance(cache, Cache)
+		self.assertEqual(len(cache._cache._shards), 4)
+		self.assertEqual(cache._cache._shards[0].maxEntries, 250)
+
+
+	def __ASingleFlightThread(self, cache, question, outResps, outErrors):
+		try:
+			outResps.append(
+				cache.HandleQuestion(
+					msgEntry=question,
+					senderAddr=('localhost', 0),
+					recDepthStack=[],
+				)
+			)
+		except Exception as e:
+			outErrors.append(e)
+
+	def test_Downstream_Local_Cache_04SingleFlight(self):
+		hosts = BuildTestingHosts(cls=CountingHosts)
+		releaseEvent = threading.Event()
+		blocking = BlockingHandler(
+			targetHandler=hosts,
+			releaseEvent=releaseEvent,
+		)
+
+		cache = Cache(fallback=blocking)
+
+		question1 = QuestionEntry(
+			name=dns.name.from_text('dns.google.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+
+		numOfThreads = 10
+		resps = []
+		errors = []
+		threads = [
+			threading.Thread(
+				target=self.__ASingleFlightThread,
+				args=(cache, question1, resps, errors),
+			)
+			for _ in range(numOfThreads)
+		]
+		for thread in threads:
+			thread.start()
+		# give all threads enough time to miss the cache
+		time.sleep(0.5)
+		releaseEvent.set()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(len(errors), 0)
+		self.assertEqual(len(resps), numOfThreads)
+		# all concurrent misses are served by a single fallback lookup
+		self.assertEqual(hosts.GetCounter(), 1)
+		for resp in resps:
+			self.assertEqual(resp, resps[0])
+
+	def test_Downstream_Local_Cache_05SingleFlightExcept(self):
+		releaseEvent = threading.Event()
+		blocking = BlockingHandler(
+			targetHandler=RaiseExcept(
+				exceptToRaise=DNSServerFaultError,
+				exceptKwargs={ 'reason': 'Testing' },
+			),
+			releaseEvent=releaseEvent,
+		)
+
+		cache = Cache(fallback=blocking)
+
+		question1 = QuestionEntry(
+			name=dns.name.from_text('dns.google.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+
+		numOfThreads = 10
+		resps = []
+		errors = []
+		threads = [
+			threading.Thread(
+				target=self.__ASingleFlightThread,
+				args=(cache, question1, resps, errors),
+			)
+			for _ in range(numOfThreads)
+		]
+		for thread in threads:
+			thread.start()
+		time.sleep(0.5)
+		releaseEvent.set()
+		for thread in threads:
+			thread.join()
+
+		# the exception raised by the fallback is given to all waiters
+		self.assertEqual(len(resps), 0)
+		self.assertEqual(len(errors), numOfThreads)
+		for e in errors:
+			self.assertIsInstance(e, DNSServerFaultError)
+			self.assertEqual(str(e), 'Testing')
+		# each thread raises its own exception object, and the followers'
+		# ones are chained to the leader's one
+		self.assertEqual(len(set([ id(e) for e in errors ])), numOfThreads)
+		leaderErrs = [ e for e in errors if e.__cause__ is None ]
+		self.assertEqual(len(leaderErrs), 1)
+		for e in errors:
+			if e is not leaderErrs[0]:
+				self.assertIs(e.__cause__, leaderErrs[0])
+
+	def test_Downstream_Local_Cache_06BoundedEntries(self):
+		hosts = BuildTestingHosts(cls=CountingHosts)
+		for i in range(10):
+			hosts.AddAddrRecord(
+				domain=f'test{i}.example.com',
+				ipAddr=ipaddress.ip_address(f'192.168.1.{i}'),
+			)
+
+		cache = Cache(fallback=hosts, maxEntries=4)
+
+		for i in range(10):
+			cache.HandleQuestion(
+				msgEntry=QuestionEntry(
+					name=dns.name.from_text(f'test{i}.example.com'),
+					rdCls=dns.rdataclass.IN,
+					rdType=dns.rdatatype.A,
+				),
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+		self.assertEqual(hosts.GetCounter(), 10)
+		self.assertEqual(cache.GetStats()['entries'], 4)
+		self.assertEqual(cache.GetNumEvictions(), 6)
+
+		# the most recent entries are still cached
+		for i in range(6, 10):
+			cache.HandleQuestion(
+				msgEntry=QuestionEntry(
+					name=dns.name.from_text(f'test{i}.example.com'),
+					rdCls=dns.rdataclass.IN,
+					rdType=dns.rdatatype.A,
+				),
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+		self.assertEqual(hosts.GetCounter(), 10)
+
+		# the oldest entries have been evicted
+		cache.HandleQuestion(
+			msgEntry=QuestionEntry(
+				name=dns.name.from_text('test0.example.com'),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.A,
+			),
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		self.assertEqual(hosts.GetCounter(), 11)
+
+	def test_Downstream_Local_Cache_07BoundedBytes(self):
+		hosts = BuildTestingHosts(cls=CountingHosts)
+		for i in range(100):
+			hosts.AddAddrRecord(
+				domain=f'test{i}.example.com',
+				ipAddr=ipaddress.ip_address(f'192.168.1.{i}'),
+			)
+
+		maxBytes = 4096
+		cache = Cache(fallback=hosts, maxBytes=maxBytes)
+
+		for i in range(100):
+			cache.HandleQuestion(
+				msgEntry=QuestionEntry(
+					name=dns.name.from_text(f'test{i}.example.com'),
+					rdCls=dns.rdataclass.IN,
+					rdType=dns.rdatatype.A,
+				),
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+			self.assertLessEqual(cache.GetStats()['bytes'], maxBytes)
+		self.assertGreater(cache.GetNumEvictions(), 0)
+		self.assertLess(cache.GetStats()['entries'], 100)
+
+	def test_Downstream_Local_Cache_08ServeStale(self):
+		hosts = CountingHosts(ttl=1)
+		hosts.AddAddrRecord(
+			domain='test.example.com',
+			ipAddr=ipaddress.ip_address('192.168.1.1'),
+		)
+		releaseEvent = threading.Event()
+		releaseEvent.set()
+		blocking = BlockingHandler(
+			targetHandler=hosts,
+			releaseEvent=releaseEvent,
+		)
+
+		cache = Cache(fallback=blocking, staleTTL=60.0, staleAnsTTL=0)
+
+		question1 = QuestionEntry(
+			name=dns.name.from_text('test.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		resp1 = cache.HandleQuestion(
+			msgEntry=question1,
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		self.assertEqual(hosts.GetCounter(), 1)
+		self.assertEqual(resp1[0].ttl, 1)
+
+		# wait for the entry to expire
+		time.sleep(1.1)
+		# block the fallback, so the refresh can't finish
+		releaseEvent.clear()
+
+		# the stale entry is served immediately
+		startTime = time.time()
+		resp2 = cache.HandleQuestion(
+			msgEntry=question1,
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		self.assertLess(time.time() - startTime, 0.5)
+		self.assertEqual(resp2[0].GetAddresses(), resp1[0].GetAddresses())
+		self.assertEqual(resp2[0].ttl, 0)
+		# the cached entry is not modified
+		resp3 = cache.HandleQuestion(
+			msgEntry=question1,
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		self.assertEqual(resp3[0].ttl, 0)
+		self.assertEqual(cache.GetStats()['staleHits'], 2)
+		# only one refresh is started
+		self.assertEqual(cache.GetStats()['bgRefreshes'], 1)
+
+		# let the refresh finish
+		releaseEvent.set()
+		time.sleep(0.2)
+		self.assertEqual(hosts.GetCounter(), 2)
+
+		# the refreshed entry is served
+		resp4 = cache.HandleQuestion(
+			msgEntry=question1,
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		self.assertEqual(resp4[0].ttl, 1)
+		self.assertEqual(hosts.GetCounter(), 2)
+		self.assertEqual(cache.GetStats()['staleHits'], 2)
+
+		cache.Terminate()
+
+	def test_Downstream_Local_Cache_09StaleWindow(self):
+		hosts = CountingHosts(ttl=1)
+		hosts.AddAddrRecord(
+			domain='test.example.com',
+			ipAddr=ipaddress.ip_address('192.168.1.1'),
+		)
+
+		cache = Cache(fallback=hosts, staleTTL=0.5)
+
+		question1 = QuestionEntry(
+			name=dns.name.from_text('test.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		cache.HandleQuestion(
+			msgEntry=question1,
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		self.assertEqual(hosts.GetCounter(), 1)
+
+		# wait for the stale window to end as well
+		time.sleep(1.6)
+		cache.HandleQuestion(
+			msgEntry=question1,
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		# it's a regular miss
+		self.assertEqual(hosts.GetCounter(), 2)
+		self.assertEqual(cache.GetStats()['staleHits'], 0)
+
+		cache.Terminate()
+
+	def test_Downstream_Local_Cache_10Prefetch(self):
+		hosts = CountingHosts(ttl=2)
+		hosts.AddAddrRecord(
+			domain='hot.example.com',
+			ipAddr=ipaddress.ip_address('192.168.1.1'),
+		)
+		hosts.AddAddrRecord(
+			domain='cold.example.com',
+			ipAddr=ipaddress.ip_address('192.168.1.2'),
+		)
+
+		cache = Cache(
+			fallback=hosts,
+			prefetchMinHits=3,
+			prefetchRemainFrac=0.5,
+		)
+
+		hotQuestion = QuestionEntry(
+			name=dns.name.from_text('hot.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		coldQuestion = QuestionEntry(
+			name=dns.name.from_text('cold.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		def _Query(question):
+			return cache.HandleQuestion(
+				msgEntry=question,
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+
+		# miss on both entries
+		_Query(hotQuestion)
+		_Query(coldQuestion)
+		self.assertEqual(hosts.GetCounter(), 2)
+
+		# plenty of TTL left, no prefetch
+		for _ in range(3):
+			_Query(hotQuestion)
+		self.assertEqual(hosts.GetCounter(), 2)
+
+		# less than half of the TTL is left
+		time.sleep(1.2)
+		_Query(hotQuestion)
+		_Query(coldQuestion)
+		time.sleep(0.2)
+		# only the hot entry is prefetched
+		self.assertEqual(hosts.GetCounter(), 3)
+		self.assertEqual(cache.GetStats()['prefetches'], 1)
+
+		# the original entries have expired by now
+		time.sleep(1.0)
+		_Query(hotQuestion)
+		# hot entry is still cached, but the cold one is not
+		self.assertEqual(hosts.GetCounter(), 3)
+		_Query(coldQuestion)
+		self.assertEqual(hosts.GetCounter(), 4)
+
+		cache.Terminate()
+
+	def test_Downstream_Local_Cache_11PrefetchRateLimit(self):
+		hosts = CountingHosts(ttl=2)
+		for i in range(3):
+			hosts.AddAddrRecord(
+				domain=f'test{i}.example.com',
+				ipAddr=ipaddress.ip_address(f'192.168.1.{i}'),
+			)
+
+		cache = Cache(
+			fallback=hosts,
+			prefetchMinHits=1,
+			prefetchRemainFrac=0.5,
+			prefetchRate=0.001,
+		)
+
+		questions = [
+			QuestionEntry(
+				name=dns.name.from_text(f'test{i}.example.com'),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.A,
+			)
+			for i in range(3)
+		]
+		for question in questions:
+			cache.HandleQuestion(
+				msgEntry=question,
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+		self.assertEqual(hosts.GetCounter(), 3)
+
+		time.sleep(1.2)
+		for question in questions:
+			cache.HandleQuestion(
+				msgEntry=question,
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+		time.sleep(0.2)
+
+		# only one prefetch is allowed
+		self.assertEqual(hosts.GetCounter(), 4)
+		self.assertEqual(cache.GetStats()['prefetches'], 1)
+		self.assertEqual(cache.GetStats()['prefetchesLimited'], 2)
+
+		cache.Terminate()
+
+	def test_Downstream_Local_Cache_12NegativeCache(self):
+		hosts = CountingHosts(ttl=3600)
+		hosts.AddAddrRecord(
+			domain='test.example.com',
+			ipAddr=ipaddress.ip_address('192.168.1.1'),
+		)
+
+		cache = Cache(fallback=hosts, negTTL=1.0)
+
+		nxQuestion = QuestionEntry(
+			name=dns.name.from_text('nx.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		noDataQuestion = QuestionEntry(
+			name=dns.name.from_text('test.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.AAAA,
+		)
+		def _Query(question):
+			return cache.HandleQuestion(
+				msgEntry=question,
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+
+		# the negative results are cached
+		for _ in range(3):
+			with self.assertRaises(DNSNameNotFoundError):
+				_Query(nxQuestion)
+			with self.assertRaises(DNSZeroAnswerError):
+				_Query(noDataQuestion)
+		self.assertEqual(hosts.GetCounter(), 2)
+
+		# until the negative TTL expires
+		time.sleep(1.2)
+		with self.assertRaises(DNSNameNotFoundError):
+			_Query(nxQuestion)
+		self.assertEqual(hosts.GetCounter(), 3)
+
+		cache.Terminate()
+
+		# negative caching can be disabled
+		cache = Cache(fallback=hosts, negTTL=0)
+		for _ in range(3):
+			with self.assertRaises(DNSNameNotFoundError):
+				_Query(nxQuestion)
+		self.assertEqual(hosts.GetCounter(), 6)
+
+		cache.Terminate()
+
+	def test_Downstream_Local_Cache_13NegativeTTL(self):
+		question = QuestionEntry(
+			name=dns.name.from_text('nx.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+
+		# the negative TTL carried by the exception is preferred
+		item = CacheItem(
+			question=question,
+			resps=[],
+			negTTL=300.0,
+			negExcept=DNSNameNotFoundError(
+				name='nx.example.com',
+				respServer='remote',
+				negTTL=60,
+			),
+		)
+		self.assertEqual(item.GetTTL(), 60)
+		with self.assertRaises(DNSNameNotFoundError):
+			item.GetResp()
+		with self.assertRaises(DNSNameNotFoundError):
+			item.GetStaleResp(30)
+
+		item = CacheItem(
+			question=question,
+			resps=[],
+			negTTL=300.0,
+			negExcept=DNSZeroAnswerError(name='nx.example.com'),
+		)
+		self.assertEqual(item.GetTTL(), 300.0)
+		with self.assertRaises(DNSZeroAnswerError):
+			item.GetResp()
+
+		# a NODATA response with a SOA record in the authority section
+		soaRRset = dns.rrset.from_text_list(
+			name=dns.name.from_text('example.com'),
+			ttl=900,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.SOA,
+			text_rdatas=[
+				'ns.example.com. admin.example.com. 1 7200 3600 1209600 120',
+			]
+		)
+		item = CacheItem(
+			question=question,
+			resps=[ AuthEntry(rawSet=soaRRset) ],
+			defaultTTL=3600.0,
+		)
+		self.assertEqual(item.GetTTL(), 120)
+		self.assertEqual(len(item.GetResp()), 1)
+
+	def test_Downstream_Local_Cache_14Snapshot(self):
+		with tempfile.TemporaryDirectory() as tmpDir:
+			snapshotPath = os.path.join(tmpDir, 'cache.snapshot')
+
+			hosts = BuildTestingHosts(cls=CountingHosts)
+			cache = Cache(
+				fallback=hosts,
+				snapshotPath=snapshotPath,
+				snapshotInterval=0,
+			)
+			# there is no snapshot to load at the beginning
+			self.assertTrue(cache.WaitSnapshotLoaded(timeout=5.0))
+			self.assertEqual(cache.GetStats()['snapshotLoaded'], 0)
+
+			question1 = QuestionEntry(
+				name=dns.name.from_text('dns.google.com'),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.A,
+			)
+			nxQuestion = QuestionEntry(
+				name=dns.name.from_text('nx.example.com'),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.A,
+			)
+			noDataQuestion = QuestionEntry(
+				name=dns.name.from_text('dns.google.com'),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.AAAA,
+			)
+			def _Query(cache, question):
+				return cache.HandleQuestion(
+					msgEntry=question,
+					senderAddr=('localhost', 0),
+					recDepthStack=[],
+				)
+
+			resp1 = _Query(cache, question1)
+			with self.assertRaises(DNSNameNotFoundError):
+				_Query(cache, nxQuestion)
+			with self.assertRaises(DNSZeroAnswerError):
+				_Query(cache, noDataQuestion)
+			self.assertEqual(hosts.GetCounter(), 3)
+
+			# the snapshot is saved on termination
+			cache.Terminate()
+			self.assertTrue(os.path.exists(snapshotPath))
+
+			# restart
+			hosts = BuildTestingHosts(cls=CountingHosts)
+			cache = Cache(
+				fallback=hosts,
+				snapshotPath=snapshotPath,
+				snapshotInterval=0,
+			)
+			self.assertTrue(cache.WaitSnapshotLoaded(timeout=5.0))
+			self.assertEqual(cache.GetStats()['snapshotLoaded'], 3)
+
+			self.assertEqual(_Query(cache, question1), resp1)
+			with self.assertRaises(DNSNameNotFoundError):
+				_Query(cache, nxQuestion)
+			with self.assertRaises(DNSZeroAnswerError):
+				_Query(cache, noDataQuestion)
+			# all are served from the cache
+			self.assertEqual(hosts.GetCounter(), 0)
+
+			cache.Terminate()
+
+		# NODATA responses with the SOA record
+		soaRRset = dns.rrset.from_text_list(
+			name=dns.name.from_text('example.com'),
+			ttl=900,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.SOA,
+			text_rdatas=[
+				'ns.example.com. admin.example.com. 1 7200 3600 1209600 120',
+			]
+		)
+		item = CacheItem(
+			question=noDataQuestion,
+			resps=[ AuthEntry(rawSet=soaRRset) ],
+		)
+		record = item.Dump(expireAt=time.time() + 60)
+		header = CacheSnapshot._RECORD_HEADER
+		question, resps, negExcept, _, size = CacheSnapshot.LoadEntry(
+			*header.unpack(record[:header.size])[:3],
+			record[header.size:],
+		)
+		self.assertEqual(question, noDataQuestion)
+		self.assertEqual(resps, [ AuthEntry(rawSet=soaRRset) ])
+		self.assertIsNone(negExcept)
+		self.assertEqual(size, item.GetSize())
+
+	def test_Downstream_Local_Cache_15SnapshotExpiry(self):
+		with tempfile.TemporaryDirectory() as tmpDir:
+			snapshotPath = os.path.join(tmpDir, 'cache.snapshot')
+
+			hosts = CountingHosts(ttl=1)
+			hosts.AddAddrRecord(
+				domain='short.example.com',
+				ipAddr=ipaddress.ip_address('192.168.1.1'),
+			)
+			hosts.AddAddrRecord(
+				domain='long.example.com',
+				ipAddr=ipaddress.ip_address('192.168.1.2'),
+			)
+			longHosts = CountingHosts(ttl=3600)
+			longHosts.AddAddrRecord(
+				domain='long.example.com',
+				ipAddr=ipaddress.ip_address('192.168.1.2'),
+			)
+
+			cache = Cache(fallback=hosts, snapshotPath=snapshotPath)
+			for domain, fallback in [
+				('short.example.com', hosts),
+				('long.example.com', longHosts),
+			]:
+				cache._fallback = fallback
+				cache.HandleQuestion(
+					msgEntry=QuestionEntry(
+						name=dns.name.from_text(domain),
+						rdCls=dns.rdataclass.IN,
+						rdType=dns.rdatatype.A,
+					),
+					senderAddr=('localhost', 0),
+					recDepthStack=[],
+				)
+			cache._fallback = hosts
+			self.assertEqual(cache.SaveSnapshot(), 2)
+			cache.Terminate()
+
+			# the short-lived entry has expired by the time it's loaded
+			time.sleep(1.2)
+			cache = Cache(fallback=hosts, snapshotPath=snapshotPath)
+			self.assertTrue(cache.WaitSnapshotLoaded(timeout=5.0))
+			self.assertEqual(cache.GetStats()['snapshotLoaded'], 1)
+			cache.Terminate()
+
+	def test_Downstream_Local_Cache_16SnapshotLoadSpeed(self):
+		numEntries = 50000
+
+		with tempfile.TemporaryDirectory() as tmpDir:
+			snapshotPath = os.path.join(tmpDir, 'cache.snapshot')
+
+			hosts = CountingHosts(ttl=3600)
+			cache = Cache(fallback=hosts, snapshotPath=snapshotPath)
+			for i in range(numEntries):
+				question = QuestionEntry(
+					name=dns.name.from_text(f'test{i}.example.com'),
+					rdCls=dns.rdataclass.IN,
+					rdType=dns.rdatatype.A,
+				)
+				cache._cache.Put(
+					CacheItem(
+						question=question,
+						resps=[
+							AnsEntry(
+								name=question.name,
+								rdCls=question.rdCls,
+								rdType=question.rdType,
+								dataList=[
+									dns.rdata.from_text(
+										dns.rdataclass.IN,
+										dns.rdatatype.A,
+										f'10.0.{i // 256 % 256}.{i % 256}'
+									),
+								],
+								ttl=3600,
+							),
+						],
+					)
+				)
+
+			startTime = time.time()
+			self.assertEqual(cache.SaveSnapshot(), numEntries)
+			saveTime = time.time() - startTime
+			cache.Terminate()
+
+			startTime = time.time()
+			cache = Cache(fallback=hosts, snapshotPath=snapshotPath)
+			initTime = time.time() - startTime
+			self.assertTrue(cache.WaitSnapshotLoaded(timeout=600.0))
+			loadTime = time.time() - startTime
+			self.assertEqual(cache.GetStats()['snapshotLoaded'], numEntries)
+			cache.Terminate()
+
+			print()
+			print(f'Saving {numEntries} entries took {saveTime:.3f} seconds')
+			print(f'Cache init took {initTime * 1000:.3f}ms')
+			print(f'Loading {numEntries} entries took {loadTime:.3f} seconds')
+			print(f'Snapshot size: {os.path.getsize(snapshotPath)} bytes')
+
+			# loading is done in the background, so it doesn't delay the
+			# initialization
+			self.assertLess(initTime, 0.5)
+
+	def test_Downstream_Local_Cache_17NoDataResp(self):
+		question = QuestionEntry(
+			name=dns.name.from_text('test.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.AAAA,
+		)
+		def _Query(cache):
+			return cache.HandleQuestion(
+				msgEntry=question,
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+
+		# a NODATA response without SOA record is cached for `negTTL`
+		handler = NoDataHandler(resps=[])
+		cache = Cache(fallback=handler, defaultTTL=3600.0, negTTL=60.0)
+		for _ in range(3):
+			self.assertEqual(_Query(cache), [])
+		self.assertEqual(handler.counter, 1)
+		cachedItem, _ = cache._cache.GetAllowStale(question)
+		self.assertEqual(cachedItem.GetTTL(), 60.0)
+		cache.Terminate()
+
+		# a NODATA response with only the SOA record is not cached when
+		# negative caching is disabled
+		soaRRset = dns.rrset.from_text_list(
+			name=dns.name.from_text('example.com'),
+			ttl=900,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.SOA,
+			text_rdatas=[
+				'ns.example.com. admin.example.com. 1 7200 3600 1209600 120',
+			]
+		)
+		for resps in ([], [ AuthEntry(rawSet=soaRRset) ]):
+			handler = NoDataHandler(resps=resps)
+			cache = Cache(fallback=handler, negTTL=0)
+			for _ in range(3):
+				self.assertEqual(len(_Query(cache)), len(resps))
+			self.assertEqual(handler.counter, 3)
+			cache.Terminate()
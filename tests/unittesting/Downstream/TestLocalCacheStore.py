@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import os
+import random
+import threading
+import time
+import unittest
+
+from ModularDNS.Downstream.Local.CacheStore import (
+	CacheStore,
+	ShardedCacheStore,
+	StoreItem,
+)
+
+
+class DummyItem(StoreItem):
+
+	def __init__(self, key: str, ttl: float = 3600.0, size: int = 1) -> None:
+		super(DummyItem, self).__init__()
+
+		self.key = key
+		self.ttl = ttl
+		self.size = size
+		self.isTerminated = False
+
+	def GetKeys(self):
+		return [self.key]
+
+	def GetTTL(self):
+		return self.ttl
+
+	def GetSize(self):
+		return self.size
+
+	def Terminate(self):
+		self.isTerminated = True
+
+
+class TestLocalCacheStore(unittest.TestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_Downstream_Local_CacheStore_01Basic(self):
+		store = CacheStore()
+
+		item1 = DummyItem('a')
+		store.Put(item1)
+		self.assertEqual(store.Get('a'), item1)
+		self.assertIsNone(store.Get('b'))
+		self.assertEqual(len(store), 1)
+
+		# duplicated key
+		with self.assertRaises(KeyError):
+			store.Put(DummyItem('a'))
+		item2 = DummyItem('a')
+		store.Put(item2, raiseIfKeyExist=False)
+		self.assertEqual(store.Get('a'), item2)
+		self.assertTrue(item1.isTerminated)
+		self.assertEqual(len(store), 1)
+
+		store.Terminate()
+		self.assertEqual(len(store), 0)
+		self.assertTrue(item2.isTerminated)
+
+	def test_Downstream_Local_CacheStore_02Expire(self):
+		store = CacheStore()
+
+		store.Put(DummyItem('a', ttl=0.1))
+		store.Put(DummyItem('b', ttl=3600.0))
+		self.assertIsNotNone(store.Get('a'))
+		time.sleep(0.2)
+		self.assertIsNone(store.Get('a'))
+		self.assertIsNotNone(store.Get('b'))
+		self.assertEqual(store.GetStats()['expirations'], 1)
+		self.assertEqual(store.GetNumEvictions(), 0)
+
+	def test_Downstream_Local_CacheStore_03LRU(self):
+		store = CacheStore(maxEntries=2, evictPolicy='lru')
+
+		store.Put(DummyItem('a'))
+		store.Put(DummyItem('b'))
+		# `a` becomes the most recently used one
+		self.assertIsNotNone(store.Get('a'))
+		store.Put(DummyItem('c'))
+
+		self.assertIsNotNone(store.Get('a'))
+		self.assertIsNone(store.Get('b'))
+		self.assertIsNotNone(store.Get('c'))
+		self.assertEqual(len(store), 2)
+		self.assertEqual(store.GetNumEvictions(), 1)
+
+	def test_Downstream_Local_CacheStore_04FIFO(self):
+		store = CacheStore(maxEntries=2, evictPolicy='fifo')
+
+		store.Put(DummyItem('a'))
+		store.Put(DummyItem('b'))
+		self.assertIsNotNone(store.Get('a'))
+		store.Put(DummyItem('c'))
+
+		self.assertIsNone(store.Get('a'))
+		self.assertIsNotNone(store.Get('b'))
+		self.assertIsNotNone(store.Get('c'))
+		self.assertEqual(store.GetNumEvictions(), 1)
+
+	def test_Downstream_Local_CacheStore_05MaxBytes(self):
+		store = CacheStore(maxBytes=100)
+
+		for i in range(10):
+			store.Put(DummyItem(f'{i}', size=30))
+			self.assertLessEqual(store.GetStats()['bytes'], 100)
+
+		self.assertEqual(len(store), 3)
+		self.assertEqual(store.GetNumEvictions(), 7)
+
+		# an item larger than the limit is not kept at all
+		store.Put(DummyItem('large', size=1000))
+		self.assertIsNone(store.Get('large'))
+		self.assertEqual(store.GetStats()['bytes'], 0)
+
+	def test_Downstream_Local_CacheStore_06Stale(self):
+		store = CacheStore(staleTTL=0.3)
+
+		item1 = DummyItem('a', ttl=0.1)
+		store.Put(item1)
+		self.assertEqual(store.GetAllowStale('a'), (item1, False))
+		time.sleep(0.2)
+		# expired, but still within the stale window
+		self.assertIsNone(store.Get('a'))
+		self.assertEqual(store.GetAllowStale('a'), (item1, True))
+		time.sleep(0.3)
+		# out of the stale window
+		self.assertEqual(store.GetAllowStale('a'), (None, False))
+		self.assertTrue(item1.isTerminated)
+
+	def test_Downstream_Local_CacheStore_07InvalidConfig(self):
+		with self.assertRaises(ValueError):
+			CacheStore(maxEntries=0)
+		with self.assertRaises(ValueError):
+			CacheStore(maxBytes=-1)
+		with self.assertRaises(ValueError):
+			CacheStore(evictPolicy='random')
+		with self.assertRaises(ValueError):
+			CacheStore(staleTTL=-1.0)
+
+	def test_Downstream_Local_CacheStore_08Sharded(self):
+		store = ShardedCacheStore(numShards=4)
+
+		items = [ DummyItem(f'k{i}') for i in range(100) ]
+		for item in items:
+			store.Put(item)
+		self.assertEqual(len(store), 100)
+		for item in items:
+			self.assertIs(store.Get(item.key), item)
+		self.assertIsNone(store.Get('x'))
+		# keys are spread across the shards
+		for shard in store._shards:
+			self.assertGreater(len(shard), 0)
+
+		# duplicated key
+		with self.assertRaises(KeyError):
+			store.Put(DummyItem('k0'))
+		store.Put(DummyItem('k0'), raiseIfKeyExist=False)
+		self.assertIsNot(store.Get('k0'), items[0])
+		self.assertTrue(items[0].isTerminated)
+
+		self.assertEqual(len(store.GetFreshItems()), 100)
+		stats = store.GetStats()
+		self.assertEqual(stats['entries'], 100)
+		self.assertEqual(stats['bytes'], 100)
+
+		store.Terminate()
+		self.assertEqual(len(store), 0)
+		self.assertTrue(items[1].isTerminated)
+
+		with self.assertRaises(ValueError):
+			ShardedCacheStore(numShards=0)
+		with self.assertRaises(ValueError):
+			ShardedCacheStore(numShards=2, evictPolicy='random')
+
+	def test_Downstream_Local_CacheStore_09ShardedBounds(self):
+		store = ShardedCacheStore(numShards=4, maxEntries=40, staleTTL=0.3)
+
+		for i in range(400):
+			store.Put(DummyItem(f'k{i}'))
+		# bounds are applied per shard
+		self.assertLessEqual(len(store), 40)
+		self.assertGreater(store.GetNumEvictions(), 0)
+		for shard in store._shards:
+			self.assertLessEqual(len(shard), 10)
+
+		item = DummyItem('s', ttl=0.1)
+		store.Put(item)
+		time.sleep(0.2)
+		self.assertIsNone(store.Get('s'))
+		self.assertEqual(store.GetAllowStale('s'), (item, True))
+
+	def __ContentionWorker(self, store, keys, numOps, startEvent):
+		rand = random.Random(len(keys))
+		startEvent.wait()
+		for _ in range(numOps):
+			key = keys[rand.randrange(len(keys))]
+			if rand.random() < 0.9:
+				store.Get(key)
+			else:
+				store.Put(DummyItem(key), raiseIfKeyExist=False)
+
+	def __RunContention(self, store, keys, numThreads, numOpsTotal):
+		for key in keys:
+			store.Put(DummyItem(key))
+
+		startEvent = threading.Event()
+		threads = [
+			threading.Thread(
+				target=self.__ContentionWorker,
+				args=(store, keys, numOpsTotal // numThreads, startEvent),
+			)
+			for _ in range(numThreads)
+		]
+		for t in threads:
+			t.start()
+		startTime = time.perf_counter()
+		startEvent.set()
+		for t in threads:
+			t.join()
+		return time.perf_counter() - startTime
+
+	@unittest.skipUnless(
+		os.environ.get('MODULARDNS_BENCHMARK'),
+		'set MODULARDNS_BENCHMARK=1 to run the benchmark'
+	)
+	def test_Downstream_Local_CacheStore_10ContentionBenchmark(self):
+		keys = [ f'k{i}' for i in range(10000) ]
+		numOpsTotal = 128000
+
+		print()
+		for numThreads in [1, 2, 4, 8, 16, 32, 64]:
+			singleTime = self.__RunContention(
+				CacheStore(maxEntries=8000),
+				keys,
+				numThreads,
+				numOpsTotal,
+			)
+			shardedTime = self.__RunContention(
+				ShardedCacheStore(numShards=16, maxEntries=8000),
+				keys,
+				numThreads,
+				numOpsTotal,
+			)
+			print(
+				f'CacheStore contention with {numThreads:2d} threads: '
+				f'single {numOpsTotal / singleTime:10.0f} ops/s, '
+				f'16 shards {numOpsTotal / shardedTime:10.0f} ops/s'
+			)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import gzip
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+from ModularDNS.Downstream.Logical import QuestionRule
+from ModularDNS.Downstream.Logical.DomainList import DomainList
+
+
+def GenerateDomains(num: int, seed: int = 12345) -> list:
+	rand = random.Random(seed)
+	tlds = ['com', 'net', 'org', 'io', 'cn', 'co.uk']
+	alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789'
+	domains = set()
+	while len(domains) < num:
+		label = ''.join(
+			[ rand.choice(alphabet) for _ in range(rand.randint(4, 14)) ]
+		)
+		domain = f'{label}.{rand.choice(tlds)}'
+		if rand.random() < 0.3:
+			domain = f'{rand.choice(["ads", "cdn", "api", "img"])}.{domain}'
+		domains.add(domain)
+	return sorted(domains)
+
+
+class TestLogicalDomainList(unittest.TestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_Downstream_Logical_DomainList_01Parse(self):
+		domainList = DomainList.FromLines([
+			b'# a comment\n',
+			b'\n',
+			b'google.com\n',
+			b'domain:Example.ORG.\n',
+			b'full:dns.example.net @cn\n',
+			b'  ads.example.io   # trailing comment\n',
+		])
+		self.assertEqual(domainList.GetStats()[0], 4)
+
+		# sub-domain matching
+		self.assertTrue(domainList.Match('google.com'))
+		self.assertTrue(domainList.Match('dns.google.com'))
+		self.assertTrue(domainList.Match('a.b.GOOGLE.com'))
+		self.assertFalse(domainList.Match('agoogle.com'))
+		self.assertFalse(domainList.Match('google.com.cn'))
+		self.assertFalse(domainList.Match('com'))
+		self.assertTrue(domainList.Match('www.example.org'))
+		self.assertTrue(domainList.Match('x.ads.example.io'))
+		self.assertFalse(domainList.Match('example.io'))
+
+		# full matching
+		self.assertTrue(domainList.Match('dns.example.net'))
+		self.assertFalse(domainList.Match('a.dns.example.net'))
+		self.assertFalse(domainList.Match('example.net'))
+
+		# unsupported entries
+		with self.assertRaises(ValueError):
+			DomainList.FromLines([ b'regexp:.*\\.google\\.com\n' ])
+		with self.assertRaises(ValueError):
+			DomainList.FromLines([ b'full:\n' ])
+
+	def test_Downstream_Logical_DomainList_02Files(self):
+		lines = [ 'google.com', 'full:dns.example.net', 'example.org' ]
+		with tempfile.TemporaryDirectory() as tmpDir:
+			textPath = os.path.join(tmpDir, 'list.txt')
+			with open(textPath, 'w') as f:
+				f.write('\n'.join(lines))
+			gzPath = os.path.join(tmpDir, 'list.txt.gz')
+			with gzip.open(gzPath, 'wt') as f:
+				f.write('\n'.join(lines))
+
+			for path in [ textPath, gzPath ]:
+				domainList = DomainList.FromFile(path)
+				self.assertEqual(domainList.GetStats()[0], 3)
+				self.assertTrue(domainList.Match('a.google.com'))
+				self.assertTrue(domainList.Match('dns.example.net'))
+				self.assertFalse(domainList.Match('a.dns.example.net'))
+
+			binPath = os.path.join(tmpDir, 'list.bin')
+			domainList.Save(binPath)
+			domainList = DomainList.FromFile(binPath)
+			self.assertEqual(domainList.GetStats()[0], 3)
+			self.assertTrue(domainList.Match('a.google.com'))
+			self.assertTrue(domainList.Match('www.example.org'))
+			self.assertTrue(domainList.Match('dns.example.net'))
+			self.assertFalse(domainList.Match('a.dns.example.net'))
+
+			# empty list
+			emptyPath = os.path.join(tmpDir, 'empty.bin')
+			DomainList(subDomains=[], fullDomains=[]).Save(emptyPath)
+			domainList = DomainList.FromFile(emptyPath)
+			self.assertEqual(domainList.GetStats()[0], 0)
+			self.assertFalse(domainList.Match('google.com'))
+
+	def test_Downstream_Logical_DomainList_03BinaryFormat(self):
+		domains = GenerateDomains(1000)
+		with tempfile.TemporaryDirectory() as tmpDir:
+			# saved by another process, with a different `hash()` seed
+			binPath = os.path.join(tmpDir, 'list.bin')
+			script = (
+				'import sys\n'
+				'from ModularDNS.Downstream.Logical.DomainList import DomainList\n'
+				'DomainList.FromLines(\n'
+				'	[ x.encode() for x in sys.argv[2:] ]\n'
+				').Save(sys.argv[1])\n'
+			)
+			subprocess.run(
+				[ sys.executable, '-c', script, binPath ] + domains,
+				env={ **os.environ, 'PYTHONHASHSEED': '1' },
+				check=True,
+			)
+
+			domainList = DomainList.FromFile(binPath)
+			self.assertEqual(domainList.GetStats()[0], len(domains))
+			for domain in domains:
+				self.assertTrue(domainList.Match(f'www.{domain}'))
+				self.assertFalse(domainList.Match(f'{domain}.invalid'))
+
+			# the buffers are loaded as they are saved
+			expList = DomainList.FromLines([ x.encode() for x in domains ])
+			self.assertEqual(
+				domainList._subDomains.GetBuffers(),
+				expList._subDomains.GetBuffers()
+			)
+
+			with open(binPath, 'rb') as f:
+				data = f.read()
+			brokenPath = os.path.join(tmpDir, 'broken.bin')
+			with open(brokenPath, 'wb') as f:
+				f.write(data[:-1])
+			with self.assertRaises(EOFError):
+				DomainList.FromFile(brokenPath)
+
+			# the offsets are stored in 4 bytes, and the hashes in 8 bytes
+			magicLen = len(DomainList.BINARY_MAGIC)
+			self.assertEqual(data[magicLen + 8:magicLen + 10], b'\x08\x04')
+			# files with different sizes of the items are rejected
+			with open(brokenPath, 'wb') as f:
+				f.write(data[:magicLen + 9] + b'\x08' + data[magicLen + 10:])
+			with self.assertRaises(ValueError):
+				DomainList.FromFile(brokenPath)
+			# so are files of other versions
+			with open(brokenPath, 'wb') as f:
+				f.write(b'MDNSDL02' + data[magicLen:])
+			with self.assertRaises(ValueError):
+				DomainList.FromFile(brokenPath)
+
+	def test_Downstream_Logical_DomainList_04LargeList(self):
+		numDomains = 200000
+		domains = GenerateDomains(numDomains)
+
+		with tempfile.TemporaryDirectory() as tmpDir:
+			gzPath = os.path.join(tmpDir, 'list.txt.gz')
+			with gzip.open(gzPath, 'wt') as f:
+				f.write('\n'.join(domains))
+
+			startTime = time.perf_counter()
+			domainList = DomainList.FromFile(gzPath)
+			textLoadTime = time.perf_counter() - startTime
+
+			binPath = os.path.join(tmpDir, 'list.bin')
+			domainList.Save(binPath)
+			del domainList
+
+			startTime = time.perf_counter()
+			domainList = DomainList.FromFile(binPath)
+			binLoadTime = time.perf_counter() - startTime
+			del domainList
+
+			tracemalloc.start()
+			domainList = DomainList.FromFile(binPath)
+			listMem, listPeakMem = tracemalloc.get_traced_memory()
+			tracemalloc.stop()
+
+		# the same domains given as inline `sub` rules, for comparison
+		tracemalloc.start()
+		rules = [ QuestionRule.RuleFromStr(f'sub:->>{x}') for x in domains ]
+		rulesMem, _ = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		del rules
+
+		self.assertEqual(domainList.GetStats()[0], numDomains)
+		for domain in domains[::1000]:
+			self.assertTrue(domainList.Match(domain))
+			self.assertTrue(domainList.Match(f'www.{domain}'))
+			self.assertFalse(domainList.Match(f'{domain}.invalid'))
+
+		names = [ f'www.{x}' for x in domains[:5000] ] + \
+			[ f'www.{x}.invalid' for x in domains[:5000] ]
+		startTime = time.perf_counter()
+		for name in names:
+			domainList.Match(name)
+		matchTime = time.perf_counter() - startTime
+
+		print()
+		print(f'Loading {numDomains} domains from a gzip text file took {textLoadTime:.3f} seconds')
+		print(f'Loading {numDomains} domains from a binary file took {binLoadTime:.3f} seconds')
+		print(f'Keeping {numDomains} domains in a domain list uses {listMem / 1024 / 1024:.2f} MB (peak {listPeakMem / 1024 / 1024:.2f} MB)')
+		print(f'Keeping {numDomains} domains as inline rules uses {rulesMem / 1024 / 1024:.2f} MB')
+		print(f'Matching a name took {matchTime / len(names) * 1000000:.3f} us')
@@ -9,12 +9,14 @@
 
 
 import ipaddress
+import time
 import unittest
 
 import dns.name
 import dns.rdataclass
 import dns.rdatatype
 
+from ModularDNS.Exceptions import DNSNameNotFoundError, ServerNetworkError
 from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
 from ModularDNS.Downstream.Logical.Failover import Failover
 from ModularDNS.MsgEntry.QuestionEntry import QuestionEntry
@@ -22,6 +24,27 @@ from ModularDNS.MsgEntry.QuestionEntry import QuestionEntry
 from .TestLocalHosts import BuildTestingHosts, CountingHosts
 
 
+class FlakyHosts(CountingHosts):
+
+	def __init__(self) -> None:
+		super(FlakyHosts, self).__init__()
+
+		self.isDown = False
+		self.interrupt = None
+
+	def HandleQuestion(self, msgEntry, senderAddr, recDepthStack):
+		ans = super(FlakyHosts, self).HandleQuestion(
+			msgEntry=msgEntry,
+			senderAddr=senderAddr,
+			recDepthStack=recDepthStack,
+		)
+		if self.interrupt is not None:
+			raise self.interrupt
+		if self.isDown:
+			raise ServerNetworkError('The server is down')
+		return ans
+
+
 class TestLogicalFailover(unittest.TestCase):
 
 	def setUp(self):
@@ -104,3 +127,127 @@ class TestLogicalFailover(unittest.TestCase):
 		)
 		self.assertIsInstance(failover, Failover)
 
+		failover = Failover.FromConfig(
+			dCollection=dCollection,
+			initialHandler='s:hosts1',
+			failoverHandler='s:hosts2',
+			breakerThreshold=3,
+			breakerWindow=5.0,
+			breakerCooldown=10.0,
+			breakerProbes=2,
+		)
+		self.assertIsInstance(failover, Failover)
+		self.assertEqual(failover.GetBreakerStats()['state'], 'closed')
+
+	def test_Downstream_Logical_FailOver_03CircuitBreaker(self):
+		testName = 'test1.example.com'
+		testAddr = ipaddress.ip_address('192.168.1.1')
+		hosts1 = FlakyHosts()
+		hosts1.AddAddrRecord(domain=testName, ipAddr=testAddr)
+		hosts2 = BuildTestingHosts(cls=CountingHosts)
+		hosts2.AddAddrRecord(domain=testName, ipAddr=testAddr)
+
+		failover = Failover(
+			initialHandler=hosts1,
+			failoverHandler=hosts2,
+			breakerThreshold=3,
+			breakerWindow=5.0,
+			breakerCooldown=0.2,
+		)
+		self.assertEqual(Failover(hosts1, hosts2).GetBreakerStats(), None)
+
+		def _Lookup(name: str = testName) -> None:
+			ans = failover.HandleQuestion(
+				msgEntry=QuestionEntry(
+					name=dns.name.from_text(name),
+					rdCls=dns.rdataclass.IN,
+					rdType=dns.rdatatype.A,
+				),
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+			self.assertEqual(ans[0].GetAddresses(), [testAddr])
+
+		# NXDOMAIN is failed over, but isn't a failure of the server
+		for _ in range(3):
+			with self.assertRaises(DNSNameNotFoundError):
+				_Lookup('unknown.example.com')
+		self.assertEqual(failover.GetBreakerStats()['state'], 'closed')
+
+		# the circuit is opened after 3 failures
+		hosts1.isDown = True
+		for _ in range(10):
+			_Lookup()
+		self.assertEqual(hosts1.GetCounter(), 3 + 3)
+		self.assertEqual(hosts2.GetCounter(), 3 + 10)
+		self.assertEqual(
+			failover.GetBreakerStats(),
+			{ 'state': 'open', 'opened': 1, 'rejected': 7 }
+		)
+
+		# a failed probe opens the circuit again
+		time.sleep(0.25)
+		_Lookup()
+		_Lookup()
+		self.assertEqual(hosts1.GetCounter(), 3 + 4)
+		self.assertEqual(failover.GetBreakerStats()['opened'], 2)
+
+		# a successful probe closes the circuit
+		hosts1.isDown = False
+		time.sleep(0.25)
+		_Lookup()
+		self.assertEqual(failover.GetBreakerStats()['state'], 'closed')
+		for _ in range(5):
+			_Lookup()
+		self.assertEqual(hosts1.GetCounter(), 3 + 4 + 6)
+		self.assertEqual(hosts2.GetCounter(), 3 + 10 + 2)
+
+	def test_Downstream_Logical_FailOver_04InterruptedProbe(self):
+		class _Interrupted(BaseException):
+			pass
+
+		testName = 'test1.example.com'
+		testAddr = ipaddress.ip_address('192.168.1.1')
+		hosts1 = FlakyHosts()
+		hosts1.AddAddrRecord(domain=testName, ipAddr=testAddr)
+		hosts2 = BuildTestingHosts(cls=CountingHosts)
+		hosts2.AddAddrRecord(domain=testName, ipAddr=testAddr)
+
+		failover = Failover(
+			initialHandler=hosts1,
+			failoverHandler=hosts2,
+			breakerThreshold=1,
+			breakerWindow=5.0,
+			breakerCooldown=0.2,
+			breakerProbes=1,
+		)
+
+		def _Lookup() -> list:
+			return failover.HandleQuestion(
+				msgEntry=QuestionEntry(
+					name=dns.name.from_text(testName),
+					rdCls=dns.rdataclass.IN,
+					rdType=dns.rdatatype.A,
+				),
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+
+		hosts1.isDown = True
+		_Lookup()
+		self.assertEqual(failover.GetBreakerStats()['state'], 'open')
+
+		# the only probe is interrupted, which opens the circuit again
+		hosts1.interrupt = _Interrupted()
+		time.sleep(0.25)
+		with self.assertRaises(_Interrupted):
+			_Lookup()
+		self.assertEqual(failover.GetBreakerStats()['opened'], 2)
+
+		# the probe slot has been released, so the next probe can be sent
+		hosts1.interrupt = None
+		hosts1.isDown = False
+		time.sleep(0.25)
+		self.assertEqual(_Lookup()[0].GetAddresses(), [testAddr])
+		self.assertEqual(failover.GetBreakerStats()['state'], 'closed')
+		self.assertEqual(hosts1.GetCounter(), 3)
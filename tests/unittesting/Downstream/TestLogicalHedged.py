@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import threading
+import time
+import unittest
+
+from ModularDNS.Exceptions import DNSNameNotFoundError, ServerNetworkError
+from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
+from ModularDNS.Downstream.Logical.Hedged import Hedged
+from ModularDNS.Downstream.Logical.RaiseExcept import RaiseExcept
+
+from .TestLocalHosts import BuildTestingHosts, CountingHosts
+from .TestLogicalLatencyAware import (
+	TEST_ADDR,
+	BuildQuestion,
+	BuildSlowHosts,
+)
+
+
+class TestLogicalHedged(unittest.TestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def TimedLookup(self, handler, question) -> float:
+		startTime = time.monotonic()
+		ans = handler.HandleQuestion(
+			msgEntry=question,
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		timeUsed = time.monotonic() - startTime
+		self.assertEqual(ans[0].GetAddresses(), [TEST_ADDR])
+		return timeUsed
+
+	def test_Downstream_Logical_Hedged_01Hedge(self):
+		primary = BuildSlowHosts(delay=0.5)
+		secondary = BuildSlowHosts(delay=0.0)
+		hedged = Hedged(
+			primaryHandler=primary,
+			secondaryHandlerList=[secondary],
+			hedgeDelay=0.05,
+		)
+
+		timeUsed = self.TimedLookup(hedged, BuildQuestion())
+		self.assertGreaterEqual(timeUsed, 0.05)
+		self.assertLess(timeUsed, 0.4)
+		self.assertEqual(secondary.GetCounter(), 1)
+
+		stats = hedged.GetStats()
+		self.assertEqual(stats['questions'], 1)
+		self.assertEqual(stats['hedged'], 1)
+		self.assertEqual(stats['hedgeWins'], 1)
+		self.assertEqual(stats['throttled'], 0)
+
+		# no hedge if the primary answers in time
+		fastPrimary = BuildSlowHosts(delay=0.0)
+		hedged = Hedged(
+			primaryHandler=fastPrimary,
+			secondaryHandlerList=[secondary],
+			hedgeDelay=0.2,
+		)
+		for _ in range(10):
+			self.TimedLookup(hedged, BuildQuestion())
+		self.assertEqual(secondary.GetCounter(), 1)
+		self.assertEqual(hedged.GetStats()['hedged'], 0)
+
+	def test_Downstream_Logical_Hedged_02RateLimit(self):
+		primary = BuildSlowHosts(delay=0.2)
+		secondary = BuildSlowHosts(delay=0.0)
+		hedged = Hedged(
+			primaryHandler=primary,
+			secondaryHandlerList=[secondary],
+			hedgeDelay=0.01,
+			maxHedgeRatio=0.0,
+			hedgeBurst=1,
+		)
+
+		question = BuildQuestion()
+		# the first hedge is allowed by the burst
+		self.assertLess(self.TimedLookup(hedged, question), 0.15)
+		# then there is no more budget for hedging
+		self.assertGreaterEqual(self.TimedLookup(hedged, question), 0.2)
+
+		stats = hedged.GetStats()
+		self.assertEqual(stats['hedged'], 1)
+		self.assertEqual(stats['throttled'], 1)
+		self.assertEqual(secondary.GetCounter(), 1)
+
+	def test_Downstream_Logical_Hedged_03Failures(self):
+		failing = RaiseExcept(
+			exceptToRaise=ServerNetworkError,
+			exceptArgs=('Connection refused',),
+		)
+		secondary = BuildSlowHosts(delay=0.0)
+		hedged = Hedged(
+			primaryHandler=failing,
+			secondaryHandlerList=[secondary],
+			hedgeDelay=1.0,
+			maxHedgeRatio=0.0,
+			hedgeBurst=1,
+		)
+
+		# a failed primary is failed over right away, without any budget
+		for _ in range(3):
+			self.assertLess(self.TimedLookup(hedged, BuildQuestion()), 0.5)
+		self.assertEqual(secondary.GetCounter(), 3)
+		self.assertEqual(hedged.GetStats()['hedged'], 0)
+
+		# the error is raised if all handlers have failed
+		hedged = Hedged(
+			primaryHandler=failing,
+			secondaryHandlerList=[failing],
+			hedgeDelay=1.0,
+		)
+		with self.assertRaises(ServerNetworkError):
+			self.TimedLookup(hedged, BuildQuestion())
+
+		# NXDOMAIN is an answer
+		hosts = BuildTestingHosts(cls=CountingHosts)
+		hedged = Hedged(
+			primaryHandler=hosts,
+			secondaryHandlerList=[secondary],
+			hedgeDelay=1.0,
+		)
+		with self.assertRaises(DNSNameNotFoundError):
+			self.TimedLookup(hedged, BuildQuestion('unknown.example.com'))
+		self.assertEqual(secondary.GetCounter(), 3)
+
+	def test_Downstream_Logical_Hedged_04PercentileDelay(self):
+		primary = BuildSlowHosts(delay=0.01)
+		secondary = BuildSlowHosts(delay=0.0)
+		hedged = Hedged(
+			primaryHandler=primary,
+			secondaryHandlerList=[secondary],
+			hedgeDelay=0.5,
+			hedgePercentile=95,
+		)
+
+		question = BuildQuestion()
+		for _ in range(Hedged.MIN_LATENCY_SAMPLES - 1):
+			self.TimedLookup(hedged, question)
+		self.assertEqual(hedged.GetHedgeDelay(), 0.5)
+
+		self.TimedLookup(hedged, question)
+		hedgeDelay = hedged.GetHedgeDelay()
+		self.assertGreaterEqual(hedgeDelay, 0.01)
+		self.assertLess(hedgeDelay, 0.5)
+
+	def test_Downstream_Logical_Hedged_05FromConfig(self):
+		hosts1 = BuildTestingHosts(cls=CountingHosts)
+		hosts2 = BuildTestingHosts(cls=CountingHosts)
+		dCollection = DownstreamCollection()
+		dCollection.AddHandler('hosts1', hosts1)
+		dCollection.AddHandler('hosts2', hosts2)
+
+		hedged = Hedged.FromConfig(
+			dCollection=dCollection,
+			primaryHandler='s:hosts1',
+			secondaryHandlerList=['s:hosts2'],
+		)
+		self.assertIsInstance(hedged, Hedged)
+
+		hedged = Hedged.FromConfig(
+			dCollection=dCollection,
+			primaryHandler='s:hosts1',
+			secondaryHandlerList=['s:hosts2'],
+			hedgeDelay=0.2,
+			hedgePercentile=95,
+			maxHedgeRatio=0.05,
+			hedgeBurst=5,
+			exceptList=['ServerNetworkError'],
+			maxWorkers=4,
+		)
+		self.assertIsInstance(hedged, Hedged)
+		self.assertEqual(hedged.exceptList, [ServerNetworkError])
+
+		with self.assertRaises(ValueError):
+			Hedged.FromConfig(
+				dCollection=dCollection,
+				primaryHandler='s:hosts1',
+				secondaryHandlerList=[],
+			)
+		with self.assertRaises(ValueError):
+			Hedged.FromConfig(
+				dCollection=dCollection,
+				primaryHandler='s:hosts1',
+				secondaryHandlerList=['s:hosts2'],
+				hedgePercentile=0,
+			)
+		with self.assertRaises(ValueError):
+			Hedged.FromConfig(
+				dCollection=dCollection,
+				primaryHandler='s:hosts1',
+				secondaryHandlerList=['s:hosts2'],
+				maxWorkers=0,
+			)
+
+	def test_Downstream_Logical_Hedged_06Terminate(self):
+		primary = BuildSlowHosts(delay=0.5)
+		secondary = BuildSlowHosts(delay=0.0)
+		hedged = Hedged(
+			primaryHandler=primary,
+			secondaryHandlerList=[secondary],
+			hedgeDelay=0.05,
+			maxWorkers=2,
+		)
+
+		numThreads = threading.active_count()
+		self.assertLess(self.TimedLookup(hedged, BuildQuestion()), 0.4)
+		# the primary request lost the race, but it's still running
+		self.assertEqual(primary.GetCounter(), 0)
+
+		# the requests are sent by the bounded pool of threads
+		for _ in range(5):
+			self.TimedLookup(hedged, BuildQuestion())
+		self.assertLessEqual(threading.active_count(), numThreads + 2)
+
+		# and they are waited for on termination
+		hedged.Terminate()
+		self.assertGreaterEqual(primary.GetCounter(), 1)
+		self.assertLessEqual(threading.active_count(), numThreads)
+
+	def test_Downstream_Logical_Hedged_07Overload(self):
+		primary = BuildSlowHosts(delay=0.2)
+		secondary = BuildSlowHosts(delay=0.0)
+		hedged = Hedged(
+			primaryHandler=primary,
+			secondaryHandlerList=[secondary],
+			hedgeDelay=0.3,
+			maxWorkers=4,
+		)
+
+		# more concurrent callers than workers
+		numThreads = 32
+		timesUsed = []
+		errors = []
+		def _Lookup():
+			try:
+				timesUsed.append(self.TimedLookup(hedged, BuildQuestion()))
+			except Exception as e:
+				errors.append(e)
+		threads = [
+			threading.Thread(target=_Lookup) for _ in range(numThreads)
+		]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		hedged.Terminate()
+
+		self.assertEqual(errors, [])
+		self.assertEqual(len(timesUsed), numThreads)
+		# no question waits for a worker
+		self.assertLess(max(timesUsed), 0.3)
+		# and the primary answers in time, so nothing is hedged
+		stats = hedged.GetStats()
+		self.assertEqual(stats['hedged'], 0)
+		self.assertEqual(stats['throttled'], 0)
+		self.assertGreaterEqual(stats['inline'], numThreads - 4)
+		self.assertEqual(secondary.GetCounter(), 0)
+		self.assertEqual(primary.GetCounter(), numThreads)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import ipaddress
+import threading
+import time
+import unittest
+
+import dns.name
+import dns.rdataclass
+import dns.rdatatype
+
+from ModularDNS.Exceptions import DNSNameNotFoundError, ServerNetworkError
+from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
+from ModularDNS.Downstream.Logical.LatencyAware import LatencyAware
+from ModularDNS.Downstream.Logical.RaiseExcept import RaiseExcept
+from ModularDNS.MsgEntry.QuestionEntry import QuestionEntry
+
+from .BlockingHandler import BlockingHandler
+from .TestLocalHosts import BuildTestingHosts, CountingHosts
+
+
+TEST_NAME = 'test1.example.com'
+TEST_ADDR = ipaddress.ip_address('192.168.1.1')
+
+
+class SlowHosts(CountingHosts):
+
+	def __init__(self, delay: float) -> None:
+		super(SlowHosts, self).__init__()
+
+		self.delay = delay
+
+	def HandleQuestion(self, msgEntry, senderAddr, recDepthStack):
+		time.sleep(self.delay)
+
+		return super(SlowHosts, self).HandleQuestion(
+			msgEntry=msgEntry,
+			senderAddr=senderAddr,
+			recDepthStack=recDepthStack,
+		)
+
+
+def BuildSlowHosts(delay: float) -> SlowHosts:
+	hosts = SlowHosts(delay=delay)
+	hosts.AddAddrRecord(domain=TEST_NAME, ipAddr=TEST_ADDR)
+	return hosts
+
+
+def BuildQuestion(name: str = TEST_NAME) -> QuestionEntry:
+	return QuestionEntry(
+		name=dns.name.from_text(name),
+		rdCls=dns.rdataclass.IN,
+		rdType=dns.rdatatype.A,
+	)
+
+
+class TestLogicalLatencyAware(unittest.TestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def Lookup(self, handler, question) -> None:
+		ans = handler.HandleQuestion(
+			msgEntry=question,
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		self.assertEqual(ans[0].GetAddresses(), [TEST_ADDR])
+
+	def test_Downstream_Logical_LatencyAware_01PreferFaster(self):
+		for strategy in LatencyAware.STRATEGIES:
+			fast = BuildSlowHosts(delay=0.0)
+			slow = BuildSlowHosts(delay=0.02)
+			latencyAware = LatencyAware(
+				handlerList=[slow, fast],
+				strategy=strategy,
+			)
+
+			question = BuildQuestion()
+			numReqs = 100
+			for _ in range(numReqs):
+				self.Lookup(latencyAware, question)
+
+			# the slow handler is only used until its latency is known
+			self.assertLessEqual(slow.GetCounter(), 5, strategy)
+			self.assertEqual(fast.GetCounter() + slow.GetCounter(), numReqs)
+
+			stats = latencyAware.GetStats()
+			self.assertEqual(len(stats), 2)
+			self.assertGreaterEqual(stats[0]['latency'], 0.02)
+			self.assertLess(stats[1]['latency'], stats[0]['latency'])
+			self.assertEqual(stats[0]['requests'], slow.GetCounter())
+			self.assertEqual(stats[1]['requests'], fast.GetCounter())
+			self.assertEqual(stats[0]['outstanding'], 0)
+			self.assertEqual(stats[1]['errors'], 0)
+
+	def test_Downstream_Logical_LatencyAware_02AvoidErrors(self):
+		hosts = BuildTestingHosts(cls=CountingHosts)
+		hosts.AddAddrRecord(domain=TEST_NAME, ipAddr=TEST_ADDR)
+		failing = RaiseExcept(
+			exceptToRaise=ServerNetworkError,
+			exceptArgs=('Connection refused',),
+		)
+		latencyAware = LatencyAware(
+			handlerList=[failing, hosts],
+			errorPenalty=1.0,
+		)
+
+		question = BuildQuestion()
+		numErrors = 0
+		for _ in range(50):
+			try:
+				self.Lookup(latencyAware, question)
+			except ServerNetworkError:
+				numErrors += 1
+
+		# the failing handler is only used until its first error
+		self.assertEqual(numErrors, 1)
+		stats = latencyAware.GetStats()
+		self.assertEqual(stats[0]['errors'], 1)
+		self.assertGreater(stats[0]['errorRate'], 0.0)
+		self.assertEqual(stats[1]['errors'], 0)
+
+		# NXDOMAIN is not an error of the handler
+		with self.assertRaises(DNSNameNotFoundError):
+			latencyAware.HandleQuestion(
+				msgEntry=BuildQuestion('unknown.example.com'),
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+		self.assertEqual(latencyAware.GetStats()[1]['errors'], 0)
+
+	def test_Downstream_Logical_LatencyAware_03LeastOutstanding(self):
+		releaseEvent = threading.Event()
+		blockedHosts = BuildTestingHosts(cls=CountingHosts)
+		blockedHosts.AddAddrRecord(domain=TEST_NAME, ipAddr=TEST_ADDR)
+		blocked = BlockingHandler(
+			targetHandler=blockedHosts,
+			releaseEvent=releaseEvent,
+		)
+		hosts = BuildTestingHosts(cls=CountingHosts)
+		hosts.AddAddrRecord(domain=TEST_NAME, ipAddr=TEST_ADDR)
+
+		latencyAware = LatencyAware(
+			handlerList=[blocked, hosts],
+			strategy=LatencyAware.STRATEGY_LEAST_OUTSTANDING,
+		)
+
+		question = BuildQuestion()
+		# keep one request outstanding on the blocked handler
+		thread = None
+		while thread is None:
+			t = threading.Thread(
+				target=self.Lookup,
+				args=(latencyAware, question),
+			)
+			t.start()
+			time.sleep(0.05)
+			if latencyAware.GetStats()[0]['outstanding'] == 1:
+				thread = t
+			else:
+				t.join()
+
+		try:
+			numReqs = 20
+			counter = hosts.GetCounter()
+			for _ in range(numReqs):
+				self.Lookup(latencyAware, question)
+			self.assertEqual(hosts.GetCounter() - counter, numReqs)
+		finally:
+			releaseEvent.set()
+			thread.join()
+
+		self.assertEqual(blockedHosts.GetCounter(), 1)
+		self.assertEqual(latencyAware.GetStats()[0]['outstanding'], 0)
+
+	def test_Downstream_Logical_LatencyAware_04FromConfig(self):
+		hosts1 = BuildTestingHosts(cls=CountingHosts)
+		hosts2 = BuildTestingHosts(cls=CountingHosts)
+		dCollection = DownstreamCollection()
+		dCollection.AddHandler('hosts1', hosts1)
+		dCollection.AddHandler('hosts2', hosts2)
+
+		latencyAware1 = LatencyAware.FromConfig(
+			dCollection=dCollection,
+			handlerList=['s:hosts1', 's:hosts2'],
+		)
+		self.assertIsInstance(latencyAware1, LatencyAware)
+
+		latencyAware2 = LatencyAware.FromConfig(
+			dCollection=dCollection,
+			handlerList=['s:hosts1', 's:hosts2'],
+			strategy='leastOutstanding',
+			decayTime=5.0,
+			errorPenalty=2.0,
+			errorList=['ServerNetworkError'],
+		)
+		self.assertIsInstance(latencyAware2, LatencyAware)
+		self.assertEqual(latencyAware2.errorList, [ServerNetworkError])
+
+		with self.assertRaises(ValueError):
+			LatencyAware.FromConfig(
+				dCollection=dCollection,
+				handlerList=['s:hosts1'],
+				strategy='roundRobin',
+			)
+		with self.assertRaises(ValueError):
+			LatencyAware(handlerList=[])
@@ -390,3 +390,94 @@ class TestLogicalQuestionRule(unittest.TestCase):
 		self.assertNotEqual(rule1, rule2)
 		self.assertNotEqual(hash(rule1), hash(rule2))
 
+	def test_Downstream_Logical_QuestionRule_10RegexRuleMatch(self):
+		rule: QuestionRule.RegexRule = QuestionRule.RuleFromStr(r'regex:->>(.+\.)?goo+gle\.com')
+		self.assertEqual(rule._weight, QuestionRule.RegexRule.DEFAULT_WEIGHT)
+		self.assertEqual(rule._ruleBody, r'(.+\.)?goo+gle\.com')
+		self.assertEqual(str(rule), r'regex:->>70:~>>(.+\.)?goo+gle\.com')
+
+		# match
+		for name in ['google.com', 'gooogle.com', 'dns.google.com']:
+			q = QuestionEntry(
+				name=dns.name.from_text(name),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.A,
+			)
+			self.assertEqual(rule.Match(q), (True, 70))
+
+		# should not match, since the whole name must match
+		for name in ['google.com.com', 'agoogle.com', 'gogle.com']:
+			q = QuestionEntry(
+				name=dns.name.from_text(name),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.A,
+			)
+			self.assertEqual(rule.Match(q), (False, 70))
+
+		rule2 = QuestionRule.RuleFromStr(r'regex:->>23:~>>(.+\.)?goo+gle\.com')
+		self.assertEqual(rule2._weight, 23)
+		self.assertNotEqual(rule, rule2)
+
+		# invalid pattern
+		with self.assertRaises(Exception):
+			QuestionRule.RuleFromStr('regex:->>(google.com')
+
+	def test_Downstream_Logical_QuestionRule_11CIDRRuleMatch(self):
+		rule: QuestionRule.CIDRRule = QuestionRule.RuleFromStr('cidr:->>10.1.0.0/16')
+		self.assertEqual(rule._weight, QuestionRule.CIDRRule.DEFAULT_WEIGHT)
+		self.assertEqual(str(rule), 'cidr:->>60:~>>10.1.0.0/16')
+
+		q = QuestionEntry(
+			name=dns.name.from_text('google.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		# match
+		self.assertEqual(rule.Match(q, ('10.1.2.3', 53)), (True, 60))
+		self.assertEqual(rule.Match(q, ('::ffff:10.1.2.3', 53)), (True, 60))
+		# should not match
+		self.assertEqual(rule.Match(q, ('10.2.2.3', 53)), (False, 60))
+		self.assertEqual(rule.Match(q, ('fd00::1', 53)), (False, 60))
+		self.assertEqual(rule.Match(q, ('localhost', 53)), (False, 60))
+		self.assertEqual(rule.Match(q), (False, 60))
+
+		rule = QuestionRule.RuleFromStr('cidr:->>70:~>>fd00::/8')
+		self.assertEqual(rule.Match(q, ('fd12::1', 53)), (True, 70))
+		self.assertEqual(rule.Match(q, ('10.1.2.3', 53)), (False, 70))
+
+		# invalid network
+		with self.assertRaises(ValueError):
+			QuestionRule.RuleFromStr('cidr:->>10.1.0.1/16')
+		with self.assertRaises(ValueError):
+			QuestionRule.RuleFromStr('cidr:->>google.com')
+
+	def test_Downstream_Logical_QuestionRule_12QTypeQClassRuleMatch(self):
+		rule: QuestionRule.QTypeRule = QuestionRule.RuleFromStr('qtype:->>AAAA')
+		self.assertEqual(rule._weight, QuestionRule.QTypeRule.DEFAULT_WEIGHT)
+		self.assertEqual(str(rule), 'qtype:->>40:~>>AAAA')
+
+		q = QuestionEntry(
+			name=dns.name.from_text('google.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.AAAA,
+		)
+		self.assertEqual(rule.Match(q), (True, 40))
+		q = QuestionEntry(
+			name=dns.name.from_text('google.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		self.assertEqual(rule.Match(q), (False, 40))
+
+		rule: QuestionRule.QClassRule = QuestionRule.RuleFromStr('qclass:->>55:~>>CH')
+		self.assertEqual(rule.Match(q), (False, 55))
+		q = QuestionEntry(
+			name=dns.name.from_text('version.bind'),
+			rdCls=dns.rdataclass.CH,
+			rdType=dns.rdatatype.TXT,
+		)
+		self.assertEqual(rule.Match(q), (True, 55))
+
+		# invalid type
+		with self.assertRaises(Exception):
+			QuestionRule.RuleFromStr('qtype:->>NOTATYPE')
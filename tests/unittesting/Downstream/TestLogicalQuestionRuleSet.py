@@ -9,6 +9,11 @@
 
 
 import ipaddress
+import os
+import random
+import re
+import tempfile
+import time
 import unittest
 
 import dns.name
@@ -16,7 +21,7 @@ import dns.rdataclass
 import dns.rdatatype
 
 from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
-from ModularDNS.Downstream.Logical import QuestionRuleSet
+from ModularDNS.Downstream.Logical import QuestionRule, QuestionRuleSet
 from ModularDNS.MsgEntry.QuestionEntry import QuestionEntry
 
 from .TestLocalHosts import BuildTestingHosts, CountingHosts
@@ -164,3 +169,483 @@ class TestLogicalQuestionRuleSet(unittest.TestCase):
 		# both rules should match, but the full rule should have higher priority
 		self.assertEqual(matchedHandler, hosts2)
 
+	def __LinearMatchHandler(self, ruleSet, question):
+		# the reference matching, which goes through all rules one by one
+		best = None
+		for i, (rule, handler) in enumerate(ruleSet.lut.items()):
+			isMatch, weight = rule.Match(question)
+			if isMatch and ((best is None) or ((-weight, i) < best[0])):
+				best = ((-weight, i), handler)
+		return None if best is None else best[1]
+
+	def test_Downstream_Logical_QuestionRuleSet_05CompiledMatching(self):
+		rand = random.Random(12345)
+		labels = ['a', 'b', 'oo', 'goo', 'gle', 'google', 'com', 'net']
+
+		def RandName():
+			return '.'.join(
+				[ rand.choice(labels) for _ in range(rand.randint(1, 4)) ]
+			)
+
+		ruleAndHandlers = {
+			# rules that are not aligned to labels, or have an empty body
+			'sub:->>.com': 'h-0',
+			'sub:->>oogle.com': 'h-1',
+			'sub': 'h-2',
+			'sub:->>10:~>>': 'h-3',
+			'default:->>40': 'h-4',
+			# regex rules, including the ones that can't be combined
+			r'regex:->>(.+\.)?goo+gle\.com': 'h-5',
+			r'regex:->>40:~>>(.*)\.\1': 'h-6',
+			r'regex:->>50:~>>(?i)A\..*': 'h-7',
+			r'regex:->>90:~>>b(\.oo|\.a)+': 'h-8',
+		}
+		ruleStrs = set([
+			str(QuestionRule.RuleFromStr(x)) for x in ruleAndHandlers.keys()
+		])
+		for i in range(300):
+			ruleType = rand.choice(['sub', 'full', 'regex', 'default'])
+			weight = rand.choice([ 10, 40, 50, 90 ])
+			if ruleType == 'default':
+				body = ''
+			elif ruleType == 'regex':
+				body = RandName().replace('.', r'\.').replace('oo', 'o+') + '.*'
+			else:
+				body = RandName()
+			ruleStr = f'{ruleType}:->>{weight}:~>>{body}'
+			if ruleStr not in ruleStrs:
+				ruleStrs.add(ruleStr)
+				ruleAndHandlers[ruleStr] = f'h{i}'
+		# handlers are only compared, so strings are good enough here
+		ruleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers=ruleAndHandlers
+		)
+
+		self.assertEqual(len(ruleSet._regexMatcher._singleRules), 2)
+		noCacheRuleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers=ruleAndHandlers,
+			cacheSize=0,
+		)
+
+		for _ in range(2000):
+			question = QuestionEntry(
+				name=dns.name.from_text(RandName()),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.A,
+			)
+			expHandler = self.__LinearMatchHandler(ruleSet, question)
+			self.assertEqual(ruleSet.MatchHandler(question), expHandler)
+			self.assertEqual(noCacheRuleSet.MatchHandler(question), expHandler)
+
+	def test_Downstream_Logical_QuestionRuleSet_06LargeRuleSet(self):
+		numRules = 50000
+		ruleAndHandlers = {}
+		for i in range(numRules):
+			ruleAndHandlers[f'sub:->>domain{i}.example.com'] = f'sub{i}'
+			ruleAndHandlers[f'full:->>www.domain{i}.example.com'] = f'full{i}'
+
+		startTime = time.perf_counter()
+		ruleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers=ruleAndHandlers
+		)
+		buildTime = time.perf_counter() - startTime
+
+		questions = [
+			QuestionEntry(
+				name=dns.name.from_text(name),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.A,
+			)
+			for name in [
+				'a.domain123.example.com',
+				'www.domain49999.example.com',
+				'www.domain0.example.org',
+			]
+		]
+		self.assertEqual(ruleSet.MatchHandler(questions[0]), 'sub123')
+		self.assertEqual(ruleSet.MatchHandler(questions[1]), 'full49999')
+		with self.assertRaises(RuntimeError):
+			ruleSet.MatchHandler(questions[2])
+
+		numLookups = 10000
+		startTime = time.perf_counter()
+		for i in range(numLookups):
+			ruleSet.MatchHandler(questions[i % 2])
+		lookupTime = time.perf_counter() - startTime
+
+		print()
+		print(f'Building a rule set of {numRules * 2} rules took {buildTime:.3f} seconds')
+		print(f'Matching against {numRules * 2} rules took {lookupTime / numLookups * 1000000:.3f} us per question')
+
+	def test_Downstream_Logical_QuestionRuleSet_07RegexRules(self):
+		ruleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers={
+				r'regex:->>.*\.google\.com': 'h1',
+				r'regex:->>80:~>>dns\.google\.com': 'h2',
+				# the same group name can't be combined into one regex
+				r'regex:->>60:~>>(?P<x>mail)\.google\.com': 'h3',
+				r'regex:->>65:~>>(?P<x>a+)\.google\.com': 'h4',
+				'sub:->>google.com': 'h5',
+			}
+		)
+		singleBuckets = [
+			x for x in ruleSet._regexMatcher._buckets.values()
+			if x._regex is None
+		]
+		self.assertEqual(len(singleBuckets), 1)
+		self.assertEqual(len(singleBuckets[0]._rules), 3)
+
+		def MatchName(name):
+			return ruleSet.MatchHandler(
+				QuestionEntry(
+					name=dns.name.from_text(name),
+					rdCls=dns.rdataclass.IN,
+					rdType=dns.rdatatype.A,
+				)
+			)
+
+		self.assertEqual(MatchName('www.google.com'), 'h1')
+		self.assertEqual(MatchName('dns.google.com'), 'h2')
+		self.assertEqual(MatchName('mail.google.com'), 'h1')
+		self.assertEqual(MatchName('google.com'), 'h5')
+		with self.assertRaises(RuntimeError):
+			MatchName('google.org')
+
+		with self.assertRaises(ValueError):
+			QuestionRuleSet.QuestionRuleSet(ruleAndHandlers={}, cacheSize=-1)
+
+	def test_Downstream_Logical_QuestionRuleSet_08LargeRegexRuleSet(self):
+		numRules = 10000
+		ruleAndHandlers = {
+			f'regex:->>(.+\\.)?domain{i}\\.example\\.(com|net)': f'regex{i}'
+			for i in range(numRules)
+		}
+
+		startTime = time.perf_counter()
+		ruleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers=ruleAndHandlers,
+			cacheSize=0,
+		)
+		buildTime = time.perf_counter() - startTime
+		self.assertIsNone(ruleSet._regexMatcher._anyRegex)
+
+		questions = [
+			QuestionEntry(
+				name=dns.name.from_text(name),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.A,
+			)
+			for name in [
+				'a.domain123.example.com',
+				'www.domain9999.example.net',
+				'www.domain0.example.org',
+			]
+		]
+		self.assertEqual(ruleSet.MatchHandler(questions[0]), 'regex123')
+		self.assertEqual(ruleSet.MatchHandler(questions[1]), 'regex9999')
+		with self.assertRaises(RuntimeError):
+			ruleSet.MatchHandler(questions[2])
+
+		numLookups = 1000
+		startTime = time.perf_counter()
+		for i in range(numLookups):
+			ruleSet.MatchHandler(questions[i % 2])
+		lookupTime = time.perf_counter() - startTime
+
+		# with the cache in front of the regex
+		ruleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers=ruleAndHandlers,
+		)
+		startTime = time.perf_counter()
+		for i in range(numLookups):
+			ruleSet.MatchHandler(questions[i % 2])
+		cachedLookupTime = time.perf_counter() - startTime
+
+		print()
+		print(f'Building a rule set of {numRules} regex rules took {buildTime:.3f} seconds')
+		print(f'Matching against {numRules} regex rules took {lookupTime / numLookups * 1000000:.3f} us per question')
+		print(f'Matching against {numRules} regex rules (cached) took {cachedLookupTime / numLookups * 1000000:.3f} us per question')
+
+	def test_Downstream_Logical_QuestionRuleSet_09SenderAndTypeRules(self):
+		ruleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers={
+				'default': 'public',
+				'sub:->>example.com': 'example',
+				'qtype:->>60:~>>AAAA': 'ipv6',
+				'qclass:->>CH': 'chaos',
+				# split-horizon views
+				'cidr:->>80:~>>10.0.0.0/8': 'office',
+				'cidr:->>80:~>>10.8.0.0/16': 'vpn',
+				'cidr:->>80:~>>10.8.1.2/32': 'admin',
+				'cidr:->>80:~>>fd00::/8': 'office6',
+			}
+		)
+
+		def MatchName(name, senderAddr, rdType=dns.rdatatype.A, rdCls=dns.rdataclass.IN):
+			return ruleSet.MatchHandler(
+				QuestionEntry(
+					name=dns.name.from_text(name),
+					rdCls=rdCls,
+					rdType=rdType,
+				),
+				senderAddr=senderAddr,
+			)
+
+		self.assertEqual(MatchName('google.com', ('1.2.3.4', 53)), 'public')
+		self.assertEqual(MatchName('google.com', None), 'public')
+		self.assertEqual(MatchName('www.example.com', ('1.2.3.4', 53)), 'example')
+		self.assertEqual(
+			MatchName('www.example.com', ('1.2.3.4', 53), dns.rdatatype.AAAA),
+			'ipv6'
+		)
+		self.assertEqual(
+			MatchName('version.bind', None, dns.rdatatype.TXT, dns.rdataclass.CH),
+			'chaos'
+		)
+		# the longest prefix wins among CIDR rules with the same weight
+		self.assertEqual(MatchName('google.com', ('10.1.2.3', 53)), 'office')
+		self.assertEqual(MatchName('google.com', ('10.8.2.3', 53)), 'vpn')
+		self.assertEqual(MatchName('google.com', ('10.8.1.2', 53)), 'admin')
+		self.assertEqual(MatchName('google.com', ('::ffff:10.8.2.3', 53)), 'vpn')
+		self.assertEqual(MatchName('google.com', ('fd00::1', 53)), 'office6')
+		self.assertEqual(MatchName('google.com', ('fe80::1', 53)), 'public')
+		self.assertEqual(MatchName('google.com', ('localhost', 53)), 'public')
+		self.assertTrue(ruleSet.IsSenderDependent())
+
+		# the sender address is passed through `HandleQuestion`
+		hosts1 = BuildTestingHosts(cls=CountingHosts)
+		hosts2 = BuildTestingHosts(cls=CountingHosts)
+		ruleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers={
+				'sub:->>google.com': hosts1,
+				'cidr:->>192.168.0.0/16': hosts2,
+			}
+		)
+		question = QuestionEntry(
+			name=dns.name.from_text('dns.google.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		ruleSet.HandleQuestion(
+			msgEntry=question,
+			senderAddr=('192.168.1.1', 12345),
+			recDepthStack=[],
+		)
+		self.assertEqual(hosts1.GetCounter(), 0)
+		self.assertEqual(hosts2.GetCounter(), 1)
+		ruleSet.HandleQuestion(
+			msgEntry=question,
+			senderAddr=('127.0.0.1', 12345),
+			recDepthStack=[],
+		)
+		self.assertEqual(hosts1.GetCounter(), 1)
+		self.assertEqual(hosts2.GetCounter(), 1)
+
+		# rule sets without `cidr` rules don't depend on the sender
+		ruleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers={
+				'sub:->>google.com': hosts1,
+				'qtype:->>AAAA': hosts2,
+			}
+		)
+		self.assertFalse(ruleSet.IsSenderDependent())
+
+	def test_Downstream_Logical_QuestionRuleSet_10LargeCIDRRuleSet(self):
+		rand = random.Random(12345)
+		ruleAndHandlers = {}
+		networks = []
+		for i in range(5000):
+			prefixLen = rand.choice([ 16, 20, 24, 28, 32 ])
+			network = ipaddress.ip_network(
+				(rand.getrandbits(32) >> (32 - prefixLen)) << (32 - prefixLen)
+			).supernet(new_prefix=prefixLen)
+			ruleStr = f'cidr:->>{network}'
+			if ruleStr not in ruleAndHandlers:
+				ruleAndHandlers[ruleStr] = str(network)
+				networks.append(network)
+
+		startTime = time.perf_counter()
+		ruleSet = QuestionRuleSet.QuestionRuleSet(
+			ruleAndHandlers=ruleAndHandlers,
+		)
+		buildTime = time.perf_counter() - startTime
+
+		question = QuestionEntry(
+			name=dns.name.from_text('google.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		senderAddrs = [
+			(str(network.network_address + rand.randrange(network.num_addresses)), 53)
+			for network in networks[:1000]
+		]
+		for senderAddr in senderAddrs:
+			# the reference: the longest matching prefix, and then the first
+			ipAddr = ipaddress.ip_address(senderAddr[0])
+			expNetwork = max(
+				[ x for x in networks if ipAddr in x ],
+				key=lambda x: x.prefixlen,
+			)
+			self.assertEqual(
+				ruleSet.MatchHandler(question, senderAddr),
+				str(expNetwork)
+			)
+
+		numLookups = 10000
+		startTime = time.perf_counter()
+		for i in range(numLookups):
+			ruleSet.MatchHandler(question, senderAddrs[i % len(senderAddrs)])
+		lookupTime = time.perf_counter() - startTime
+
+		print()
+		print(f'Building a rule set of {len(networks)} CIDR rules took {buildTime:.3f} seconds')
+		print(f'Matching against {len(networks)} CIDR rules took {lookupTime / numLookups * 1000000:.3f} us per question')
+
+	def test_Downstream_Logical_QuestionRuleSet_11DomainListRules(self):
+		with tempfile.TemporaryDirectory() as tmpDir:
+			adsPath = os.path.join(tmpDir, 'ads.txt')
+			with open(adsPath, 'w') as f:
+				f.write('ads.example.com\nfull:tracker.example.net\n')
+			cnPath = os.path.join(tmpDir, 'cn.txt')
+			with open(cnPath, 'w') as f:
+				f.write('cn\nexample.com\n')
+
+			ruleSet = QuestionRuleSet.QuestionRuleSet(
+				ruleAndHandlers={
+					'default': 'public',
+					f'list:->>{cnPath}': 'cn',
+					f'list:->>80:~>>{adsPath}': 'block',
+					'full:->>www.example.com': 'www',
+				}
+			)
+
+		def MatchName(name):
+			return ruleSet.MatchHandler(
+				QuestionEntry(
+					name=dns.name.from_text(name),
+					rdCls=dns.rdataclass.IN,
+					rdType=dns.rdatatype.A,
+				)
+			)
+
+		self.assertEqual(MatchName('google.com'), 'public')
+		self.assertEqual(MatchName('baidu.cn'), 'cn')
+		self.assertEqual(MatchName('mail.example.com'), 'cn')
+		self.assertEqual(MatchName('www.example.com'), 'www')
+		self.assertEqual(MatchName('x.ads.example.com'), 'block')
+		self.assertEqual(MatchName('tracker.example.net'), 'block')
+		self.assertEqual(MatchName('a.tracker.example.net'), 'public')
+
+		with self.assertRaises(FileNotFoundError):
+			QuestionRuleSet.QuestionRuleSet(
+				ruleAndHandlers={ f'list:->>{adsPath}': 'block' }
+			)
+
+	def test_Downstream_Logical_QuestionRuleSet_12RegexMatcherDifferential(self):
+		rand = random.Random(0x5eed)
+
+		# each token is a regex piece, and a function giving a string it
+		# matches
+		chars = 'abe.2'
+		tokens = [
+			(lambda c: (re.escape(c), lambda: c))(c) for c in chars
+		] + [
+			(r'\x2e', lambda: '.'),
+			(r'\x62', lambda: 'b'),
+			(r'\u0065', lambda: 'e'),
+			(r'\056', lambda: '.'),
+			(r'\N{FULL STOP}', lambda: '.'),
+			(r'\d', lambda: rand.choice('0123456789')),
+			(r'\w', lambda: rand.choice('ab2')),
+			('.', lambda: rand.choice(chars)),
+			('[a-c]', lambda: rand.choice('abc')),
+			('(a|eb)', lambda: rand.choice(['a', 'eb'])),
+			('b?', lambda: rand.choice(['', 'b'])),
+			('e{1,2}', lambda: rand.choice(['e', 'ee'])),
+			(r'(?:\.2)*', lambda: '.2' * rand.randint(0, 2)),
+		]
+
+		def _RandPattern():
+			pieces = [ rand.choice(tokens) for _ in range(rand.randint(1, 8)) ]
+			if rand.random() < 0.1:
+				# a top level alternation
+				other = rand.choice(tokens)
+				return (
+					'|'.join([ ''.join([ x[0] for x in pieces ]), other[0] ]),
+					lambda: ''.join([ x[1]() for x in pieces ]),
+				)
+			return (
+				''.join([ x[0] for x in pieces ]),
+				lambda: ''.join([ x[1]() for x in pieces ]),
+			)
+
+		for _ in range(20):
+			rules = []
+			samplers = []
+			for i in range(rand.randint(1, 50)):
+				pattern, sampler = _RandPattern()
+				rule = QuestionRule.RegexRule(
+					f'{rand.randint(1, 3)}:~>>{pattern}'
+				)
+				rules.append((rule, (-rule._weight, i)))
+				samplers.append(sampler)
+			matcher = QuestionRuleSet._RegexMatcher(rules)
+
+			names = [ rand.choice(samplers)() for _ in range(200) ] + [
+				''.join(rand.choice(chars) for _ in range(rand.randint(1, 8)))
+				for _ in range(200)
+			]
+			for name in names:
+				expPrio = min(
+					[ prio for rule, prio in rules if rule._regex.fullmatch(name) ],
+					default=None,
+				)
+				self.assertEqual(
+					matcher.Match(name),
+					expPrio,
+					f'{name} against {[ x[0]._ruleBody for x in rules ]}'
+				)
+
+		# the escapes with alphanumeric operands are not taken literally
+		rules = [
+			(QuestionRule.RegexRule(r'foo\x2ebar\.com'), (-70, 0)),
+		] + [
+			(QuestionRule.RegexRule(f'{x}\\.ebar\\.com'), (-70, i + 1))
+			for i, x in enumerate(['a', 'b', 'c', 'd'])
+		]
+		matcher = QuestionRuleSet._RegexMatcher(rules)
+		self.assertEqual(matcher.Match('foo.bar.com'), (-70, 0))
+
+	def test_Downstream_Logical_QuestionRuleSet_13RegexMatcherWithoutParser(self):
+		rules = [
+			(QuestionRule.RegexRule(r'.*\.google\.com'), (-70, 0)),
+			(QuestionRule.RegexRule(r'80:~>>dns\.google\.com'), (-80, 1)),
+			(QuestionRule.RegexRule(r'(a|b)\.example\.com'), (-70, 2)),
+		]
+
+		class _BrokenParser(object):
+			@staticmethod
+			def parse(pattern):
+				raise AttributeError('the private regex parser has changed')
+
+		origParser = QuestionRuleSet._ReParser
+		for parser in [ None, _BrokenParser ]:
+			QuestionRuleSet._ReParser = parser
+			try:
+				self.assertEqual(
+					QuestionRuleSet._RegexMatcher._GetRequiredLiteral(
+						r'dns\.google\.com'
+					),
+					''
+				)
+				matcher = QuestionRuleSet._RegexMatcher(rules)
+			finally:
+				QuestionRuleSet._ReParser = origParser
+
+			# all patterns are put into the bucket that is always tried
+			self.assertEqual(len(matcher._buckets), 0)
+			self.assertEqual(len(matcher._anyRegex._prioByGroup), 3)
+			self.assertEqual(matcher.Match('www.google.com'), (-70, 0))
+			self.assertEqual(matcher.Match('dns.google.com'), (-80, 1))
+			self.assertEqual(matcher.Match('b.example.com'), (-70, 2))
+			self.assertIsNone(matcher.Match('c.example.com'))
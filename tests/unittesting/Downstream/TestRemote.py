@@ -12,7 +12,13 @@ import ipaddress
 import threading
 import unittest
 
+import dns.name
+import dns.rdataclass
+import dns.rdatatype
+
 from ModularDNS.Downstream.Remote.Remote import Remote
+from ModularDNS.Exceptions import DNSNameNotFoundError
+from ModularDNS.MsgEntry.QuestionEntry import QuestionEntry
 
 
 class TestRemote(unittest.TestCase):
@@ -35,6 +41,37 @@ class TestRemote(unittest.TestCase):
 		expIPs = [ipaddress.ip_address(x) for x in expIPStrs]
 		self.assertIn(ip, expIPs)
 
+	def NegativeLookupTest(self, remote: Remote) -> None:
+
+		# NXDOMAIN
+		with self.assertRaises(DNSNameNotFoundError) as cm:
+			remote.HandleQuestion(
+				msgEntry=QuestionEntry(
+					name=dns.name.from_text('nonexistent.invalid'),
+					rdCls=dns.rdataclass.IN,
+					rdType=dns.rdatatype.A,
+				),
+				senderAddr=('localhost', 0),
+				recDepthStack=[],
+			)
+		# the negative TTL given by the SOA record
+		self.assertIsNotNone(cm.exception.negTTL)
+
+		# NODATA
+		resps = remote.HandleQuestion(
+			msgEntry=QuestionEntry(
+				name=dns.name.from_text('dns.google'),
+				rdCls=dns.rdataclass.IN,
+				rdType=dns.rdatatype.NAPTR,
+			),
+			senderAddr=('localhost', 0),
+			recDepthStack=[],
+		)
+		self.assertEqual(
+			[ x.entryType for x in resps if x.entryType != 'ADD' ],
+			[ 'AUTH' ]
+		)
+
 	def ConcurrentStandardLookupTest(self, remote: Remote, numOfThreads: int) -> None:
 		threads = [
 			threading.Thread(
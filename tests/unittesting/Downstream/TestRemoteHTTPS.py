@@ -9,10 +9,16 @@
 
 
 import logging
+import unittest
+
+try:
+	import httpx
+except ImportError:
+	httpx = None
 
 from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
 from ModularDNS.Downstream.Remote.ByProtocol import ByProtocol
-from ModularDNS.Downstream.Remote.HTTPS import HTTPS
+from ModularDNS.Downstream.Remote.HTTPS import HTTP2Protocol, HTTPS, HTTPSProtocol
 from ModularDNS.Downstream.Remote.Endpoint import StaticEndpoint
 
 from .TestLocalHosts import BuildTestingHosts
@@ -44,12 +50,12 @@ class TestRemoteHTTPS(TestRemote):
 			StaticEndpoint.FromURI(uri='https://dns.google', resolver=hosts),
 		) as remote:
 
-			self.assertEqual(len(remote.underlying.cache), 0)
+			self.assertEqual(len(remote.underlying.pool), 0)
 
 			self.ConcurrentStandardLookupTest(remote=remote, numOfThreads=10)
 
-			self.assertGreater(len(remote.underlying.cache), 2)
-			self.assertGreater(remote.underlying.cache.NumberOfIdle(), 2)
+			self.assertGreater(len(remote.underlying.pool), 2)
+			self.assertGreater(remote.underlying.pool.NumberOfIdle(), 2)
 
 			self.ConcurrentStandardLookupTest(remote=remote, numOfThreads=5)
 
@@ -81,3 +87,58 @@ class TestRemoteHTTPS(TestRemote):
 		) as remote:
 			self.assertIsInstance(remote, HTTPS)
 
+	@unittest.skipIf(httpx is None, 'httpx[http2] is not installed')
+	def test_Downstream_Remote_HTTPS_04HTTP2(self):
+		logging.getLogger().info('')
+
+		hosts = BuildTestingHosts()
+		dCollection = DownstreamCollection()
+		dCollection.AddHandler('hosts', hosts)
+		dCollection.AddEndpoint(
+			'doh_google',
+			StaticEndpoint.FromConfig(
+				dCollection=dCollection,
+				uri='https://dns.google',
+				resolver='s:hosts',
+				preferIPv6=False
+			)
+		)
+
+		with HTTPS.FromConfig(
+			dCollection=dCollection,
+			endpoint='doh_google',
+			timeout=2.0,
+			http2=True,
+		) as remote:
+			self.assertIsInstance(remote.underlying, HTTP2Protocol)
+
+			self.StandardLookupTest(remote=remote)
+			self.NegativeLookupTest(remote=remote)
+			self.ConcurrentStandardLookupTest(remote=remote, numOfThreads=20)
+
+	def test_Downstream_Remote_HTTPS_05PostAndMemo(self):
+		logging.getLogger().info('')
+
+		hosts = BuildTestingHosts()
+		with HTTPS(
+			StaticEndpoint.FromURI(uri='https://dns.google', resolver=hosts),
+			method='POST',
+			memoSize=64,
+		) as remote:
+			self.StandardLookupTest(remote=remote)
+			self.NegativeLookupTest(remote=remote)
+
+			# identical queries are answered by the memo
+			stats = remote.respMemo.GetStats()
+			self.StandardLookupTest(remote=remote)
+			self.assertGreater(remote.respMemo.GetStats()['hits'], stats['hits'])
+
+		with self.assertRaises(ValueError):
+			HTTPSProtocol(
+				endpoint=StaticEndpoint.FromURI(
+					uri='https://dns.google',
+					resolver=hosts,
+				),
+				timeout=1.0,
+				method='PUT',
+			)
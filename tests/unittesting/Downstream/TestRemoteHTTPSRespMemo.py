@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import time
+import unittest
+
+from typing import Tuple
+
+import dns.message
+import dns.rrset
+
+from ModularDNS.Downstream.Remote.HTTPSRespMemo import HTTPSRespMemo
+
+
+def _MakeResp(name: str, ttl: int = 300) -> Tuple[bytes, bytes]:
+	q = dns.message.make_query(name, 'A')
+	resp = dns.message.make_response(q)
+	resp.answer.append(dns.rrset.from_text(name, ttl, 'IN', 'A', '1.2.3.4'))
+	return q.to_wire(), resp.to_wire()
+
+
+class TestRemoteHTTPSRespMemo(unittest.TestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_Downstream_Remote_HTTPSRespMemo_01ParseMaxAge(self):
+		self.assertEqual(HTTPSRespMemo.ParseMaxAge(None), None)
+		self.assertEqual(HTTPSRespMemo.ParseMaxAge(''), None)
+		self.assertEqual(HTTPSRespMemo.ParseMaxAge('max-age=300'), 300)
+		self.assertEqual(
+			HTTPSRespMemo.ParseMaxAge('private, Max-Age="120"'),
+			120
+		)
+		self.assertEqual(HTTPSRespMemo.ParseMaxAge('no-store, max-age=300'), None)
+		self.assertEqual(HTTPSRespMemo.ParseMaxAge('max-age=300, no-cache'), None)
+		self.assertEqual(HTTPSRespMemo.ParseMaxAge('max-age=abc'), None)
+		self.assertEqual(HTTPSRespMemo.ParseMaxAge('public'), None)
+
+	def test_Downstream_Remote_HTTPSRespMemo_02GetPut(self):
+		memo = HTTPSRespMemo(maxEntries=2)
+
+		qWire, respWire = _MakeResp('example.com.')
+		key = HTTPSRespMemo.MakeKey(qWire)
+		resp = dns.message.from_wire(respWire)
+
+		self.assertIsNone(memo.Get(key))
+
+		# responses that must not be kept
+		memo.Put(key, respWire, resp, 'remote', None)
+		memo.Put(key, respWire, resp, 'remote', 0)
+		self.assertIsNone(memo.Get(key))
+
+		memo.Put(key, respWire, resp, 'remote', 300)
+		# the message ID is ignored
+		otherQWire = b'\xab\xcd' + qWire[2:]
+		self.assertEqual(HTTPSRespMemo.MakeKey(otherQWire), key)
+		memoResp, remote = memo.Get(HTTPSRespMemo.MakeKey(otherQWire))
+		self.assertIs(memoResp, resp)
+		self.assertEqual(remote, 'remote')
+
+		# the least recently used one is evicted
+		for name in [ 'a.example.com.', 'b.example.com.' ]:
+			qWire2, respWire2 = _MakeResp(name)
+			memo.Get(key)
+			memo.Put(
+				HTTPSRespMemo.MakeKey(qWire2),
+				respWire2,
+				dns.message.from_wire(respWire2),
+				'remote',
+				300,
+			)
+		self.assertIsNotNone(memo.Get(key))
+		self.assertIsNone(memo.Get(HTTPSRespMemo.MakeKey(_MakeResp('a.example.com.')[0])))
+
+		self.assertEqual(
+			memo.GetStats(),
+			{ 'entries': 2, 'hits': 4, 'misses': 3 }
+		)
+
+		with self.assertRaises(ValueError):
+			HTTPSRespMemo(maxEntries=0)
+
+	def test_Downstream_Remote_HTTPSRespMemo_03Expiry(self):
+		memo = HTTPSRespMemo()
+
+		qWire, respWire = _MakeResp('example.com.', ttl=300)
+		key = HTTPSRespMemo.MakeKey(qWire)
+		memo.Put(key, respWire, dns.message.from_wire(respWire), 'remote', 2)
+
+		time.sleep(1.1)
+		# the TTLs are decreased by the age of the response
+		memoResp, _ = memo.Get(key)
+		self.assertEqual(memoResp.answer[0].ttl, 299)
+
+		time.sleep(1.0)
+		self.assertIsNone(memo.Get(key))
+		self.assertEqual(memo.GetStats()['entries'], 0)
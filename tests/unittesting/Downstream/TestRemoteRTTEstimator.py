@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import unittest
+
+from ModularDNS.Downstream.Remote.RTTEstimator import (
+	QueryWithRetransmits,
+	RTTEstimator,
+)
+
+
+class TestRemoteRTTEstimator(unittest.TestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_Downstream_Remote_RTTEstimator_01Estimation(self):
+		rttEstimator = RTTEstimator(minRTO=0.01, maxRTO=2.0)
+		# the initial RTO is the maximum one
+		self.assertEqual(rttEstimator.GetRTO(), 2.0)
+
+		# RTO = SRTT + 4 * RTTVAR
+		rttEstimator.AddSample(0.1)
+		stats = rttEstimator.GetStats()
+		self.assertAlmostEqual(stats['srtt'], 0.1)
+		self.assertAlmostEqual(stats['rttvar'], 0.05)
+		self.assertAlmostEqual(stats['rto'], 0.3)
+
+		rttEstimator.AddSample(0.2)
+		stats = rttEstimator.GetStats()
+		self.assertAlmostEqual(stats['rttvar'], (0.75 * 0.05) + (0.25 * 0.1))
+		self.assertAlmostEqual(stats['srtt'], (0.875 * 0.1) + (0.125 * 0.2))
+		self.assertAlmostEqual(
+			stats['rto'],
+			stats['srtt'] + (4 * stats['rttvar'])
+		)
+
+		# a stable RTT converges
+		for _ in range(100):
+			rttEstimator.AddSample(0.005)
+		self.assertAlmostEqual(rttEstimator.GetStats()['srtt'], 0.005, places=4)
+		# the RTO is clamped to the minimum
+		self.assertEqual(rttEstimator.GetRTO(), 0.01)
+
+		# the RTO is doubled on each timeout, up to the maximum
+		rttEstimator.Backoff()
+		self.assertEqual(rttEstimator.GetRTO(), 0.02)
+		for _ in range(10):
+			rttEstimator.Backoff()
+		self.assertEqual(rttEstimator.GetRTO(), 2.0)
+		self.assertEqual(rttEstimator.GetStats()['backoffs'], 11)
+
+		with self.assertRaises(ValueError):
+			RTTEstimator(minRTO=0, maxRTO=2.0)
+		with self.assertRaises(ValueError):
+			RTTEstimator(minRTO=1.0, maxRTO=0.5)
+
+	def test_Downstream_Remote_RTTEstimator_02Retransmits(self):
+		sent = []
+		waits = []
+
+		def _Wait(waitTime: float):
+			waits.append(waitTime)
+			# respond to the third transmission
+			return 'resp' if len(sent) == 3 else None
+
+		rttEstimator = RTTEstimator(minRTO=0.01, maxRTO=1.0, initialRTO=0.01)
+		self.assertEqual(
+			QueryWithRetransmits(
+				send=lambda: sent.append(True),
+				wait=_Wait,
+				timeout=1.0,
+				rttEstimator=rttEstimator,
+			),
+			'resp'
+		)
+		self.assertEqual(len(sent), 3)
+		self.assertEqual(waits, [ 0.01, 0.02, 0.04 ])
+		self.assertEqual(rttEstimator.GetStats()['samples'], 0)
+
+		# without an estimator, the query is sent once
+		sent.clear()
+		waits.clear()
+		self.assertIsNone(
+			QueryWithRetransmits(
+				send=lambda: sent.append(True),
+				wait=lambda waitTime: waits.append(waitTime),
+				timeout=0.0,
+				rttEstimator=None,
+			)
+		)
+		self.assertEqual(len(sent), 1)
+		self.assertEqual(waits, [ 0.0 ])
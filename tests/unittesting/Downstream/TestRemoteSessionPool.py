@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import threading
+import time
+import unittest
+
+from ModularDNS.Downstream.Remote.SessionPool import SessionPool
+from ModularDNS.Exceptions import ServerNetworkError
+
+
+class FakeSession(object):
+
+	def __init__(self, sid: int) -> None:
+		self.sid = sid
+		self.isWarm = False
+		self.isTerminated = False
+
+	def Terminate(self) -> None:
+		self.isTerminated = True
+
+
+class FakeSessionFactory(object):
+
+	def __init__(self) -> None:
+		self.sessions = []
+
+	def __call__(self) -> FakeSession:
+		session = FakeSession(len(self.sessions))
+		self.sessions.append(session)
+		return session
+
+
+class TestRemoteSessionPool(unittest.TestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_Downstream_Remote_SessionPool_01PreWarmAndReuse(self):
+		factory = FakeSessionFactory()
+		pool = SessionPool(factory=factory, minIdle=2)
+		try:
+			self.assertEqual(len(factory.sessions), 2)
+			self.assertEqual(len(pool), 2)
+			self.assertEqual(pool.NumberOfIdle(), 2)
+
+			s1 = pool.Get()
+			s2 = pool.Get()
+			s3 = pool.Get()
+			self.assertEqual(len(factory.sessions), 3)
+			self.assertEqual(pool.NumberOfIdle(), 0)
+
+			pool.Put(s1)
+			pool.Put(s3)
+			# the most recently returned session is reused first
+			self.assertIs(pool.Get(), s3)
+			pool.Put(s3)
+			pool.Put(s2)
+
+			self.assertEqual(
+				pool.GetStats(),
+				{
+					'inUse': 0,
+					'idle': 3,
+					'created': 3,
+					'waited': 0,
+					'rejected': 0,
+					'evicted': 0,
+				}
+			)
+		finally:
+			pool.Terminate()
+
+		self.assertTrue(all(s.isTerminated for s in factory.sessions))
+
+	def test_Downstream_Remote_SessionPool_02IdleEviction(self):
+		factory = FakeSessionFactory()
+		pool = SessionPool(factory=factory, minIdle=1, idleTimeout=0.2)
+		try:
+			sessions = [ pool.Get() for _ in range(3) ]
+			for s in sessions:
+				pool.Put(s)
+			self.assertEqual(pool.NumberOfIdle(), 3)
+
+			time.sleep(0.3)
+			# idle sessions are evicted, except the last `minIdle` ones
+			s = pool.Get()
+			self.assertIs(s, sessions[-1])
+			self.assertEqual(pool.NumberOfIdle(), 0)
+			self.assertTrue(sessions[0].isTerminated)
+			self.assertTrue(sessions[1].isTerminated)
+			self.assertFalse(sessions[2].isTerminated)
+			pool.Put(s)
+
+			self.assertEqual(pool.GetStats()['evicted'], 2)
+			self.assertEqual(len(pool), 1)
+		finally:
+			pool.Terminate()
+
+	def test_Downstream_Remote_SessionPool_03BoundedWait(self):
+		factory = FakeSessionFactory()
+		pool = SessionPool(
+			factory=factory,
+			maxSize=2,
+			waitTimeout=0.2,
+			maxWaiters=1,
+		)
+		try:
+			s1 = pool.Get()
+			s2 = pool.Get()
+
+			# no session is returned in time
+			startTime = time.monotonic()
+			with self.assertRaises(ServerNetworkError):
+				pool.Get()
+			self.assertGreaterEqual(time.monotonic() - startTime, 0.2)
+
+			# a waiting caller gets the session returned
+			result = []
+			waiter = threading.Thread(target=lambda: result.append(pool.Get()))
+			waiter.start()
+			time.sleep(0.05)
+			# too many callers are waiting
+			with self.assertRaises(ServerNetworkError):
+				pool.Get()
+			pool.Put(s1)
+			waiter.join()
+			self.assertEqual(result, [ s1 ])
+
+			self.assertEqual(len(factory.sessions), 2)
+			stats = pool.GetStats()
+			self.assertEqual(stats['inUse'], 2)
+			self.assertEqual(stats['waited'], 2)
+			self.assertEqual(stats['rejected'], 2)
+
+			pool.Put(s2)
+			pool.Put(s1)
+		finally:
+			pool.Terminate()
+
+	def test_Downstream_Remote_SessionPool_04Terminate(self):
+		factory = FakeSessionFactory()
+		pool = SessionPool(factory=factory, minIdle=1)
+
+		s1 = pool.Get()
+		s2 = pool.Get()
+		pool.Put(s2)
+		pool.Terminate()
+
+		# idle sessions are terminated immediately
+		self.assertTrue(s2.isTerminated)
+		# sessions in use are terminated once returned
+		self.assertFalse(s1.isTerminated)
+		pool.Put(s1)
+		self.assertTrue(s1.isTerminated)
+
+		with self.assertRaises(ServerNetworkError):
+			pool.Get()
+
+	def test_Downstream_Remote_SessionPool_05InvalidConfig(self):
+		factory = FakeSessionFactory()
+		for kwargs in [
+			{ 'minIdle': -1 },
+			{ 'maxSize': 0 },
+			{ 'minIdle': 3, 'maxSize': 2 },
+			{ 'idleTimeout': 0 },
+			{ 'waitTimeout': -1 },
+			{ 'maxWaiters': -1 },
+		]:
+			with self.assertRaises(ValueError):
+				SessionPool(factory=factory, **kwargs)
+		self.assertEqual(factory.sessions, [])
+
+	def test_Downstream_Remote_SessionPool_06FactoryError(self):
+		class _Interrupted(BaseException):
+			pass
+
+		def factory():
+			raise _Interrupted()
+
+		pool = SessionPool(factory=factory, maxSize=1, waitTimeout=0.0)
+		self.assertEqual(SessionPool.DEFAULT_MAX_SIZE, 500)
+		self.assertEqual(
+			SessionPool(factory=factory).maxSize,
+			SessionPool.DEFAULT_MAX_SIZE
+		)
+		try:
+			# the slot is released even if the creation is interrupted
+			for _ in range(2):
+				with self.assertRaises(_Interrupted):
+					pool.Get()
+			self.assertEqual(len(pool), 0)
+		finally:
+			pool.Terminate()
+
+	def test_Downstream_Remote_SessionPool_07WarmUp(self):
+		factory = FakeSessionFactory()
+
+		def warmUp(session: FakeSession) -> None:
+			if session.sid == 1:
+				raise ServerNetworkError('The server is down')
+			session.isWarm = True
+
+		pool = SessionPool(factory=factory, minIdle=3, warmUp=warmUp)
+		try:
+			self.assertEqual(
+				[ s.isWarm for s in factory.sessions ],
+				[ True, False, True ]
+			)
+			# the session failed to warm up is kept
+			self.assertEqual(pool.NumberOfIdle(), 3)
+
+			# sessions created on demand are used right away
+			sessions = [ pool.Get() for _ in range(4) ]
+			self.assertFalse(sessions[-1].isWarm)
+			for s in sessions:
+				pool.Put(s)
+		finally:
+			pool.Terminate()
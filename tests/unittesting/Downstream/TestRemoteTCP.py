@@ -9,12 +9,16 @@
 
 
 import logging
+import time
+
+import dns.message
 
 from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
 from ModularDNS.Downstream.Remote.ByProtocol import ByProtocol
 from ModularDNS.Downstream.Remote.TCP import TCP
 from ModularDNS.Downstream.Remote.Endpoint import StaticEndpoint
 
+from .FakeServers import FAKE_ANS_ADDR, FakeTCPServer
 from .TestLocalHosts import BuildTestingHosts
 from .TestRemote import TestRemote
 
@@ -44,15 +48,22 @@ class TestRemoteTCP(TestRemote):
 			StaticEndpoint.FromURI(uri='tcp://dns.google', resolver=hosts),
 		) as remote:
 
-			self.assertEqual(len(remote.underlying.cache), 0)
+			self.assertEqual(len(remote.underlying.pool), 0)
 
 			self.ConcurrentStandardLookupTest(remote=remote, numOfThreads=10)
 
-			self.assertGreater(len(remote.underlying.cache), 2)
-			self.assertGreater(remote.underlying.cache.NumberOfIdle(), 2)
+			self.assertGreater(len(remote.underlying.pool), 2)
+			self.assertGreater(remote.underlying.pool.NumberOfIdle(), 2)
 
 			self.ConcurrentStandardLookupTest(remote=remote, numOfThreads=5)
 
+		with TCP(
+			StaticEndpoint.FromURI(uri='tcp://dns.google', resolver=hosts),
+			muxConns=2,
+		) as remote:
+			self.ConcurrentStandardLookupTest(remote=remote, numOfThreads=20)
+			self.assertEqual(remote.underlying.pool.GetStats()['connects'], 2)
+
 	def test_Downstream_Remote_TCP_03FromConfig(self):
 		hosts = BuildTestingHosts()
 		dCollection = DownstreamCollection()
@@ -74,6 +85,24 @@ class TestRemoteTCP(TestRemote):
 		) as remote:
 			self.assertIsInstance(remote, TCP)
 
+		with TCP.FromConfig(
+			dCollection=dCollection,
+			endpoint='tcp_google',
+			timeout=1.0,
+			muxConns=2,
+		) as remote:
+			self.assertIsInstance(remote, TCP)
+
+		with TCP.FromConfig(
+			dCollection=dCollection,
+			endpoint='tcp_google',
+			timeout=1.0,
+			sessionPool={ 'minIdle': 2, 'maxSize': 8 },
+		) as remote:
+			self.assertIsInstance(remote, TCP)
+			self.assertEqual(remote.underlying.pool.NumberOfIdle(), 2)
+			self.assertEqual(remote.underlying.pool.maxSize, 8)
+
 		with ByProtocol.FromConfig(
 			dCollection=dCollection,
 			endpoint='tcp_google',
@@ -81,3 +110,48 @@ class TestRemoteTCP(TestRemote):
 		) as remote:
 			self.assertIsInstance(remote, TCP)
 
+		# only UDP retransmits, so `minTimeout` doesn't apply to TCP
+		with ByProtocol.FromConfig(
+			dCollection=dCollection,
+			endpoint='tcp_google',
+			timeout=1.0,
+			minTimeout=0.1,
+		) as remote:
+			self.assertIsInstance(remote, TCP)
+			self.assertEqual(remote.underlying.timeout, 1.0)
+
+	def test_Downstream_Remote_TCP_04LocalPreWarm(self):
+		server = FakeTCPServer()
+		try:
+			with TCP(
+				StaticEndpoint.FromURI(
+					uri=f'tcp://127.0.0.1:{server.port}',
+					resolver=BuildTestingHosts(),
+				),
+				timeout=1.0,
+				sessionPool={ 'minIdle': 2 },
+			) as remote:
+				pool = remote.underlying.pool
+
+				# the pre-warmed sessions are connected to the server
+				sessions = [ pool.Get(), pool.Get() ]
+				for session in sessions:
+					self.assertIsNotNone(session.sockAndSelector)
+				for session in sessions:
+					pool.Put(session)
+				deadline = time.monotonic() + 1.0
+				while (server.numConns < 2) and (time.monotonic() < deadline):
+					time.sleep(0.01)
+				self.assertEqual(server.numConns, 2)
+
+				# and the first queries don't need new connections
+				for _ in range(2):
+					resp, _ = remote.underlying.Query(
+						dns.message.make_query('test.example.com', 'A'),
+						recDepthStack=[],
+					)
+					self.assertEqual(resp.answer[0][0].to_text(), FAKE_ANS_ADDR)
+				self.assertEqual(server.numConns, 2)
+				self.assertEqual(len(pool), 2)
+		finally:
+			server.Terminate()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import threading
+import time
+
+from ModularDNS.Downstream.Remote.TCPMux import TCPConnectionPool
+from ModularDNS.Exceptions import ServerNetworkError
+
+from .FakeServers import FakeServerTestCase, FakeTCPServer
+
+
+class TestRemoteTCPMux(FakeServerTestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_Downstream_Remote_TCPMux_01Query(self):
+		server = FakeTCPServer()
+		pool = TCPConnectionPool(numConns=2)
+		try:
+			for i in range(10):
+				name = f'test{i}.example.com.'
+				self.AssertResp(name, self.Query(pool, server.port, name))
+
+			self.assertEqual(
+				pool.GetStats(),
+				{ 'connections': 2, 'connects': 2, 'pending': 0, 'dropped': 0 }
+			)
+			self.assertEqual(server.numConns, 2)
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_TCPMux_02ConcurrentQueries(self):
+		# responses to pipelined queries are sent out of order
+		server = FakeTCPServer(batchSize=8)
+		pool = TCPConnectionPool(numConns=2)
+		try:
+			numThreads = 64
+			numQueriesPerThread = 50
+			errors = []
+			threads = [
+				threading.Thread(
+					target=self.QueryThread,
+					args=(
+						pool,
+						server.port,
+						[
+							f'test{i}-{j}.example.com.'
+							for j in range(numQueriesPerThread)
+						],
+						errors,
+					),
+				)
+				for i in range(numThreads)
+			]
+
+			startTime = time.perf_counter()
+			for t in threads:
+				t.start()
+			for t in threads:
+				t.join()
+			timeUsed = time.perf_counter() - startTime
+
+			self.assertEqual(errors, [])
+			numQueries = numThreads * numQueriesPerThread
+			self.assertEqual(server.numQueries, numQueries)
+			# all queries are served by the same two connections
+			self.assertEqual(server.numConns, 2)
+			stats = pool.GetStats()
+			self.assertEqual(stats['connects'], 2)
+			self.assertEqual(stats['pending'], 0)
+
+			print()
+			print(f'{numQueries} pipelined queries from {numThreads} threads took {timeUsed:.3f} seconds')
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_TCPMux_03ClosedByServer(self):
+		# the server closes each connection after 3 responses, and queries
+		# sent to closed connections are retried on new ones
+		server = FakeTCPServer(closeAfter=3)
+		pool = TCPConnectionPool(numConns=1)
+		try:
+			for i in range(10):
+				name = f'test{i}.example.com.'
+				self.AssertResp(name, self.Query(pool, server.port, name))
+
+			self.assertEqual(pool.GetStats()['connects'], 4)
+			self.assertEqual(server.numConns, 4)
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_TCPMux_04IdleTimeout(self):
+		server = FakeTCPServer()
+		pool = TCPConnectionPool(numConns=1, idleTimeout=0.2)
+		try:
+			name = 'test.example.com.'
+			self.AssertResp(name, self.Query(pool, server.port, name))
+			self.assertEqual(pool.GetStats()['connections'], 1)
+
+			time.sleep(0.6)
+			self.assertEqual(pool.GetStats()['connections'], 0)
+
+			self.AssertResp(name, self.Query(pool, server.port, name))
+			self.assertEqual(pool.GetStats()['connects'], 2)
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_TCPMux_05TimeoutAndTerminate(self):
+		server = FakeTCPServer(respond=False)
+		pool = TCPConnectionPool(numConns=1)
+		errors = []
+		try:
+			startTime = time.perf_counter()
+			with self.assertRaises(ServerNetworkError):
+				self.Query(pool, server.port, 'google.com.', 0.3)
+			self.assertGreaterEqual(time.perf_counter() - startTime, 0.3)
+			self.assertEqual(pool.GetStats()['pending'], 0)
+
+			thread = threading.Thread(
+				target=self.QueryThread,
+				args=(pool, server.port, [ 'google.com.' ], errors),
+			)
+			thread.start()
+			time.sleep(0.2)
+
+			# the waiting query is woken up when the pool is terminated
+			startTime = time.perf_counter()
+			pool.Terminate()
+			thread.join()
+			self.assertLess(time.perf_counter() - startTime, 1.0)
+			self.assertEqual(len(errors), 1)
+			self.assertIsInstance(errors[0], ServerNetworkError)
+
+			with self.assertRaises(ServerNetworkError):
+				self.Query(pool, server.port, 'google.com.', 0.3)
+			# terminating twice is fine
+			pool.Terminate()
+		finally:
+			server.Terminate()
+
+		with self.assertRaises(ValueError):
+			TCPConnectionPool(numConns=0)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import logging
+import time
+
+from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
+from ModularDNS.Downstream.Local.Hosts import Hosts
+from ModularDNS.Downstream.Remote.ByProtocol import ByProtocol
+from ModularDNS.Downstream.Remote.TLS import TLS
+from ModularDNS.Downstream.Remote.Endpoint import StaticEndpoint
+
+from .TestLocalHosts import BuildTestingHosts
+from .TestRemote import TestRemote
+from .FakeServers import FakeTLSServer, TLS_CA_FILE, TLS_SERVER_HOSTNAME
+
+
+class TestRemoteTLS(TestRemote):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_Downstream_Remote_TLS_01Lookup(self):
+		logging.getLogger().info('')
+
+		hosts = BuildTestingHosts()
+		with TLS(
+			StaticEndpoint.FromURI(uri='tls://dns.google', resolver=hosts),
+		) as remote:
+			self.StandardLookupTest(remote=remote)
+
+	def test_Downstream_Remote_TLS_02Concurrent(self):
+		logging.getLogger().info('')
+
+		hosts = BuildTestingHosts()
+		with TLS(
+			StaticEndpoint.FromURI(uri='tls://dns.google', resolver=hosts),
+			numConns=2,
+		) as remote:
+			self.ConcurrentStandardLookupTest(remote=remote, numOfThreads=20)
+			self.assertEqual(remote.underlying.pool.GetStats()['connects'], 2)
+
+	def test_Downstream_Remote_TLS_03FromConfig(self):
+		hosts = BuildTestingHosts()
+		dCollection = DownstreamCollection()
+		dCollection.AddHandler('hosts', hosts)
+		dCollection.AddEndpoint(
+			'tls_google',
+			StaticEndpoint.FromConfig(
+				dCollection=dCollection,
+				uri='tls://dns.google',
+				resolver='s:hosts',
+				preferIPv6=False
+			)
+		)
+
+		with TLS.FromConfig(
+			dCollection=dCollection,
+			endpoint='tls_google',
+			timeout=1.0,
+			numConns=1,
+		) as remote:
+			self.assertIsInstance(remote, TLS)
+
+		with ByProtocol.FromConfig(
+			dCollection=dCollection,
+			endpoint='tls_google',
+			timeout=1.0
+		) as remote:
+			self.assertIsInstance(remote, TLS)
+
+	def test_Downstream_Remote_TLS_04LocalSessionResumption(self):
+		server = FakeTLSServer()
+		try:
+			hosts = Hosts.FromConfig(
+				dCollection=None,
+				config={
+					'ttl': 3600,
+					'records': [
+						{ 'domain': TLS_SERVER_HOSTNAME, 'ip': [ '127.0.0.1' ] },
+					],
+				}
+			)
+			with TLS(
+				StaticEndpoint.FromURI(
+					uri=f'tls://{TLS_SERVER_HOSTNAME}:{server.port}',
+					resolver=hosts,
+				),
+				timeout=1.0,
+				numConns=1,
+				caFile=TLS_CA_FILE,
+			) as remote:
+				pool = remote.underlying.pool
+				pool.idleTimeout = 0.2
+
+				for _ in range(2):
+					ipAddr = remote.LookupIpAddr(
+						'test.example.com',
+						preferIPv6=False,
+						recDepthStack=[],
+					)
+					self.assertEqual(str(ipAddr), '1.2.3.4')
+					# wait for the idle connection to be closed
+					time.sleep(0.6)
+
+				stats = pool.GetStats()
+				self.assertEqual(stats['connects'], 2)
+				self.assertEqual(stats['resumed'], 1)
+		finally:
+			server.Terminate()
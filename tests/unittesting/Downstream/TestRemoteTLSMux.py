@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import ssl
+import threading
+import time
+
+from ModularDNS.Downstream.Remote.TLSMux import TLSConnectionPool
+from ModularDNS.Exceptions import ServerNetworkError
+
+from .FakeServers import (
+	TLS_SERVER_HOSTNAME,
+	CreateTestingSSLContext,
+	FakeServerTestCase,
+	FakeTLSServer,
+)
+
+
+class TestRemoteTLSMux(FakeServerTestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_Downstream_Remote_TLSMux_01Query(self):
+		server = FakeTLSServer()
+		pool = TLSConnectionPool(
+			sslContext=CreateTestingSSLContext(),
+			serverHostname=TLS_SERVER_HOSTNAME,
+			numConns=2,
+		)
+		try:
+			for i in range(10):
+				name = f'test{i}.example.com.'
+				self.AssertResp(name, self.Query(pool, server.port, name))
+
+			stats = pool.GetStats()
+			self.assertEqual(stats['connections'], 2)
+			self.assertEqual(stats['connects'], 2)
+			self.assertEqual(stats['pending'], 0)
+			self.assertEqual(server.numConns, 2)
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_TLSMux_02ConcurrentQueries(self):
+		# responses to pipelined queries are sent out of order
+		server = FakeTLSServer(batchSize=8)
+		pool = TLSConnectionPool(
+			sslContext=CreateTestingSSLContext(),
+			serverHostname=TLS_SERVER_HOSTNAME,
+			numConns=2,
+		)
+		try:
+			numThreads = 32
+			numQueriesPerThread = 50
+			errors = []
+			threads = [
+				threading.Thread(
+					target=self.QueryThread,
+					args=(
+						pool,
+						server.port,
+						[
+							f'test{i}-{j}.example.com.'
+							for j in range(numQueriesPerThread)
+						],
+						errors,
+					),
+				)
+				for i in range(numThreads)
+			]
+
+			startTime = time.perf_counter()
+			for t in threads:
+				t.start()
+			for t in threads:
+				t.join()
+			timeUsed = time.perf_counter() - startTime
+
+			self.assertEqual(errors, [])
+			numQueries = numThreads * numQueriesPerThread
+			self.assertEqual(server.numQueries, numQueries)
+			# all queries are served by the same two connections
+			self.assertEqual(server.numConns, 2)
+			self.assertEqual(pool.GetStats()['pending'], 0)
+
+			print()
+			print(f'{numQueries} pipelined TLS queries from {numThreads} threads took {timeUsed:.3f} seconds')
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_TLSMux_03SessionResumption(self):
+		server = FakeTLSServer()
+		pool = TLSConnectionPool(
+			sslContext=CreateTestingSSLContext(),
+			serverHostname=TLS_SERVER_HOSTNAME,
+			numConns=1,
+			idleTimeout=0.2,
+		)
+		try:
+			name = 'test.example.com.'
+			self.AssertResp(name, self.Query(pool, server.port, name))
+			self.assertEqual(pool.GetStats()['resumed'], 0)
+
+			# the idle connection is closed, and the next one is resumed
+			time.sleep(0.6)
+			self.assertEqual(pool.GetStats()['connections'], 0)
+			self.AssertResp(name, self.Query(pool, server.port, name))
+
+			stats = pool.GetStats()
+			self.assertEqual(stats['connects'], 2)
+			self.assertEqual(stats['resumed'], 1)
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_TLSMux_04CertVerification(self):
+		server = FakeTLSServer()
+		try:
+			for sslContext, serverHostname in [
+				# the host name doesn't match the certificate
+				(CreateTestingSSLContext(), 'wrong.test'),
+				# the certificate isn't issued by a trusted CA
+				(ssl.create_default_context(), TLS_SERVER_HOSTNAME),
+			]:
+				pool = TLSConnectionPool(
+					sslContext=sslContext,
+					serverHostname=serverHostname,
+				)
+				try:
+					with self.assertRaises(ServerNetworkError):
+						self.Query(pool, server.port, 'test.example.com.')
+					self.assertEqual(pool.GetStats()['connections'], 0)
+				finally:
+					pool.Terminate()
+		finally:
+			server.Terminate()
@@ -8,6 +8,18 @@
 ###
 
 
+import socket
+import socketserver
+import threading
+import time
+
+import dns.flags
+import dns.message
+import dns.name
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+
 from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
 from ModularDNS.Downstream.Logical.RaiseExcept import RaiseExcept
 from ModularDNS.Downstream.Remote.ByProtocol import ByProtocol
@@ -15,8 +27,84 @@ from ModularDNS.Downstream.Remote.UDP import UDP
 from ModularDNS.Downstream.Remote.Endpoint import StaticEndpoint
 from ModularDNS.Exceptions import DNSServerFaultError
 
+from ModularDNS.MsgEntry.QuestionEntry import QuestionEntry
+
 from .TestLocalHosts import BuildTestingHosts
 from .TestRemote import TestRemote
+from .FakeServers import FakeUDPServer
+
+
+class FakeLargeAnsServer(object):
+	'''
+	A DNS server on both UDP and TCP, answering every query with a large TXT
+	record, which is truncated over UDP if it doesn't fit into the payload
+	size given by the query
+	'''
+
+	NUM_TXT_STRINGS = 10
+
+	@classmethod
+	def MakeResp(cls, q: dns.message.Message) -> dns.message.Message:
+		resp = dns.message.make_response(q)
+		resp.answer.append(
+			dns.rrset.from_text(
+				q.question[0].name,
+				300,
+				'IN',
+				'TXT',
+				*[ f'"{i:03d}' + ('x' * 96) + '"' for i in range(cls.NUM_TXT_STRINGS) ]
+			)
+		)
+		return resp
+
+	def __init__(self) -> None:
+		self.numUDPQueries = 0
+		self.numTCPQueries = 0
+		server = self
+
+		class UDPHandler(socketserver.BaseRequestHandler):
+			def handle(self):
+				data, sock = self.request
+				server.numUDPQueries += 1
+				q = dns.message.from_wire(data)
+				wire = server.MakeResp(q).to_wire(max_size=65535)
+				if len(wire) > max(q.payload if q.edns >= 0 else 512, 512):
+					resp = dns.message.make_response(q)
+					resp.flags |= dns.flags.TC
+					wire = resp.to_wire()
+				sock.sendto(wire, self.client_address)
+
+		class TCPHandler(socketserver.BaseRequestHandler):
+			def handle(self):
+				while True:
+					lenBytes = self.request.recv(2)
+					if len(lenBytes) < 2:
+						return
+					data = self.request.recv(int.from_bytes(lenBytes, 'big'))
+					server.numTCPQueries += 1
+					wire = server.MakeResp(
+						dns.message.from_wire(data)
+					).to_wire(max_size=65535)
+					self.request.sendall(len(wire).to_bytes(2, 'big') + wire)
+
+		self.tcpServer = socketserver.ThreadingTCPServer(('127.0.0.1', 0), TCPHandler)
+		self.tcpServer.daemon_threads = True
+		self.port = self.tcpServer.server_address[1]
+		self.udpServer = socketserver.UDPServer(('127.0.0.1', self.port), UDPHandler)
+
+		self.threads = [
+			threading.Thread(target=self.tcpServer.serve_forever),
+			threading.Thread(target=self.udpServer.serve_forever),
+		]
+		for t in self.threads:
+			t.start()
+
+	def Terminate(self) -> None:
+		for srv in (self.tcpServer, self.udpServer):
+			srv.shutdown()
+			srv.server_close()
+		for t in self.threads:
+			t.join()
 
 
 class TestRemoteUDP(TestRemote):
@@ -40,6 +128,24 @@ class TestRemoteUDP(TestRemote):
 			),
 		) as remote:
 			self.StandardLookupTest(remote=remote)
+			self.NegativeLookupTest(remote=remote)
+
+	def test_Downstream_Remote_UDP_03MuxLookup(self):
+		with UDP(
+			StaticEndpoint.FromURI(
+				uri='udp://8.8.8.8',
+				resolver=RaiseExcept(
+					exceptToRaise=DNSServerFaultError,
+					exceptKwargs={
+						'reason': 'Endpoint already knows the IP address',
+					}
+				)
+			),
+			muxSockets=2,
+		) as remote:
+			self.StandardLookupTest(remote=remote)
+			self.NegativeLookupTest(remote=remote)
+			self.ConcurrentStandardLookupTest(remote=remote, numOfThreads=20)
 
 	def test_Downstream_Remote_UDP_02FromConfig(self):
 		hosts = BuildTestingHosts()
@@ -62,6 +168,14 @@ class TestRemoteUDP(TestRemote):
 		) as remote:
 			self.assertIsInstance(remote, UDP)
 
+		with UDP.FromConfig(
+			dCollection=dCollection,
+			endpoint='udp_google',
+			timeout=1.0,
+			muxSockets=4,
+		) as remote:
+			self.assertIsInstance(remote, UDP)
+
 		with ByProtocol.FromConfig(
 			dCollection=dCollection,
 			endpoint='udp_google',
@@ -69,3 +183,122 @@ class TestRemoteUDP(TestRemote):
 		) as remote:
 			self.assertIsInstance(remote, UDP)
 
+		with ByProtocol.FromConfig(
+			dCollection=dCollection,
+			endpoint='udp_google',
+			timeout=1.0,
+			minTimeout=0.1,
+		) as remote:
+			self.assertIsInstance(remote, UDP)
+			self.assertEqual(remote.rttEstimator.GetRTO(), 1.0)
+
+	def __BuildLocalRemote(self, port: int, **kwargs) -> UDP:
+		return UDP(
+			StaticEndpoint.FromURI(
+				uri=f'udp://127.0.0.1:{port}',
+				resolver=RaiseExcept(
+					exceptToRaise=DNSServerFaultError,
+					exceptKwargs={
+						'reason': 'Endpoint already knows the IP address',
+					}
+				)
+			),
+			timeout=1.0,
+			**kwargs,
+		)
+
+	def test_Downstream_Remote_UDP_04EDNSAndTCPFallback(self):
+		server = FakeLargeAnsServer()
+		question = QuestionEntry(
+			name=dns.name.from_text('large.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.TXT,
+		)
+		try:
+			# without EDNS, the response is truncated, and retried over TCP
+			with self.__BuildLocalRemote(server.port, ednsPayload=0) as remote:
+				for _ in range(3):
+					resps = remote.HandleQuestion(
+						msgEntry=question,
+						senderAddr=('localhost', 0),
+						recDepthStack=[],
+					)
+					self.assertEqual(
+						len(resps[0].dataList),
+						FakeLargeAnsServer.NUM_TXT_STRINGS
+					)
+				self.assertEqual(
+					remote.GetStats(),
+					{ 'queries': 3, 'truncated': 3, 'tcpFallbackErrors': 0 }
+				)
+			self.assertEqual(server.numTCPQueries, 3)
+
+			# with EDNS, the response fits into the UDP payload
+			with self.__BuildLocalRemote(server.port) as remote:
+				resps = remote.HandleQuestion(
+					msgEntry=question,
+					senderAddr=('localhost', 0),
+					recDepthStack=[],
+				)
+				self.assertEqual(
+					len(resps[0].dataList),
+					FakeLargeAnsServer.NUM_TXT_STRINGS
+				)
+				self.assertEqual(remote.GetStats()['truncated'], 0)
+			self.assertEqual(server.numTCPQueries, 3)
+
+			# without TCP fallback, the truncated response is returned as is
+			with self.__BuildLocalRemote(
+				server.port,
+				ednsPayload=0,
+				tcpFallback=False,
+				muxSockets=1,
+			) as remote:
+				resp, _ = remote.Query(
+					q=remote.MakeQuery(question),
+					recDepthStack=[],
+				)
+				self.assertTrue(resp.flags & dns.flags.TC)
+				self.assertEqual(remote.GetStats()['truncated'], 1)
+			self.assertEqual(server.numTCPQueries, 3)
+		finally:
+			server.Terminate()
+
+		with self.assertRaises(ValueError):
+			self.__BuildLocalRemote(53, ednsPayload=100)
+
+	def test_Downstream_Remote_UDP_05Retransmit(self):
+		question = QuestionEntry(
+			name=dns.name.from_text('test.example.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
+		for muxSockets in [ 0, 1 ]:
+			server = FakeUDPServer(numDrops=1)
+			try:
+				with self.__BuildLocalRemote(
+					server.port,
+					muxSockets=muxSockets,
+					minTimeout=0.05,
+				) as remote:
+					# learn the RTT of the server from the first query,
+					# whose first transmission is dropped after waiting for
+					# the initial RTO (i.e., the timeout)
+					remote.rttEstimator.AddSample(0.001)
+
+					startTime = time.perf_counter()
+					resps = remote.HandleQuestion(
+						msgEntry=question,
+						senderAddr=('localhost', 0),
+						recDepthStack=[],
+					)
+					self.assertEqual(
+						[ str(x) for x in resps[0].GetAddresses() ],
+						[ '1.2.3.4' ]
+					)
+					# retransmitted after 0.05s, instead of timing out
+					self.assertLess(time.perf_counter() - startTime, 0.5)
+					self.assertEqual(server.numQueries, 2)
+					self.assertEqual(remote.rttEstimator.GetStats()['backoffs'], 1)
+			finally:
+				server.Terminate()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import threading
+import time
+
+from ModularDNS.Downstream.Remote.RTTEstimator import RTTEstimator
+from ModularDNS.Downstream.Remote.UDPMux import UDPSocketPool
+from ModularDNS.Exceptions import ServerNetworkError
+
+from .FakeServers import FakeServerTestCase, FakeUDPServer
+
+
+class TestRemoteUDPMux(FakeServerTestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_Downstream_Remote_UDPMux_01Query(self):
+		server = FakeUDPServer()
+		pool = UDPSocketPool(numSockets=2)
+		try:
+			for i in range(10):
+				name = f'test{i}.example.com.'
+				self.AssertResp(name, self.Query(pool, server.port, name))
+			self.assertEqual(pool.GetStats(), { 'pending': 0, 'dropped': 0 })
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_UDPMux_02ConcurrentQueries(self):
+		# responses are sent out of order, after bogus ones
+		server = FakeUDPServer(batchSize=16, sendBogus=True)
+		pool = UDPSocketPool(numSockets=4)
+		try:
+			numThreads = 64
+			numQueriesPerThread = 50
+			errors = []
+			threads = [
+				threading.Thread(
+					target=self.QueryThread,
+					args=(
+						pool,
+						server.port,
+						[
+							f'test{i}-{j}.example.com.'
+							for j in range(numQueriesPerThread)
+						],
+						errors,
+					),
+				)
+				for i in range(numThreads)
+			]
+
+			startTime = time.perf_counter()
+			for t in threads:
+				t.start()
+			for t in threads:
+				t.join()
+			timeUsed = time.perf_counter() - startTime
+
+			self.assertEqual(errors, [])
+			stats = pool.GetStats()
+			self.assertEqual(stats['pending'], 0)
+			# 3 bogus responses per query
+			self.assertEqual(
+				stats['dropped'],
+				3 * numThreads * numQueriesPerThread
+			)
+
+			numQueries = numThreads * numQueriesPerThread
+			print()
+			print(f'{numQueries} multiplexed queries from {numThreads} threads took {timeUsed:.3f} seconds')
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_UDPMux_03Timeout(self):
+		server = FakeUDPServer(respond=False)
+		pool = UDPSocketPool(numSockets=1)
+		try:
+			startTime = time.perf_counter()
+			with self.assertRaises(ServerNetworkError):
+				self.Query(pool, server.port, 'google.com.', 0.3)
+			self.assertGreaterEqual(time.perf_counter() - startTime, 0.3)
+			self.assertEqual(pool.GetStats()['pending'], 0)
+		finally:
+			pool.Terminate()
+			server.Terminate()
+
+	def test_Downstream_Remote_UDPMux_04Terminate(self):
+		server = FakeUDPServer(respond=False)
+		pool = UDPSocketPool(numSockets=1)
+		errors = []
+		try:
+			thread = threading.Thread(
+				target=self.QueryThread,
+				args=(pool, server.port, [ 'google.com.' ], errors),
+			)
+			thread.start()
+			time.sleep(0.2)
+
+			# the waiting query is woken up when the pool is terminated
+			startTime = time.perf_counter()
+			pool.Terminate()
+			thread.join()
+			self.assertLess(time.perf_counter() - startTime, 1.0)
+			self.assertEqual(len(errors), 1)
+			self.assertIsInstance(errors[0], ServerNetworkError)
+
+			with self.assertRaises(ServerNetworkError):
+				self.Query(pool, server.port, 'google.com.', 0.3)
+			# terminating twice is fine
+			pool.Terminate()
+		finally:
+			server.Terminate()
+
+		with self.assertRaises(ValueError):
+			UDPSocketPool(numSockets=0)
+
+	def test_Downstream_Remote_UDPMux_05Retransmit(self):
+		server = FakeUDPServer(numDrops=2)
+		pool = UDPSocketPool(numSockets=1)
+		rttEstimator = RTTEstimator(minRTO=0.05, maxRTO=2.0, initialRTO=0.05)
+		try:
+			name = 'test.example.com.'
+			# the first two transmissions are dropped
+			startTime = time.perf_counter()
+			self.AssertResp(
+				name,
+				self.Query(
+					pool,
+					server.port,
+					name,
+					timeout=2.0,
+					rttEstimator=rttEstimator,
+				)
+			)
+			# retransmitted after 0.05s and 0.1s
+			timeUsed = time.perf_counter() - startTime
+			self.assertGreaterEqual(timeUsed, 0.15)
+			self.assertLess(timeUsed, 1.0)
+			self.assertEqual(server.numQueries, 3)
+
+			# no RTT sample is taken from a retransmitted query
+			stats = rttEstimator.GetStats()
+			self.assertEqual(stats['backoffs'], 2)
+			self.assertEqual(stats['samples'], 0)
+			self.assertEqual(stats['rto'], 0.2)
+
+			self.AssertResp(
+				name,
+				self.Query(
+					pool,
+					server.port,
+					name,
+					timeout=2.0,
+					rttEstimator=rttEstimator,
+				)
+			)
+			self.assertEqual(server.numQueries, 4)
+			stats = rttEstimator.GetStats()
+			self.assertEqual(stats['samples'], 1)
+			self.assertEqual(stats['rto'], 0.05)
+			self.assertEqual(pool.GetStats()['pending'], 0)
+		finally:
+			pool.Terminate()
+			server.Terminate()
@@ -132,26 +132,11 @@ class TestAddEntry(unittest.TestCase):
 			rawSet=testRRset1,
 		)
 
-		addEntryCopy = copy.copy(addEntry1)
-		self.assertEqual(addEntry1, addEntryCopy)
-		self.assertEqual(addEntry1._rawSet, addEntryCopy._rawSet)
+		# immutable objects are shared rather than copied
+		self.assertIs(copy.copy(addEntry1), addEntry1)
+		self.assertIs(copy.deepcopy(addEntry1), addEntry1)
 
-		# Change the a member of the copy
-		testRRset2 = dns.rrset.from_text_list(
-			name='dns.google',
-			ttl=300,
-			rdclass=dns.rdataclass.IN,
-			rdtype=dns.rdatatype.A,
-			text_rdatas=[ '8.8.8.8', '8.8.4.4' ]
-		)
-		addEntryCopy._rawSet = testRRset2
-		self.assertNotEqual(addEntry1, addEntryCopy)
-		self.assertNotEqual(addEntry1._rawSet, addEntryCopy._rawSet)
-
-		addEntryCopy = copy.copy(addEntry1)
-		self.assertEqual(addEntry1, addEntryCopy)
-
-	def test_MsgEntry_AddEntry_3DeepCopy(self):
+	def test_MsgEntry_AddEntry_3Immutable(self):
 		testRRset1 = dns.rrset.from_text_list(
 			name='dns.google.com',
 			ttl=300,
@@ -163,22 +148,10 @@ class TestAddEntry(unittest.TestCase):
 			rawSet=testRRset1,
 		)
 
-		addEntryCopy = copy.deepcopy(addEntry1)
-		self.assertEqual(addEntry1, addEntryCopy)
-		self.assertEqual(addEntry1._rawSet, addEntryCopy._rawSet)
-
-		# Change the a member of the copy
-		testRRset2 = dns.rrset.from_text_list(
-			name='dns.google',
-			ttl=300,
-			rdclass=dns.rdataclass.IN,
-			rdtype=dns.rdatatype.A,
-			text_rdatas=[ '8.8.8.8', '8.8.4.4' ]
-		)
-		addEntryCopy._rawSet = testRRset2
-		self.assertNotEqual(addEntry1, addEntryCopy)
-		self.assertNotEqual(addEntry1._rawSet, addEntryCopy._rawSet)
-
-		addEntryCopy = copy.deepcopy(addEntry1)
-		self.assertEqual(addEntry1, addEntryCopy)
+		with self.assertRaises(AttributeError):
+			addEntry1._rawSet = testRRset1
+		with self.assertRaises(AttributeError):
+			addEntry1.newAttr = 1
 
+		# the RRset given is used as is
+		self.assertIs(addEntry1.ToRRSet(), testRRset1)
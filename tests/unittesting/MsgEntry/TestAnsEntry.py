@@ -145,36 +145,42 @@ class TestAnsEntry(unittest.TestCase):
 			],
 		)
 
-		ansEntryCopy = copy.copy(ansEntry1)
-		self.assertEqual(ansEntry1, ansEntryCopy)
-		self.assertEqual(ansEntry1.name, ansEntryCopy.name)
-		self.assertEqual(ansEntry1.rdCls, ansEntryCopy.rdCls)
-		self.assertEqual(ansEntry1.rdType, ansEntryCopy.rdType)
-		self.assertEqual(ansEntry1.ttl, ansEntryCopy.ttl)
-		self.assertEqual(ansEntry1.dataList, ansEntryCopy.dataList)
-
-		# Change the name of the copy
-		ansEntryCopy.name = dns.name.from_text('dns.google')
-		self.assertNotEqual(ansEntry1, ansEntryCopy)
-		self.assertNotEqual(ansEntry1.name, ansEntryCopy.name)
-		self.assertEqual(ansEntry1.rdCls, ansEntryCopy.rdCls)
-		self.assertEqual(ansEntry1.rdType, ansEntryCopy.rdType)
-		self.assertEqual(ansEntry1.ttl, ansEntryCopy.ttl)
-		self.assertEqual(ansEntry1.dataList, ansEntryCopy.dataList)
-
-		ansEntryCopy = copy.copy(ansEntry1)
-		self.assertEqual(ansEntry1, ansEntryCopy)
-
-		# Change the dataList of the copy
-		ansEntryCopy.dataList.pop()
-		self.assertNotEqual(ansEntry1, ansEntryCopy)
-		self.assertEqual(ansEntry1.name, ansEntryCopy.name)
-		self.assertEqual(ansEntry1.rdCls, ansEntryCopy.rdCls)
-		self.assertEqual(ansEntry1.rdType, ansEntryCopy.rdType)
-		self.assertEqual(ansEntry1.ttl, ansEntryCopy.ttl)
-		self.assertNotEqual(ansEntry1.dataList, ansEntryCopy.dataList)
-
-	def test_MsgEntry_AnsEntry_3DeepCopy(self):
+		# immutable objects are shared rather than copied
+		self.assertIs(copy.copy(ansEntry1), ansEntry1)
+		self.assertIs(copy.deepcopy(ansEntry1), ansEntry1)
+
+	def test_MsgEntry_AnsEntry_3Immutable(self):
+		ansEntry1 = AnsEntry(
+			name=dns.name.from_text('dns.google.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+			ttl=300,
+			dataList=[
+				dns.rdata.from_text(dns.rdataclass.IN, dns.rdatatype.A, '8.8.8.8'),
+				dns.rdata.from_text(dns.rdataclass.IN, dns.rdatatype.A, '8.8.4.4'),
+			],
+		)
+
+		with self.assertRaises(AttributeError):
+			ansEntry1.name = dns.name.from_text('dns.google')
+		with self.assertRaises(AttributeError):
+			ansEntry1.ttl = 30
+		with self.assertRaises(AttributeError):
+			ansEntry1.newAttr = 1
+		# the data list is a tuple, so it can't be changed either
+		self.assertIsInstance(ansEntry1.dataList, tuple)
+		self.assertEqual(len(ansEntry1.dataList), 2)
+
+		# a different TTL requires a new entry
+		ansEntry2 = ansEntry1.WithTTL(30)
+		self.assertEqual(ansEntry1.ttl, 300)
+		self.assertEqual(ansEntry2.ttl, 30)
+		self.assertEqual(ansEntry1.name, ansEntry2.name)
+		self.assertEqual(ansEntry1.dataList, ansEntry2.dataList)
+		self.assertNotEqual(ansEntry1, ansEntry2)
+		self.assertIs(ansEntry1.WithTTL(300), ansEntry1)
+
+	def test_MsgEntry_AnsEntry_4ToRRSet(self):
 		ansEntry1 = AnsEntry(
 			name=dns.name.from_text('dns.google.com'),
 			rdCls=dns.rdataclass.IN,
@@ -186,32 +192,15 @@ class TestAnsEntry(unittest.TestCase):
 			],
 		)
 
-		ansEntryCopy = copy.deepcopy(ansEntry1)
-		self.assertEqual(ansEntry1, ansEntryCopy)
-		self.assertEqual(ansEntry1.name, ansEntryCopy.name)
-		self.assertEqual(ansEntry1.rdCls, ansEntryCopy.rdCls)
-		self.assertEqual(ansEntry1.rdType, ansEntryCopy.rdType)
-		self.assertEqual(ansEntry1.ttl, ansEntryCopy.ttl)
-		self.assertEqual(ansEntry1.dataList, ansEntryCopy.dataList)
-
-		# Change the name of the copy
-		ansEntryCopy.name = dns.name.from_text('dns.google')
-		self.assertNotEqual(ansEntry1, ansEntryCopy)
-		self.assertNotEqual(ansEntry1.name, ansEntryCopy.name)
-		self.assertEqual(ansEntry1.rdCls, ansEntryCopy.rdCls)
-		self.assertEqual(ansEntry1.rdType, ansEntryCopy.rdType)
-		self.assertEqual(ansEntry1.ttl, ansEntryCopy.ttl)
-		self.assertEqual(ansEntry1.dataList, ansEntryCopy.dataList)
-
-		ansEntryCopy = copy.deepcopy(ansEntry1)
-		self.assertEqual(ansEntry1, ansEntryCopy)
-
-		# Change the dataList of the copy
-		ansEntryCopy.dataList.pop()
-		self.assertNotEqual(ansEntry1, ansEntryCopy)
-		self.assertEqual(ansEntry1.name, ansEntryCopy.name)
-		self.assertEqual(ansEntry1.rdCls, ansEntryCopy.rdCls)
-		self.assertEqual(ansEntry1.rdType, ansEntryCopy.rdType)
-		self.assertEqual(ansEntry1.ttl, ansEntryCopy.ttl)
-		self.assertNotEqual(ansEntry1.dataList, ansEntryCopy.dataList)
+		rrset = ansEntry1.ToRRSet()
+		self.assertEqual(rrset.name, ansEntry1.name)
+		self.assertEqual(rrset.ttl, ansEntry1.ttl)
+		self.assertEqual(len(rrset), 2)
+		# the RRset is only built once
+		self.assertIs(ansEntry1.ToRRSet(), rrset)
 
+		# the RRset given is used as is
+		ansEntry2 = AnsEntry.FromRRSet(rrset)
+		self.assertEqual(ansEntry1, ansEntry2)
+		self.assertEqual(hash(ansEntry1), hash(ansEntry2))
+		self.assertIs(ansEntry2.ToRRSet(), rrset)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import copy
+import unittest
+
+import dns.name
+import dns.rdata
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+
+from ModularDNS.MsgEntry.AuthEntry import AuthEntry, MsgEntry
+
+
+class TestAuthEntry(unittest.TestCase):
+
+	def setUp(self):
+		pass
+
+	def tearDown(self):
+		pass
+
+	def test_MsgEntry_AuthEntry_1Equal(self):
+		testRRset1 = dns.rrset.from_text_list(
+			name='dns.google.com',
+			ttl=300,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.A,
+			text_rdatas=[ '8.8.8.8', '8.8.4.4' ]
+		)
+		authEntry1 = AuthEntry(
+			rawSet=testRRset1,
+		)
+		self.assertEqual(authEntry1.entryType, 'AUTH')
+
+		testRRset2 = dns.rrset.from_text_list(
+			name='dns.google.com',
+			ttl=300,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.A,
+			text_rdatas=[ '8.8.8.8', '8.8.4.4' ]
+		)
+		authEntry2 = AuthEntry(
+			rawSet=testRRset2,
+		)
+		self.assertEqual(authEntry2.entryType, 'AUTH')
+
+		self.assertEqual(authEntry1, authEntry2)
+		self.assertEqual(hash(authEntry1), hash(authEntry2))
+
+		# a AuthEntry has a empty dataList
+		testRRsetEmpty = dns.rrset.from_text_list(
+			name='dns.google.com',
+			ttl=300,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.A,
+			text_rdatas=[ ]
+		)
+		authEntryEmpty = AuthEntry(
+			rawSet=testRRsetEmpty,
+		)
+
+		self.assertNotEqual(authEntry1, authEntryEmpty)
+		self.assertNotEqual(hash(authEntry1), hash(authEntryEmpty))
+
+		# Different name
+		testRRset3 = dns.rrset.from_text_list(
+			name='dns.google',
+			ttl=300,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.A,
+			text_rdatas=[ '8.8.8.8', '8.8.4.4' ]
+		)
+		authEntry3 = AuthEntry(
+			rawSet=testRRset3,
+		)
+
+		self.assertNotEqual(authEntry1, authEntry3)
+		self.assertNotEqual(hash(authEntry1), hash(authEntry3))
+
+		# Different rdCls
+		testRRset4 = dns.rrset.from_text_list(
+			name='dns.google.com',
+			ttl=300,
+			rdclass=dns.rdataclass.ANY,
+			rdtype=dns.rdatatype.A,
+			text_rdatas=[ ]
+		)
+		authEntry4 = AuthEntry(
+			rawSet=testRRset4,
+		)
+
+		self.assertNotEqual(authEntryEmpty, authEntry4)
+		self.assertNotEqual(hash(authEntryEmpty), hash(authEntry4))
+
+		# Different rdType
+		testRRset5 = dns.rrset.from_text_list(
+			name='dns.google.com',
+			ttl=300,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.AAAA,
+			text_rdatas=[ ]
+		)
+		authEntry5 = AuthEntry(
+			rawSet=testRRset5,
+		)
+
+		self.assertNotEqual(authEntryEmpty, authEntry5)
+		self.assertNotEqual(hash(authEntryEmpty), hash(authEntry5))
+
+		# Different classes
+		msgEntry = MsgEntry(entryType=authEntry1.entryType)
+		self.assertNotEqual(authEntry1, msgEntry)
+
+	def test_MsgEntry_AuthEntry_2Copy(self):
+		testRRset1 = dns.rrset.from_text_list(
+			name='dns.google.com',
+			ttl=300,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.A,
+			text_rdatas=[ '8.8.8.8', '8.8.4.4' ]
+		)
+		authEntry1 = AuthEntry(
+			rawSet=testRRset1,
+		)
+
+		# immutable objects are shared rather than copied
+		self.assertIs(copy.copy(authEntry1), authEntry1)
+		self.assertIs(copy.deepcopy(authEntry1), authEntry1)
+
+	def test_MsgEntry_AuthEntry_3Immutable(self):
+		testRRset1 = dns.rrset.from_text_list(
+			name='dns.google.com',
+			ttl=300,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.A,
+			text_rdatas=[ '8.8.8.8', '8.8.4.4' ]
+		)
+		authEntry1 = AuthEntry(
+			rawSet=testRRset1,
+		)
+
+		with self.assertRaises(AttributeError):
+			authEntry1._rawSet = testRRset1
+		with self.assertRaises(AttributeError):
+			authEntry1.newAttr = 1
+
+		# the RRset given is used as is
+		self.assertIs(authEntry1.ToRRSet(), testRRset1)
@@ -83,38 +83,40 @@ class TestQuestionEntry(unittest.TestCase):
 			rdType=dns.rdatatype.A,
 		)
 
-		questionEntryCopy = copy.copy(questionEntry)
+		# immutable objects are shared rather than copied
+		self.assertIs(copy.copy(questionEntry), questionEntry)
+		self.assertIs(copy.deepcopy(questionEntry), questionEntry)
 
-		self.assertEqual(questionEntry, questionEntryCopy)
-		self.assertEqual(questionEntry.name, questionEntryCopy.name)
-		self.assertEqual(questionEntry.rdCls, questionEntryCopy.rdCls)
-		self.assertEqual(questionEntry.rdType, questionEntryCopy.rdType)
-
-		questionEntryCopy.name = dns.name.from_text('www.google.com')
-
-		self.assertNotEqual(questionEntry, questionEntryCopy)
-		self.assertNotEqual(questionEntry.name, questionEntryCopy.name)
-		self.assertEqual(questionEntry.rdCls, questionEntryCopy.rdCls)
-		self.assertEqual(questionEntry.rdType, questionEntryCopy.rdType)
-
-	def test_MsgEntry_QuestionEntry_3DeepCopy(self):
+	def test_MsgEntry_QuestionEntry_3Immutable(self):
 		questionEntry = QuestionEntry(
 			name=dns.name.from_text('google.com'),
 			rdCls=dns.rdataclass.IN,
 			rdType=dns.rdatatype.A,
 		)
 
-		questionEntryCopy = copy.deepcopy(questionEntry)
-
-		self.assertEqual(questionEntry, questionEntryCopy)
-		self.assertEqual(questionEntry.name, questionEntryCopy.name)
-		self.assertEqual(questionEntry.rdCls, questionEntryCopy.rdCls)
-		self.assertEqual(questionEntry.rdType, questionEntryCopy.rdType)
-
-		questionEntryCopy.name = dns.name.from_text('www.google.com')
+		with self.assertRaises(AttributeError):
+			questionEntry.name = dns.name.from_text('www.google.com')
+		with self.assertRaises(AttributeError):
+			questionEntry.newAttr = 1
+		with self.assertRaises(AttributeError):
+			del questionEntry.name
+		self.assertEqual(questionEntry.name, dns.name.from_text('google.com'))
 
-		self.assertNotEqual(questionEntry, questionEntryCopy)
-		self.assertNotEqual(questionEntry.name, questionEntryCopy.name)
-		self.assertEqual(questionEntry.rdCls, questionEntryCopy.rdCls)
-		self.assertEqual(questionEntry.rdType, questionEntryCopy.rdType)
+	def test_MsgEntry_QuestionEntry_4ToRRSet(self):
+		questionEntry = QuestionEntry(
+			name=dns.name.from_text('google.com'),
+			rdCls=dns.rdataclass.IN,
+			rdType=dns.rdatatype.A,
+		)
 
+		rrset = questionEntry.ToRRSet()
+		self.assertEqual(rrset.name, questionEntry.name)
+		self.assertEqual(rrset.rdclass, questionEntry.rdCls)
+		self.assertEqual(rrset.rdtype, questionEntry.rdType)
+		# the RRset is only built once
+		self.assertIs(questionEntry.ToRRSet(), rrset)
+
+		# the RRset given is used as is
+		questionEntry2 = QuestionEntry.FromRRSet(rrset)
+		self.assertEqual(questionEntry, questionEntry2)
+		self.assertIs(questionEntry2.ToRRSet(), rrset)
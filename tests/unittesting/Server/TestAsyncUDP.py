@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import logging
+import socket
+import time
+import unittest
+
+import dns.message
+import dns.query
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+
+from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
+from ModularDNS.Server import AsyncUDP
+
+from ..Downstream.TestLocalHosts import BuildTestingHosts
+from ..Downstream.TestLogicalLatencyAware import (
+	TEST_ADDR,
+	TEST_NAME,
+	BuildSlowHosts,
+)
+
+
+class TestAsyncUDP(unittest.TestCase):
+
+	def setUp(self):
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.suitStartTime = time.time()
+
+		hosts = BuildTestingHosts()
+		self.dCollection = DownstreamCollection()
+		self.dCollection.AddHandler('hosts', hosts)
+
+		self.srcAddr = '127.0.0.1'
+		self.server = AsyncUDP.AsyncUDP.FromConfig(
+			dCollection=self.dCollection,
+			ip=self.srcAddr,
+			port=0,
+			downstream='s:hosts',
+		)
+		self.srcPort = self.server.GetSrcPort()
+
+		self.logger.info(f'UDP server is listening on {self.srcAddr}:{self.srcPort}')
+
+		self.server.ThreadedServeUntilTerminate()
+
+	def tearDown(self):
+		self.server.Terminate()
+
+		elapseTime = time.time() - self.suitStartTime
+		self.logger.info(f'Test suite took {elapseTime:.3f} seconds')
+
+	def test_Server_AsyncUDP_01MsgHandling(self):
+		queryName = 'dns.google.com'
+		dnsMsg = dns.message.make_query(
+			queryName,
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.A,
+		)
+
+		startTime = time.time()
+		resp = dns.query.udp(
+			q=dnsMsg,
+			where=self.srcAddr,
+			port=self.srcPort,
+			timeout=1,
+		)
+		elapseTime = time.time() - startTime
+
+		self.assertIsInstance(resp, dns.message.Message)
+		self.assertEqual(resp.rcode(), dns.rcode.NOERROR)
+		self.assertGreaterEqual(len(resp.answer), 1)
+		self.assertIn('8.8.8.8', [r.address for r in resp.answer[0].items])
+
+		self.logger.info(f'Query {queryName} took {elapseTime:.3f} seconds')
+
+		# the invalid message is ignored, and the server keeps serving
+		with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+			sock.sendto(b'\x00\x01', (self.srcAddr, self.srcPort))
+		resp = dns.query.udp(
+			q=dnsMsg,
+			where=self.srcAddr,
+			port=self.srcPort,
+			timeout=1,
+		)
+		self.assertEqual(resp.rcode(), dns.rcode.NOERROR)
+
+	def test_Server_AsyncUDP_02ConcurrentHandling(self):
+		hosts = BuildSlowHosts(delay=0.3)
+		server = AsyncUDP.AsyncUDP.CreateServer(
+			server_address=(self.srcAddr, 0),
+			downstreamHdlr=hosts,
+			maxWorkers=8,
+		)
+		server.ThreadedServeUntilTerminate()
+		try:
+			where = (self.srcAddr, server.GetSrcPort())
+			socks = [
+				socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+				for _ in range(8)
+			]
+			try:
+				startTime = time.monotonic()
+				for sock in socks:
+					dnsMsg = dns.message.make_query(
+						TEST_NAME,
+						rdclass=dns.rdataclass.IN,
+						rdtype=dns.rdatatype.A,
+					)
+					sock.sendto(dnsMsg.to_wire(), where)
+				for sock in socks:
+					sock.settimeout(2.0)
+					resp = dns.message.from_wire(sock.recv(65535))
+					self.assertIn(
+						str(TEST_ADDR),
+						[r.address for r in resp.answer[0].items]
+					)
+				# the slow queries are handled concurrently
+				self.assertLess(time.monotonic() - startTime, 0.9)
+			finally:
+				for sock in socks:
+					sock.close()
+		finally:
+			server.Terminate()
+
+		self.assertEqual(hosts.GetCounter(), 8)
+
+	def test_Server_AsyncUDP_03PacketCache(self):
+		hosts = BuildSlowHosts(delay=0.0)
+		server = AsyncUDP.AsyncUDP.CreateServer(
+			server_address=(self.srcAddr, 0),
+			downstreamHdlr=hosts,
+			packetCacheSize=16,
+		)
+		server.ThreadedServeUntilTerminate()
+		try:
+			for _ in range(3):
+				dnsMsg = dns.message.make_query(
+					TEST_NAME,
+					rdclass=dns.rdataclass.IN,
+					rdtype=dns.rdatatype.A,
+				)
+				resp = dns.query.udp(
+					q=dnsMsg,
+					where=self.srcAddr,
+					port=server.GetSrcPort(),
+					timeout=1,
+				)
+				self.assertEqual(resp.id, dnsMsg.id)
+				self.assertIn(
+					str(TEST_ADDR),
+					[r.address for r in resp.answer[0].items]
+				)
+		finally:
+			server.Terminate()
+
+		# only the first query reaches the downstream handler
+		self.assertEqual(hosts.GetCounter(), 1)
+
+	def test_Server_AsyncUDP_04Terminate(self):
+		# terminate a server that has never served
+		server = AsyncUDP.AsyncUDP.FromConfig(
+			dCollection=self.dCollection,
+			ip=self.srcAddr,
+			port=0,
+			downstream='s:hosts',
+		)
+		server.Terminate()
+		# no serve thread is started after termination
+		server.ThreadedServeUntilTerminate()
+		self.assertFalse(server.hasServeThreadStarted)
+		server.Terminate()
+
+		with self.assertRaises(ValueError):
+			AsyncUDP.AsyncUDP.FromConfig(
+				dCollection=self.dCollection,
+				ip=self.srcAddr,
+				port=0,
+				downstream='s:hosts',
+				maxWorkers=0,
+			)
@@ -19,6 +19,7 @@ import dns.rdataclass
 import dns.rdatatype
 
 from ModularDNS.Downstream.DownstreamCollection import DownstreamCollection
+from ModularDNS.Downstream.Logical.QuestionRuleSet import QuestionRuleSet
 from ModularDNS.Server import UDP
 
 from ..Downstream.TestLocalHosts import BuildTestingHosts
@@ -78,3 +79,34 @@ class TestUDP(unittest.TestCase):
 
 		self.logger.info(f'Query {queryName} took {elapseTime:.3f} seconds')
 
+	def test_Server_UDP_02PacketCacheBySender(self):
+		def _CreateServer():
+			return UDP.UDP.FromConfig(
+				dCollection=self.dCollection,
+				ip=self.srcAddr,
+				port=0,
+				downstream='s:hosts',
+				packetCacheSize=16,
+			)
+
+		server = _CreateServer()
+		try:
+			self.assertFalse(server.packetCache.keyBySender)
+		finally:
+			server.Terminate()
+
+		# the answers depend on the sender once a `cidr` rule is in use
+		self.dCollection.AddHandler(
+			'rules',
+			QuestionRuleSet(
+				ruleAndHandlers={
+					'default': self.dCollection.GetHandler('s:hosts'),
+					'cidr:->>10.0.0.0/8': self.dCollection.GetHandler('s:hosts'),
+				}
+			),
+		)
+		server = _CreateServer()
+		try:
+			self.assertTrue(server.packetCache.keyBySender)
+		finally:
+			server.Terminate()
@@ -9,6 +9,7 @@
 
 
 import logging
+import time
 import unittest
 
 import dns.message
@@ -146,3 +147,130 @@ class TestUtils(unittest.TestCase):
 			self.assertIsInstance(dnsMsgAns, dns.message.Message)
 			self.assertEqual(dnsMsgAns.rcode(), dns.rcode.SERVFAIL)
 
+	def test_Server_Utils_02PacketCache(self):
+		packetCache = Utils.PacketCache(maxEntries=2)
+
+		with BuildTestingHosts() as hosts:
+			def _Handle(rawQuery):
+				return Utils.CommonRawDNSMsgHandling(
+					rawData=rawQuery,
+					senderAddr=('127.0.0.1', 12345),
+					downstreamHdlr=hosts,
+					logger=self.logger,
+					packetCache=packetCache,
+				)
+
+			# miss
+			query1 = dns.message.make_query(
+				'dns.google.com',
+				rdclass=dns.rdataclass.IN,
+				rdtype=dns.rdatatype.A,
+			)
+			resp1 = dns.message.from_wire(_Handle(query1.to_wire()))
+			self.assertEqual(resp1.id, query1.id)
+			self.assertGreaterEqual(len(resp1.answer), 1)
+			self.assertEqual(
+				packetCache.GetStats(),
+				{ 'entries': 1, 'hits': 0, 'misses': 1 }
+			)
+
+			# hit, with a different ID and a different case of the name
+			query2 = dns.message.make_query(
+				'DNS.Google.com',
+				rdclass=dns.rdataclass.IN,
+				rdtype=dns.rdatatype.A,
+			)
+			query2.id = (query1.id + 1) % 65536
+			resp2 = dns.message.from_wire(_Handle(query2.to_wire()))
+			self.assertEqual(resp2.id, query2.id)
+			self.assertEqual(
+				resp2.question[0].name.to_text(),
+				'DNS.Google.com.'
+			)
+			self.assertEqual(resp2.answer, resp1.answer)
+			self.assertEqual(resp2.answer[0].ttl, resp1.answer[0].ttl)
+			self.assertEqual(
+				packetCache.GetStats(),
+				{ 'entries': 1, 'hits': 1, 'misses': 1 }
+			)
+
+			# the TTL values are decremented
+			time.sleep(1.1)
+			resp3 = dns.message.from_wire(_Handle(query1.to_wire()))
+			self.assertEqual(resp3.answer[0].ttl, resp1.answer[0].ttl - 1)
+
+			# EDNS options are part of the key
+			query4 = dns.message.make_query(
+				'dns.google.com',
+				rdclass=dns.rdataclass.IN,
+				rdtype=dns.rdatatype.A,
+				use_edns=0,
+			)
+			_Handle(query4.to_wire())
+			self.assertEqual(
+				packetCache.GetStats(),
+				{ 'entries': 2, 'hits': 2, 'misses': 2 }
+			)
+
+			# responses without TTL (e.g., NXDOMAIN) are not cached
+			query5 = dns.message.make_query(
+				'nx.example.com',
+				rdclass=dns.rdataclass.IN,
+				rdtype=dns.rdatatype.A,
+			)
+			resp5 = dns.message.from_wire(_Handle(query5.to_wire()))
+			self.assertEqual(resp5.rcode(), dns.rcode.NXDOMAIN)
+			self.assertEqual(packetCache.GetStats()['entries'], 2)
+
+			# the least recently used entry is evicted
+			query6 = dns.message.make_query(
+				'dns.google',
+				rdclass=dns.rdataclass.IN,
+				rdtype=dns.rdatatype.AAAA,
+			)
+			_Handle(query6.to_wire())
+			self.assertEqual(packetCache.GetStats()['entries'], 2)
+			_Handle(query1.to_wire())
+			self.assertEqual(packetCache.GetStats()['misses'], 5)
+
+			# invalid queries are ignored
+			self.assertIsNone(_Handle(b'\x00\x01\x02'))
+
+	def test_Server_Utils_03PacketCacheBySender(self):
+		packetCache = Utils.PacketCache(maxEntries=4, keyBySender=True)
+
+		query = dns.message.make_query(
+			'dns.google.com',
+			rdclass=dns.rdataclass.IN,
+			rdtype=dns.rdatatype.A,
+		).to_wire()
+
+		# the key depends on the address of the sender, but not on its port
+		self.assertNotEqual(
+			packetCache.MakeKey(query, ('10.0.0.1', 12345)),
+			packetCache.MakeKey(query, ('10.0.0.2', 12345)),
+		)
+		self.assertEqual(
+			packetCache.MakeKey(query, ('10.0.0.1', 12345)),
+			packetCache.MakeKey(query, ('10.0.0.1', 54321)),
+		)
+		# queries without a sender are never cached
+		self.assertIsNone(packetCache.MakeKey(query))
+
+		with BuildTestingHosts() as hosts:
+			def _Handle(rawQuery, senderAddr):
+				return Utils.CommonRawDNSMsgHandling(
+					rawData=rawQuery,
+					senderAddr=senderAddr,
+					downstreamHdlr=hosts,
+					logger=self.logger,
+					packetCache=packetCache,
+				)
+
+			_Handle(query, ('10.0.0.1', 12345))
+			_Handle(query, ('10.0.0.1', 12346))
+			_Handle(query, ('10.0.0.2', 12345))
+			self.assertEqual(
+				packetCache.GetStats(),
+				{ 'entries': 2, 'hits': 1, 'misses': 2 }
+			)
@@ -43,3 +43,28 @@ class TestExceptions(unittest.TestCase):
 			Exceptions.DNSServerFaultError
 		)
 
+	def test_Exceptions_02CopyException(self):
+		exceptions = [
+			Exceptions.DNSNameNotFoundError(
+				name='nx.example.com',
+				respServer='remote',
+				negTTL=60,
+			),
+			Exceptions.DNSRequestRefusedError('local', 'remote'),
+			Exceptions.ServerNetworkError('Connection refused'),
+			ValueError('Testing', 1),
+		]
+		for e in exceptions:
+			try:
+				raise e
+			except BaseException:
+				pass
+			self.assertIsNotNone(e.__traceback__)
+
+			newE = Exceptions.CopyException(e)
+			self.assertIsNot(newE, e)
+			self.assertIs(type(newE), type(e))
+			self.assertEqual(newE.args, e.args)
+			self.assertEqual(str(newE), str(e))
+			self.assertEqual(newE.__dict__, e.__dict__)
+			self.assertIsNone(newE.__traceback__)
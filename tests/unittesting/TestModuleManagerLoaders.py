@@ -17,6 +17,8 @@ from ModularDNS.Downstream.Handler import DownstreamHandler
 from ModularDNS.Downstream.Local.Cache import Cache
 from ModularDNS.Downstream.Local.Hosts import Hosts
 from ModularDNS.Downstream.Logical.Failover import Failover
+from ModularDNS.Downstream.Logical.Hedged import Hedged
+from ModularDNS.Downstream.Logical.LatencyAware import LatencyAware
 from ModularDNS.Downstream.Logical.LimitConcurrentReq import LimitConcurrentReq
 from ModularDNS.Downstream.Logical.QtAnsLog import QtAnsLog
 from ModularDNS.Downstream.Logical.QuestionRuleSet import QuestionRuleSet
@@ -26,8 +28,10 @@ from ModularDNS.Downstream.Remote.ByProtocol import ByProtocol
 from ModularDNS.Downstream.Remote.Endpoint import Endpoint, StaticEndpoint
 from ModularDNS.Downstream.Remote.HTTPS import HTTPS
 from ModularDNS.Downstream.Remote.TCP import TCP
+from ModularDNS.Downstream.Remote.TLS import TLS
 from ModularDNS.Downstream.Remote.UDP import UDP
 
+from ModularDNS.Server.AsyncUDP import AsyncUDP as AsyncUDPServer
 from ModularDNS.Server.TCP import TCP as TCPServer
 from ModularDNS.Server.UDP import UDP as UDPServer
 
@@ -44,6 +48,8 @@ class TestModuleManagerLoaders(unittest.TestCase):
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Local.Cache'), Cache)
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Local.Hosts'), Hosts)
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Logical.Failover'), Failover)
+		self.assertEqual(MODULE_MGR.GetModule('Downstream.Logical.Hedged'), Hedged)
+		self.assertEqual(MODULE_MGR.GetModule('Downstream.Logical.LatencyAware'), LatencyAware)
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Logical.LimitConcurrentReq'), LimitConcurrentReq)
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Logical.QtAnsLog'), QtAnsLog)
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Logical.QuestionRuleSet'), QuestionRuleSet)
@@ -54,7 +60,9 @@ class TestModuleManagerLoaders(unittest.TestCase):
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Remote.StaticEndpoint'), StaticEndpoint)
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Remote.HTTPS'), HTTPS)
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Remote.TCP'), TCP)
+		self.assertEqual(MODULE_MGR.GetModule('Downstream.Remote.TLS'), TLS)
 		self.assertEqual(MODULE_MGR.GetModule('Downstream.Remote.UDP'), UDP)
+		self.assertEqual(MODULE_MGR.GetModule('Server.AsyncUDP'), AsyncUDPServer)
 		self.assertEqual(MODULE_MGR.GetModule('Server.TCP'), TCPServer)
 		self.assertEqual(MODULE_MGR.GetModule('Server.UDP'), UDPServer)
 
@@ -76,6 +84,18 @@ class TestModuleManagerLoaders(unittest.TestCase):
 				DownstreamHandler
 			)
 		)
+		self.assertTrue(
+			issubclass(
+				MODULE_MGR.GetModule('Downstream.Logical.Hedged'),
+				DownstreamHandler
+			)
+		)
+		self.assertTrue(
+			issubclass(
+				MODULE_MGR.GetModule('Downstream.Logical.LatencyAware'),
+				DownstreamHandler
+			)
+		)
 		self.assertTrue(
 			issubclass(
 				MODULE_MGR.GetModule('Downstream.Logical.LimitConcurrentReq'),
@@ -134,6 +154,12 @@ class TestModuleManagerLoaders(unittest.TestCase):
 				DownstreamHandler
 			)
 		)
+		self.assertTrue(
+			issubclass(
+				MODULE_MGR.GetModule('Downstream.Remote.TLS'),
+				DownstreamHandler
+			)
+		)
 		self.assertTrue(
 			issubclass(
 				MODULE_MGR.GetModule('Downstream.Remote.UDP'),
@@ -15,10 +15,14 @@ from .Downstream.TestDownstreamCollection import TestDownstreamCollection
 from .Downstream.TestStackDepth import TestStackDepth
 
 from .Downstream.TestLocalCache import TestLocalCache
+from .Downstream.TestLocalCacheStore import TestLocalCacheStore
 from .Downstream.TestLocalHosts import TestLocalHosts
 
 from .Downstream.TestLogicalConstAns import TestLogicalConstAns
+from .Downstream.TestLogicalDomainList import TestLogicalDomainList
 from .Downstream.TestLogicalFailover import TestLogicalFailover
+from .Downstream.TestLogicalHedged import TestLogicalHedged
+from .Downstream.TestLogicalLatencyAware import TestLogicalLatencyAware
 from .Downstream.TestLogicalLimitConcurrentReq import TestLogicalLimitConcurrentReq
 from .Downstream.TestLogicalQtAnsLog import TestLogicalQtAnsLog
 from .Downstream.TestLogicalQuestionRule import TestLogicalQuestionRule
@@ -29,15 +33,24 @@ from .Downstream.TestLogicalRandomChoice import TestLogicalRandomChoice
 from .Downstream.TestRemoteEndpoint import TestRemoteEndpoint
 from .Downstream.TestRemoteHTTPS import TestRemoteHTTPS
 from .Downstream.TestRemoteHTTPSAdapters import TestRemoteHTTPSAdapters
+from .Downstream.TestRemoteHTTPSRespMemo import TestRemoteHTTPSRespMemo
+from .Downstream.TestRemoteRTTEstimator import TestRemoteRTTEstimator
+from .Downstream.TestRemoteSessionPool import TestRemoteSessionPool
 from .Downstream.TestRemoteTCP import TestRemoteTCP
+from .Downstream.TestRemoteTCPMux import TestRemoteTCPMux
+from .Downstream.TestRemoteTLS import TestRemoteTLS
+from .Downstream.TestRemoteTLSMux import TestRemoteTLSMux
 from .Downstream.TestRemoteUDP import TestRemoteUDP
+from .Downstream.TestRemoteUDPMux import TestRemoteUDPMux
 
 from .MsgEntry.TestAddEntry import TestAddEntry
 from .MsgEntry.TestAnsEntry import TestAnsEntry
+from .MsgEntry.TestAuthEntry import TestAuthEntry
 from .MsgEntry.TestQuestionEntry import TestQuestionEntry
 
 from .Server.TestUtils import TestUtils
 from .Server.TestTCP import TestTCP
 from .Server.TestUDP import TestUDP
+from .Server.TestAsyncUDP import TestAsyncUDP
 from .Server.TestServerCollection import TestServerCollection
 